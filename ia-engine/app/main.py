@@ -1,26 +1,97 @@
 """Punto de entrada del microservicio Email Studio IA Engine (FastAPI)."""
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 
+from app.routers.admin import router as admin_router
+from app.routers.debug import router as debug_router
 from app.routers.generate import router as generate_router
 from app.routers.meta import router as meta_router
+from app.routers.sessions import router as sessions_router
+from app.services.cassette import MODE_REPLAY, get_cassette
+from app.services.providers import get_router
+from app.services.runtime_monitor import run_in_lane, start_runtime_monitor, stop_runtime_monitor
+from app.services.text_engine import generate_pool_variant
+from app.services.variant_pool import start_pool_scheduler, stop_pool_scheduler
+from app.services.warmup import is_ready, start_warm_up, warmup_state
+from app.utils.catalog import get_catalog, start_catalog_watcher, stop_catalog_watcher
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    """
+    Arranque/apagado: carga el catálogo, levanta el watcher si corresponde,
+    lanza el warm-up en background (ver /ready), el scheduler del pool y
+    los health checks de proveedores (salvo en replay de cassettes: sin red)
+    y el monitor de event loop / threadpool.
+    """
+    start_runtime_monitor()
+    get_catalog()
+    start_catalog_watcher()
+    start_warm_up()
+    start_pool_scheduler(generate_pool_variant)
+    if get_cassette().mode != MODE_REPLAY:
+        get_router().start_health_checks()
+    yield
+    get_router().stop_health_checks()
+    stop_pool_scheduler()
+    stop_catalog_watcher()
+    await stop_runtime_monitor()
+
 
 app = FastAPI(
     title="Email Studio IA Engine",
     version="0.1.0",
     description="Microservicio de IA para generación de contenidos de Email Studio.",
+    lifespan=lifespan,
 )
 
 
-@app.get("/health", tags=["health"])
-def health_check() -> dict:
-    """Endpoint simple de healthcheck para monitoreo."""
+def _health() -> dict:
     return {"status": "ok"}
 
 
+def _readiness():
+    state = warmup_state()
+    if not is_ready():
+        return JSONResponse(status_code=503, content=state)
+    return state
+
+
+@app.get("/health", tags=["health"])
+async def health_check() -> dict:
+    """
+    Endpoint simple de healthcheck para monitoreo.
+
+    Con IA_RESERVED_LANE=1 corre en el carril reservado: no espera detrás
+    de las generaciones que ocupan el threadpool.
+    """
+    return await run_in_lane(_health)
+
+
+@app.get("/ready", tags=["health"])
+async def readiness_check():
+    """
+    Readiness probe: 200 solo cuando el warm-up terminó
+    (cliente construido, conexión abierta y prompts precompilados).
+    """
+    return await run_in_lane(_readiness)
+
+
 # Rutas principales del motor IA
 # /ia/generate  → generación de sets de contenido (antes “trios”)
 app.include_router(generate_router, prefix="/ia", tags=["ia"])
 
+# /ia/sessions  → sesiones de refinamiento por WebSocket (contexto en el servidor)
+app.include_router(sessions_router, prefix="/ia", tags=["ia"])
+
 # /ia/meta      → catálogo de campañas / clusters para el frontend/backend
 app.include_router(meta_router, prefix="/ia", tags=["meta"])
+
+# /ia/admin/*   → operaciones administrativas (recarga de catálogo, etc.)
+app.include_router(admin_router, prefix="/ia", tags=["admin"])
+
+# /debug/*      → diagnóstico (flight recorder de requests lentos)
+app.include_router(debug_router)
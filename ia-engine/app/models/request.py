@@ -5,10 +5,15 @@ A nivel de negocio hablamos de *sets de contenido*:
 cada set = {subject, preheader, title, subtitle, body, cta}.
 """
 
-from typing import Optional
+from typing import List, Literal, Optional
 
 from pydantic import BaseModel, Field
 
+from app.models.response import GeneratedVariant
+
+# Campos de un set que se pueden regenerar por separado
+VariantField = Literal["subject", "preheader", "title", "subtitle", "body", "cta"]
+
 
 class EmailFeedback(BaseModel):
     """
@@ -41,7 +46,8 @@ class GenerateRequest(BaseModel):
     Request para el endpoint /ia/generate.
 
     Mapea 1:1 con lo que necesitamos desde el backend Node:
-    - engine   → nombre lógico del motor (por ahora 'openai').
+    - engine   → motor: un proveedor ('openai' por defecto, 'anthropic'),
+                 un endpoint de IA_PROVIDERS, 'auto' o 'template'.
     - campaign → campaña (ej: 'Crédito de consumo - Persona').
     - cluster  → cluster/segmento (driver_asunto).
     - sets     → CANTIDAD DE SETS de contenido a generar.
@@ -50,7 +56,12 @@ class GenerateRequest(BaseModel):
 
     engine: str = Field(
         default="openai",
-        description="Motor de IA a utilizar (por ahora solo 'openai').",
+        description=(
+            "Motor de IA a utilizar: un proveedor ('openai', default; 'anthropic') "
+            "o endpoint de IA_PROVIDERS preferido, 'auto' (ruteo por latencia "
+            "entre todos los endpoints configurados) o 'template' (generador "
+            "local por catálogo, sin llamadas al modelo)."
+        ),
     )
 
     campaign: str = Field(
@@ -87,3 +98,81 @@ class GenerateRequest(BaseModel):
         """
         self.sets = sets
         return self
+
+
+class RegenerateRequest(BaseModel):
+    """
+    Request para /ia/regenerate: rehace solo algunos campos de un set ya
+    generado, dejando el resto fijo como contexto.
+    """
+
+    engine: str = Field(
+        default="auto",
+        description="Mismo significado que en GenerateRequest ('auto', proveedor, endpoint o 'template').",
+    )
+
+    campaign: str = Field(..., description="Campaña del set.")
+
+    cluster: str = Field(..., description="Cluster/driver del set.")
+
+    variant: GeneratedVariant = Field(
+        ...,
+        description="Set actual completo (tal como lo devolvió /ia/generate o editado por el usuario).",
+    )
+
+    fields: List[VariantField] = Field(
+        ...,
+        min_length=1,
+        description="Campos a regenerar: subject, preheader, title, subtitle, body y/o cta.",
+    )
+
+    instruction: Optional[str] = Field(
+        default=None,
+        max_length=500,
+        description="Indicación opcional del usuario (ej: 'más corto', 'destaca la tasa').",
+    )
+
+
+class SessionOpen(BaseModel):
+    """
+    Primer mensaje de una sesión de refinamiento por WebSocket (/ia/sessions):
+    fija campaña, cluster y motor para todos los turnos.
+    """
+
+    engine: str = Field(
+        default="auto",
+        description="Mismo significado que en GenerateRequest ('auto', proveedor, endpoint o 'template').",
+    )
+
+    campaign: str = Field(..., description="Campaña de la sesión.")
+
+    cluster: str = Field(..., description="Cluster/driver de la sesión.")
+
+
+class SessionRefine(BaseModel):
+    """
+    Turno de refinamiento: solo el delta respecto del turno anterior.
+
+    Los hints de `feedback` se acumulan en el servidor (un campo en "" lo
+    borra; un campo ausente no cambia). `base` elige un set del turno
+    anterior como punto de partida.
+    """
+
+    sets: int = Field(default=1, ge=1, le=5, description="Sets a generar en este turno (1..5).")
+
+    feedback: Optional[EmailFeedback] = Field(
+        default=None,
+        description="Cambios en los hints (subject/preheader/bodyContent/body).",
+    )
+
+    instruction: Optional[str] = Field(
+        default=None,
+        max_length=500,
+        description="Indicación del turno (ej: 'más corto', 'destaca la tasa').",
+    )
+
+    base: Optional[int] = Field(
+        default=None,
+        ge=1,
+        description="Id de un set del turno anterior a refinar.",
+    )
@@ -90,3 +90,21 @@ class GenerateResponse(BaseModel):
         default_factory=dict,
         description="Metadatos de la llamada (tokens, duración, mensajes internos, etc.).",
     )
+
+
+class RegenerateResponse(BaseModel):
+    """Respuesta de /ia/regenerate: solo los campos que cambiaron."""
+
+    engine: str = Field(..., description="Motor de IA utilizado.")
+
+    id: int = Field(..., description="Id del set regenerado (el mismo del request).")
+
+    fields: Dict[str, Optional[str]] = Field(
+        default_factory=dict,
+        description="Campos nuevos (solo los que cambiaron respecto del set recibido).",
+    )
+
+    metadata: Dict[str, Any] = Field(
+        default_factory=dict,
+        description="Metadatos de la llamada (campos pedidos, sin cambios, lint, presupuesto de tokens).",
+    )
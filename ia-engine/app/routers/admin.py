@@ -0,0 +1,148 @@
+# ia-engine/app/routers/admin.py
+"""Rutas administrativas del IA Engine (protegidas con X-Admin-Token)."""
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from app.services.adaptive_limit import get_adaptive_limit
+from app.services.cancellation import cancellation_stats
+from app.services.cascade import cascade_stats
+from app.services.cassette import get_cassette
+from app.services.idempotency import idempotency_stats
+from app.services.openai_client import output_format_stats
+from app.services.profiling import list_profiles, read_profile
+from app.services.providers import get_router
+from app.services.runtime_monitor import runtime_stats
+from app.services.scheduler import get_scheduler
+from app.services.semantic_cache import semantic_cache_stats
+from app.services.sessions import get_session_store
+from app.services.variant_pool import pool_stats
+from app.utils.admin_auth import require_admin
+from app.utils.catalog import CatalogError, get_catalog, reload_catalog
+
+# El prefix "/ia" lo aplica main.py al incluir el router.
+router = APIRouter(tags=["admin"], dependencies=[Depends(require_admin)])
+
+
+@router.get("/admin/catalog")
+def read_catalog_status() -> dict:
+    """Versión y origen del snapshot de catálogo vigente."""
+    snapshot = get_catalog()
+    return {
+        "version": snapshot.version,
+        "source": snapshot.source,
+        "loadedAt": snapshot.loaded_at,
+        "contentHash": snapshot.content_hash,
+    }
+
+
+@router.post("/admin/catalog/reload")
+def reload_catalog_now() -> dict:
+    """
+    Recarga el catálogo desde IA_CATALOG_PATH y publica un snapshot nuevo.
+
+    Los requests en curso terminan con el snapshot que tomaron al iniciar.
+    Si el catálogo es inválido se responde 422 y se mantiene la versión vigente.
+    """
+    previous = get_catalog().version
+    try:
+        snapshot = reload_catalog()
+    except CatalogError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+
+    return {
+        "version": snapshot.version,
+        "previousVersion": previous,
+        "changed": snapshot.version != previous,
+        "source": snapshot.source,
+    }
+
+
+@router.get("/admin/pool")
+def read_pool_stats() -> dict:
+    """Profundidad, hit rate y edad del pool de sets pre-generados."""
+    return pool_stats()
+
+
+@router.get("/admin/providers")
+def read_provider_stats() -> dict:
+    """
+    Endpoints LLM (EWMA de latencia/errores, circuito, último error,
+    structured outputs), resultados por modo de salida y estado del cassette.
+    """
+    return {
+        "endpoints": get_router().snapshot(),
+        "outputFormats": output_format_stats(),
+        "cassette": get_cassette().stats(),
+    }
+
+
+@router.post("/admin/providers/health")
+def run_provider_health() -> dict:
+    """Ejecuta los health checks ahora (cierra circuitos de endpoints sanos)."""
+    return {"health": get_router().check_health()}
+
+
+@router.get("/admin/cascade")
+def read_cascade_stats() -> dict:
+    """Tiers de la cascada de modelos y tasa de escalamiento por campaña."""
+    return cascade_stats()
+
+
+@router.get("/admin/idempotency")
+def read_idempotency_stats() -> dict:
+    """Keys de Idempotency-Key guardadas y cuántos duplicados se absorbieron."""
+    return idempotency_stats()
+
+
+@router.get("/admin/semantic-cache")
+def read_semantic_cache_stats() -> dict:
+    """Entradas, combinaciones y hit rate del caché semántico de feedback."""
+    return semantic_cache_stats()
+
+
+@router.get("/admin/cancellation")
+def read_cancellation_stats() -> dict:
+    """Requests cancelados por desconexión del cliente y tokens desperdiciados (estimados)."""
+    return cancellation_stats()
+
+
+@router.get("/admin/sessions")
+def read_session_stats() -> dict:
+    """Sesiones de refinamiento vivas, turnos y descartes por inactividad/tope."""
+    return get_session_store().stats()
+
+
+@router.get("/admin/scheduler")
+def read_scheduler_stats() -> dict:
+    """Cupos del scheduler de llamadas al LLM, colas por clase y límite adaptativo."""
+    adaptive = get_adaptive_limit()
+    return {**get_scheduler().stats(), "adaptive": adaptive.stats() if adaptive is not None else None}
+
+
+@router.get("/admin/runtime")
+async def read_runtime_stats() -> dict:
+    """
+    Lag del event loop, ocupación/espera del threadpool y carril reservado.
+
+    Async (solo lee memoria): responde aunque el threadpool esté saturado.
+    """
+    return runtime_stats()
+
+
+@router.get("/admin/profiles")
+def read_profiles() -> dict:
+    """Perfiles de CPU guardados (más nuevo primero)."""
+    return {"profiles": list_profiles()}
+
+
+@router.get("/admin/profiles/{profile_id}", response_class=PlainTextResponse)
+def read_profile_file(profile_id: str) -> str:
+    """Perfil en formato collapsed (flamegraph.pl / speedscope / inferno)."""
+    content = read_profile(profile_id)
+    if content is None:
+        raise HTTPException(status_code=404, detail="Perfil no encontrado")
+    return content
+
+
+__all__ = ["router"]
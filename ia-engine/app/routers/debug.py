@@ -0,0 +1,37 @@
+# ia-engine/app/routers/debug.py
+"""Rutas de diagnóstico del IA Engine (protegidas con X-Admin-Token)."""
+
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, Query
+
+from app.services import flight_recorder
+from app.utils.admin_auth import require_admin
+
+# Se monta sin prefix: /debug/*
+router = APIRouter(tags=["debug"], dependencies=[Depends(require_admin)])
+
+
+@router.get("/debug/requests")
+def read_flight_recorder(
+    view: Literal["recent", "slowest"] = "recent",
+    campaign: Optional[str] = None,
+    cluster: Optional[str] = None,
+    min_ms: float = Query(default=0.0, ge=0, alias="minMs"),
+    limit: int = Query(default=50, ge=1, le=500),
+) -> dict:
+    """
+    Últimos requests (view=recent) o los más lentos por ventana
+    (view=slowest), con tiempos por etapa e intentos de cada set.
+    Filtros: campaign, cluster y latencia mínima (minMs).
+    """
+    return flight_recorder.query(
+        view=view,
+        campaign=campaign,
+        cluster=cluster,
+        min_ms=min_ms,
+        limit=limit,
+    )
+
+
+__all__ = ["router"]
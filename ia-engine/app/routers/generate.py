@@ -1,36 +1,163 @@
 # ia-engine/app/routers/generate.py
 """Rutas principales del motor de IA (generación de contenidos)."""
 
-from fastapi import APIRouter, HTTPException
+import hashlib
+from functools import partial
+from typing import Optional
 
-from app.models.request import GenerateRequest
-from app.models.response import GenerateResponse
-from app.services.text_engine import generate_sets
+from fastapi import APIRouter, Header, HTTPException, Request, Response
+
+from app.models.request import GenerateRequest, RegenerateRequest
+from app.models.response import GenerateResponse, RegenerateResponse
+from app.services import flight_recorder
+from app.services.cancellation import CancelToken, RequestCancelled, run_until_disconnected
+from app.services.idempotency import (
+    HEADER as IDEMPOTENCY_HEADER,
+    REPLAY_HEADER,
+    STATUS_NEW,
+    IdempotencyConflict,
+    IdempotencyTimeout,
+    run_idempotent,
+)
+from app.services.profiling import PROFILE_HEADER, SamplingProfiler, should_profile
+from app.services.scheduler import CALLER_HEADER, PRIORITY_HEADER, use_priority
+from app.services.text_engine import generate_sets_with_metadata, regenerate_fields
+from app.utils.admin_auth import ADMIN_HEADER
 
 router: APIRouter = APIRouter()
 
+# Respuesta para un cliente que ya se fue (convención de nginx: client closed request)
+STATUS_CLIENT_CLOSED = 499
+
+
+def _summary(payload: GenerateRequest) -> dict:
+    """Resumen del payload para el flight recorder (sin textos de feedback)."""
+    fb = payload.feedback
+    return {
+        "engine": payload.engine,
+        "campaign": payload.campaign,
+        "cluster": payload.cluster,
+        "setsRequested": payload.sets,
+        "feedback": sorted(k for k, v in fb.model_dump().items() if v) if fb else [],
+    }
+
+
+def _generate(payload: GenerateRequest, profile: bool = False) -> GenerateResponse:
+    profiler = SamplingProfiler() if profile else None
+    try:
+        with flight_recorder.track("/ia/generate", _summary(payload)):
+            if profiler is None:
+                variants, engine_meta = generate_sets_with_metadata(payload)
+            else:
+                with profiler:
+                    variants, engine_meta = generate_sets_with_metadata(payload)
+    except Exception as e:  # pragma: no cover
+        raise HTTPException(status_code=500, detail=str(e))
+
+    if profiler is not None and profiler.save():
+        engine_meta["profile"] = profiler.summary()
+
+    return GenerateResponse(
+        engine=payload.engine,
+        variants=variants,
+        metadata={
+            "message": f"IA Engine OK ({payload.engine})",
+            "sets": len(variants),
+            **engine_meta,
+        },
+    )
+
 
 @router.post("/generate", response_model=GenerateResponse)
-def generate_content(payload: GenerateRequest) -> GenerateResponse:
+async def generate_content(
+    payload: GenerateRequest,
+    request: Request,
+    response: Response,
+    idempotency_key: Optional[str] = Header(default=None, alias=IDEMPOTENCY_HEADER),
+    profile_header: Optional[str] = Header(default=None, alias=PROFILE_HEADER),
+    admin_token: Optional[str] = Header(default=None, alias=ADMIN_HEADER),
+    priority: Optional[str] = Header(default=None, alias=PRIORITY_HEADER),
+    caller: Optional[str] = Header(default=None, alias=CALLER_HEADER),
+) -> GenerateResponse:
     """
     Endpoint principal del motor de IA.
 
     - Recibe: engine, campaign, cluster, sets, feedback.
     - Devuelve: una lista de sets de contenido:
         {subject, preheader, body.{title, subtitle, content}, cta}
+
+    Con header `Idempotency-Key`, los reintentos con la misma key (y el mismo
+    payload) reciben la respuesta del primer request sin volver a generar.
+
+    Con `X-IA-Profile: 1` + `X-Admin-Token` (o por IA_PROFILE_SAMPLE_RATE) la
+    generación se perfila y `metadata.profile` trae el id del flamegraph.
+
+    `X-IA-Priority` (interactive | batch | background) y `X-IA-Caller` fijan la
+    clase y el flujo en el scheduler de llamadas al LLM (default: interactive,
+    flujo = campaña).
+
+    La generación corre en el threadpool; si el cliente se desconecta antes
+    de terminar (p. ej. el backend corta a los 30 s), las llamadas al LLM
+    pendientes se cancelan (ver services/cancellation.py).
+    """
+    token = CancelToken("/ia/generate")
+    work = partial(
+        _generate_with_key,
+        payload,
+        response,
+        idempotency_key,
+        should_profile(profile_header, admin_token),
+    )
+    with use_priority(priority or "", flow=(caller or "").strip() or payload.campaign):
+        try:
+            return await run_until_disconnected(request.receive, token, work)
+        except RequestCancelled:
+            return Response(status_code=STATUS_CLIENT_CLOSED)
+
+
+def _generate_with_key(
+    payload: GenerateRequest,
+    response: Response,
+    idempotency_key: Optional[str],
+    profile: bool,
+) -> GenerateResponse:
+    if not idempotency_key:
+        return _generate(payload, profile)
+
+    fingerprint = hashlib.sha256(payload.model_dump_json().encode("utf-8")).hexdigest()
+    try:
+        result, status = run_idempotent(
+            idempotency_key.strip(),
+            fingerprint,
+            # Se guarda como JSON: el store puede ser compartido entre workers.
+            lambda: _generate(payload, profile).model_dump(mode="json"),
+        )
+    except IdempotencyConflict as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+    except IdempotencyTimeout as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+
+    if status != STATUS_NEW:
+        response.headers[REPLAY_HEADER] = "true"
+    return GenerateResponse.model_validate(result)
+
+
+@router.post("/regenerate", response_model=RegenerateResponse)
+def regenerate_content(payload: RegenerateRequest) -> RegenerateResponse:
+    """
+    Regeneración parcial de un set: rehace solo `fields` (p. ej. el subject)
+    con los demás campos fijos como contexto, y devuelve solo lo que cambió.
     """
     try:
-        variants = generate_sets(payload)
+        fields, meta = regenerate_fields(payload)
     except Exception as e:  # pragma: no cover
         raise HTTPException(status_code=500, detail=str(e))
 
-    return GenerateResponse(
+    return RegenerateResponse(
         engine=payload.engine,
-        variants=variants,
-        metadata={
-            "message": "IA Engine OK (OpenAI)",
-            "sets": len(variants),
-        },
+        id=payload.variant.id,
+        fields=fields,
+        metadata=meta,
     )
 
 
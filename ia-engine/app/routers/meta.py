@@ -9,8 +9,11 @@ Este endpoint entrega:
   para poblar dropdowns sin hardcodear catálogos.
 """
 
-from fastapi import APIRouter
+from typing import Optional
 
+from fastapi import APIRouter, Query
+
+from app.services.runtime_monitor import run_in_lane
 from app.utils.meta import get_meta
 
 # El prefix "/ia" lo aplica main.py al incluir el router.
@@ -18,15 +21,23 @@ router = APIRouter(tags=["meta"])
 
 
 @router.get("/meta")
-def read_meta():
+async def read_meta(
+    since: Optional[str] = Query(
+        default=None,
+        description="Versión de catálogo que ya tiene el cliente; devuelve solo el delta.",
+    ),
+):
     """
-    Devuelve meta estática (catálogo) del motor de IA.
+    Devuelve meta (catálogo) del motor de IA.
 
     Pensado para que:
       - El backend Node no tenga que hardcodear campañas/clusters.
       - El frontend (Email Studio) pueda poblar selectores dinámicamente.
+      - Con `?since=<version>` se entrega solo lo que cambió.
+
+    Con IA_RESERVED_LANE=1 corre en el carril reservado (ver runtime_monitor).
     """
-    return get_meta()
+    return await run_in_lane(get_meta, since)
 
 
 __all__ = ["router"]
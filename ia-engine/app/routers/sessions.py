@@ -0,0 +1,215 @@
+# ia-engine/app/routers/sessions.py
+"""Sesiones de refinamiento por WebSocket (/ia/sessions).
+
+Protocolo (mensajes JSON):
+
+cliente → servidor
+- {"type": "open", "campaign", "cluster", "engine"?}      abre una sesión
+- {"type": "resume", "session": "<id>"}                    retoma una sesión viva
+- {"type": "refine", "sets"?, "feedback"?, "instruction"?, "base"?}
+                                                           un turno (solo el delta)
+- {"type": "close"}                                        descarta la sesión
+
+servidor → cliente
+- {"type": "session", ...}                                 sesión abierta/retomada
+- {"type": "variant", "turn", "variant", "stub", "metadata"}  un set, apenas está listo
+- {"type": "done", "turn", "sets", "stubs", "durationMs"}  fin del turno
+- {"type": "error", "detail"}                              el socket sigue abierto
+
+Las sesiones viven en memoria del proceso: con varios workers un "resume"
+que cae en otro worker no encuentra la sesión. Requiere un solo worker
+(IA_WORKERS=1) o sticky sessions por conexión en el balanceador.
+"""
+
+import json
+import time
+from collections import deque
+from functools import partial
+from typing import Any, Deque, Dict, List, Optional
+
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from pydantic import ValidationError
+
+from app.models.request import SessionOpen, SessionRefine
+from app.models.response import GeneratedVariant
+from app.services import flight_recorder
+from app.services.cancellation import REASON_DISCONNECT, CancelToken, RequestCancelled, run_until_disconnected
+from app.services.scheduler import INTERACTIVE, use_priority
+from app.services.sessions import RefineSession, SessionError, SessionStore, get_session_store
+from app.services.text_engine import generate_session_set
+
+router: APIRouter = APIRouter()
+
+
+class _Inbox:
+    """
+    Mensajes ASGI del socket. Mientras corre un turno, `receive` lo usa la
+    espera de desconexión (ver services/cancellation.py): lo que llega queda
+    en `pending` y el loop lo procesa al terminar el turno, en orden.
+
+    Un disconnect en `pending` cierra todo: Starlette no deja volver a leer
+    el socket y nadie recibiría las respuestas a lo que quedó antes.
+    """
+
+    def __init__(self, websocket: WebSocket) -> None:
+        self.websocket = websocket
+        self.pending: Deque[Dict[str, Any]] = deque()
+
+    async def receive(self) -> Dict[str, Any]:
+        message = await self.websocket.receive()
+        self.pending.append(message)
+        return message
+
+    @property
+    def disconnected(self) -> bool:
+        return any(m["type"] == "websocket.disconnect" for m in self.pending)
+
+    def check(self) -> None:
+        """Raises RequestCancelled si el cliente ya se desconectó."""
+        if self.disconnected:
+            raise RequestCancelled(REASON_DISCONNECT)
+
+    async def next(self) -> Dict[str, Any]:
+        if self.disconnected:
+            return next(m for m in self.pending if m["type"] == "websocket.disconnect")
+        if self.pending:
+            return self.pending.popleft()
+        return await self.websocket.receive()
+
+
+async def _error(websocket: WebSocket, detail: str) -> None:
+    await websocket.send_json({"type": "error", "detail": detail})
+
+
+async def _run_turn(
+    inbox: _Inbox,
+    store: SessionStore,
+    session: RefineSession,
+    refine: SessionRefine,
+) -> None:
+    """
+    Genera los sets del turno y envía cada uno apenas está listo. Si el
+    cliente se desconecta a mitad del turno, las llamadas al LLM pendientes
+    se cancelan y los sets ya listos quedan en la sesión.
+    """
+    websocket = inbox.websocket
+    token = CancelToken("/ia/sessions")
+    turn = session.start_turn(refine)
+    request = session.request(refine.sets)
+    variants: List[GeneratedVariant] = []
+    stubs: List[int] = []
+    summary = {
+        "engine": session.engine,
+        "campaign": session.campaign,
+        "cluster": session.cluster,
+        "setsRequested": refine.sets,
+        "session": session.id,
+        "turn": turn,
+    }
+    t0 = time.perf_counter()
+    try:
+        with use_priority(INTERACTIVE, flow=session.campaign), flight_recorder.track("/ia/sessions", summary):
+            for i in range(refine.sets):
+                # El disconnect puede haber llegado justo cuando terminaba el set anterior.
+                inbox.check()
+                # El prompt se arma acá (no en el thread): depende de los sets ya listos.
+                prompt = session.prompt(i)
+                variant, is_stub, meta = await run_until_disconnected(
+                    inbox.receive, token, partial(generate_session_set, request, i, prompt, turn=turn)
+                )
+                session.add_variant(variant, is_stub)
+                variants.append(variant)
+                if is_stub:
+                    stubs.append(variant.id)
+                inbox.check()
+                await websocket.send_json(
+                    {
+                        "type": "variant",
+                        "turn": turn,
+                        "variant": variant.model_dump(),
+                        "stub": is_stub,
+                        "metadata": meta,
+                    }
+                )
+    except RequestCancelled:
+        return
+    finally:
+        session.finish_turn(variants)
+        store.count_turn()
+
+    if inbox.disconnected:
+        return
+    await websocket.send_json(
+        {
+            "type": "done",
+            "turn": turn,
+            "sets": len(variants),
+            "stubs": stubs,
+            "durationMs": round((time.perf_counter() - t0) * 1000, 1),
+        }
+    )
+
+
+@router.websocket("/sessions")
+async def refine_session(websocket: WebSocket) -> None:
+    """
+    Sesión de refinamiento iterativo: el servidor guarda el contexto del
+    prompt, el feedback acumulado y los sets previos; cada `refine` trae solo
+    el delta y los sets vuelven por el mismo socket a medida que se generan.
+    """
+    store = get_session_store()
+    session: Optional[RefineSession] = None
+    await websocket.accept()
+    inbox = _Inbox(websocket)
+    try:
+        while True:
+            raw = await inbox.next()
+            if raw["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(raw.get("code", 1000))
+            if raw.get("text") is None:
+                await _error(websocket, "mensaje binario no soportado: se espera texto JSON")
+                continue
+            try:
+                message: Dict[str, Any] = json.loads(raw["text"])
+            except json.JSONDecodeError:
+                await _error(websocket, "mensaje no es JSON válido")
+                continue
+            if not isinstance(message, dict):
+                await _error(websocket, "mensaje debe ser un objeto JSON")
+                continue
+            kind = message.pop("type", None)
+
+            try:
+                if kind == "open":
+                    session = store.open(SessionOpen(**message))
+                    await websocket.send_json({"type": "session", **session.describe()})
+                elif kind == "resume":
+                    found = store.get(str(message.get("session") or ""))
+                    if found is None:
+                        await _error(websocket, "sesión inexistente o vencida")
+                        continue
+                    session = found
+                    await websocket.send_json({"type": "session", **session.describe()})
+                elif kind == "refine":
+                    if session is None:
+                        await _error(websocket, "primero 'open' o 'resume'")
+                        continue
+                    await _run_turn(inbox, store, session, SessionRefine(**message))
+                elif kind == "close":
+                    if session is not None:
+                        store.close(session.id)
+                    await websocket.close()
+                    return
+                else:
+                    await _error(websocket, f"type desconocido: {kind!r}")
+            except ValidationError as exc:
+                err = exc.errors()[0]
+                await _error(websocket, f"mensaje inválido: {'.'.join(map(str, err['loc']))}: {err['msg']}")
+            except SessionError as exc:
+                await _error(websocket, str(exc))
+    except WebSocketDisconnect:
+        # La sesión queda viva hasta vencer: se puede retomar con "resume".
+        return
+
+
+__all__ = ["router"]
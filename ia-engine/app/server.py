@@ -0,0 +1,383 @@
+# ia-engine/app/server.py
+"""Servidor de producción multi-proceso (pre-fork) para el IA Engine.
+
+`uvicorn app.main:app` corre un solo proceso: el trabajo CPU del request
+(render de prompts, mapeo, dedup, linter, motor de plantillas) queda
+limitado por el GIL a un core. Este entry point:
+
+- dimensiona los workers según CPUs disponibles (affinity / cuota de
+  cgroup) y memoria (IA_WORKER_MEMORY_MB por worker);
+- usa uvloop + httptools cuando están instalados (uvicorn[standard]);
+- importa la app, carga el catálogo y precompila prompts en el proceso
+  padre y congela el heap (gc.freeze) ANTES del fork, para que los workers
+  compartan esas páginas copy-on-write y no paguen el import;
+- reinicia cada worker de forma ordenada tras N requests (con jitter)
+  para acotar fragmentación y fugas, y reemplaza los que mueren;
+- con SIGHUP recicla los workers de a uno: levanta el reemplazo, espera a
+  que acepte conexiones y recién entonces termina al viejo (siempre hay
+  workers atendiendo).
+
+Los threads de background (watcher, warm-up, pool, health checks) y los
+clientes HTTP se crean en el lifespan de cada worker, después del fork.
+
+Uso (desde ia-engine/):
+    python -m app.server                       # workers automáticos, puerto $PORT u 8000
+    python -m app.server --workers 4 --max-requests 5000
+
+Configuración (env, sobreescribible por CLI):
+- IA_WORKERS=0                 → 0 = automático. El número elegido se exporta
+                                 como WEB_CONCURRENCY a los workers; con supervisor,
+                                 IA_IDEMPOTENCY_DB toma un default en el tmpdir.
+- IA_WORKER_MEMORY_MB=256      → memoria estimada por worker para el cálculo automático.
+- IA_MAX_REQUESTS=10000        → requests por worker antes de reciclarlo (0 = nunca).
+- IA_MAX_REQUESTS_JITTER=1000  → jitter aleatorio para no reciclar todos a la vez.
+- HOST / PORT                  → bind (default 0.0.0.0:8000).
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import logging
+import os
+import random
+import select
+import signal
+import socket
+import sys
+import tempfile
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger("app.server")
+
+WORKERS = int(os.getenv("IA_WORKERS", "0"))
+WORKER_MEMORY_MB = int(os.getenv("IA_WORKER_MEMORY_MB", "256"))
+MAX_REQUESTS = int(os.getenv("IA_MAX_REQUESTS", "10000"))
+MAX_REQUESTS_JITTER = int(os.getenv("IA_MAX_REQUESTS_JITTER", "1000"))
+
+# Un worker que muere antes de esto se considera crash (backoff antes de reponerlo)
+_MIN_UPTIME = 5.0
+# Espera máxima a que un reemplazo (SIGHUP) acepte conexiones
+_READY_TIMEOUT = 60.0
+# Intervalo de sondeo del supervisor (workers terminados / SIGHUP pendiente)
+_POLL_INTERVAL = 0.2
+
+
+# ============================================================
+#  Dimensionamiento
+# ============================================================
+
+def _cgroup_cpus() -> Optional[float]:
+    """Cuota de CPU del contenedor (cgroup v2 / v1), None si no hay límite."""
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as fh:
+            quota, period = fh.read().split()[:2]
+        if quota != "max":
+            return int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as fh:
+            quota_us = int(fh.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as fh:
+            period_us = int(fh.read())
+        if quota_us > 0:
+            return quota_us / period_us
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def _available_memory_mb() -> Optional[int]:
+    """Límite de memoria del contenedor o memoria física, en MB."""
+    for path in ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"):
+        try:
+            with open(path) as fh:
+                raw = fh.read().strip()
+            if raw != "max" and int(raw) < 1 << 60:
+                return int(raw) // (1024 * 1024)
+        except (OSError, ValueError):
+            continue
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def auto_workers(memory_per_worker_mb: int = WORKER_MEMORY_MB) -> int:
+    """
+    Workers = min(CPUs disponibles, memoria / memoria por worker), mínimo 1.
+
+    CPUs disponibles = affinity del proceso acotada por la cuota del cgroup.
+    """
+    try:
+        cpus: float = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    quota = _cgroup_cpus()
+    if quota:
+        cpus = min(cpus, quota)
+
+    by_cpu = max(1, int(cpus))
+    memory = _available_memory_mb()
+    by_memory = max(1, memory // max(memory_per_worker_mb, 1)) if memory else by_cpu
+    return max(1, min(by_cpu, by_memory))
+
+
+# ============================================================
+#  Pre-fork
+# ============================================================
+
+def _preload() -> object:
+    """
+    Importa la app y precalienta lo que es seguro compartir entre procesos
+    (catálogo, prompts, regex, templates). No crea clientes HTTP ni threads.
+    """
+    from app.main import app
+    from app.utils.catalog import get_catalog
+    from app.utils.prompts import precompile_prompts
+
+    get_catalog()
+    rendered = precompile_prompts()
+    logger.info("IA-Engine: app precargada en el padre (%d prompts precompilados)", rendered)
+
+    # Todo lo vivo hasta acá queda fuera del GC de los workers: sin escrituras
+    # de refcount/GC sobre estas páginas, el copy-on-write las mantiene compartidas.
+    gc.collect()
+    gc.freeze()
+    return app
+
+
+def _event_loop() -> str:
+    try:
+        import uvloop  # noqa: F401
+    except ImportError:
+        return "asyncio"
+    return "uvloop"
+
+
+def _http_impl() -> str:
+    try:
+        import httptools  # noqa: F401
+    except ImportError:
+        return "h11"
+    return "httptools"
+
+
+def _bind(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(app: object, sock: socket.socket, max_requests: int, ready_fd: Optional[int] = None) -> None:
+    """
+    Cuerpo del proceso hijo: un uvicorn.Server sobre el socket compartido.
+    Con `ready_fd` avisa al supervisor (un byte en el pipe) cuando ya acepta conexiones.
+    """
+    import uvicorn
+
+    class _Server(uvicorn.Server):
+        async def startup(self, sockets: Optional[list] = None) -> None:
+            await super().startup(sockets=sockets)
+            if ready_fd is not None and self.started:
+                os.write(ready_fd, b"1")
+                os.close(ready_fd)
+
+    # El hijo no hereda los handlers del supervisor.
+    for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP, signal.SIGCHLD):
+        signal.signal(sig, signal.SIG_DFL)
+    random.seed()
+
+    limit = None
+    if max_requests > 0:
+        limit = max_requests + random.randint(0, max(MAX_REQUESTS_JITTER, 0))
+
+    config = uvicorn.Config(
+        app,
+        loop=_event_loop(),
+        http=_http_impl(),
+        lifespan="on",
+        limit_max_requests=limit,
+        access_log=False,
+        timeout_graceful_shutdown=30,
+    )
+    _Server(config).run(sockets=[sock])
+
+
+class Supervisor:
+    """Proceso padre: forkea workers, los repone y reenvía señales."""
+
+    def __init__(self, app: object, sock: socket.socket, workers: int, max_requests: int) -> None:
+        self.app = app
+        self.sock = sock
+        self.workers = workers
+        self.max_requests = max_requests
+        self.children: Dict[int, float] = {}
+        self.stopping = False
+        self.reload_pending = False
+        self.recycled = 0
+
+    def spawn(self, ready_fd: Optional[int] = None) -> int:
+        pid = os.fork()
+        if pid == 0:  # hijo
+            code = 0
+            try:
+                _run_worker(self.app, self.sock, self.max_requests, ready_fd)
+            except BaseException:  # noqa: BLE001
+                logger.exception("IA-Engine: worker %d terminó con error", os.getpid())
+                code = 1
+            finally:
+                os._exit(code)
+        self.children[pid] = time.monotonic()
+        return pid
+
+    def _spawn_ready(self) -> Optional[int]:
+        """Levanta un worker y espera a que acepte conexiones. None si murió o no llegó a tiempo."""
+        read_fd, write_fd = os.pipe()
+        pid = self.spawn(write_fd)
+        os.close(write_fd)
+        try:
+            deadline = time.monotonic() + _READY_TIMEOUT
+            while not self.stopping:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                readable, _, _ = select.select([read_fd], [], [], min(remaining, _POLL_INTERVAL))
+                if readable:
+                    # b"" = el hijo cerró el pipe sin avisar (murió en el arranque)
+                    return pid if os.read(read_fd, 1) else None
+            return None
+        finally:
+            os.close(read_fd)
+
+    def _on_stop(self, signum: int, _frame: object) -> None:
+        self.stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def _on_reload(self, _signum: int, _frame: object) -> None:
+        """SIGHUP: pide un reciclado escalonado de todos los workers (ver _roll)."""
+        self.reload_pending = True
+
+    def _roll(self) -> None:
+        """
+        Recicla los workers vigentes de a uno: levanta el reemplazo, espera a
+        que acepte conexiones y recién entonces manda SIGTERM al viejo (que
+        termina lo que tiene en curso). Si un reemplazo no arranca, el viejo
+        sigue y el reciclado se corta.
+        """
+        self.reload_pending = False
+        for old in list(self.children):
+            if self.stopping:
+                return
+            if old not in self.children:
+                continue
+            new = self._spawn_ready()
+            if new is None:
+                logger.warning("IA-Engine: el reemplazo de %d no arrancó; reciclado interrumpido", old)
+                return
+            try:
+                os.kill(old, signal.SIGTERM)
+                _, status = os.waitpid(old, 0)
+            except (ProcessLookupError, ChildProcessError):
+                status = 0
+            started = self.children.pop(old, None)
+            self.recycled += 1
+            logger.info(
+                "IA-Engine: worker %d reemplazado por %d (code=%s, %.0fs)",
+                old,
+                new,
+                os.waitstatus_to_exitcode(status),
+                time.monotonic() - (started or time.monotonic()),
+            )
+
+    def run(self) -> int:
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+        signal.signal(signal.SIGHUP, self._on_reload)
+
+        for _ in range(self.workers):
+            self.spawn()
+        logger.info(
+            "IA-Engine: %d workers (pid padre %d, loop=%s, http=%s, max_requests=%s)",
+            self.workers,
+            os.getpid(),
+            _event_loop(),
+            _http_impl(),
+            self.max_requests or "∞",
+        )
+
+        while self.children:
+            if self.reload_pending and not self.stopping:
+                self._roll()
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                time.sleep(_POLL_INTERVAL)
+                continue
+            started = self.children.pop(pid, None)
+            if started is None or self.stopping:
+                continue
+
+            uptime = time.monotonic() - started
+            code = os.waitstatus_to_exitcode(status)
+            if code == 0 or code == -signal.SIGTERM:
+                self.recycled += 1
+                logger.info("IA-Engine: worker %d reciclado tras %.0fs", pid, uptime)
+            else:
+                logger.warning("IA-Engine: worker %d murió (code=%s) tras %.1fs", pid, code, uptime)
+                if uptime < _MIN_UPTIME:
+                    time.sleep(1.0)
+            self.spawn()
+
+        self.sock.close()
+        return 0
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Servidor multi-proceso del IA Engine")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=WORKERS, help="0 = automático")
+    parser.add_argument("--max-requests", type=int, default=MAX_REQUESTS, help="0 = sin reciclado")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=os.getenv("LOG_LEVEL", "INFO").upper(),
+        format="%(asctime)s %(process)d %(levelname)s %(name)s: %(message)s",
+    )
+
+    workers = args.workers if args.workers > 0 else auto_workers()
+    # Los workers lo heredan en el fork: el pool reparte su profundidad entre ellos.
+    os.environ["WEB_CONCURRENCY"] = str(workers)
+    if workers > 1 or args.max_requests > 0:
+        # Idempotency-Key: los duplicados pueden caer en otro worker (o en el
+        # reemplazo de uno que se recicla), así que el store se comparte.
+        os.environ.setdefault(
+            "IA_IDEMPOTENCY_DB",
+            os.path.join(tempfile.gettempdir(), f"ia-idempotency-{args.port}.sqlite3"),
+        )
+    sock = _bind(args.host, args.port)
+    app = _preload()
+
+    if workers == 1 and args.max_requests <= 0:
+        # Un solo proceso sin reciclado: no hace falta supervisor.
+        _run_worker(app, sock, 0)
+        return 0
+
+    return Supervisor(app, sock, workers, args.max_requests).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
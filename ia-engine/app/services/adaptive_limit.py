@@ -0,0 +1,232 @@
+# ia-engine/app/services/adaptive_limit.py
+"""Concurrencia adaptativa (AIMD) para las llamadas al LLM.
+
+Un IA_UPSTREAM_CONCURRENCY fijo queda corto cuando el proveedor anda bien y
+largo cuando empieza a responder 429 o a alargar latencias. Con
+IA_ADAPTIVE_CONCURRENCY=1 el límite de llamadas simultáneas (los cupos del
+scheduler, ver scheduler.py) se ajusta solo, estilo TCP:
+
+- aumento aditivo: +1/límite por llamada exitosa mientras el límite se esté
+  usando (≈ +1 por "ronda" de llamadas);
+- disminución multiplicativa:
+    - ×IA_ADAPTIVE_BACKOFF ante 429, 503/529 (sobrecarga) o timeouts;
+    - ×IA_ADAPTIVE_LATENCY_BACKOFF si la latencia (EWMA) supera
+      IA_ADAPTIVE_LATENCY_TOLERANCE × la línea base (p10 de las últimas
+      muestras: una respuesta corta o cacheada suelta no la hunde). La
+      latencia depende de cuánto genera la llamada (/ia/regenerate pide ~70
+      tokens, un set ~900, la sobre-generación varios sets), así que EWMA y
+      línea base se llevan por clase de llamada: potencia de 2 de max_tokens;
+    - ×IA_ADAPTIVE_LATENCY_BACKOFF si los headers x-ratelimit-remaining-*
+      (o anthropic-ratelimit-*) bajan de IA_ADAPTIVE_HEADROOM del límite;
+  con a lo más una disminución por ventana de IA_ADAPTIVE_COOLDOWN, para
+  que una ráfaga de fallos en vuelo no corte el límite N veces.
+
+El límite vigente, la línea base y los motivos de cada corte se ven en
+GET /ia/admin/scheduler (`adaptive`).
+
+Configuración:
+- IA_ADAPTIVE_CONCURRENCY=0
+- IA_ADAPTIVE_INITIAL=8
+- IA_ADAPTIVE_MIN=1
+- IA_ADAPTIVE_MAX=64
+- IA_ADAPTIVE_BACKOFF=0.5
+- IA_ADAPTIVE_LATENCY_BACKOFF=0.9
+- IA_ADAPTIVE_LATENCY_TOLERANCE=2.0
+- IA_ADAPTIVE_HEADROOM=0.1
+- IA_ADAPTIVE_COOLDOWN=1.0
+"""
+
+from __future__ import annotations
+
+import math
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Mapping, Optional
+
+from app.services.scheduler import UpstreamScheduler, get_scheduler
+
+ENABLED = os.getenv("IA_ADAPTIVE_CONCURRENCY", "0").strip().lower() in ("1", "true", "yes")
+INITIAL = float(os.getenv("IA_ADAPTIVE_INITIAL", "8"))
+MIN_LIMIT = float(os.getenv("IA_ADAPTIVE_MIN", "1"))
+MAX_LIMIT = float(os.getenv("IA_ADAPTIVE_MAX", "64"))
+BACKOFF = float(os.getenv("IA_ADAPTIVE_BACKOFF", "0.5"))
+LATENCY_BACKOFF = float(os.getenv("IA_ADAPTIVE_LATENCY_BACKOFF", "0.9"))
+LATENCY_TOLERANCE = float(os.getenv("IA_ADAPTIVE_LATENCY_TOLERANCE", "2.0"))
+HEADROOM = float(os.getenv("IA_ADAPTIVE_HEADROOM", "0.1"))
+COOLDOWN = float(os.getenv("IA_ADAPTIVE_COOLDOWN", "1.0"))
+
+# Muestras de latencia para la línea base (percentil bajo de la ventana)
+BASELINE_SAMPLES = 200
+BASELINE_PERCENTILE = 10
+EWMA_ALPHA = 0.2
+
+OVERLOAD_STATUS = (429, 503, 529)
+# Muestras mínimas de una clase de llamada antes de comparar contra su línea base
+MIN_SAMPLES = 10
+
+
+def is_overload(exc: BaseException) -> Optional[str]:
+    """Motivo de corte si el error indica sobrecarga (429/503/529 o timeout)."""
+    status = getattr(exc, "status_code", None)
+    if status in OVERLOAD_STATUS:
+        return f"http{status}"
+    if isinstance(exc, TimeoutError) or "timeout" in type(exc).__name__.lower():
+        return "timeout"
+    return None
+
+
+@dataclass
+class _LatencyClass:
+    """EWMA y línea base de latencia de una clase de llamada (mismo orden de max_tokens)."""
+
+    samples: Deque[float] = field(default_factory=lambda: deque(maxlen=BASELINE_SAMPLES))
+    ewma: Optional[float] = None
+
+    def add(self, latency: float) -> None:
+        self.samples.append(latency)
+        self.ewma = latency if self.ewma is None else EWMA_ALPHA * latency + (1 - EWMA_ALPHA) * self.ewma
+
+    @property
+    def baseline(self) -> float:
+        ordered = sorted(self.samples)
+        return ordered[len(ordered) * BASELINE_PERCENTILE // 100]
+
+
+def call_class(max_tokens: Optional[int]) -> int:
+    """Clase de llamada: cota superior (potencia de 2) de max_tokens; 0 = sin dato."""
+    if not max_tokens or max_tokens <= 0:
+        return 0
+    return 1 << math.ceil(math.log2(max_tokens))
+
+
+class AimdLimit:
+    """Límite AIMD que se aplica como cupos del scheduler."""
+
+    def __init__(
+        self,
+        scheduler: UpstreamScheduler,
+        *,
+        initial: float = INITIAL,
+        min_limit: float = MIN_LIMIT,
+        max_limit: float = MAX_LIMIT,
+    ) -> None:
+        self.scheduler = scheduler
+        self.min_limit = max(min_limit, 1.0)
+        self.max_limit = max(max_limit, self.min_limit)
+        self.limit = min(max(initial, self.min_limit), self.max_limit)
+        self._lock = threading.Lock()
+        self._classes: Dict[int, _LatencyClass] = {}
+        self._last_decrease = float("-inf")
+        self._cuts: Dict[str, int] = {}
+        self._rate_limit: Dict[str, float] = {}
+        self.scheduler.set_capacity(int(self.limit))
+
+    def _apply(self) -> None:
+        capacity = int(self.limit)
+        if capacity != self.scheduler.capacity:
+            self.scheduler.set_capacity(capacity)
+
+    def _decrease(self, factor: float, reason: str) -> None:
+        now = time.monotonic()
+        if now - self._last_decrease < COOLDOWN:
+            return
+        self._last_decrease = now
+        self.limit = max(self.limit * factor, self.min_limit)
+        self._cuts[reason] = self._cuts.get(reason, 0) + 1
+        self._apply()
+
+    def _rate_limited(self, rate: Mapping[str, float]) -> Optional[str]:
+        for kind in ("Requests", "Tokens"):
+            limit = rate.get(f"limit{kind}")
+            remaining = rate.get(f"remaining{kind}")
+            if limit and remaining is not None and remaining / limit < HEADROOM:
+                return f"ratelimit{kind}"
+        return None
+
+    def on_success(
+        self,
+        latency: float,
+        rate: Optional[Mapping[str, float]] = None,
+        *,
+        max_tokens: Optional[int] = None,
+    ) -> None:
+        with self._lock:
+            klass = self._classes.setdefault(call_class(max_tokens), _LatencyClass())
+            klass.add(latency)
+            if rate:
+                self._rate_limit = dict(rate)
+                reason = self._rate_limited(rate)
+                if reason:
+                    self._decrease(LATENCY_BACKOFF, reason)
+                    return
+            if len(klass.samples) >= MIN_SAMPLES and klass.ewma > klass.baseline * LATENCY_TOLERANCE:
+                self._decrease(LATENCY_BACKOFF, "latency")
+                return
+            # Solo se crece si el límite se está usando (si no, no hay señal).
+            if self.scheduler.active >= int(self.limit) - 1:
+                self.limit = min(self.limit + 1.0 / self.limit, self.max_limit)
+                self._apply()
+
+    def on_error(self, exc: BaseException, rate: Optional[Mapping[str, float]] = None) -> None:
+        reason = is_overload(exc)
+        with self._lock:
+            if rate:
+                self._rate_limit = dict(rate)
+            if reason:
+                self._decrease(BACKOFF, reason)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "limit": round(self.limit, 2),
+                "capacity": int(self.limit),
+                "min": self.min_limit,
+                "max": self.max_limit,
+                # Por clase de llamada (cota de max_tokens; "0" = sin dato)
+                "latency": {
+                    str(key): {
+                        "ewmaMs": round(c.ewma * 1000, 1) if c.ewma is not None else None,
+                        "baselineMs": round(c.baseline * 1000, 1),
+                        "samples": len(c.samples),
+                    }
+                    for key, c in sorted(self._classes.items())
+                },
+                "cuts": dict(self._cuts),
+                "rateLimit": dict(self._rate_limit),
+            }
+
+
+_limiter: Optional[AimdLimit] = None
+_limiter_lock = threading.Lock()
+
+
+def get_adaptive_limit() -> Optional[AimdLimit]:
+    """Controlador AIMD sobre el scheduler global (None si está apagado)."""
+    global _limiter
+    if not ENABLED:
+        return None
+    if _limiter is not None:
+        return _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = AimdLimit(get_scheduler())
+    return _limiter
+
+
+def set_adaptive_limit(limiter: Optional[AimdLimit]) -> None:
+    """Reemplaza el controlador (scripts / benchmarks)."""
+    global _limiter
+    with _limiter_lock:
+        _limiter = limiter
+
+
+__all__ = [
+    "AimdLimit",
+    "call_class",
+    "get_adaptive_limit",
+    "is_overload",
+    "set_adaptive_limit",
+]
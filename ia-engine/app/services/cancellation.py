@@ -0,0 +1,202 @@
+# ia-engine/app/services/cancellation.py
+"""Cancelación del trabajo de un request cuando el cliente se desconecta.
+
+El backend corta /ia/generate a los 30 s, pero el motor seguía haciendo
+todas las llamadas a `chat_json` (y sus reintentos) para una respuesta que
+nadie iba a leer. Aquí:
+
+- `run_until_disconnected` corre la generación en el threadpool mientras
+  escucha el `http.disconnect` del cliente; al llegar, cancela el token;
+- el token viaja en un ContextVar (`cancellable`) y `chat_json` lo revisa
+  antes de cada intento/reintento (los sets que faltan, las rondas de dedup
+  y la sobre-generación no llegan a llamar) y el scheduler suelta las
+  esperas en cola (`cancel=` en acquire);
+- una llamada ya enviada no se puede interrumpir desde su thread (HTTP
+  bloqueante): termina, su respuesta se descarta y no se hace nada más;
+- los tokens de las llamadas del request cancelado (estimados localmente
+  con utils/tokens) se acumulan como desperdicio en GET /ia/admin/cancellation;
+- /ia/sessions hace lo mismo en cada turno con el `websocket.disconnect`.
+
+`RequestCancelled` hereda de BaseException (como asyncio.CancelledError)
+para que los `except Exception` del motor no lo conviertan en fallback.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, Optional, TypeVar
+
+import anyio
+import anyio.to_thread
+
+from app.utils.tokens import count_tokens
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+REASON_DISCONNECT = "client_disconnected"
+
+# Mensajes ASGI de desconexión (HTTP y WebSocket)
+_DISCONNECT_TYPES = ("http.disconnect", "websocket.disconnect")
+
+
+class RequestCancelled(BaseException):
+    """El request se canceló (cliente desconectado): no seguir llamando al LLM."""
+
+
+class CancelToken:
+    """Estado de cancelación y consumo de un request."""
+
+    def __init__(self, route: str) -> None:
+        self.route = route
+        self.event = threading.Event()
+        self.reason: Optional[str] = None
+        self.calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.late_calls = 0        # llamadas que terminaron después de cancelar
+        self.skipped = 0           # intentos o esperas en cola que no llegaron a llamar
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.event.is_set()
+
+    def cancel(self, reason: str) -> None:
+        if not self.event.is_set():
+            self.reason = reason
+            self.event.set()
+
+    def check(self) -> None:
+        """Raises RequestCancelled si el token está cancelado."""
+        if self.event.is_set():
+            with self._lock:
+                self.skipped += 1
+            raise RequestCancelled(self.reason or "cancelado")
+
+    def add_call(self, input_tokens: int, output_tokens: int) -> None:
+        with self._lock:
+            self.calls += 1
+            self.input_tokens += input_tokens
+            self.output_tokens += output_tokens
+            if self.event.is_set():
+                self.late_calls += 1
+
+
+_current: ContextVar[Optional[CancelToken]] = ContextVar("ia_cancel_token", default=None)
+
+_lock = threading.Lock()
+_stats: Dict[str, int] = {
+    "cancelledRequests": 0,
+    "wastedCalls": 0,
+    "wastedInputTokens": 0,
+    "wastedOutputTokens": 0,
+    "lateCalls": 0,
+    "skippedCalls": 0,
+}
+
+
+def current_token() -> Optional[CancelToken]:
+    return _current.get()
+
+
+def check_cancelled() -> None:
+    """Raises RequestCancelled si el request en curso fue cancelado (no-op sin token)."""
+    token = _current.get()
+    if token is not None:
+        token.check()
+
+
+def note_call(system: str, user: str, content: str, model: Optional[str] = None) -> None:
+    """Anota el consumo (estimado) de una llamada del request en curso."""
+    token = _current.get()
+    if token is not None:
+        token.add_call(count_tokens(system, model) + count_tokens(user, model), count_tokens(content, model))
+
+
+def _record(token: CancelToken) -> None:
+    with _lock:
+        _stats["cancelledRequests"] += 1
+        _stats["wastedCalls"] += token.calls
+        _stats["wastedInputTokens"] += token.input_tokens
+        _stats["wastedOutputTokens"] += token.output_tokens
+        _stats["lateCalls"] += token.late_calls
+        _stats["skippedCalls"] += token.skipped
+    logger.info(
+        "IA-Engine: %s cancelado (%s): %d llamadas descartadas (~%d tokens de entrada, ~%d de salida), %d evitadas",
+        token.route,
+        token.reason,
+        token.calls,
+        token.input_tokens,
+        token.output_tokens,
+        token.skipped,
+    )
+
+
+@contextmanager
+def cancellable(token: CancelToken) -> Iterator[CancelToken]:
+    """Instala el token para el código del bloque; al salir registra el desperdicio si se canceló."""
+    ctx = _current.set(token)
+    try:
+        yield token
+    finally:
+        _current.reset(ctx)
+        if token.cancelled:
+            _record(token)
+
+
+async def run_until_disconnected(receive: Callable[[], Any], token: CancelToken, fn: Callable[[], T]) -> T:
+    """
+    Corre `fn` en el threadpool (con el token instalado) y cancela el token si
+    el cliente se desconecta antes de que termine. `receive` es el del ASGI
+    (`request.receive`: con el body ya leído, solo entrega `http.disconnect`)
+    o uno que lea el WebSocket (`websocket.disconnect`); los demás mensajes
+    que entregue se ignoran acá.
+
+    Raises RequestCancelled si `fn` se cortó por la cancelación.
+    """
+
+    def run() -> T:
+        with cancellable(token):
+            return fn()
+
+    async def watch() -> None:
+        while True:
+            message = await receive()
+            if message.get("type") in _DISCONNECT_TYPES:
+                token.cancel(REASON_DISCONNECT)
+                return
+
+    outcome: Dict[str, Any] = {}
+    async with anyio.create_task_group() as tg:
+        tg.start_soon(watch)
+        try:
+            outcome["result"] = await anyio.to_thread.run_sync(run)
+        except BaseException as exc:  # noqa: BLE001 — se relanza fuera del task group (sin ExceptionGroup)
+            outcome["error"] = exc
+        finally:
+            tg.cancel_scope.cancel()
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["result"]
+
+
+def cancellation_stats() -> Dict[str, int]:
+    with _lock:
+        return dict(_stats)
+
+
+__all__ = [
+    "CancelToken",
+    "RequestCancelled",
+    "cancellable",
+    "cancellation_stats",
+    "check_cancelled",
+    "current_token",
+    "note_call",
+    "run_until_disconnected",
+]
@@ -0,0 +1,191 @@
+# ia-engine/app/services/cascade.py
+"""Cascada de modelos: modelo barato primero, escalar solo lo que falla.
+
+Cada set se pide primero al tier más barato. La salida se revisa localmente
+(mapeo a GeneratedVariant, campos obligatorios y reglas de largo/compliance
+del linter que no se pueden reparar); solo si falla se repite el prompt con
+el tier siguiente. El último tier se acepta tal cual.
+
+Configuración:
+- IA_CASCADE (JSON, opcional). Tiers por campaña, con "*" como default:
+
+      {"*": ["gpt-4o-mini", "gpt-4o"],
+       "Crédito hipotecario - Persona": [
+         {"model": "gpt-4o-mini"},
+         {"model": "claude-3-5-sonnet-latest", "engine": "anthropic"}
+       ]}
+
+  Cada tier es un nombre de modelo o {"model", "engine"} (engine = proveedor
+  o endpoint preferido, ver providers.py). Sin engine, el proveedor se
+  infiere del modelo ("claude-*" → anthropic, "gpt-*"/"o*" → openai) y un
+  modelo que no se reconoce se rechaza: así ni "auto" ni el failover le
+  mandan "gpt-4o" al endpoint de Anthropic. Sin IA_CASCADE no hay cascada:
+  un solo tier con el modelo por defecto del endpoint.
+
+Se lleva la tasa de escalamiento por campaña (`cascade_stats`).
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.models.response import GeneratedVariant
+from app.services.providers import model_kind
+from app.utils.linter import lint_variant
+
+logger = logging.getLogger(__name__)
+
+_RAW_CONFIG = os.getenv("IA_CASCADE", "").strip()
+
+# Campos que un set debe traer sí o sí para no escalar
+REQUIRED_FIELDS: Tuple[str, ...] = ("subject", "preheader", "title", "body", "cta")
+
+
+@dataclass(frozen=True)
+class Tier:
+    """Un escalón de la cascada (model/engine None = default del endpoint/request)."""
+
+    model: Optional[str] = None
+    engine: Optional[str] = None
+
+    @property
+    def label(self) -> str:
+        return self.model or self.engine or "default"
+
+
+def _parse_tier(raw: Any) -> Optional[Tier]:
+    if isinstance(raw, str):
+        raw = {"model": raw.strip()}
+    if not isinstance(raw, dict) or not (raw.get("model") or raw.get("engine")):
+        return None
+    model = raw.get("model") or None
+    engine = raw.get("engine") or model_kind(model)
+    if model and not engine:
+        logger.error(
+            "IA-Engine: IA_CASCADE: no se sabe qué proveedor sirve %r; indica \"engine\" en el tier",
+            model,
+        )
+        return None
+    return Tier(model=model, engine=engine)
+
+
+def _parse_config(raw: str) -> Dict[str, Tuple[Tier, ...]]:
+    if not raw:
+        return {}
+    try:
+        data = json.loads(raw)
+    except json.JSONDecodeError as exc:
+        logger.error("IA-Engine: IA_CASCADE no es JSON válido: %s", exc)
+        return {}
+    if isinstance(data, list):
+        data = {"*": data}
+
+    out: Dict[str, Tuple[Tier, ...]] = {}
+    for campaign, tiers in (data or {}).items():
+        parsed = tuple(t for t in (_parse_tier(x) for x in (tiers or [])) if t)
+        if parsed:
+            out[campaign] = parsed
+    return out
+
+
+CASCADE_CONFIG: Dict[str, Tuple[Tier, ...]] = _parse_config(_RAW_CONFIG)
+DEFAULT_TIERS: Tuple[Tier, ...] = (Tier(),)
+
+
+def tiers_for(campaign: str) -> Tuple[Tier, ...]:
+    """Tiers configurados para la campaña (override > '*' > sin cascada)."""
+    return CASCADE_CONFIG.get(campaign) or CASCADE_CONFIG.get("*") or DEFAULT_TIERS
+
+
+def is_enabled(campaign: str) -> bool:
+    return len(tiers_for(campaign)) > 1
+
+
+# ============================================================
+#  Chequeo local
+# ============================================================
+
+def check_variant(variant: GeneratedVariant, *, campaign: str) -> List[str]:
+    """
+    Motivos para escalar (lista vacía = el set se acepta).
+
+    Revisa campos obligatorios y las violaciones del linter que NO se pueden
+    reparar localmente (las reparables las corrige el linter más adelante).
+    """
+    reasons: List[str] = []
+    values = {
+        "subject": variant.subject,
+        "preheader": variant.preheader,
+        "title": variant.body.title,
+        "body": variant.body.content,
+        "cta": variant.cta,
+    }
+    for name in REQUIRED_FIELDS:
+        if not (values.get(name) or "").strip():
+            reasons.append(f"{name}.missing")
+
+    _, violations = lint_variant(variant, campaign=campaign, repair=True)
+    reasons.extend(f"{v.field}.{v.rule}" for v in violations if not v.fixed)
+    return reasons
+
+
+# ============================================================
+#  Métricas
+# ============================================================
+
+_lock = threading.Lock()
+_stats: Dict[str, Dict[str, Any]] = {}
+
+
+def record(campaign: str, served_tier: int, reasons: List[List[str]]) -> None:
+    """Registra un set: tier que lo sirvió (0-based) y motivos de cada escalamiento."""
+    with _lock:
+        st = _stats.setdefault(
+            campaign,
+            {"sets": 0, "escalated": 0, "servedByTier": {}, "reasons": {}},
+        )
+        st["sets"] += 1
+        if served_tier > 0:
+            st["escalated"] += 1
+        key = tiers_for(campaign)[min(served_tier, len(tiers_for(campaign)) - 1)].label
+        st["servedByTier"][key] = st["servedByTier"].get(key, 0) + 1
+        for step in reasons:
+            for reason in step:
+                st["reasons"][reason] = st["reasons"].get(reason, 0) + 1
+
+
+def cascade_stats() -> Dict[str, Any]:
+    """Tasa de escalamiento por campaña y motivos más frecuentes."""
+    with _lock:
+        per_campaign = {
+            campaign: {
+                **{k: (dict(v) if isinstance(v, dict) else v) for k, v in st.items()},
+                "escalationRate": round(st["escalated"] / st["sets"], 3) if st["sets"] else None,
+            }
+            for campaign, st in _stats.items()
+        }
+    total = sum(st["sets"] for st in per_campaign.values())
+    escalated = sum(st["escalated"] for st in per_campaign.values())
+    return {
+        "configured": {k: [t.label for t in v] for k, v in CASCADE_CONFIG.items()},
+        "sets": total,
+        "escalated": escalated,
+        "escalationRate": round(escalated / total, 3) if total else None,
+        "campaigns": per_campaign,
+    }
+
+
+__all__ = [
+    "REQUIRED_FIELDS",
+    "Tier",
+    "cascade_stats",
+    "check_variant",
+    "is_enabled",
+    "record",
+    "tiers_for",
+]
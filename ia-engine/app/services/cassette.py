@@ -0,0 +1,263 @@
+# ia-engine/app/services/cassette.py
+"""Grabación y replay de llamadas al LLM ("cassettes") debajo de chat_json.
+
+Sirve para correr benchmarks, demos y pruebas de carga sin red ni costo de
+tokens, con respuestas y latencias reales:
+
+- record      → llama al proveedor y guarda cada respuesta (o error) con su
+                latencia en IA_CASSETTE_DIR, un archivo JSON comprimido por
+                request (clave = hash de modelo, parámetros, schema y prompts).
+  Varios procesos (workers de app.server) pueden grabar en el mismo
+                directorio: cada escritura toma un lock del directorio, relee
+                el archivo del disco y agrega su interacción (no se pisan).
+- replay      → no toca la red: devuelve lo grabado esperando la latencia
+                original × IA_CASSETTE_LATENCY_SCALE. Si una clave tiene varias
+                grabaciones se rotan en orden. Un request no grabado falla con
+                CassetteMiss (el caller hace failover/fallback como con
+                cualquier error de proveedor).
+- passthrough → comportamiento normal (default).
+
+Configuración:
+- IA_CASSETTE_MODE=passthrough      → passthrough | record | replay.
+- IA_CASSETTE_DIR=cassettes         → directorio de los archivos .json.gz.
+- IA_CASSETTE_LATENCY_SCALE=1       → 1 = latencia original, 0 = instantáneo.
+
+NO conoce de prompts ni de campañas: recibe lo mismo que Provider.complete_json.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.services.providers import Provider, ProviderError
+
+logger = logging.getLogger(__name__)
+
+MODE_PASSTHROUGH = "passthrough"
+MODE_RECORD = "record"
+MODE_REPLAY = "replay"
+MODES = (MODE_PASSTHROUGH, MODE_RECORD, MODE_REPLAY)
+
+FORMAT_VERSION = 1
+
+
+class CassetteMiss(ProviderError):
+    """Replay de un request que no está grabado."""
+
+    def __init__(self, key: str) -> None:
+        super().__init__(f"cassette sin grabación para {key[:12]}", status_code=404)
+        self.key = key
+
+
+def request_key(
+    provider: Provider,
+    system: str,
+    user: str,
+    *,
+    model: Optional[str],
+    temperature: float,
+    top_p: float,
+    max_tokens: int,
+    schema: Optional[Dict[str, Any]] = None,
+    **_: Any,
+) -> str:
+    """
+    Clave estable del request. No incluye el endpoint (sí el modelo), así un
+    cassette grabado contra un gateway se reproduce con otra IA_PROVIDERS.
+    """
+    payload = {
+        "model": model or provider.model,
+        "temperature": round(float(temperature), 4),
+        "top_p": round(float(top_p), 4),
+        "max_tokens": int(max_tokens),
+        "schema": schema,
+        "system": system,
+        "user": user,
+    }
+    raw = json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    """Directorio de grabaciones + modo. Thread-safe."""
+
+    def __init__(self, directory: str | Path, mode: str = MODE_PASSTHROUGH, latency_scale: float = 1.0) -> None:
+        if mode not in MODES:
+            raise ValueError(f"IA_CASSETTE_MODE inválido: {mode!r} (usar {', '.join(MODES)})")
+        self.directory = Path(directory)
+        self.mode = mode
+        self.latency_scale = max(float(latency_scale), 0.0)
+        self._lock = threading.Lock()
+        self._loaded: Dict[str, List[Dict[str, Any]]] = {}
+        self._cursor: Dict[str, int] = {}
+        self._stats: Dict[str, int] = {"recorded": 0, "replayed": 0, "misses": 0}
+
+    @property
+    def active(self) -> bool:
+        return self.mode != MODE_PASSTHROUGH
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json.gz"
+
+    def _load(self, key: str) -> List[Dict[str, Any]]:
+        """Grabaciones de una clave leídas del disco."""
+        path = self._path(key)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as fh:
+                return json.load(fh).get("interactions", [])
+        except FileNotFoundError:
+            return []
+        except (OSError, ValueError) as exc:
+            logger.warning("IA-Engine: cassette ilegible %s: %s", path, exc)
+            return []
+
+    def _read(self, key: str) -> List[Dict[str, Any]]:
+        """Grabaciones de una clave (cacheadas en memoria; llamar con _lock)."""
+        if key not in self._loaded:
+            self._loaded[key] = self._load(key)
+        return self._loaded[key]
+
+    def _append(self, key: str, request: Dict[str, Any], interaction: Dict[str, Any]) -> None:
+        with self._lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            # Lock del directorio entre procesos: releer del disco y agregar, así
+            # no se pierden las grabaciones que otro worker escribió mientras tanto.
+            with open(self.directory / ".record.lock", "a") as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                interactions = self._load(key)
+                interactions.append(interaction)
+                fd, tmp = tempfile.mkstemp(dir=self.directory, prefix=f".{key[:12]}.", suffix=".tmp")
+                os.close(fd)
+                try:
+                    with gzip.open(tmp, "wt", encoding="utf-8") as fh:
+                        json.dump(
+                            {"version": FORMAT_VERSION, "key": key, "request": request, "interactions": interactions},
+                            fh,
+                            ensure_ascii=False,
+                        )
+                    os.replace(tmp, self._path(key))
+                except BaseException:
+                    os.unlink(tmp)
+                    raise
+            self._loaded[key] = interactions
+            self._stats["recorded"] += 1
+
+    def complete_json(self, provider: Provider, system: str, user: str, **call: Any) -> str:
+        """Provider.complete_json según el modo (mismos argumentos)."""
+        if self.mode == MODE_PASSTHROUGH:
+            return provider.complete_json(system, user, **call)
+
+        key = request_key(provider, system, user, **call)
+        if self.mode == MODE_REPLAY:
+            return self._replay(key)
+
+        request = {
+            "model": call.get("model") or provider.model,
+            "endpoint": provider.name,
+            "temperature": call.get("temperature"),
+            "top_p": call.get("top_p"),
+            "max_tokens": call.get("max_tokens"),
+            "schema": call.get("schema") is not None,
+            "system": system,
+            "user": user,
+        }
+        t0 = time.perf_counter()
+        try:
+            content = provider.complete_json(system, user, **call)
+        except Exception as exc:
+            self._append(key, request, {
+                "latencyMs": round((time.perf_counter() - t0) * 1000, 1),
+                "error": {
+                    "type": type(exc).__name__,
+                    "message": str(exc)[:500],
+                    "status": getattr(exc, "status_code", None),
+                },
+                "recordedAt": time.time(),
+            })
+            raise
+        self._append(key, request, {
+            "latencyMs": round((time.perf_counter() - t0) * 1000, 1),
+            "content": content,
+            "recordedAt": time.time(),
+        })
+        return content
+
+    def _replay(self, key: str) -> str:
+        with self._lock:
+            interactions = self._read(key)
+            if not interactions:
+                self._stats["misses"] += 1
+                raise CassetteMiss(key)
+            index = self._cursor.get(key, 0)
+            self._cursor[key] = index + 1
+            interaction = interactions[index % len(interactions)]
+            self._stats["replayed"] += 1
+
+        delay = interaction.get("latencyMs", 0) / 1000 * self.latency_scale
+        if delay > 0:
+            time.sleep(delay)
+        error = interaction.get("error")
+        if error:
+            raise ProviderError(f"[replay] {error['type']}: {error['message']}", status_code=error.get("status"))
+        return interaction["content"]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "directory": str(self.directory),
+                "latencyScale": self.latency_scale,
+                **self._stats,
+            }
+
+
+def build_cassette_from_env() -> Cassette:
+    return Cassette(
+        os.getenv("IA_CASSETTE_DIR", "cassettes"),
+        mode=os.getenv("IA_CASSETTE_MODE", MODE_PASSTHROUGH).strip().lower() or MODE_PASSTHROUGH,
+        latency_scale=float(os.getenv("IA_CASSETTE_LATENCY_SCALE", "1")),
+    )
+
+
+_cassette: Optional[Cassette] = None
+_cassette_lock = threading.Lock()
+
+
+def get_cassette() -> Cassette:
+    """Singleton del cassette (se arma perezosamente desde env)."""
+    global _cassette
+    if _cassette is not None:
+        return _cassette
+    with _cassette_lock:
+        if _cassette is None:
+            _cassette = build_cassette_from_env()
+    return _cassette
+
+
+def set_cassette(cassette: Optional[Cassette]) -> None:
+    """Reemplaza el cassette (scripts / benchmarks). None = volver a env."""
+    global _cassette
+    with _cassette_lock:
+        _cassette = cassette
+
+
+__all__ = [
+    "Cassette",
+    "CassetteMiss",
+    "MODE_PASSTHROUGH",
+    "MODE_RECORD",
+    "MODE_REPLAY",
+    "get_cassette",
+    "request_key",
+    "set_cassette",
+]
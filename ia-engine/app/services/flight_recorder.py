@@ -0,0 +1,230 @@
+# ia-engine/app/services/flight_recorder.py
+"""Flight recorder de requests lentos (GET /debug/requests).
+
+Los logs no dicen qué request fue lento ni por qué. Aquí se guarda en
+memoria, por proceso:
+
+- un ring buffer con los últimos IA_FLIGHT_RECENT requests;
+- los IA_FLIGHT_SLOWEST más lentos de cada ventana de IA_FLIGHT_WINDOW_SEC
+  segundos (se conservan las últimas IA_FLIGHT_WINDOWS ventanas).
+
+Cada entrada trae el resumen del payload, y por set: tiempos por etapa
+(prompt, llm, map, check, fallback), intentos al LLM (endpoint, latencia,
+error), tipos de excepción y si terminó en stub; más las etapas del request
+(pool, dedup, lint).
+
+La traza viaja en un ContextVar: text_engine y openai_client anotan solo si
+hay un request en curso (los sets del pool en background no se registran).
+
+Configuración:
+- IA_FLIGHT_RECORDER=1       → 0 desactiva el registro.
+- IA_FLIGHT_RECENT=200
+- IA_FLIGHT_SLOWEST=20
+- IA_FLIGHT_WINDOW_SEC=300
+- IA_FLIGHT_WINDOWS=12
+"""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+ENABLED = os.getenv("IA_FLIGHT_RECORDER", "1").strip().lower() not in ("0", "false", "no")
+RECENT = int(os.getenv("IA_FLIGHT_RECENT", "200"))
+SLOWEST = int(os.getenv("IA_FLIGHT_SLOWEST", "20"))
+WINDOW = float(os.getenv("IA_FLIGHT_WINDOW_SEC", "300"))
+WINDOWS = int(os.getenv("IA_FLIGHT_WINDOWS", "12"))
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 1)
+
+
+class RequestTrace:
+    """Lo que se anota de un request mientras está en curso."""
+
+    def __init__(self, route: str, summary: Dict[str, Any]) -> None:
+        self.route = route
+        self.summary = summary
+        self.started = time.time()
+        self.stages: Dict[str, float] = {}
+        self.sets: Dict[int, Dict[str, Any]] = {}
+        self.active: Optional[int] = None
+
+    def set_entry(self, index: int) -> Dict[str, Any]:
+        entry = self.sets.get(index)
+        if entry is None:
+            entry = {"id": index + 1, "stages": {}, "attempts": [], "errors": [], "stub": False}
+            self.sets[index] = entry
+        return entry
+
+    def add_stage(self, name: str, seconds: float, index: Optional[int] = None) -> None:
+        stages = self.stages if index is None else self.set_entry(index)["stages"]
+        stages[name] = round(stages.get(name, 0.0) + seconds * 1000, 1)
+
+
+_current: ContextVar[Optional[RequestTrace]] = ContextVar("ia_flight_trace", default=None)
+
+_lock = threading.Lock()
+_seq = itertools.count()
+_recent: Deque[Dict[str, Any]] = deque(maxlen=max(RECENT, 1))
+# (inicio de ventana, heap de (duración, seq, entrada)) — heap de mínimos: el tope es el menos lento
+_slowest: Deque[Tuple[float, List[Tuple[float, int, Dict[str, Any]]]]] = deque(maxlen=max(WINDOWS, 1))
+
+
+def current() -> Optional[RequestTrace]:
+    """Traza del request en curso (None fuera de un request o si está apagado)."""
+    return _current.get()
+
+
+@contextmanager
+def stage(name: str, index: Optional[int] = None) -> Iterator[None]:
+    """Mide una etapa (del set `index` o del request). Sin traza no hace nada."""
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    previous = trace.active
+    if index is not None:
+        trace.active = index
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add_stage(name, time.perf_counter() - t0, index)
+        trace.active = previous
+
+
+def note_attempt(endpoint: str, seconds: float, error: Optional[BaseException] = None) -> None:
+    """Un intento de llamada al LLM del set activo."""
+    trace = _current.get()
+    if trace is None or trace.active is None:
+        return
+    attempt: Dict[str, Any] = {"endpoint": endpoint, "ms": _ms(seconds), "ok": error is None}
+    if error is not None:
+        attempt["error"] = type(error).__name__
+    trace.set_entry(trace.active)["attempts"].append(attempt)
+
+
+def note_error(exc: BaseException, index: Optional[int] = None) -> None:
+    """Excepción capturada en un set (o en el set activo)."""
+    trace = _current.get()
+    if trace is None:
+        return
+    index = trace.active if index is None else index
+    if index is not None:
+        trace.set_entry(index)["errors"].append(type(exc).__name__)
+
+
+def mark_stub(index: int) -> None:
+    trace = _current.get()
+    if trace is not None:
+        trace.set_entry(index)["stub"] = True
+
+
+def _store(entry: Dict[str, Any]) -> None:
+    duration = entry["durationMs"]
+    window = entry["startedAt"] - entry["startedAt"] % WINDOW
+    with _lock:
+        _recent.append(entry)
+        if not _slowest or _slowest[-1][0] != window:
+            _slowest.append((window, []))
+        heap = _slowest[-1][1]
+        item = (duration, next(_seq), entry)
+        if len(heap) < SLOWEST:
+            heapq.heappush(heap, item)
+        elif duration > heap[0][0]:
+            heapq.heapreplace(heap, item)
+
+
+@contextmanager
+def track(route: str, summary: Dict[str, Any]) -> Iterator[Optional[RequestTrace]]:
+    """Registra el request completo (duración, estado y lo anotado adentro)."""
+    if not ENABLED:
+        yield None
+        return
+    trace = RequestTrace(route, summary)
+    token = _current.set(trace)
+    t0 = time.perf_counter()
+    status = "ok"
+    error: Optional[str] = None
+    try:
+        yield trace
+    except BaseException as exc:
+        status, error = "error", type(exc).__name__
+        raise
+    finally:
+        _current.reset(token)
+        entry = {
+            "route": route,
+            "startedAt": trace.started,
+            "durationMs": _ms(time.perf_counter() - t0),
+            "status": status,
+            "error": error,
+            **trace.summary,
+            "stages": trace.stages,
+            "sets": [trace.sets[i] for i in sorted(trace.sets)],
+        }
+        _store(entry)
+
+
+def _matches(entry: Dict[str, Any], campaign: Optional[str], cluster: Optional[str], min_ms: float) -> bool:
+    if campaign and entry.get("campaign") != campaign:
+        return False
+    if cluster and entry.get("cluster") != cluster:
+        return False
+    return entry["durationMs"] >= min_ms
+
+
+def query(
+    *,
+    view: str = "recent",
+    campaign: Optional[str] = None,
+    cluster: Optional[str] = None,
+    min_ms: float = 0.0,
+    limit: int = 50,
+) -> Dict[str, Any]:
+    """
+    Entradas filtradas. view="recent" → más nuevas primero; view="slowest" →
+    por ventana (más nueva primero), más lentas primero.
+    """
+    with _lock:
+        recent = list(_recent)
+        windows = [(start, sorted(heap, reverse=True)) for start, heap in _slowest]
+
+    if view == "slowest":
+        out = []
+        for start, items in reversed(windows):
+            entries = [e for _, _, e in items if _matches(e, campaign, cluster, min_ms)][:limit]
+            if entries:
+                out.append({"windowStart": start, "windowSec": WINDOW, "requests": entries})
+        return {"view": view, "windows": out}
+
+    entries = [e for e in reversed(recent) if _matches(e, campaign, cluster, min_ms)][:limit]
+    return {"view": "recent", "capacity": _recent.maxlen, "requests": entries}
+
+
+def reset() -> None:
+    with _lock:
+        _recent.clear()
+        _slowest.clear()
+
+
+__all__ = [
+    "RequestTrace",
+    "current",
+    "mark_stub",
+    "note_attempt",
+    "note_error",
+    "query",
+    "reset",
+    "stage",
+    "track",
+]
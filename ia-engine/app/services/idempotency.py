@@ -0,0 +1,336 @@
+# ia-engine/app/services/idempotency.py
+"""Idempotencia para /ia/generate (header `Idempotency-Key`).
+
+Los reintentos del backend (timeouts, doble click, redeploys) repetían la
+generación completa y gastaban tokens dos veces. Con una misma key:
+
+- el primer request genera y su respuesta se guarda por IA_IDEMPOTENCY_TTL;
+- los duplicados concurrentes esperan al que está en vuelo y reciben su
+  misma respuesta (no se llama dos veces al modelo);
+- los duplicados posteriores se sirven desde el store.
+
+Si el primer request falla, la key se libera y el siguiente duplicado
+genera de nuevo. Reusar una key con un payload distinto es un conflicto.
+
+Stores:
+- en memoria (default): sirve para un solo proceso;
+- SQLite compartido (IA_IDEMPOTENCY_DB): lo usan todos los workers de
+  `app.server`, que lo activa solo cuando levanta más de uno. Los
+  duplicados en otro worker sondean la fila hasta que el dueño termina; si
+  el dueño murió (pid inexistente), el siguiente duplicado toma la key.
+
+El resultado de `fn` debe ser serializable a JSON (el router guarda el
+`model_dump` de la respuesta).
+
+Configuración:
+- IA_IDEMPOTENCY_TTL=600        → segundos que se guarda una respuesta.
+- IA_IDEMPOTENCY_MAX_KEYS=2000  → tope de keys guardadas (se descartan las más viejas).
+- IA_IDEMPOTENCY_WAIT=120       → segundos máximos que un duplicado espera al original.
+- IA_IDEMPOTENCY_DB=            → archivo SQLite compartido (vacío = memoria del proceso).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Tuple
+
+TTL = float(os.getenv("IA_IDEMPOTENCY_TTL", "600"))
+MAX_KEYS = int(os.getenv("IA_IDEMPOTENCY_MAX_KEYS", "2000"))
+WAIT_TIMEOUT = float(os.getenv("IA_IDEMPOTENCY_WAIT", "120"))
+
+# Cada cuánto un duplicado vuelve a mirar la fila del store compartido
+_POLL_INTERVAL = 0.05
+
+HEADER = "Idempotency-Key"
+REPLAY_HEADER = "Idempotent-Replayed"
+
+STATUS_NEW = "new"
+STATUS_JOINED = "joined"
+STATUS_REPLAYED = "replayed"
+
+
+class IdempotencyConflict(ValueError):
+    """La key ya se usó con un payload distinto."""
+
+
+class IdempotencyTimeout(RuntimeError):
+    """El request original con esa key no terminó a tiempo."""
+
+
+@dataclass
+class _Entry:
+    fingerprint: str
+    created: float = field(default_factory=time.monotonic)
+    done: threading.Event = field(default_factory=threading.Event)
+    result: Any = None
+    failed: bool = False
+
+
+_lock = threading.Lock()
+_entries: "OrderedDict[str, _Entry]" = OrderedDict()
+_stats: Dict[str, int] = {"new": 0, "joined": 0, "replayed": 0, "conflicts": 0, "failures": 0}
+
+
+def _evict(now: float) -> None:
+    """
+    Descarta keys vencidas y, si sobran, las más viejas (llamar con _lock).
+
+    `_entries` está en orden de creación: basta mirar el frente. Una entrada
+    descartada en vuelo sigue viva para su dueño y los que la esperan.
+    """
+    while _entries:
+        entry = next(iter(_entries.values()))
+        if now - entry.created <= TTL and len(_entries) <= MAX_KEYS:
+            break
+        _entries.popitem(last=False)
+
+
+def db_path() -> str:
+    """Archivo del store compartido (IA_IDEMPOTENCY_DB); vacío = memoria. Se lee en cada llamada."""
+    return os.getenv("IA_IDEMPOTENCY_DB", "").strip()
+
+
+def run_idempotent(
+    key: str,
+    fingerprint: str,
+    fn: Callable[[], Any],
+) -> Tuple[Any, str]:
+    """
+    Ejecuta `fn` una sola vez por key dentro de la ventana TTL.
+
+    Returns:
+        (resultado, estado) con estado "new" (se ejecutó acá), "joined"
+        (se esperó a un duplicado en vuelo) o "replayed" (desde el store).
+
+    Raises:
+        IdempotencyConflict si la key ya existe con otro fingerprint.
+        IdempotencyTimeout si el original no termina en IA_IDEMPOTENCY_WAIT.
+    """
+    path = db_path()
+    if path:
+        return _run_shared(path, key, fingerprint, fn)
+    return _run_memory(key, fingerprint, fn)
+
+
+def _conflict(key: str) -> IdempotencyConflict:
+    with _lock:
+        _stats["conflicts"] += 1
+    return IdempotencyConflict(f"{HEADER} '{key}' ya se usó con un payload distinto")
+
+
+def _timeout(key: str) -> IdempotencyTimeout:
+    return IdempotencyTimeout(f"{HEADER} '{key}': el request original sigue en curso")
+
+
+def _run_memory(key: str, fingerprint: str, fn: Callable[[], Any]) -> Tuple[Any, str]:
+    deadline = time.monotonic() + WAIT_TIMEOUT
+    while True:
+        now = time.monotonic()
+        with _lock:
+            _evict(now)
+            entry = _entries.get(key)
+            if entry is not None and entry.fingerprint != fingerprint:
+                _stats["conflicts"] += 1
+                raise IdempotencyConflict(
+                    f"{HEADER} '{key}' ya se usó con un payload distinto"
+                )
+            if entry is None:
+                entry = _Entry(fingerprint=fingerprint)
+                _entries[key] = entry
+                owner = True
+            else:
+                owner = False
+                if entry.done.is_set():
+                    _stats["replayed"] += 1
+                    return entry.result, STATUS_REPLAYED
+
+        if owner:
+            try:
+                result = fn()
+            except BaseException:
+                with _lock:
+                    entry.failed = True
+                    _stats["failures"] += 1
+                    if _entries.get(key) is entry:
+                        del _entries[key]
+                entry.done.set()
+                raise
+            with _lock:
+                entry.result = result
+                _stats["new"] += 1
+            entry.done.set()
+            return result, STATUS_NEW
+
+        # Duplicado concurrente: esperar al original.
+        if not entry.done.wait(max(deadline - time.monotonic(), 0.0)):
+            raise _timeout(key)
+        if not entry.failed:
+            with _lock:
+                _stats["joined"] += 1
+            return entry.result, STATUS_JOINED
+        # El original falló: se reintenta (este request puede pasar a ser el dueño).
+
+
+# ============================================================
+#  Store compartido (SQLite)
+# ============================================================
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS idempotency (
+    key TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    created REAL NOT NULL,
+    owner_pid INTEGER NOT NULL,
+    done INTEGER NOT NULL DEFAULT 0,
+    result TEXT
+)
+"""
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    # Conexión por llamada: los threads del threadpool no comparten conexiones
+    # y nada queda abierto a través del fork.
+    conn = sqlite3.connect(path, timeout=max(WAIT_TIMEOUT, 5.0), isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(_SCHEMA)
+    return conn
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _evict_shared(conn: sqlite3.Connection, now: float) -> None:
+    """Descarta keys vencidas y, si sobran, las más viejas (dentro de la transacción)."""
+    conn.execute("DELETE FROM idempotency WHERE created < ?", (now - TTL,))
+    conn.execute(
+        "DELETE FROM idempotency WHERE key IN "
+        "(SELECT key FROM idempotency ORDER BY created DESC LIMIT -1 OFFSET ?)",
+        (MAX_KEYS,),
+    )
+
+
+def _claim(path: str, key: str, fingerprint: str) -> Tuple[str, Any]:
+    """
+    Una pasada sobre la fila de `key`: ("owner", None), ("done", resultado)
+    o ("wait", None). Levanta IdempotencyConflict.
+    """
+    pid = os.getpid()
+    conn = _connect(path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        now = time.time()
+        _evict_shared(conn, now)
+        row = conn.execute(
+            "SELECT fingerprint, owner_pid, done, result FROM idempotency WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            conn.execute(
+                "INSERT INTO idempotency (key, fingerprint, created, owner_pid) VALUES (?, ?, ?, ?)",
+                (key, fingerprint, now, pid),
+            )
+            state: Tuple[str, Any] = ("owner", None)
+        elif row[0] != fingerprint:
+            conn.execute("ROLLBACK")
+            raise _conflict(key)
+        elif row[2]:
+            state = ("done", json.loads(row[3]))
+        elif row[1] != pid and not _pid_alive(row[1]):
+            # El worker dueño murió a mitad de camino: la key pasa a este.
+            conn.execute("UPDATE idempotency SET owner_pid = ?, created = ? WHERE key = ?", (pid, now, key))
+            state = ("owner", None)
+        else:
+            state = ("wait", None)
+        conn.execute("COMMIT")
+        return state
+    finally:
+        conn.close()
+
+
+def _release(path: str, key: str, result: Any, failed: bool) -> None:
+    conn = _connect(path)
+    try:
+        if failed:
+            conn.execute("DELETE FROM idempotency WHERE key = ? AND owner_pid = ?", (key, os.getpid()))
+        else:
+            conn.execute(
+                "UPDATE idempotency SET done = 1, result = ? WHERE key = ? AND owner_pid = ?",
+                (json.dumps(result, ensure_ascii=False), key, os.getpid()),
+            )
+    finally:
+        conn.close()
+
+
+def _run_shared(path: str, key: str, fingerprint: str, fn: Callable[[], Any]) -> Tuple[Any, str]:
+    deadline = time.monotonic() + WAIT_TIMEOUT
+    waited = False
+    while True:
+        state, result = _claim(path, key, fingerprint)
+        if state == "done":
+            status = STATUS_JOINED if waited else STATUS_REPLAYED
+            with _lock:
+                _stats[status] += 1
+            return result, status
+
+        if state == "owner":
+            try:
+                result = fn()
+            except BaseException:
+                _release(path, key, None, failed=True)
+                with _lock:
+                    _stats["failures"] += 1
+                raise
+            _release(path, key, result, failed=False)
+            with _lock:
+                _stats["new"] += 1
+            return result, STATUS_NEW
+
+        # Duplicado en vuelo (en este u otro worker): sondear hasta que termine.
+        # Si el original falla la fila desaparece y este request pasa a ser el dueño.
+        waited = True
+        if time.monotonic() >= deadline:
+            raise _timeout(key)
+        time.sleep(_POLL_INTERVAL)
+
+
+def idempotency_stats() -> Dict[str, Any]:
+    """Keys guardadas, en vuelo y conteos por resultado (conteos de este proceso)."""
+    path = db_path()
+    if path:
+        conn = _connect(path)
+        try:
+            keys, inflight = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(done = 0), 0) FROM idempotency WHERE created >= ?",
+                (time.time() - TTL,),
+            ).fetchone()
+        finally:
+            conn.close()
+        with _lock:
+            return {"store": "sqlite", "keys": keys, "inFlight": inflight, "ttlSec": TTL, **_stats}
+    with _lock:
+        _evict(time.monotonic())
+        inflight = sum(1 for e in _entries.values() if not e.done.is_set())
+        return {"store": "memory", "keys": len(_entries), "inFlight": inflight, "ttlSec": TTL, **_stats}
+
+
+__all__ = [
+    "HEADER",
+    "REPLAY_HEADER",
+    "IdempotencyConflict",
+    "IdempotencyTimeout",
+    "db_path",
+    "idempotency_stats",
+    "run_idempotent",
+]
@@ -3,9 +3,12 @@
 
 Responsabilidad:
 - Cargar configuración desde variables de entorno / .env.
-- Crear un cliente OpenAI (soporta OPENAI_BASE_URL para endpoint privado).
 - Exponer chat_json(system, user, **kwargs) que devuelve un dict (JSON parseado).
-- Manejar timeouts y reintentos básicos.
+- Manejar timeouts, reintentos y failover entre endpoints.
+
+Los clientes concretos (OpenAI, OpenAI-compatible vía OPENAI_BASE_URL,
+Anthropic) y el ruteo por latencia viven en providers.py; la grabación y
+replay de llamadas (IA_CASSETTE_MODE) en cassette.py.
 
 NO conoce de GenerateRequest ni de campañas; eso lo maneja text_engine/prompts.
 """
@@ -15,7 +18,9 @@ from __future__ import annotations
 import json
 import logging
 import os
-from typing import Any, Dict, Optional
+import threading
+import time
+from typing import Any, Dict, List, Optional
 
 try:
     # En local cargamos .env; en GCP usarás env vars del servicio.
@@ -25,7 +30,13 @@ try:
 except Exception:
     pass
 
-from openai import OpenAI
+from app.services import cancellation, flight_recorder
+from app.services.adaptive_limit import get_adaptive_limit
+from app.services.cassette import MODE_REPLAY, get_cassette
+from app.services.providers import get_router, last_rate_limit
+from app.services.scheduler import get_scheduler
+from app.utils.json_salvage import salvage_json
+from app.utils.schema import schema_violations
 
 logger = logging.getLogger(__name__)
 
@@ -49,55 +60,93 @@ MAX_TOKENS = int(os.getenv("OPENAI_TEXT_MAX_TOKENS", "900"))
 REQUEST_TIMEOUT = float(os.getenv("OPENAI_REQUEST_TIMEOUT", "30"))  # segundos
 MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "2"))
 
-_client: Optional[OpenAI] = None
+# Rescate de JSON truncado / mal formado (ver utils/json_salvage.py)
+SALVAGE_ENABLED = os.getenv("IA_JSON_SALVAGE", "1").strip().lower() not in ("0", "false", "no")
+
+FORMAT_JSON_OBJECT = "json_object"
+FORMAT_SCHEMA = "json_schema"
+
+# Resultado por modo de salida: cuántas respuestas no parsearon (reintento)
+# o no cumplieron el schema (escalamiento/fallback aguas abajo).
+_format_lock = threading.Lock()
+_format_stats: Dict[str, Dict[str, int]] = {
+    FORMAT_JSON_OBJECT: {"calls": 0, "decodeErrors": 0, "schemaViolations": 0, "salvaged": 0},
+    FORMAT_SCHEMA: {"calls": 0, "decodeErrors": 0, "schemaViolations": 0, "salvaged": 0, "rejected": 0},
+}
 
 
-def _get_client() -> OpenAI:
+class PartialJSON(dict):
     """
-    Singleton simple del cliente OpenAI.
+    dict rescatado de una respuesta truncada (p. ej. cortada por max_tokens).
+
+    `cut_field` es el campo cuyo valor llegó incompleto (si hubo) y
+    `dropped` los campos que se descartaron por estar a medio escribir.
+    """
+
+    truncated = True
+
+    def __init__(self, data: Dict[str, Any], *, cut_field: Optional[str] = None, dropped: Optional[List[str]] = None) -> None:
+        super().__init__(data)
+        self.cut_field = cut_field
+        self.dropped = list(dropped or [])
+
+
+def _count(fmt: str, key: str) -> None:
+    with _format_lock:
+        _format_stats[fmt][key] += 1
+
+
+def _is_schema_rejection(exc: BaseException) -> bool:
+    """400 del proveedor por response_format/tools no soportado."""
+    status = getattr(exc, "status_code", None)
+    text = str(exc).lower()
+    return status == 400 and any(k in text for k in ("response_format", "json_schema", "schema", "tool"))
+
 
-    Importante:
-    - NO pasamos 'proxies' en los kwargs porque las versiones nuevas
-      del SDK no aceptan ese argumento en el constructor.
-    - Si en el futuro necesitas proxy, se configura vía HTTP_PROXY / HTTPS_PROXY
-      a nivel de variables de entorno, no en el constructor.
+def output_format_stats() -> Dict[str, Any]:
     """
-    global _client
-    if _client is not None:
-        return _client
-
-    api_key = (
-        os.getenv("OPENAI_API_KEY")
-        or os.getenv("OPENAI_APIKEY")
-        or os.getenv("OPENAI_TOKEN")
-    )
-    if not api_key:
-        raise RuntimeError("IA-Engine: OPENAI_API_KEY no está configurada")
-
-    base_url = (
-        os.getenv("OPENAI_BASE_URL")
-        or os.getenv("OPENAI_API_BASE")
-        or os.getenv("OPENAI_ENDPOINT")
-    )
-
-    # Timeout de cliente (se puede tunear más fino usando httpx custom si algún día hace falta)
-    try:
-        client_timeout = float(os.getenv("OPENAI_CLIENT_TIMEOUT", "60"))
-    except ValueError:
-        client_timeout = 60.0
-
-    kwargs: Dict[str, Any] = {
-        "api_key": api_key,
-        "timeout": client_timeout,
+    Llamadas por modo de salida y reintentos evitados.
+
+    `retriesAvoided` estima las respuestas inválidas que el modo json_object
+    habría producido en las llamadas hechas con schema (tasa observada en
+    json_object × llamadas con schema), menos las inválidas reales con schema.
+    """
+    with _format_lock:
+        stats = {k: dict(v) for k, v in _format_stats.items()}
+    obj, sch = stats[FORMAT_JSON_OBJECT], stats[FORMAT_SCHEMA]
+    obj_bad = obj["decodeErrors"] + obj["schemaViolations"]
+    sch_bad = sch["decodeErrors"] + sch["schemaViolations"]
+    rate = obj_bad / obj["calls"] if obj["calls"] else None
+    return {
+        **stats,
+        "jsonObjectInvalidRate": round(rate, 4) if rate is not None else None,
+        "retriesAvoided": round(max(rate * sch["calls"] - sch_bad, 0.0), 1) if rate is not None else None,
     }
 
-    if base_url:
-        kwargs["base_url"] = base_url
 
-    # OJO: aquí antes se solía pasar "proxies", eso es lo que rompía en Docker.
-    _client = OpenAI(**kwargs)
-    logger.info("IA-Engine: cliente OpenAI inicializado (model=%s)", MODEL_JSON)
-    return _client
+def warm_up_client(*, connect: bool = True, timeout: float = 5.0) -> Dict[str, Any]:
+    """
+    Construye los clientes de todos los endpoints y, opcionalmente, abre la
+    conexión (DNS + TLS) para que el primer chat_json no la pague.
+
+    La pre-conexión es el health check liviano de cada proveedor; cualquier
+    error se informa pero no se propaga.
+    """
+    router = get_router()
+    info: Dict[str, Any] = {"client": True, "connected": False}
+    if get_cassette().mode == MODE_REPLAY:
+        # Replay no usa la red: no hay conexión que abrir.
+        info["cassette"] = MODE_REPLAY
+        return info
+    if not connect:
+        return info
+
+    health = router.check_health(timeout=timeout)
+    info["connected"] = any(health.values())
+    info["endpoints"] = health
+    if not all(health.values()):
+        logger.warning("IA-Engine: pre-conexión con endpoints caídos: %s", health)
+    return info
 
 
 def chat_json(
@@ -109,65 +158,120 @@ def chat_json(
     top_p: Optional[float] = None,
     max_tokens: Optional[int] = None,
     timeout: Optional[float] = None,
+    engine: Optional[str] = None,
+    schema: Optional[Dict[str, Any]] = None,
 ) -> Dict[str, Any]:
     """
-    Llama a Chat Completions esperando un JSON en el contenido.
+    Llama al LLM esperando un JSON en el contenido.
+
+    Cada intento elige endpoint con el router de proveedores (EWMA de
+    latencia y errores); si un endpoint falla, el siguiente intento hace
+    failover a otro distinto.
 
     Args:
         system: mensaje de sistema.
         user: mensaje de usuario (prompt principal).
-        model: modelo a usar (fallback a MODEL_JSON).
+        model: modelo a usar (fallback al modelo del endpoint elegido).
         temperature, top_p, max_tokens: overrides opcionales.
         timeout: override opcional de timeout en segundos.
+        engine: proveedor o endpoint preferido (GenerateRequest.engine);
+            None o "auto" = cualquiera.
+        schema: JSON Schema esperado. Si el endpoint/modelo lo soporta se
+            pide structured output estricto; si no, json_object y el schema
+            solo se usa para medir violaciones.
 
     Returns:
-        dict parseado desde el contenido devuelto por el modelo.
+        dict parseado desde el contenido devuelto por el modelo. Si el JSON
+        llegó truncado y se pudo rescatar, un `PartialJSON` (truncated=True).
 
     Raises:
         RuntimeError si falla tras los reintentos.
-        json.JSONDecodeError si el contenido no es JSON válido.
     """
-    client = _get_client()
+    router = get_router()
+    cassette = get_cassette()
+    scheduler = get_scheduler()
+    adaptive = get_adaptive_limit()
+    token = cancellation.current_token()
 
-    m = model or MODEL_JSON
     t = TEMP if temperature is None else float(temperature)
     p = TOP_P if top_p is None else float(top_p)
     mt = MAX_TOKENS if max_tokens is None else int(max_tokens)
     to = REQUEST_TIMEOUT if timeout is None else float(timeout)
 
     last_err: Optional[Exception] = None
+    tried: List[str] = []
 
     for attempt in range(1, MAX_RETRIES + 1):
+        # Cliente desconectado: ni el primer intento ni los reintentos salen.
+        cancellation.check_cancelled()
+        endpoint = router.pick(engine, exclude=tried, model=model)
+        # Cupo del scheduler de prioridades (no-op si está apagado); un
+        # SchedulerTimeout sale de acá sin contar como fallo del endpoint.
+        try:
+            ticket = scheduler.acquire(cancel=token.event if token is not None else None)
+        except cancellation.RequestCancelled:
+            cancellation.check_cancelled()  # cuenta la llamada evitada
+            raise
+        t0 = time.perf_counter()
         try:
             logger.debug(
-                "IA-Engine: llamando a OpenAI (model=%s, attempt=%d/%d)",
-                m,
+                "IA-Engine: llamando a %s (model=%s, attempt=%d/%d)",
+                endpoint.name,
+                model or endpoint.provider.model,
                 attempt,
                 MAX_RETRIES,
             )
 
-            resp = client.chat.completions.create(
-                model=m,
-                messages=[
-                    {"role": "system", "content": system},
-                    {"role": "user", "content": user},
-                ],
-                temperature=t,
-                top_p=p,
-                max_tokens=mt,
-                response_format={"type": "json_object"},
-                timeout=to,
+            provider = endpoint.provider
+            fmt = (
+                FORMAT_SCHEMA
+                if schema is not None and provider.supports_schema(model)
+                else FORMAT_JSON_OBJECT
             )
-
-            if not resp.choices:
-                raise RuntimeError(
-                    "IA-Engine: respuesta sin choices desde OpenAI"
+            call = dict(model=model, temperature=t, top_p=p, max_tokens=mt, timeout=to)
+            try:
+                content = cassette.complete_json(
+                    provider, system, user, schema=schema if fmt == FORMAT_SCHEMA else None, **call
                 )
+            except Exception as exc:  # noqa: BLE001
+                if fmt != FORMAT_SCHEMA or not _is_schema_rejection(exc):
+                    raise
+                # El modelo no acepta structured outputs: se recuerda y se
+                # repite en el acto con json_object (no cuenta como intento).
+                logger.warning(
+                    "IA-Engine: %s rechazó structured outputs (%s); uso json_object",
+                    endpoint.name,
+                    exc,
+                )
+                provider.reject_schema(model)
+                _count(FORMAT_SCHEMA, "rejected")
+                fmt = FORMAT_JSON_OBJECT
+                content = cassette.complete_json(provider, system, user, **call)
+            latency = time.perf_counter() - t0
+            _count(fmt, "calls")
+            cancellation.note_call(system, user, content, model)
+            flight_recorder.note_attempt(endpoint.name, latency)
+            if adaptive is not None:
+                adaptive.on_success(latency, last_rate_limit(), max_tokens=mt)
 
-            content = resp.choices[0].message.content or "{}"
             try:
                 data = json.loads(content)
             except json.JSONDecodeError as exc:
+                _count(fmt, "decodeErrors")
+                salvaged = salvage_json(content) if SALVAGE_ENABLED else None
+                if salvaged is not None:
+                    # Se usa lo que llegó en vez de reintentar la llamada completa.
+                    _count(fmt, "salvaged")
+                    router.record(endpoint, True, latency)
+                    if not salvaged.truncated:
+                        return salvaged.data
+                    logger.warning(
+                        "IA-Engine: JSON truncado rescatado desde %s (cortado=%s, descartados=%s)",
+                        endpoint.name,
+                        salvaged.cut_field,
+                        salvaged.dropped,
+                    )
+                    return PartialJSON(salvaged.data, cut_field=salvaged.cut_field, dropped=salvaged.dropped)
                 logger.error("IA-Engine: contenido no es JSON válido: %s", exc)
                 # Logueamos un fragmento del contenido para debug si es muy largo
                 snippet = content[:1000]
@@ -175,25 +279,40 @@ def chat_json(
                     "Contenido bruto devuelto por el modelo (truncado a 1000 chars):\n%s",
                     snippet,
                 )
+                # El endpoint respondió: cuenta la latencia, no abre el circuito.
+                router.record(endpoint, True, latency)
                 raise
 
+            router.record(endpoint, True, latency)
+            if schema is not None and schema_violations(data, schema):
+                _count(fmt, "schemaViolations")
             return data
 
+        except json.JSONDecodeError as exc:
+            last_err = exc
         except Exception as exc:  # noqa: BLE001
             last_err = exc
+            router.record(endpoint, False, time.perf_counter() - t0, exc)
+            flight_recorder.note_attempt(endpoint.name, time.perf_counter() - t0, exc)
+            if adaptive is not None:
+                adaptive.on_error(exc, last_rate_limit())
+            tried.append(endpoint.name)
             logger.warning(
-                "IA-Engine: error llamando a OpenAI (attempt %d/%d): %s",
+                "IA-Engine: error llamando a %s (attempt %d/%d): %s",
+                endpoint.name,
                 attempt,
                 MAX_RETRIES,
                 exc,
             )
-            if attempt >= MAX_RETRIES:
-                break
+        finally:
+            scheduler.release(ticket)
+        if attempt >= MAX_RETRIES:
+            break
 
     # Si llegamos acá, fallaron todos los intentos
-    msg = f"IA-Engine: error llamando a OpenAI tras {MAX_RETRIES} intentos"
+    msg = f"IA-Engine: error llamando al LLM tras {MAX_RETRIES} intentos"
     logger.error(msg)
     raise RuntimeError(msg) from last_err
 
 
-__all__ = ["chat_json", "MODEL_JSON"]
+__all__ = ["PartialJSON", "chat_json", "output_format_stats", "warm_up_client", "MODEL_JSON"]
@@ -0,0 +1,176 @@
+# ia-engine/app/services/profiling.py
+"""Profiling de CPU bajo demanda para /ia/generate.
+
+Un profiler por muestreo (stdlib, sin dependencias): un thread aparte mira
+cada IA_PROFILE_INTERVAL_MS milisegundos el stack del thread que atiende el
+request (`sys._current_frames`) y cuenta stacks. La salida es el formato
+"collapsed" (`raíz;...;hoja N` por línea), que leen directamente
+flamegraph.pl, speedscope e inferno.
+
+Se activa por request:
+- header `X-IA-Profile: 1` junto con un `X-Admin-Token` válido, o
+- muestreo aleatorio con IA_PROFILE_SAMPLE_RATE (0 = nunca).
+
+Apagado no agrega costo: no hay thread ni hooks, solo el chequeo del header.
+Los perfiles se guardan en IA_PROFILE_DIR (se conservan los últimos
+IA_PROFILE_MAX_FILES) y se descargan en GET /ia/admin/profiles/{id}.
+
+Configuración:
+- IA_PROFILE_SAMPLE_RATE=0     → fracción de requests perfilados sin header.
+- IA_PROFILE_INTERVAL_MS=5     → período de muestreo.
+- IA_PROFILE_DIR=/tmp/ia-profiles
+- IA_PROFILE_MAX_FILES=50
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+from types import FrameType
+from typing import Any, Dict, List, Optional
+
+from app.utils.admin_auth import is_admin_token
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = float(os.getenv("IA_PROFILE_SAMPLE_RATE", "0"))
+INTERVAL = max(float(os.getenv("IA_PROFILE_INTERVAL_MS", "5")), 0.5) / 1000
+PROFILE_DIR = Path(os.getenv("IA_PROFILE_DIR", "/tmp/ia-profiles"))
+MAX_FILES = int(os.getenv("IA_PROFILE_MAX_FILES", "50"))
+
+PROFILE_HEADER = "X-IA-Profile"
+SUFFIX = ".folded"
+
+_ID = re.compile(r"^[0-9a-f]{12}$")
+_write_lock = threading.Lock()
+
+
+def should_profile(header: Optional[str], admin_token: Optional[str]) -> bool:
+    """True si este request se perfila (header admin o muestreo)."""
+    if header and header.strip().lower() in ("1", "true", "yes") and is_admin_token(admin_token):
+        return True
+    return SAMPLE_RATE > 0 and random.random() < SAMPLE_RATE
+
+
+def _label(frame: FrameType) -> str:
+    code = frame.f_code
+    path = code.co_filename
+    for marker in ("/site-packages/", "/ia-engine/"):
+        if marker in path:
+            path = path.split(marker, 1)[1]
+            break
+    else:
+        path = os.path.basename(path)
+    return f"{code.co_name} ({path}:{code.co_firstlineno})".replace(";", ",")
+
+
+class SamplingProfiler:
+    """
+    Context manager que muestrea el stack del thread que lo abre.
+
+        with SamplingProfiler() as prof:
+            trabajo()
+        prof.save()  → id del perfil
+    """
+
+    def __init__(self, interval: float = INTERVAL) -> None:
+        self.interval = interval
+        self.id = uuid.uuid4().hex[:12]
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.duration = 0.0
+        self._target = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._t0 = 0.0
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            stack: List[str] = []
+            while frame is not None:
+                stack.append(_label(frame))
+                frame = frame.f_back
+            if stack:
+                stack.reverse()
+                self.stacks[";".join(stack)] += 1
+                self.samples += 1
+
+    def __enter__(self) -> "SamplingProfiler":
+        self._target = threading.get_ident()
+        self._t0 = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name=f"ia-profile-{self.id}", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *_exc: Any) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.duration = time.perf_counter() - self._t0
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {n}\n" for stack, n in self.stacks.most_common())
+
+    def save(self) -> Optional[str]:
+        """Escribe el perfil en IA_PROFILE_DIR y poda los más viejos. None si falla."""
+        try:
+            with _write_lock:
+                PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+                (PROFILE_DIR / f"{self.id}{SUFFIX}").write_text(self.collapsed(), encoding="utf-8")
+                files = sorted(PROFILE_DIR.glob(f"*{SUFFIX}"), key=lambda p: p.stat().st_mtime)
+                for old in files[: max(len(files) - MAX_FILES, 0)]:
+                    old.unlink(missing_ok=True)
+        except OSError as exc:
+            logger.warning("IA-Engine: no se pudo guardar el perfil %s: %s", self.id, exc)
+            return None
+        return self.id
+
+    def summary(self) -> Dict[str, Any]:
+        """Datos para metadata.profile de la respuesta."""
+        return {
+            "id": self.id,
+            "url": f"/ia/admin/profiles/{self.id}",
+            "samples": self.samples,
+            "intervalMs": round(self.interval * 1000, 2),
+            "durationMs": round(self.duration * 1000, 1),
+        }
+
+
+def list_profiles() -> List[Dict[str, Any]]:
+    """Perfiles guardados, del más nuevo al más viejo."""
+    if not PROFILE_DIR.is_dir():
+        return []
+    files = sorted(PROFILE_DIR.glob(f"*{SUFFIX}"), key=lambda p: p.stat().st_mtime, reverse=True)
+    return [
+        {"id": p.stem, "bytes": p.stat().st_size, "createdAt": p.stat().st_mtime}
+        for p in files
+    ]
+
+
+def read_profile(profile_id: str) -> Optional[str]:
+    """Contenido collapsed de un perfil (None si no existe o el id es inválido)."""
+    if not _ID.match(profile_id):
+        return None
+    path = PROFILE_DIR / f"{profile_id}{SUFFIX}"
+    try:
+        return path.read_text(encoding="utf-8")
+    except OSError:
+        return None
+
+
+__all__ = [
+    "PROFILE_HEADER",
+    "SamplingProfiler",
+    "list_profiles",
+    "read_profile",
+    "should_profile",
+]
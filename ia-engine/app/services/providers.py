@@ -0,0 +1,768 @@
+# ia-engine/app/services/providers.py
+"""Registro de proveedores LLM y ruteo por latencia/errores para chat_json.
+
+Responsabilidad:
+- Adapters por tipo de proveedor:
+    - "openai"             → API de OpenAI (SDK oficial).
+    - "openai_compatible"  → cualquier endpoint con API compatible (OPENAI_BASE_URL,
+                              gateways privados, vLLM, stand-ins locales).
+    - "anthropic"          → Messages API de Anthropic (vía httpx, sin SDK).
+- Varios endpoints por proveedor, con ruteo ponderado por EWMA de latencia
+  y tasa de error, circuit breaker, health checks y failover automático.
+
+Configuración:
+- IA_PROVIDERS (JSON, opcional). Si no se define, hay un único endpoint
+  "openai" armado con las env vars de siempre (OPENAI_API_KEY, OPENAI_BASE_URL...).
+
+      [
+        {"name": "openai", "kind": "openai", "model": "gpt-4o-mini", "weight": 1},
+        {"name": "gateway", "kind": "openai_compatible",
+         "base_url": "http://gateway.interno/v1", "api_key_env": "GATEWAY_KEY"},
+        {"name": "claude", "kind": "anthropic", "model": "claude-3-5-haiku-latest"}
+      ]
+
+- IA_PROVIDER_EWMA_ALPHA=0.2        → peso de la última muestra en los EWMA.
+- IA_PROVIDER_FAILURES_TO_OPEN=3    → fallos consecutivos para abrir el circuito.
+- IA_PROVIDER_COOLDOWN=30           → segundos con el circuito abierto.
+- IA_PROVIDER_HEALTH_INTERVAL=30    → segundos entre health checks (0 = sin thread).
+- IA_STRUCTURED_OUTPUTS=auto        → JSON Schema estricto: auto (según proveedor/modelo),
+                                      on (siempre) u off (json_object de siempre).
+                                      Por endpoint: "structured": true|false en IA_PROVIDERS.
+
+Modelo explícito (cascada, `chat_json(model=...)`): solo se rutea a endpoints
+que pueden servirlo. Los "claude-*" van a endpoints anthropic; el resto, a los
+openai/openai_compatible. Un endpoint puede fijar su lista con "models": [...].
+
+NO conoce de prompts ni de GenerateRequest: recibe system/user y devuelve texto.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# =========================
+# Configuración
+# =========================
+
+EWMA_ALPHA = float(os.getenv("IA_PROVIDER_EWMA_ALPHA", "0.2"))
+FAILURES_TO_OPEN = int(os.getenv("IA_PROVIDER_FAILURES_TO_OPEN", "3"))
+COOLDOWN = float(os.getenv("IA_PROVIDER_COOLDOWN", "30"))
+HEALTH_INTERVAL = float(os.getenv("IA_PROVIDER_HEALTH_INTERVAL", "30"))
+
+# Structured outputs (JSON Schema estricto): auto | on | off
+STRUCTURED_MODE = os.getenv("IA_STRUCTURED_OUTPUTS", "auto").strip().lower()
+
+# Modelos OpenAI con response_format json_schema strict (prefijos)
+_STRUCTURED_OPENAI_MODELS: Tuple[str, ...] = (
+    "gpt-4o-mini",
+    "gpt-4o-2024-08-06",
+    "gpt-4o-2024-11-20",
+    "gpt-4.1",
+    "gpt-5",
+    "o1",
+    "o3",
+    "o4",
+)
+_STRUCTURED_OPENAI_EXCLUDED: Tuple[str, ...] = ("gpt-4o-2024-05-13", "o1-preview", "o1-mini")
+
+KIND_OPENAI = "openai"
+KIND_OPENAI_COMPATIBLE = "openai_compatible"
+KIND_ANTHROPIC = "anthropic"
+
+# Prefijos de modelo → tipo de proveedor que los sirve (ver `model_kind`)
+_MODEL_PREFIXES: Tuple[Tuple[str, str], ...] = (
+    ("claude", KIND_ANTHROPIC),
+    ("gpt-", KIND_OPENAI),
+    ("chatgpt", KIND_OPENAI),
+    ("o1", KIND_OPENAI),
+    ("o3", KIND_OPENAI),
+    ("o4", KIND_OPENAI),
+)
+
+DEFAULT_ANTHROPIC_URL = "https://api.anthropic.com"
+ANTHROPIC_VERSION = "2023-06-01"
+
+
+def _env_first(*names: str) -> Optional[str]:
+    for name in names:
+        value = os.getenv(name)
+        if value:
+            return value
+    return None
+
+
+# ============================================================
+#  Adapters
+# ============================================================
+
+# Rate limit informado por el proveedor en la última llamada de cada thread
+_call_state = threading.local()
+
+_RATE_LIMIT_HEADERS: Tuple[Tuple[str, str], ...] = (
+    ("x-ratelimit-limit-requests", "limitRequests"),
+    ("x-ratelimit-remaining-requests", "remainingRequests"),
+    ("x-ratelimit-limit-tokens", "limitTokens"),
+    ("x-ratelimit-remaining-tokens", "remainingTokens"),
+    ("anthropic-ratelimit-requests-limit", "limitRequests"),
+    ("anthropic-ratelimit-requests-remaining", "remainingRequests"),
+    ("anthropic-ratelimit-tokens-limit", "limitTokens"),
+    ("anthropic-ratelimit-tokens-remaining", "remainingTokens"),
+)
+
+
+def parse_rate_limit(headers: Any) -> Dict[str, float]:
+    """Límite y remanente de requests/tokens desde los headers de respuesta."""
+    out: Dict[str, float] = {}
+    if not headers:
+        return out
+    for header, key in _RATE_LIMIT_HEADERS:
+        value = headers.get(header)
+        if value is None:
+            continue
+        try:
+            out[key] = float(value)
+        except ValueError:
+            continue
+    return out
+
+
+def _record_headers(headers: Any) -> None:
+    _call_state.rate_limit = parse_rate_limit(headers)
+
+
+def last_rate_limit() -> Dict[str, float]:
+    """Rate limit de la última llamada de este thread ({} si no vino)."""
+    return getattr(_call_state, "rate_limit", {})
+
+
+def model_kind(model: Optional[str]) -> Optional[str]:
+    """Tipo de proveedor de un nombre de modelo ("claude-*" → anthropic); None si no se sabe."""
+    name = (model or "").strip().lower()
+    for prefix, kind in _MODEL_PREFIXES:
+        if name.startswith(prefix):
+            return kind
+    return None
+
+
+class ProviderError(RuntimeError):
+    """Error de un endpoint (red, HTTP, respuesta vacía)."""
+
+    def __init__(self, message: str, *, status_code: Optional[int] = None) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class Provider(ABC):
+    """
+    Interfaz mínima de un endpoint LLM.
+
+    `complete_json` devuelve el texto crudo de la respuesta (se espera JSON);
+    el parseo lo hace openai_client.chat_json. Con `schema`, el adapter pide
+    structured outputs si el modelo los soporta (ver `supports_schema`).
+    Un adapter que no implemente ambos métodos falla al construirse.
+    """
+
+    kind: str = ""
+
+    def __init__(
+        self,
+        name: str,
+        model: str,
+        *,
+        timeout: float = 60.0,
+        structured: Optional[bool] = None,
+    ) -> None:
+        self.name = name
+        self.model = model
+        self.timeout = timeout
+        # None = detección automática por tipo/modelo
+        self.structured = structured
+        # Modelos que rechazaron structured outputs en runtime
+        self._schema_rejected: set = set()
+        # Modelos que sirve el endpoint ("models" en IA_PROVIDERS); vacío = según tipo
+        self.models: Tuple[str, ...] = ()
+
+    def serves(self, model: Optional[str]) -> bool:
+        """
+        True si el endpoint puede recibir `model`: su modelo por defecto, uno
+        de `models` o, sin lista, un modelo del mismo tipo de proveedor. Los
+        openai_compatible aceptan cualquier modelo que no sea de Anthropic.
+        """
+        if not model or model == self.model:
+            return True
+        if self.models:
+            return model in self.models
+        kind = model_kind(model)
+        if self.kind == KIND_ANTHROPIC:
+            return kind == KIND_ANTHROPIC
+        return kind != KIND_ANTHROPIC
+
+    def _model_supports_schema(self, model: str) -> bool:
+        return False
+
+    def supports_schema(self, model: Optional[str] = None) -> bool:
+        """True si este endpoint/modelo debe recibir el JSON Schema estricto."""
+        model = model or self.model
+        if STRUCTURED_MODE == "off" or model in self._schema_rejected:
+            return False
+        if self.structured is not None:
+            return self.structured
+        return STRUCTURED_MODE == "on" or self._model_supports_schema(model)
+
+    def reject_schema(self, model: Optional[str] = None) -> None:
+        """Marca el modelo como sin soporte (400 del proveedor): vuelve a json_object."""
+        self._schema_rejected.add(model or self.model)
+
+    @abstractmethod
+    def complete_json(
+        self,
+        system: str,
+        user: str,
+        *,
+        model: Optional[str],
+        temperature: float,
+        top_p: float,
+        max_tokens: int,
+        timeout: float,
+        schema: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """Texto crudo de la respuesta del modelo."""
+
+    @abstractmethod
+    def health_check(self, timeout: float = 5.0) -> None:
+        """Levanta excepción si el endpoint no responde."""
+
+
+class OpenAIProvider(Provider):
+    """OpenAI oficial u OpenAI-compatible (base_url propio)."""
+
+    kind = KIND_OPENAI
+
+    def __init__(
+        self,
+        name: str,
+        model: str,
+        *,
+        api_key: Optional[str],
+        base_url: Optional[str] = None,
+        timeout: float = 60.0,
+        kind: str = KIND_OPENAI,
+        structured: Optional[bool] = None,
+    ) -> None:
+        super().__init__(name, model, timeout=timeout, structured=structured)
+        self.kind = kind
+        self.api_key = api_key
+        self.base_url = base_url
+        self._client: Any = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self) -> Any:
+        """
+        Cliente del SDK (perezoso: el import de `openai` se paga recién aquí).
+
+        OJO: no se pasa 'proxies' al constructor (rompe en versiones nuevas
+        del SDK); los proxies se configuran con HTTP_PROXY / HTTPS_PROXY.
+        """
+        if self._client is not None:
+            return self._client
+        with self._lock:
+            if self._client is None:
+                if not self.api_key:
+                    raise RuntimeError(
+                        f"IA-Engine: endpoint {self.name!r} sin API key (OPENAI_API_KEY no está configurada)"
+                    )
+                from openai import OpenAI
+
+                # Sin reintentos del SDK: chat_json reintenta con failover a otro endpoint.
+                kwargs: Dict[str, Any] = {
+                    "api_key": self.api_key,
+                    "timeout": self.timeout,
+                    "max_retries": 0,
+                }
+                if self.base_url:
+                    kwargs["base_url"] = self.base_url
+                self._client = OpenAI(**kwargs)
+                logger.info(
+                    "IA-Engine: cliente OpenAI inicializado (endpoint=%s, model=%s)",
+                    self.name,
+                    self.model,
+                )
+        return self._client
+
+    def _model_supports_schema(self, model: str) -> bool:
+        # En endpoints OpenAI-compatible no se asume: se habilita con "structured": true.
+        if self.kind != KIND_OPENAI or model.startswith(_STRUCTURED_OPENAI_EXCLUDED):
+            return False
+        return model.startswith(_STRUCTURED_OPENAI_MODELS)
+
+    def complete_json(self, system, user, *, model, temperature, top_p, max_tokens, timeout, schema=None):
+        response_format: Dict[str, Any] = {"type": "json_object"}
+        if schema is not None:
+            response_format = {
+                "type": "json_schema",
+                "json_schema": {"name": schema.get("title", "email_set"), "strict": True, "schema": schema},
+            }
+        _record_headers(None)
+        try:
+            # with_raw_response: mismos datos + headers (x-ratelimit-*).
+            raw = self.client.chat.completions.with_raw_response.create(
+                model=model or self.model,
+                messages=[
+                    {"role": "system", "content": system},
+                    {"role": "user", "content": user},
+                ],
+                temperature=temperature,
+                top_p=top_p,
+                max_tokens=max_tokens,
+                response_format=response_format,
+                timeout=timeout,
+            )
+        except Exception as exc:
+            _record_headers(getattr(getattr(exc, "response", None), "headers", None))
+            raise
+        _record_headers(raw.headers)
+        resp = raw.parse()
+        if not resp.choices:
+            raise ProviderError(f"IA-Engine: respuesta sin choices desde {self.name}")
+        return resp.choices[0].message.content or "{}"
+
+    def health_check(self, timeout: float = 5.0) -> None:
+        try:
+            self.client.with_options(timeout=timeout, max_retries=0).models.retrieve(self.model)
+        except Exception as exc:  # noqa: BLE001
+            # 401/404 = el endpoint responde; solo fallan red/5xx.
+            status = getattr(exc, "status_code", None)
+            if status is None or status >= 500:
+                raise
+
+
+class AnthropicProvider(Provider):
+    """Messages API de Anthropic vía httpx (sin depender del SDK)."""
+
+    kind = KIND_ANTHROPIC
+
+    def __init__(
+        self,
+        name: str,
+        model: str,
+        *,
+        api_key: Optional[str],
+        base_url: Optional[str] = None,
+        timeout: float = 60.0,
+        structured: Optional[bool] = None,
+    ) -> None:
+        super().__init__(name, model, timeout=timeout, structured=structured)
+        self.api_key = api_key
+        self.base_url = (base_url or DEFAULT_ANTHROPIC_URL).rstrip("/")
+        self._http: Any = None
+        self._lock = threading.Lock()
+
+    @property
+    def http(self) -> Any:
+        if self._http is not None:
+            return self._http
+        with self._lock:
+            if self._http is None:
+                if not self.api_key:
+                    raise RuntimeError(
+                        f"IA-Engine: endpoint {self.name!r} sin API key (ANTHROPIC_API_KEY no está configurada)"
+                    )
+                import httpx
+
+                self._http = httpx.Client(
+                    base_url=self.base_url,
+                    timeout=self.timeout,
+                    headers={
+                        "x-api-key": self.api_key,
+                        "anthropic-version": ANTHROPIC_VERSION,
+                        "content-type": "application/json",
+                    },
+                )
+        return self._http
+
+    def _model_supports_schema(self, model: str) -> bool:
+        # Tool use con input_schema está en todos los modelos de la Messages API.
+        return True
+
+    def complete_json(self, system, user, *, model, temperature, top_p, max_tokens, timeout, schema=None):
+        payload: Dict[str, Any] = {
+            "model": model or self.model,
+            "system": system,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+        }
+        if schema is not None:
+            # Structured: tool forzado cuyo input_schema es el schema del set.
+            name = schema.get("title", "email_set")
+            payload["tools"] = [{"name": name, "description": "Entrega el set de email.", "input_schema": schema}]
+            payload["tool_choice"] = {"type": "tool", "name": name}
+            payload["messages"] = [{"role": "user", "content": user}]
+        else:
+            # Sin json_object en Anthropic: se fuerza JSON con prefill del assistant.
+            payload["messages"] = [
+                {"role": "user", "content": user},
+                {"role": "assistant", "content": "{"},
+            ]
+
+        _record_headers(None)
+        resp = self.http.post("/v1/messages", json=payload, timeout=timeout)
+        _record_headers(resp.headers)
+        if resp.status_code >= 400:
+            raise ProviderError(
+                f"IA-Engine: {self.name} respondió HTTP {resp.status_code}: {resp.text[:200]}",
+                status_code=resp.status_code,
+            )
+        data = resp.json()
+        if schema is not None:
+            for block in data.get("content", []):
+                if block.get("type") == "tool_use":
+                    return json.dumps(block.get("input") or {}, ensure_ascii=False)
+            raise ProviderError(f"IA-Engine: {self.name} no devolvió tool_use")
+        text = "".join(
+            block.get("text", "")
+            for block in data.get("content", [])
+            if block.get("type") == "text"
+        )
+        if not text.strip():
+            raise ProviderError(f"IA-Engine: respuesta vacía desde {self.name}")
+        return "{" + text
+
+    def health_check(self, timeout: float = 5.0) -> None:
+        resp = self.http.get("/v1/models", timeout=timeout)
+        if resp.status_code >= 500:
+            raise ProviderError(f"IA-Engine: {self.name} health HTTP {resp.status_code}")
+
+
+# ============================================================
+#  Estadísticas y router
+# ============================================================
+
+@dataclass
+class EndpointStats:
+    """EWMA de latencia/errores y estado del circuit breaker de un endpoint."""
+
+    ewma_latency: Optional[float] = None
+    ewma_error: float = 0.0
+    consecutive_failures: int = 0
+    open_until: float = 0.0
+    calls: int = 0
+    failures: int = 0
+    last_error: Optional[str] = None
+
+    def record(self, ok: bool, latency: Optional[float]) -> None:
+        self.calls += 1
+        self.ewma_error = (1 - EWMA_ALPHA) * self.ewma_error + EWMA_ALPHA * (0.0 if ok else 1.0)
+        if latency is not None:
+            self.ewma_latency = (
+                latency
+                if self.ewma_latency is None
+                else (1 - EWMA_ALPHA) * self.ewma_latency + EWMA_ALPHA * latency
+            )
+        if ok:
+            self.consecutive_failures = 0
+            self.open_until = 0.0
+        else:
+            self.failures += 1
+            self.consecutive_failures += 1
+            if self.consecutive_failures >= FAILURES_TO_OPEN:
+                self.open_until = time.monotonic() + COOLDOWN
+
+
+@dataclass
+class Endpoint:
+    provider: Provider
+    weight: float = 1.0
+    stats: EndpointStats = field(default_factory=EndpointStats)
+
+    @property
+    def name(self) -> str:
+        return self.provider.name
+
+    def available(self, now: float) -> bool:
+        # Pasado el cooldown queda "half-open": se permite un intento.
+        return self.stats.open_until <= now
+
+
+class ProviderRouter:
+    """
+    Elige endpoint por llamada con probabilidad proporcional a:
+
+        weight / (ewma_latency * (1 + 4 * ewma_error))
+
+    Los endpoints con el circuito abierto se excluyen; si todos están
+    abiertos se intenta igual con el de menor tiempo restante. Con un
+    modelo explícito solo cuentan los endpoints que lo sirven (`serves`).
+    """
+
+    def __init__(self, endpoints: Sequence[Endpoint]) -> None:
+        if not endpoints:
+            raise ValueError("ProviderRouter necesita al menos un endpoint")
+        self.endpoints: List[Endpoint] = list(endpoints)
+        self._lock = threading.Lock()
+        self._rng = random.Random()
+        self._health_thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    # ---------- selección ----------
+
+    def _score(self, ep: Endpoint, prior_latency: float) -> float:
+        latency = ep.stats.ewma_latency or prior_latency
+        return ep.weight / (max(latency, 0.05) * (1.0 + 4.0 * ep.stats.ewma_error))
+
+    def candidates(self, preference: Optional[str] = None) -> List[Endpoint]:
+        """
+        Endpoints preferidos para `preference` (nombre de endpoint o tipo de
+        proveedor). Si nada coincide (o es None/"auto"), todos.
+        """
+        pref = (preference or "").strip().lower()
+        if pref and pref != "auto":
+            matched = [
+                ep for ep in self.endpoints
+                if ep.name.lower() == pref or ep.provider.kind == pref
+                or (pref == KIND_OPENAI and ep.provider.kind == KIND_OPENAI_COMPATIBLE)
+            ]
+            if matched:
+                return matched
+        return list(self.endpoints)
+
+    def pick(
+        self,
+        preference: Optional[str] = None,
+        *,
+        exclude: Sequence[str] = (),
+        model: Optional[str] = None,
+    ) -> Endpoint:
+        """
+        Elige un endpoint. Primero entre los preferidos; si todos fallaron
+        en esta llamada (`exclude`) o tienen el circuito abierto, hace
+        failover al resto. Con `model`, el failover tampoco sale de los
+        endpoints que lo sirven; si ninguno lo sirve, ProviderError.
+        """
+        now = time.monotonic()
+        with self._lock:
+            servable = [ep for ep in self.endpoints if ep.provider.serves(model)]
+            if not servable:
+                raise ProviderError(f"ningún endpoint configurado sirve el modelo {model!r}")
+            remaining = [ep for ep in servable if ep.name not in exclude] or servable
+            preferred = [ep for ep in self.candidates(preference) if ep in remaining]
+
+            healthy = [ep for ep in preferred if ep.available(now)]
+            if not healthy:
+                healthy = [ep for ep in remaining if ep.available(now)]
+            if not healthy:
+                return min(preferred or remaining, key=lambda ep: ep.stats.open_until)
+
+            known = [ep.stats.ewma_latency for ep in healthy if ep.stats.ewma_latency]
+            prior = sorted(known)[len(known) // 2] if known else 1.0
+            scores = [self._score(ep, prior) for ep in healthy]
+            return self._rng.choices(healthy, weights=scores, k=1)[0]
+
+    def record(self, ep: Endpoint, ok: bool, latency: Optional[float], error: Optional[BaseException] = None) -> None:
+        with self._lock:
+            was_open = ep.stats.open_until > time.monotonic()
+            ep.stats.record(ok, latency)
+            if error is not None:
+                ep.stats.last_error = f"{type(error).__name__}: {str(error)[:200]}"
+            if not ok and not was_open and ep.stats.open_until:
+                logger.warning(
+                    "IA-Engine: circuito abierto para endpoint %s (%d fallos seguidos)",
+                    ep.name,
+                    ep.stats.consecutive_failures,
+                )
+
+    # ---------- health checks ----------
+
+    def check_health(self, *, only_unhealthy: bool = False, timeout: float = 5.0) -> Dict[str, bool]:
+        """Ejecuta health_check en cada endpoint y actualiza el circuito."""
+        results: Dict[str, bool] = {}
+        now = time.monotonic()
+        for ep in self.endpoints:
+            if only_unhealthy and ep.stats.consecutive_failures == 0 and ep.available(now):
+                continue
+            try:
+                ep.provider.health_check(timeout=timeout)
+                ok = True
+            except Exception as exc:  # noqa: BLE001
+                ok = False
+                with self._lock:
+                    ep.stats.last_error = f"health: {type(exc).__name__}"
+            with self._lock:
+                if ok:
+                    ep.stats.consecutive_failures = 0
+                    ep.stats.open_until = 0.0
+                else:
+                    ep.stats.open_until = time.monotonic() + COOLDOWN
+            results[ep.name] = ok
+        return results
+
+    def _health_loop(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            try:
+                self.check_health(only_unhealthy=len(self.endpoints) > 1)
+            except Exception as exc:  # noqa: BLE001
+                logger.warning("IA-Engine: health check de proveedores falló: %s", exc)
+
+    def start_health_checks(self, interval: float = HEALTH_INTERVAL) -> bool:
+        if interval <= 0 or (self._health_thread is not None and self._health_thread.is_alive()):
+            return False
+        self._stop.clear()
+        self._health_thread = threading.Thread(
+            target=self._health_loop,
+            args=(interval,),
+            name="ia-provider-health",
+            daemon=True,
+        )
+        self._health_thread.start()
+        return True
+
+    def stop_health_checks(self) -> None:
+        self._stop.set()
+        if self._health_thread is not None:
+            self._health_thread.join(timeout=2)
+        self._health_thread = None
+
+    # ---------- reporte ----------
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    "name": ep.name,
+                    "kind": ep.provider.kind,
+                    "model": ep.provider.model,
+                    "models": list(ep.provider.models) or None,
+                    "weight": ep.weight,
+                    "structured": ep.provider.supports_schema(),
+                    "available": ep.available(now),
+                    "ewmaLatencyMs": round(ep.stats.ewma_latency * 1000, 1) if ep.stats.ewma_latency else None,
+                    "ewmaErrorRate": round(ep.stats.ewma_error, 3),
+                    "calls": ep.stats.calls,
+                    "failures": ep.stats.failures,
+                    "openForSec": round(max(ep.stats.open_until - now, 0.0), 1),
+                    "lastError": ep.stats.last_error,
+                }
+                for ep in self.endpoints
+            ]
+
+
+# ============================================================
+#  Construcción desde env
+# ============================================================
+
+def _default_model() -> str:
+    return _env_first("OPENAI_MODEL_EMAIL", "OPENAI_TEXT_JSON") or "gpt-4o-mini"
+
+
+def _client_timeout() -> float:
+    try:
+        return float(os.getenv("OPENAI_CLIENT_TIMEOUT", "60"))
+    except ValueError:
+        return 60.0
+
+
+def build_provider(spec: Dict[str, Any]) -> Endpoint:
+    """Crea un Endpoint a partir de un dict de IA_PROVIDERS."""
+    kind = str(spec.get("kind", KIND_OPENAI)).strip().lower()
+    name = str(spec.get("name") or kind)
+    timeout = float(spec.get("timeout", _client_timeout()))
+    api_key = os.getenv(spec["api_key_env"]) if spec.get("api_key_env") else spec.get("api_key")
+
+    if kind in (KIND_OPENAI, KIND_OPENAI_COMPATIBLE):
+        provider: Provider = OpenAIProvider(
+            name,
+            str(spec.get("model") or _default_model()),
+            api_key=api_key or _env_first("OPENAI_API_KEY", "OPENAI_APIKEY", "OPENAI_TOKEN")
+            or ("not-needed" if kind == KIND_OPENAI_COMPATIBLE else None),
+            base_url=spec.get("base_url")
+            or (None if kind == KIND_OPENAI_COMPATIBLE else _env_first("OPENAI_BASE_URL", "OPENAI_API_BASE", "OPENAI_ENDPOINT")),
+            timeout=timeout,
+            kind=kind,
+            structured=spec.get("structured"),
+        )
+    elif kind == KIND_ANTHROPIC:
+        provider = AnthropicProvider(
+            name,
+            str(spec.get("model") or os.getenv("ANTHROPIC_MODEL") or "claude-3-5-haiku-latest"),
+            api_key=api_key or os.getenv("ANTHROPIC_API_KEY"),
+            base_url=spec.get("base_url") or os.getenv("ANTHROPIC_BASE_URL"),
+            timeout=timeout,
+            structured=spec.get("structured"),
+        )
+    else:
+        raise ValueError(f"IA_PROVIDERS: tipo de proveedor desconocido {kind!r}")
+    provider.models = tuple(str(m) for m in spec.get("models") or ())
+
+    return Endpoint(provider=provider, weight=float(spec.get("weight", 1.0)))
+
+
+def build_router_from_env() -> ProviderRouter:
+    """
+    Router según IA_PROVIDERS; sin esa variable, un único endpoint OpenAI
+    con la configuración histórica (OPENAI_API_KEY / OPENAI_BASE_URL).
+    """
+    raw = os.getenv("IA_PROVIDERS", "").strip()
+    specs: List[Dict[str, Any]] = [{"name": "openai", "kind": KIND_OPENAI}]
+    if raw:
+        try:
+            parsed = json.loads(raw)
+            if isinstance(parsed, list) and parsed:
+                specs = parsed
+            else:
+                logger.error("IA-Engine: IA_PROVIDERS debe ser una lista JSON no vacía; uso default")
+        except json.JSONDecodeError as exc:
+            logger.error("IA-Engine: IA_PROVIDERS no es JSON válido (%s); uso default", exc)
+
+    return ProviderRouter([build_provider(spec) for spec in specs])
+
+
+_router: Optional[ProviderRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_router() -> ProviderRouter:
+    """Singleton del router (se arma perezosamente desde env)."""
+    global _router
+    if _router is not None:
+        return _router
+    with _router_lock:
+        if _router is None:
+            _router = build_router_from_env()
+    return _router
+
+
+def set_router(router: Optional[ProviderRouter]) -> None:
+    """Reemplaza el router (tests / stand-ins locales). None = volver a env."""
+    global _router
+    with _router_lock:
+        if _router is not None:
+            _router.stop_health_checks()
+        _router = router
+
+
+__all__ = [
+    "AnthropicProvider",
+    "Endpoint",
+    "OpenAIProvider",
+    "Provider",
+    "ProviderError",
+    "ProviderRouter",
+    "build_provider",
+    "build_router_from_env",
+    "get_router",
+    "last_rate_limit",
+    "model_kind",
+    "parse_rate_limit",
+    "set_router",
+]
@@ -0,0 +1,207 @@
+# ia-engine/app/services/runtime_monitor.py
+"""Monitor de event loop y threadpool (+ carril reservado para health/meta).
+
+`/ia/generate` y `/health` son rutas sync: comparten el threadpool de anyio
+(40 threads por defecto). Con carga, los `chat_json` bloqueantes ocupan
+todos los threads, el health check espera en cola y la plataforma mata
+instancias sanas. Este módulo:
+
+- mide cada IA_RUNTIME_MONITOR_INTERVAL segundos el lag del event loop,
+  la ocupación del threadpool (threads tomados / total, tareas en cola) y
+  la espera en cola real (una tarea vacía enviada al pool, cronometrada);
+- loguea warning al cruzar los umbrales (como máximo uno por métrica cada
+  IA_RUNTIME_WARN_EVERY segundos);
+- expone todo en GET /ia/admin/runtime;
+- con IA_RESERVED_LANE=1 corre /health, /ready y /ia/meta en un limiter
+  propio de IA_RESERVED_LANE_THREADS threads que la generación no puede
+  agotar (`run_in_lane`).
+
+Configuración:
+- IA_RUNTIME_MONITOR_INTERVAL=0.5  → 0 desactiva el monitor.
+- IA_THREADPOOL_SIZE=0             → threads del pool por defecto (0 = el de anyio).
+- IA_LOOP_LAG_WARN_MS=100
+- IA_THREADPOOL_WARN=0.9           → fracción de ocupación.
+- IA_QUEUE_WAIT_WARN_MS=250
+- IA_RUNTIME_WARN_EVERY=30
+- IA_RESERVED_LANE=0
+- IA_RESERVED_LANE_THREADS=2
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, TypeVar
+
+import anyio
+import anyio.to_thread
+
+logger = logging.getLogger(__name__)
+
+INTERVAL = float(os.getenv("IA_RUNTIME_MONITOR_INTERVAL", "0.5"))
+THREADPOOL_SIZE = int(os.getenv("IA_THREADPOOL_SIZE", "0"))
+LAG_WARN_MS = float(os.getenv("IA_LOOP_LAG_WARN_MS", "100"))
+OCCUPANCY_WARN = float(os.getenv("IA_THREADPOOL_WARN", "0.9"))
+QUEUE_WAIT_WARN_MS = float(os.getenv("IA_QUEUE_WAIT_WARN_MS", "250"))
+WARN_EVERY = float(os.getenv("IA_RUNTIME_WARN_EVERY", "30"))
+RESERVED_LANE = os.getenv("IA_RESERVED_LANE", "0").strip().lower() in ("1", "true", "yes")
+RESERVED_LANE_THREADS = int(os.getenv("IA_RESERVED_LANE_THREADS", "2"))
+
+# Muestras que se guardan por métrica (ventana de ~1 minuto con el intervalo por defecto)
+WINDOW_SAMPLES = 120
+
+T = TypeVar("T")
+
+_samples: Dict[str, Deque[float]] = {
+    "loopLagMs": deque(maxlen=WINDOW_SAMPLES),
+    "threadpoolOccupancy": deque(maxlen=WINDOW_SAMPLES),
+    "threadpoolWaiting": deque(maxlen=WINDOW_SAMPLES),
+    "queueWaitMs": deque(maxlen=WINDOW_SAMPLES),
+    "laneQueueWaitMs": deque(maxlen=WINDOW_SAMPLES),
+}
+_warnings: Dict[str, int] = {k: 0 for k in _samples}
+_last_warn: Dict[str, float] = {}
+_task: Optional[asyncio.Task] = None
+_lane: Optional[anyio.CapacityLimiter] = None
+_threadpool_total = 0
+
+
+def _lane_limiter() -> Optional[anyio.CapacityLimiter]:
+    """Limiter del carril reservado (se crea dentro del loop la primera vez)."""
+    global _lane
+    if not RESERVED_LANE:
+        return None
+    if _lane is None:
+        _lane = anyio.CapacityLimiter(max(RESERVED_LANE_THREADS, 1))
+    return _lane
+
+
+async def run_in_lane(fn: Callable[..., T], *args: Any) -> T:
+    """
+    Ejecuta `fn` en un thread del carril reservado (IA_RESERVED_LANE=1) o,
+    si está apagado, en el threadpool de siempre (igual que una ruta sync).
+    """
+    return await anyio.to_thread.run_sync(fn, *args, limiter=_lane_limiter())
+
+
+def _noop() -> None:
+    return None
+
+
+def _observe(name: str, value: float, threshold: float, unit: str) -> None:
+    _samples[name].append(value)
+    if threshold <= 0 or value < threshold:
+        return
+    _warnings[name] += 1
+    now = time.monotonic()
+    if now - _last_warn.get(name, float("-inf")) < WARN_EVERY:
+        return
+    _last_warn[name] = now
+    logger.warning("IA-Engine: %s=%.1f%s (umbral %.1f%s)", name, value, unit, threshold, unit)
+
+
+async def _probe(name: str, limiter: Optional[anyio.CapacityLimiter], threshold: float) -> None:
+    """Espera en cola real: cuánto tarda en correr una tarea vacía en el pool."""
+    t0 = time.perf_counter()
+    await anyio.to_thread.run_sync(_noop, limiter=limiter)
+    _observe(name, (time.perf_counter() - t0) * 1000, threshold, "ms")
+
+
+async def _loop() -> None:
+    loop = asyncio.get_running_loop()
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    probes: Dict[str, asyncio.Task] = {}
+    try:
+        await _sample_forever(loop, limiter, probes)
+    finally:
+        for probe in probes.values():
+            probe.cancel()
+
+
+async def _sample_forever(
+    loop: asyncio.AbstractEventLoop,
+    limiter: anyio.CapacityLimiter,
+    probes: Dict[str, asyncio.Task],
+) -> None:
+    while True:
+        t0 = loop.time()
+        await asyncio.sleep(INTERVAL)
+        _observe("loopLagMs", max(loop.time() - t0 - INTERVAL, 0.0) * 1000, LAG_WARN_MS, "ms")
+
+        stats = limiter.statistics()
+        _observe("threadpoolOccupancy", stats.borrowed_tokens / max(stats.total_tokens, 1), OCCUPANCY_WARN, "")
+        _samples["threadpoolWaiting"].append(float(stats.tasks_waiting))
+
+        # Una sola sonda en vuelo por pool: si el pool está saturado la
+        # sonda queda en cola y su espera se registra cuando por fin corre.
+        lanes = {"queueWaitMs": None}
+        if RESERVED_LANE:
+            lanes["laneQueueWaitMs"] = _lane_limiter()
+        for name, lane in lanes.items():
+            if name not in probes or probes[name].done():
+                probes[name] = asyncio.create_task(_probe(name, lane, QUEUE_WAIT_WARN_MS))
+
+
+def start_runtime_monitor() -> bool:
+    """Arranca el monitor en el loop actual (llamar desde el lifespan)."""
+    global _task, _threadpool_total
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    if THREADPOOL_SIZE > 0:
+        limiter.total_tokens = THREADPOOL_SIZE
+    _threadpool_total = int(limiter.total_tokens)
+    _lane_limiter()
+    if INTERVAL <= 0 or _task is not None:
+        return False
+    _task = asyncio.get_running_loop().create_task(_loop())
+    return True
+
+
+async def stop_runtime_monitor() -> None:
+    global _task
+    if _task is None:
+        return
+    _task.cancel()
+    try:
+        await _task
+    except asyncio.CancelledError:
+        pass
+    _task = None
+
+
+def _summary(values: Deque[float]) -> Dict[str, Optional[float]]:
+    if not values:
+        return {"last": None, "mean": None, "max": None}
+    data = list(values)
+    return {
+        "last": round(data[-1], 3),
+        "mean": round(sum(data) / len(data), 3),
+        "max": round(max(data), 3),
+    }
+
+
+def runtime_stats() -> Dict[str, Any]:
+    """Última muestra, media y máximo de la ventana por métrica + warnings."""
+    return {
+        "running": _task is not None and not _task.done(),
+        "intervalSec": INTERVAL,
+        "threadpoolSize": _threadpool_total,
+        "reservedLane": {"enabled": RESERVED_LANE, "threads": RESERVED_LANE_THREADS if RESERVED_LANE else 0},
+        "thresholds": {
+            "loopLagMs": LAG_WARN_MS,
+            "threadpoolOccupancy": OCCUPANCY_WARN,
+            "queueWaitMs": QUEUE_WAIT_WARN_MS,
+        },
+        "metrics": {name: _summary(values) for name, values in _samples.items()},
+        "warnings": dict(_warnings),
+    }
+
+
+__all__ = [
+    "run_in_lane",
+    "runtime_stats",
+    "start_runtime_monitor",
+    "stop_runtime_monitor",
+]
@@ -0,0 +1,349 @@
+# ia-engine/app/services/scheduler.py
+"""Clases de prioridad y cola justa ponderada para las llamadas al LLM.
+
+Requests interactivos de la UI, relleno del pool y jobs batch compiten por la
+misma capacidad del proveedor vía `chat_json`; un batch grande empujaba la
+latencia interactiva sobre el timeout del backend. Con IA_UPSTREAM_CONCURRENCY
+> 0, cada intento de llamada toma un cupo de este scheduler:
+
+- tres clases: interactive, batch y background. Cuando se libera un cupo se
+  elige clase por stride scheduling con los pesos de IA_SCHED_WEIGHTS, salvo
+  que haya interactivos esperando: ahí background no se atiende (los
+  interactivos pasan delante de todo background encolado);
+- dentro de cada clase, cola justa ponderada (WFQ) entre flujos: el flujo es
+  el caller (`X-IA-Caller`) o, si no viene, la campaña. Un flujo con 50 sets
+  encolados no deja esperando a uno con 1. IA_SCHED_FLOW_WEIGHTS da pesos
+  por flujo (default 1);
+- métricas por clase: en cola, en vuelo, despachados, espera media/p95,
+  timeouts y esperas canceladas (GET /ia/admin/scheduler).
+
+La clase y el flujo viajan en ContextVars (`use_priority`): /ia/generate los
+toma del header `X-IA-Priority` (default interactive) y el pool corre en
+background. Con IA_UPSTREAM_CONCURRENCY=0 (default) no hay cola.
+
+Configuración:
+- IA_UPSTREAM_CONCURRENCY=0        → cupos de llamadas simultáneas al LLM (0 = sin límite).
+- IA_SCHED_WEIGHTS='{"interactive": 8, "batch": 2, "background": 1}'
+- IA_SCHED_FLOW_WEIGHTS='{}'       → {"<caller o campaña>": peso}
+- IA_SCHED_MAX_WAIT=30             → segundos máximos en cola (luego SchedulerTimeout).
+"""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+from app.services.cancellation import RequestCancelled
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+BACKGROUND = "background"
+PRIORITIES: Tuple[str, ...] = (INTERACTIVE, BATCH, BACKGROUND)
+
+PRIORITY_HEADER = "X-IA-Priority"
+CALLER_HEADER = "X-IA-Caller"
+
+CONCURRENCY = int(os.getenv("IA_UPSTREAM_CONCURRENCY", "0"))
+MAX_WAIT = float(os.getenv("IA_SCHED_MAX_WAIT", "30"))
+
+# Cada cuánto revisa una espera en cola si su request se canceló
+CANCEL_POLL = 0.05
+
+_DEFAULT_WEIGHTS = {INTERACTIVE: 8.0, BATCH: 2.0, BACKGROUND: 1.0}
+
+
+def _load_weights(env: str, default: Dict[str, float]) -> Dict[str, float]:
+    raw = os.getenv(env, "").strip()
+    if not raw:
+        return dict(default)
+    try:
+        data = json.loads(raw)
+        return {**default, **{str(k): max(float(v), 0.01) for k, v in data.items()}}
+    except (ValueError, TypeError, AttributeError) as exc:
+        logger.warning("IA-Engine: %s inválido (%s); uso defaults", env, exc)
+        return dict(default)
+
+
+CLASS_WEIGHTS = _load_weights("IA_SCHED_WEIGHTS", _DEFAULT_WEIGHTS)
+FLOW_WEIGHTS = _load_weights("IA_SCHED_FLOW_WEIGHTS", {})
+
+_priority: ContextVar[str] = ContextVar("ia_priority", default=INTERACTIVE)
+_flow: ContextVar[str] = ContextVar("ia_flow", default="")
+
+
+class SchedulerTimeout(RuntimeError):
+    """No hubo cupo para llamar al LLM dentro de IA_SCHED_MAX_WAIT."""
+
+
+def normalize_priority(value: Optional[str]) -> str:
+    value = (value or "").strip().lower()
+    return value if value in PRIORITIES else INTERACTIVE
+
+
+@contextmanager
+def use_priority(priority: str, flow: Optional[str] = None) -> Iterator[None]:
+    """Clase (y flujo) de las llamadas al LLM hechas dentro del bloque."""
+    token_p = _priority.set(normalize_priority(priority))
+    token_f = _flow.set(flow) if flow is not None else None
+    try:
+        yield
+    finally:
+        _priority.reset(token_p)
+        if token_f is not None:
+            _flow.reset(token_f)
+
+
+def current_priority() -> Tuple[str, str]:
+    return _priority.get(), _flow.get()
+
+
+@dataclass(order=True)
+class _Ticket:
+    finish: float
+    seq: int
+    priority: str = field(compare=False)
+    flow: str = field(compare=False)
+    enqueued: float = field(compare=False, default_factory=time.perf_counter)
+    event: threading.Event = field(compare=False, default_factory=threading.Event)
+    granted: bool = field(compare=False, default=False)
+    cancelled: bool = field(compare=False, default=False)
+
+
+@dataclass
+class _ClassState:
+    weight: float
+    queue: List[_Ticket] = field(default_factory=list)
+    waiting: int = 0
+    virtual: float = 0.0             # tag de fin del último despachado (WFQ)
+    stride_pass: float = 0.0         # stride scheduling entre clases
+    flow_finish: Dict[str, float] = field(default_factory=dict)
+    in_flight: int = 0
+    dispatched: int = 0
+    timeouts: int = 0
+    cancelled: int = 0
+    max_waiting: int = 0
+    waits: Deque[float] = field(default_factory=lambda: deque(maxlen=512))
+
+
+class UpstreamScheduler:
+    """Cupos de llamadas simultáneas al LLM con clases y WFQ por flujo."""
+
+    def __init__(
+        self,
+        capacity: int,
+        *,
+        class_weights: Optional[Dict[str, float]] = None,
+        flow_weights: Optional[Dict[str, float]] = None,
+        max_wait: float = MAX_WAIT,
+    ) -> None:
+        weights = class_weights or CLASS_WEIGHTS
+        self.capacity = max(int(capacity), 0)
+        self.max_wait = max_wait
+        self.flow_weights = dict(flow_weights if flow_weights is not None else FLOW_WEIGHTS)
+        self._classes = {p: _ClassState(weight=max(weights.get(p, 1.0), 0.01)) for p in PRIORITIES}
+        self._active = 0
+        self._pass = 0.0
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0
+
+    @property
+    def active(self) -> int:
+        """Llamadas en vuelo (lectura sin lock ni métricas)."""
+        return self._active
+
+    # -------- selección --------
+
+    def _pick_class(self) -> Optional[_ClassState]:
+        ready = [(p, c) for p, c in self._classes.items() if c.waiting]
+        if not ready:
+            return None
+        if self._classes[INTERACTIVE].waiting:
+            ready = [(p, c) for p, c in ready if p != BACKGROUND]
+        _, state = min(ready, key=lambda item: (item[1].stride_pass, PRIORITIES.index(item[0])))
+        self._pass = state.stride_pass
+        state.stride_pass += 1.0 / state.weight
+        return state
+
+    def _dispatch(self) -> None:
+        """Entrega cupos libres a los tickets que corresponden (llamar con _lock)."""
+        while self._active < self.capacity:
+            state = self._pick_class()
+            if state is None:
+                return
+            ticket = heapq.heappop(state.queue)
+            if ticket.cancelled:
+                continue
+            state.waiting -= 1
+            state.virtual = ticket.finish
+            state.in_flight += 1
+            state.dispatched += 1
+            state.waits.append(time.perf_counter() - ticket.enqueued)
+            ticket.granted = True
+            self._active += 1
+            ticket.event.set()
+            if len(state.flow_finish) > 1024:
+                state.flow_finish = {f: t for f, t in state.flow_finish.items() if t > state.virtual}
+
+    # -------- API --------
+
+    def _wait(self, ticket: _Ticket, cancel: Optional[threading.Event]) -> bool:
+        """Espera el cupo hasta max_wait o hasta que se setee `cancel`."""
+        if cancel is None:
+            return ticket.event.wait(self.max_wait)
+        deadline = time.monotonic() + self.max_wait
+        while not cancel.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            if ticket.event.wait(min(CANCEL_POLL, remaining)):
+                return True
+        return ticket.event.is_set()
+
+    def acquire(
+        self,
+        priority: Optional[str] = None,
+        flow: Optional[str] = None,
+        cancel: Optional[threading.Event] = None,
+    ) -> Optional[_Ticket]:
+        """
+        Espera un cupo. Devuelve el ticket a liberar con `release` (None si el
+        scheduler está apagado). Raises SchedulerTimeout, o RequestCancelled si
+        `cancel` se setea mientras espera (el request ya no lo necesita).
+        """
+        if not self.enabled:
+            return None
+        ctx_priority, ctx_flow = current_priority()
+        priority = normalize_priority(priority or ctx_priority)
+        flow = flow if flow is not None else ctx_flow
+        state = self._classes[priority]
+
+        with self._lock:
+            start = max(state.flow_finish.get(flow, 0.0), state.virtual)
+            finish = start + 1.0 / self.flow_weights.get(flow, 1.0)
+            state.flow_finish[flow] = finish
+            ticket = _Ticket(finish=finish, seq=next(self._seq), priority=priority, flow=flow)
+            if not state.waiting:
+                # Una clase que vuelve a tener cola no arrastra crédito acumulado.
+                state.stride_pass = max(state.stride_pass, self._pass)
+            heapq.heappush(state.queue, ticket)
+            state.waiting += 1
+            state.max_waiting = max(state.max_waiting, state.waiting)
+            self._dispatch()
+
+        if self._wait(ticket, cancel):
+            return ticket
+        with self._lock:
+            if ticket.granted:  # se otorgó justo al vencer
+                return ticket
+            ticket.cancelled = True
+            state.waiting -= 1
+            if cancel is not None and cancel.is_set():
+                state.cancelled += 1
+                raise RequestCancelled("request cancelado mientras esperaba cupo")
+            state.timeouts += 1
+        raise SchedulerTimeout(
+            f"sin cupo para llamar al LLM tras {self.max_wait:.0f}s (clase {priority})"
+        )
+
+    def release(self, ticket: Optional[_Ticket]) -> None:
+        if ticket is None:
+            return
+        with self._lock:
+            self._active -= 1
+            self._classes[ticket.priority].in_flight -= 1
+            self._dispatch()
+
+    @contextmanager
+    def slot(self, priority: Optional[str] = None, flow: Optional[str] = None) -> Iterator[None]:
+        ticket = self.acquire(priority, flow)
+        try:
+            yield
+        finally:
+            self.release(ticket)
+
+    def set_capacity(self, capacity: int) -> None:
+        """
+        Cambia los cupos en caliente (concurrencia adaptativa). Al bajar, las
+        llamadas en vuelo terminan y no se despacha hasta quedar bajo el cupo.
+        """
+        with self._lock:
+            self.capacity = max(int(capacity), 1)
+            self._dispatch()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            classes: Dict[str, Any] = {}
+            for name, c in self._classes.items():
+                waits = sorted(c.waits)
+                classes[name] = {
+                    "weight": c.weight,
+                    "queued": c.waiting,
+                    "maxQueued": c.max_waiting,
+                    "inFlight": c.in_flight,
+                    "dispatched": c.dispatched,
+                    "timeouts": c.timeouts,
+                    "cancelled": c.cancelled,
+                    "waitMeanMs": round(sum(waits) / len(waits) * 1000, 1) if waits else None,
+                    "waitP95Ms": round(waits[min(int(0.95 * len(waits)), len(waits) - 1)] * 1000, 1) if waits else None,
+                }
+            return {
+                "enabled": self.enabled,
+                "capacity": self.capacity,
+                "active": self._active,
+                "classes": classes,
+            }
+
+
+_scheduler: Optional[UpstreamScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> UpstreamScheduler:
+    """Singleton del scheduler (IA_UPSTREAM_CONCURRENCY)."""
+    global _scheduler
+    if _scheduler is not None:
+        return _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = UpstreamScheduler(CONCURRENCY)
+    return _scheduler
+
+
+def set_scheduler(scheduler: Optional[UpstreamScheduler]) -> None:
+    """Reemplaza el scheduler (scripts / benchmarks). None = volver a env."""
+    global _scheduler
+    with _scheduler_lock:
+        _scheduler = scheduler
+
+
+__all__ = [
+    "BACKGROUND",
+    "BATCH",
+    "CALLER_HEADER",
+    "INTERACTIVE",
+    "PRIORITIES",
+    "PRIORITY_HEADER",
+    "SchedulerTimeout",
+    "UpstreamScheduler",
+    "current_priority",
+    "get_scheduler",
+    "normalize_priority",
+    "set_scheduler",
+    "use_priority",
+]
@@ -0,0 +1,213 @@
+# ia-engine/app/services/semantic_cache.py
+"""Caché semántico para requests con feedback.
+
+Los hints de feedback (subject / preheader / bodyContent) nunca se repiten
+exactos, pero muchos son casi iguales: mismo hint con otros espacios,
+mayúsculas o un cambio menor. Aquí se guarda, por engine × versión del
+catálogo × campaña × cluster, el resultado de cada generación con feedback
+junto a un vector local del feedback normalizado:
+
+- n-gramas de caracteres (IA_SEMCACHE_NGRAM) de cada campo, con el nombre
+  del campo como prefijo, hasheados (crc32) a IA_SEMCACHE_DIM dimensiones y
+  normalizados L2 → similitud coseno con un producto matriz·vector (NumPy);
+- si el más parecido supera IA_SEMCACHE_THRESHOLD, no venció
+  (IA_SEMCACHE_TTL) y tiene al menos los sets pedidos, se sirven esos sets;
+- cada combinación guarda hasta IA_SEMCACHE_PER_COMBO entradas (se reemplaza
+  la menos usada) y hay como máximo IA_SEMCACHE_MAX_COMBOS combinaciones
+  (se descarta la menos reciente).
+
+El engine y la versión del catálogo van en la clave: un request "template"
+no recibe sets del modelo (ni al revés) y un catálogo recargado no sirve
+sets armados con la metadata anterior; al guardar con una versión nueva se
+descartan las combinaciones de las anteriores.
+
+Sets con stub no se guardan. El caché es en memoria por proceso.
+
+Configuración:
+- IA_SEMCACHE=0|1              → habilita el caché (default 0).
+- IA_SEMCACHE_THRESHOLD=0.95    → cambiar una palabra de contenido baja a ~0.91;
+                                  typos, mayúsculas, tildes y espacios quedan > 0.95.
+- IA_SEMCACHE_TTL=3600
+- IA_SEMCACHE_DIM=512
+- IA_SEMCACHE_NGRAM=3
+- IA_SEMCACHE_PER_COMBO=128
+- IA_SEMCACHE_MAX_COMBOS=256
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.models.response import GeneratedVariant
+from app.utils.similarity import normalize_text
+
+ENABLED = os.getenv("IA_SEMCACHE", "0").strip().lower() in ("1", "true", "yes")
+THRESHOLD = float(os.getenv("IA_SEMCACHE_THRESHOLD", "0.95"))
+TTL = float(os.getenv("IA_SEMCACHE_TTL", "3600"))
+DIM = int(os.getenv("IA_SEMCACHE_DIM", "512"))
+NGRAM = int(os.getenv("IA_SEMCACHE_NGRAM", "3"))
+PER_COMBO = int(os.getenv("IA_SEMCACHE_PER_COMBO", "128"))
+MAX_COMBOS = int(os.getenv("IA_SEMCACHE_MAX_COMBOS", "256"))
+
+# (engine, versión del catálogo, campaña, cluster)
+Combo = Tuple[str, str, str, str]
+
+
+def feedback_vector(fields: Mapping[str, str], dim: int = DIM, n: int = NGRAM) -> Optional[np.ndarray]:
+    """
+    Vector (dim,) float32 normalizado L2 de los campos de feedback.
+
+    None si todos los campos están vacíos.
+    """
+    indices: List[int] = []
+    for name in sorted(fields):
+        text = normalize_text(fields[name] or "")
+        if not text:
+            continue
+        padded = f" {text} "
+        grams = [padded[i:i + n] for i in range(max(len(padded) - n + 1, 1))]
+        seed = zlib.crc32(f"{name}\x1f".encode("utf-8"))
+        indices.extend(zlib.crc32(g.encode("utf-8"), seed) % dim for g in grams)
+    if not indices:
+        return None
+    vec = np.bincount(np.asarray(indices, dtype=np.int64), minlength=dim).astype(np.float32)
+    return vec / np.linalg.norm(vec)
+
+
+class _ComboIndex:
+    """Vectores y sets guardados de una combinación campaña×cluster."""
+
+    def __init__(self, capacity: int, dim: int) -> None:
+        self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self.variants: List[Optional[List[GeneratedVariant]]] = [None] * capacity
+        self.created = np.full(capacity, -np.inf)
+        self.last_used = np.full(capacity, -np.inf)
+        self.size = 0
+
+    def search(self, query: np.ndarray, now: float, sets: int) -> Tuple[int, float]:
+        """(slot, similitud) del vecino vigente más parecido; slot -1 si no hay."""
+        if self.size == 0:
+            return -1, 0.0
+        sims = self.vectors[: self.size] @ query
+        usable = (now - self.created[: self.size] <= TTL) & np.fromiter(
+            (v is not None and len(v) >= sets for v in self.variants[: self.size]),
+            dtype=bool,
+            count=self.size,
+        )
+        sims = np.where(usable, sims, -1.0)
+        slot = int(np.argmax(sims))
+        return slot, float(sims[slot])
+
+    def put(self, vector: np.ndarray, variants: List[GeneratedVariant], now: float) -> None:
+        if self.size < len(self.variants):
+            slot = self.size
+            self.size += 1
+        else:
+            # Reemplaza la entrada vencida o, si no hay, la menos usada.
+            expired = now - self.created > TTL
+            slot = int(np.argmax(expired)) if expired.any() else int(np.argmin(self.last_used))
+        self.vectors[slot] = vector
+        self.variants[slot] = variants
+        self.created[slot] = now
+        self.last_used[slot] = now
+
+
+_lock = threading.Lock()
+_index: "OrderedDict[Combo, _ComboIndex]" = OrderedDict()
+_stats: Dict[str, int] = {"hits": 0, "misses": 0, "stores": 0, "evictedCombos": 0}
+
+
+def lookup(
+    campaign: str,
+    cluster: str,
+    feedback: Mapping[str, str],
+    sets: int,
+    *,
+    engine: str,
+    version: str,
+) -> Optional[Tuple[List[GeneratedVariant], float]]:
+    """
+    Sets guardados para un feedback casi igual (y la similitud), o None.
+
+    Solo busca entre los generados con el mismo `engine` y la misma versión
+    del catálogo. Los sets se devuelven renumerados 1..sets.
+    """
+    query = feedback_vector(feedback)
+    if query is None:
+        return None
+    now = time.monotonic()
+    key: Combo = (engine, version, campaign, cluster)
+    with _lock:
+        index = _index.get(key)
+        slot, similarity = index.search(query, now, sets) if index is not None else (-1, 0.0)
+        if slot < 0 or similarity < THRESHOLD:
+            _stats["misses"] += 1
+            return None
+        _stats["hits"] += 1
+        index.last_used[slot] = now
+        _index.move_to_end(key)
+        cached = index.variants[slot] or []
+    return [v.model_copy(update={"id": i + 1}, deep=True) for i, v in enumerate(cached[:sets])], similarity
+
+
+def store(
+    campaign: str,
+    cluster: str,
+    feedback: Mapping[str, str],
+    variants: Sequence[GeneratedVariant],
+    *,
+    engine: str,
+    version: str,
+) -> bool:
+    """Guarda los sets generados para este feedback. False si no hay feedback."""
+    vector = feedback_vector(feedback)
+    if vector is None or not variants:
+        return False
+    now = time.monotonic()
+    key: Combo = (engine, version, campaign, cluster)
+    with _lock:
+        # Catálogo recargado: lo guardado con otra versión ya no se puede servir.
+        for stale in [k for k in _index if k[1] != version]:
+            del _index[stale]
+            _stats["evictedCombos"] += 1
+        index = _index.get(key)
+        if index is None:
+            index = _ComboIndex(max(PER_COMBO, 1), DIM)
+            _index[key] = index
+            while len(_index) > max(MAX_COMBOS, 1):
+                _index.popitem(last=False)
+                _stats["evictedCombos"] += 1
+        _index.move_to_end(key)
+        index.put(vector, [v.model_copy(deep=True) for v in variants], now)
+        _stats["stores"] += 1
+    return True
+
+
+def semantic_cache_stats() -> Dict[str, Any]:
+    """Entradas, combinaciones y hit rate."""
+    with _lock:
+        entries = sum(i.size for i in _index.values())
+        total = _stats["hits"] + _stats["misses"]
+        return {
+            "enabled": ENABLED,
+            "threshold": THRESHOLD,
+            "combos": len(_index),
+            "entries": entries,
+            "hitRate": round(_stats["hits"] / total, 4) if total else None,
+            **_stats,
+        }
+
+
+def clear() -> None:
+    with _lock:
+        _index.clear()
+
+
+__all__ = ["clear", "feedback_vector", "lookup", "semantic_cache_stats", "store"]
@@ -0,0 +1,295 @@
+# ia-engine/app/services/sessions.py
+"""Sesiones de refinamiento (WebSocket /ia/sessions) con contexto en el servidor.
+
+El refinamiento iterativo desde Email Studio reenviaba campaña, cluster y
+feedback completos en cada vuelta, y `build_email_prompt` rearmaba todo.
+Una sesión guarda en memoria del proceso:
+
+- el prefijo del prompt (system + contexto de campaña/cluster), armado una
+  vez al abrir y idéntico en todos los turnos (cacheable por el proveedor);
+- los hints de feedback acumulados: cada turno trae solo el delta;
+- los hints de los últimos IA_SESSION_HISTORY turnos;
+- los sets del último turno (para elegir `base`) y los textos ya propuestos
+  (hasta IA_SESSION_AVOID) para no repetirlos.
+
+Memoria acotada: como máximo IA_SESSIONS_MAX sesiones (al abrir una nueva
+con el máximo lleno se descarta la menos reciente que no esté generando) y
+las que llevan IA_SESSION_IDLE_SEC sin uso se descartan al abrir u obtener
+sesiones. Una sesión sobrevive a la desconexión del socket hasta vencer:
+el cliente puede retomarla con su id.
+
+El store es por proceso: /ia/sessions requiere un solo worker (o sticky
+sessions en el balanceador). Con WEB_CONCURRENCY > 1 se avisa en el log.
+
+Configuración:
+- IA_SESSIONS_MAX=200
+- IA_SESSION_IDLE_SEC=900
+- IA_SESSION_HISTORY=8
+- IA_SESSION_AVOID=16
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from app.models.request import EmailFeedback, GenerateRequest, SessionOpen, SessionRefine
+from app.models.response import GeneratedVariant
+from app.utils.prompts import build_refine_prompt, build_session_prefix
+from app.utils.validators import soft_validate_campaign_cluster
+
+logger = logging.getLogger(__name__)
+
+MAX_SESSIONS = int(os.getenv("IA_SESSIONS_MAX", "200"))
+IDLE_SEC = float(os.getenv("IA_SESSION_IDLE_SEC", "900"))
+HISTORY = int(os.getenv("IA_SESSION_HISTORY", "8"))
+AVOID = int(os.getenv("IA_SESSION_AVOID", "16"))
+
+# Campo del delta → hint acumulado (bodyContent y body legacy son el mismo hint)
+_HINTS = (
+    ("subject", "subject_hint"),
+    ("preheader", "preheader_hint"),
+    ("bodyContent", "body_hint"),
+    ("body", "body_hint"),
+)
+
+
+class SessionError(ValueError):
+    """Mensaje inválido para el estado de la sesión (turno en curso, base inexistente...)."""
+
+
+def _fields(variant: GeneratedVariant) -> Dict[str, Optional[str]]:
+    return {
+        "subject": variant.subject,
+        "preheader": variant.preheader,
+        "title": variant.body.title,
+        "subtitle": variant.body.subtitle,
+        "body": variant.body.content,
+        "cta": variant.cta,
+    }
+
+
+class RefineSession:
+    """Contexto de una sesión: prefijo fijo, feedback acumulado y sets previos."""
+
+    def __init__(self, spec: SessionOpen) -> None:
+        campaign, cluster = soft_validate_campaign_cluster(spec.campaign, spec.cluster)
+        self.id = uuid.uuid4().hex
+        self.engine = spec.engine
+        self.campaign = campaign
+        self.cluster = cluster
+        self.prefix: Tuple[str, str] = build_session_prefix(campaign, cluster)
+        self.created = self.last_used = time.monotonic()
+        self.turns = 0
+        self.busy = False
+        self.feedback: Dict[str, str] = {}
+        self.history: Deque[Dict[str, str]] = deque(maxlen=max(HISTORY, 0))
+        self.variants: List[GeneratedVariant] = []
+        self.proposed: Deque[str] = deque(maxlen=max(AVOID, 0))
+        # Estado del turno en curso
+        self._turn_feedback: Dict[str, str] = {}
+        self._base: Optional[Dict[str, Optional[str]]] = None
+        self._produced: List[str] = []
+
+    # -------- turnos --------
+
+    def start_turn(self, refine: SessionRefine) -> int:
+        """Aplica el delta y deja listo el turno. Devuelve su número (1..)."""
+        if self.busy:
+            raise SessionError("la sesión ya tiene un turno en curso")
+        base = None
+        if refine.base is not None:
+            match = [v for v in self.variants if v.id == refine.base]
+            if not match:
+                raise SessionError(f"base={refine.base} no es un set del turno anterior")
+            base = _fields(match[0])
+
+        if refine.feedback is not None:
+            delta = refine.feedback.model_dump(exclude_unset=True)
+            for field, hint in _HINTS:
+                if field not in delta:
+                    continue
+                value = (delta[field] or "").strip()
+                if value:
+                    self.feedback[hint] = value
+                else:
+                    self.feedback.pop(hint, None)
+
+        turn_feedback = dict(self.feedback)
+        if refine.instruction and refine.instruction.strip():
+            turn_feedback["instruction"] = refine.instruction.strip()
+
+        self.busy = True
+        self.turns += 1
+        self.last_used = time.monotonic()
+        self._turn_feedback = turn_feedback
+        self._base = base
+        self._produced = []
+        return self.turns
+
+    def request(self, sets: int) -> GenerateRequest:
+        """GenerateRequest equivalente (fallback, cascada y lint lo usan)."""
+        feedback = None
+        if self.feedback:
+            feedback = EmailFeedback(
+                subject=self.feedback.get("subject_hint"),
+                preheader=self.feedback.get("preheader_hint"),
+                bodyContent=self.feedback.get("body_hint"),
+            )
+        return GenerateRequest(
+            engine=self.engine,
+            campaign=self.campaign,
+            cluster=self.cluster,
+            sets=sets,
+            feedback=feedback,
+        )
+
+    def prompt(self, index: int) -> Tuple[str, str]:
+        """Prompt del set `index` (0-based) del turno en curso: prefijo + delta."""
+        # Los textos del set base no se evitan: el usuario puede querer conservarlos.
+        keep = set((self._base or {}).values())
+        texts = [t for t in dict.fromkeys([*self.proposed, *self._produced]) if t not in keep]
+        avoid = texts[-AVOID:] if AVOID > 0 else []
+        return build_refine_prompt(
+            self.prefix,
+            index + 1,
+            feedback=self._turn_feedback,
+            history=list(self.history),
+            base=self._base,
+            avoid=avoid,
+        )
+
+    def add_variant(self, variant: GeneratedVariant, is_stub: bool) -> None:
+        """Set listo del turno en curso (los siguientes lo evitan)."""
+        if not is_stub:
+            self._produced.extend([variant.subject, variant.preheader, variant.body.title])
+
+    def finish_turn(self, variants: List[GeneratedVariant]) -> None:
+        """Cierra el turno: guarda sus sets y su feedback en el historial."""
+        if variants:
+            self.variants = variants
+        self.proposed.extend(t for t in self._produced if t)
+        if self._turn_feedback and (not self.history or self.history[-1] != self._turn_feedback):
+            self.history.append(self._turn_feedback)
+        self._turn_feedback, self._base, self._produced = {}, None, []
+        self.busy = False
+        self.last_used = time.monotonic()
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "session": self.id,
+            "engine": self.engine,
+            "campaign": self.campaign,
+            "cluster": self.cluster,
+            "turns": self.turns,
+            "feedback": dict(self.feedback),
+            "variants": [v.id for v in self.variants],
+            "idleSec": IDLE_SEC,
+        }
+
+
+class SessionStore:
+    """Sesiones vivas del proceso, con tope de cantidad y vencimiento por inactividad."""
+
+    def __init__(self, max_sessions: int = MAX_SESSIONS, idle_sec: float = IDLE_SEC) -> None:
+        self.max_sessions = max(max_sessions, 1)
+        self.idle_sec = idle_sec
+        self._sessions: "OrderedDict[str, RefineSession]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"opened": 0, "closed": 0, "evictedIdle": 0, "evictedFull": 0, "turns": 0}
+
+    def _sweep(self, now: float) -> None:
+        """Descarta las sesiones vencidas (llamar con _lock)."""
+        expired = [
+            sid for sid, s in self._sessions.items() if not s.busy and now - s.last_used > self.idle_sec
+        ]
+        for sid in expired:
+            del self._sessions[sid]
+        self._stats["evictedIdle"] += len(expired)
+
+    def open(self, spec: SessionOpen) -> RefineSession:
+        session = RefineSession(spec)
+        with self._lock:
+            self._sweep(time.monotonic())
+            while len(self._sessions) >= self.max_sessions:
+                victim = next((sid for sid, s in self._sessions.items() if not s.busy), None)
+                if victim is None:
+                    raise SessionError("sin lugar para sesiones nuevas (todas generando)")
+                del self._sessions[victim]
+                self._stats["evictedFull"] += 1
+            self._sessions[session.id] = session
+            self._stats["opened"] += 1
+        return session
+
+    def get(self, session_id: str) -> Optional[RefineSession]:
+        with self._lock:
+            self._sweep(time.monotonic())
+            session = self._sessions.get(session_id)
+            if session is not None:
+                session.last_used = time.monotonic()
+                self._sessions.move_to_end(session_id)
+            return session
+
+    def close(self, session_id: str) -> bool:
+        with self._lock:
+            if self._sessions.pop(session_id, None) is None:
+                return False
+            self._stats["closed"] += 1
+            return True
+
+    def count_turn(self) -> None:
+        with self._lock:
+            self._stats["turns"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._sweep(time.monotonic())
+            return {
+                "active": len(self._sessions),
+                "generating": sum(1 for s in self._sessions.values() if s.busy),
+                "maxSessions": self.max_sessions,
+                "idleSec": self.idle_sec,
+                **self._stats,
+            }
+
+
+_store: Optional[SessionStore] = None
+_store_lock = threading.Lock()
+
+
+def get_session_store() -> SessionStore:
+    """Singleton del store de sesiones (IA_SESSIONS_MAX / IA_SESSION_IDLE_SEC)."""
+    global _store
+    if _store is not None:
+        return _store
+    with _store_lock:
+        if _store is None:
+            _store = SessionStore()
+            if os.getenv("WEB_CONCURRENCY", "1").strip() not in ("", "1"):
+                logger.warning(
+                    "IA-Engine: sesiones en memoria con WEB_CONCURRENCY=%s: un 'resume' que cae en otro "
+                    "worker no encuentra la sesión (usar IA_WORKERS=1 o sticky sessions)",
+                    os.getenv("WEB_CONCURRENCY"),
+                )
+    return _store
+
+
+def set_session_store(store: Optional[SessionStore]) -> None:
+    """Reemplaza el store (scripts / benchmarks). None = volver a env."""
+    global _store
+    with _store_lock:
+        _store = store
+
+
+__all__ = [
+    "RefineSession",
+    "SessionError",
+    "SessionStore",
+    "get_session_store",
+    "set_session_store",
+]
@@ -0,0 +1,270 @@
+# ia-engine/app/services/template_engine.py
+"""Generador local por plantillas (modo degradado rápido, sin modelo).
+
+Cuando OpenAI está lento o caído, el stub genérico ("Texto generado
+automáticamente") no le sirve al usuario. Este motor arma sets plausibles y
+variados en microsegundos a partir del catálogo vigente:
+
+- SUBJECTS / BENEFITS / CTAS de la campaña (copy_meta),
+- CLUSTER_TONE y la descripción base del cluster (describe_cluster),
+- la descripción de tono de la campaña.
+
+Respeta los largos del linter (CHAR_LIMITS / CTA_WORDS, recortando en límite de palabra)
+y varía subject, beneficios, CTA y estructura según el índice del set.
+
+Se usa como `engine="template"` en GenerateRequest y como fallback automático
+del motor OpenAI.
+"""
+
+from __future__ import annotations
+
+import random
+import re
+import zlib
+from functools import lru_cache
+from typing import Optional, Sequence, Tuple
+
+from app.models.response import BodyBlock, GeneratedVariant
+from app.utils.campaigns import describe_campaign
+from app.utils.catalog import get_catalog
+from app.utils.clusters import describe_cluster
+from app.utils.linter import CHAR_LIMITS, CTA_WORDS, TRAILING_PUNCT
+
+ENGINE_NAME = "template"
+
+_SENTENCE = re.compile(r"(?<=[.!?])\s+")
+
+_GENERIC_BENEFITS: Tuple[str, ...] = (
+    "condiciones claras desde el inicio",
+    "asesoría especializada de Banco BICE",
+    "gestión simple desde canales digitales",
+)
+_GENERIC_SUBJECTS: Tuple[str, ...] = (
+    "Una alternativa de Banco BICE pensada para ti",
+)
+_GENERIC_CTAS: Tuple[str, ...] = ("Conoce más",)
+
+_SUBJECT_TEMPLATES: Tuple[str, ...] = (
+    "{subject}",
+    "{subject} con Banco BICE",
+    "Evalúa tu alternativa: {benefit}",
+    "{Benefit}, con Banco BICE",
+)
+_PREHEADER_TEMPLATES: Tuple[str, ...] = (
+    "Conoce beneficios como {benefit} y revisa las condiciones vigentes",
+    "{Benefit}, con el respaldo y la asesoría de Banco BICE",
+    "Una alternativa con {benefit}, sujeta a evaluación y pensada para ti",
+)
+_TITLE_TEMPLATES: Tuple[str, ...] = (
+    "{Benefit}",
+    "Una alternativa con {benefit}",
+    "Pensado para ti: {benefit}",
+)
+_SUBTITLE_TEMPLATES: Tuple[str, ...] = (
+    "{Benefit} y {benefit_2}, en un solo lugar",
+    "Suma {benefit} y {benefit_2}",
+    "{Benefit}, además de {benefit_2}",
+)
+
+# Registro de apertura/cierre según el tono del cluster (CLUSTER_TONE)
+_OPENINGS = {
+    "empatico": (
+        "Sabemos que ordenar tus finanzas toma tiempo, por eso queremos contarte sobre {campaign_sentence}",
+        "Dar el siguiente paso es más simple con información clara: {campaign_sentence}",
+    ),
+    "motivador": (
+        "Tus planes merecen avanzar: conoce {campaign_sentence}",
+        "Si estás pensando en tu próximo proyecto, esto te puede interesar: {campaign_sentence}",
+    ),
+    "neutro": (
+        "Conoce nuestra propuesta: {campaign_sentence}",
+        "Queremos contarte sobre una alternativa de Banco BICE: {campaign_sentence}",
+    ),
+}
+_TONE_KEYWORDS = {
+    "empatico": ("empático", "sin juicio", "respetuoso", "tranquilidad", "estabilidad"),
+    "motivador": ("aspiracional", "lúdico", "motivador", "experiencias", "estilo de vida", "desarrollo"),
+}
+_BULLET_INTROS: Tuple[str, ...] = (
+    "Algunos beneficios que puedes evaluar:",
+    "Esto es lo que puedes aprovechar:",
+    "Lo que encontrarás en esta alternativa:",
+)
+_PROCESS: Tuple[str, ...] = (
+    "El proceso es simple: revisas tu alternativa, evalúas las condiciones con calma y, si te acomoda, "
+    "avanzas con el acompañamiento de un ejecutivo de Banco BICE que resolverá tus dudas en cada etapa.",
+    "Puedes revisar todo a tu ritmo desde nuestros canales digitales y, si lo prefieres, conversar con "
+    "un ejecutivo de Banco BICE para entender cada detalle antes de tomar una decisión.",
+)
+_CLOSINGS: Tuple[str, ...] = (
+    "Revisa las condiciones vigentes, siempre sujetas a evaluación, y da el siguiente paso cuando te acomode.",
+    "Tómate un momento para revisar tu alternativa; las condiciones son referenciales y sujetas a análisis.",
+    "Cuando quieras, revisa los detalles con calma: la oferta es referencial y está sujeta a evaluación.",
+)
+
+
+def _cap(text: str) -> str:
+    return text[:1].upper() + text[1:] if text else text
+
+
+def _low(text: str) -> str:
+    # No bajamos siglas (BICE, DAP, PyME...)
+    if len(text) > 1 and text[1].isupper():
+        return text
+    return text[:1].lower() + text[1:] if text else text
+
+
+def _fit(text: str, bounds: Tuple[int, int]) -> Optional[str]:
+    """Recorta a max en límite de palabra; None si queda bajo el mínimo."""
+    lo, hi = bounds
+    text = " ".join(text.split())
+    if len(text) > hi:
+        cut = text[: hi + 1]
+        space = cut.rfind(" ")
+        text = TRAILING_PUNCT.sub("", cut[:space] if space > lo else cut[:hi])
+    return text if len(text) >= lo else None
+
+
+def _pick(
+    templates: Sequence[str],
+    rng: random.Random,
+    bounds: Tuple[int, int],
+    **values: str,
+) -> str:
+    """
+    Primera plantilla (en orden aleatorio) que cumple los límites sin recortar;
+    si ninguna calza, la primera que calce recortando en límite de palabra.
+    """
+    lo, hi = bounds
+    rendered = [tpl.format(**values) for tpl in templates]
+    # Evita repetir la marca dos veces en el mismo campo
+    order = [t for t in rendered if t.count("BICE") <= 1] or rendered
+    rng.shuffle(order)
+    for text in order:
+        if lo <= len(text) <= hi:
+            return text
+    for text in order:
+        fitted = _fit(text, bounds)
+        if fitted:
+            return fitted
+    return _fit(order[0], (0, hi)) or order[0]
+
+
+def _register(tone: str) -> str:
+    """Registro de la copy ('empatico' | 'motivador' | 'neutro') según CLUSTER_TONE."""
+    low = tone.lower()
+    for name, keywords in _TONE_KEYWORDS.items():
+        if any(k in low for k in keywords):
+            return name
+    return "neutro"
+
+
+def _segment_sentence(cluster: str) -> str:
+    """Primera oración de la descripción base del cluster, en segunda persona suave."""
+    desc = _SENTENCE.split(describe_cluster(cluster).strip(), 1)[0]
+    for prefix, repl in (
+        ("Clientes que ", "Pensamos en quienes "),
+        ("Clientes ", "Pensamos en clientes "),
+        ("Empresas que ", "Pensamos en empresas que "),
+        ("Empresas ", "Pensamos en empresas "),
+        ("Profesionales ", "Pensamos en profesionales "),
+    ):
+        if desc.startswith(prefix):
+            return repl + desc[len(prefix):]
+    return desc
+
+
+@lru_cache(maxsize=512)
+def _pieces(
+    version: str,
+    campaign: str,
+    cluster: str,
+) -> Tuple[Tuple[str, ...], Tuple[str, ...], Tuple[str, ...], str, Tuple[str, ...], str]:
+    """Piezas del catálogo por combinación (cacheadas por versión de snapshot)."""
+    catalog = get_catalog()
+    subjects = tuple(catalog.subjects.get(campaign, ())) or _GENERIC_SUBJECTS
+    benefits = tuple(catalog.benefits.get(campaign, ())) or _GENERIC_BENEFITS
+    ctas = tuple(
+        c for c in catalog.ctas.get(campaign, ()) if CTA_WORDS[0] <= len(c.split()) <= CTA_WORDS[1]
+    ) or _GENERIC_CTAS
+    tone = catalog.cluster_tone.get(cluster, "") or describe_cluster(cluster)
+    campaign_sentences = tuple(_SENTENCE.split(describe_campaign(campaign).strip()))
+    segment = _segment_sentence(cluster)
+    return subjects, benefits, ctas, tone, campaign_sentences, segment
+
+
+def generate_template_variant(
+    campaign: str,
+    cluster: str,
+    index: int,
+    *,
+    nonce: int = 0,
+) -> GeneratedVariant:
+    """
+    Arma UN set (índice 0-based) desde el catálogo, sin llamar a ningún modelo.
+
+    El resultado es determinístico para (campaign, cluster, index, nonce):
+    sets distintos del mismo request salen distintos entre sí.
+    """
+    catalog = get_catalog()
+    subjects, benefits, ctas, tone, campaign_sentences, segment = _pieces(
+        catalog.version, campaign, cluster
+    )
+
+    seed = zlib.crc32(f"{campaign}|{cluster}|{index}|{nonce}".encode("utf-8"))
+    rng = random.Random(seed)
+
+    # Beneficios rotados por índice para que cada set destaque otros
+    start = (index * 3) % len(benefits)
+    rotated = list(benefits[start:]) + list(benefits[:start])
+    picked = (rotated + [b for b in _GENERIC_BENEFITS if b not in rotated])[:5]
+
+    # Subject y CTA rotan por índice + nonce: el mismo set con otro nonce
+    # (otro turno de sesión, otra regeneración) no repite los mismos.
+    offset = index + nonce
+    values = {
+        "subject": subjects[offset % len(subjects)],
+        "benefit": _low(picked[0]),
+        "Benefit": _cap(picked[0]),
+    }
+    subject = _pick(_SUBJECT_TEMPLATES, rng, CHAR_LIMITS["subject"], **values)
+    preheader = _pick(_PREHEADER_TEMPLATES, rng, CHAR_LIMITS["preheader"], **values)
+
+    values.update(benefit=_low(picked[1]), Benefit=_cap(picked[1]), benefit_2=_low(picked[2]))
+    title = _pick(_TITLE_TEMPLATES, rng, CHAR_LIMITS["title"], **values)
+    values.update(benefit=_low(picked[2]), Benefit=_cap(picked[2]), benefit_2=_low(picked[0]))
+    subtitle = _pick(_SUBTITLE_TEMPLATES, rng, CHAR_LIMITS["subtitle"], **values)
+
+    cta = ctas[offset % len(ctas)]
+    register = _register(tone)
+
+    campaign_sentence = _low(campaign_sentences[0]) if campaign_sentences else ""
+    opening = rng.choice(_OPENINGS[register]).format(campaign_sentence=campaign_sentence)
+    paragraph_1 = f"{opening} {segment}.".replace("..", ".")
+    bullets = "\n".join(f"- {_cap(b)}" for b in picked[:3])
+    extra = f"Además, puedes considerar {_low(picked[3])} y {_low(picked[4])}."
+    closing = f"{rng.choice(_CLOSINGS)} Puedes comenzar en «{cta}»."
+
+    body = "\n\n".join(
+        (
+            paragraph_1,
+            rng.choice(_BULLET_INTROS) + "\n" + bullets,
+            " ".join(rng.sample(_PROCESS, len(_PROCESS))) + f" {extra}",
+            closing,
+        )
+    )
+
+    return GeneratedVariant(
+        id=index + 1,
+        subject=subject,
+        preheader=preheader,
+        body=BodyBlock(
+            title=title,
+            subtitle=subtitle,
+            content=body,
+        ),
+        cta=cta,
+    )
+
+
+__all__ = ["ENGINE_NAME", "generate_template_variant"]
@@ -14,16 +14,53 @@ Cada set incluye:
 from __future__ import annotations
 
 import logging
-from typing import List, Dict, Any
+import math
+import os
+import zlib
+from typing import List, Dict, Any, Optional, Sequence, Set, Tuple
 
-from app.models.request import GenerateRequest
+from app.models.request import GenerateRequest, RegenerateRequest
 from app.models.response import GeneratedVariant, BodyBlock
-from app.services.openai_client import chat_json
+from app.services import cascade, flight_recorder, semantic_cache, variant_pool
+from app.services.openai_client import MAX_TOKENS, chat_json
+from app.services.template_engine import ENGINE_NAME as TEMPLATE_ENGINE
+from app.services.template_engine import generate_template_variant
 from app.utils.validators import soft_validate_campaign_cluster
-from app.utils.prompts import build_email_prompt
+from app.utils.catalog import get_catalog
+from app.utils.prompts import (
+    build_candidates_prompt,
+    build_email_prompt,
+    build_field_prompt,
+    field_token_budget,
+)
+from app.utils.linter import Violation, lint_variant, summarize_violations
+from app.utils.ranking import WEIGHTS as RANK_WEIGHTS, rank_candidates
+from app.utils.schema import candidates_json_schema, variant_json_schema
+from app.utils.similarity import find_near_duplicates
 
 logger = logging.getLogger(__name__)
 
+# =========================
+# Configuración
+# =========================
+
+# Detección de near-duplicates entre sets (MinHash local) y regeneración dirigida
+DEDUP_ENABLED = os.getenv("IA_DEDUP", "1").strip().lower() not in ("0", "false", "no")
+DEDUP_THRESHOLD = float(os.getenv("IA_DEDUP_THRESHOLD", "0.6"))
+DEDUP_MAX_ROUNDS = int(os.getenv("IA_DEDUP_MAX_ROUNDS", "1"))
+DEDUP_FIELDS: Tuple[str, ...] = ("subject", "preheader", "title", "subtitle", "body")
+
+# Fallback cuando el modelo falla: "template" (motor local por catálogo) o "stub"
+FALLBACK_ENGINE = os.getenv("IA_FALLBACK_ENGINE", TEMPLATE_ENGINE).strip().lower()
+
+# Linter local de compliance/largos (y reparación en proceso)
+LINT_ENABLED = os.getenv("IA_LINT", "1").strip().lower() not in ("0", "false", "no")
+LINT_REPAIR = os.getenv("IA_LINT_REPAIR", "1").strip().lower() not in ("0", "false", "no")
+
+# Sobre-generación: candidatos = sets × factor en una llamada, ranking local (<= 1 apaga)
+OVERSAMPLE_FACTOR = float(os.getenv("IA_OVERSAMPLE_FACTOR", "0"))
+OVERSAMPLE_MAX = int(os.getenv("IA_OVERSAMPLE_MAX", "10"))
+
 
 def _extract_feedback(req: GenerateRequest) -> Dict[str, str]:
     """Normaliza feedback opcional desde GenerateRequest para logs/debug."""
@@ -47,6 +84,11 @@ def _extract_feedback(req: GenerateRequest) -> Dict[str, str]:
     return data
 
 
+def _has_feedback(req: GenerateRequest) -> bool:
+    """True si el request trae algún hint de feedback no vacío."""
+    return any(_extract_feedback(req).values())
+
+
 def _stub_variant(req: GenerateRequest, idx: int) -> GeneratedVariant:
     """
     Fallback determinístico si OpenAI falla.
@@ -90,6 +132,38 @@ def _stub_variant(req: GenerateRequest, idx: int) -> GeneratedVariant:
     )
 
 
+def _fallback_variant(req: GenerateRequest, idx: int) -> GeneratedVariant:
+    """
+    Set de respaldo cuando el modelo falla: motor de plantillas por catálogo
+    (sin latencia extra) y, si eso también falla, el stub genérico.
+    """
+    if FALLBACK_ENGINE == TEMPLATE_ENGINE:
+        try:
+            return generate_template_variant(req.campaign, req.cluster, idx)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("IA-Engine: motor de plantillas falló, uso stub: %s", exc)
+    return _stub_variant(req, idx)
+
+
+def _clean_truncated(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Limpia el campo cortado de un JSON rescatado (ver _map_json_to_variant)."""
+    cut = getattr(data, "cut_field", None)
+    out = dict(data)
+    if not cut or not isinstance(out.get(cut), str):
+        # Sin corte, o cortado dentro de un valor anidado: se usa lo que llegó.
+        return out
+
+    value = str(out[cut] or "")
+    if cut in ("body", "content", "bodyContent"):
+        # Cerrar en la última oración o línea completa.
+        ends = [value.rfind(mark) for mark in (". ", ".\n", "\n")]
+        end = max(ends)
+        out[cut] = value[: end + 1].rstrip() if end > 0 else value.rstrip()
+    else:
+        del out[cut]
+    return out
+
+
 def _map_json_to_variant(
     data: Dict[str, Any],
     *,
@@ -103,7 +177,13 @@ def _map_json_to_variant(
     Es tolerante a pequeñas variaciones de claves:
     - body vs content vs bodyContent
     - subtitle vs bajada vs subheading
+
+    Si `data` viene rescatado de un JSON truncado (PartialJSON), el body
+    cortado se cierra en la última oración completa y cualquier otro campo
+    cortado se descarta (el linter repone la CTA desde el catálogo).
     """
+    if getattr(data, "truncated", False):
+        data = _clean_truncated(data)
     subject = str(data.get("subject", "")).strip()
     preheader = str(data.get("preheader", "")).strip()
     title = str(data.get("title", "")).strip()
@@ -178,13 +258,277 @@ def _clamp_sets(n: int) -> int:
     return value
 
 
-def generate_sets(request: GenerateRequest) -> List[GeneratedVariant]:
+def _generate_one(
+    request: GenerateRequest,
+    index: int,
+    *,
+    avoid: Optional[Sequence[str]] = None,
+    info: Optional[Dict[str, Any]] = None,
+    prompt: Optional[Tuple[str, str]] = None,
+) -> Tuple[GeneratedVariant, bool]:
     """
-    Genera N *sets de contenido* para un email
-    (subject, preheader, title, subtitle, body, cta).
+    Genera UN set (índice 0-based). Devuelve (variant, es_stub).
 
-    Usa OpenAI como motor principal y cae al stub si algo falla
-    a nivel de cada variante.
+    Con cascada configurada para la campaña, pide primero al tier barato y
+    escala al siguiente solo si el chequeo local falla. Si se pasa `info`,
+    se completa con el tier que sirvió el set y los motivos de escalamiento.
+    `prompt` (system, user) reemplaza al de build_email_prompt (sesiones).
+
+    Nunca levanta: ante cualquier error deja rastro y devuelve el set de
+    respaldo (plantillas o stub).
+    """
+    tiers = cascade.tiers_for(request.campaign)
+    reasons: List[List[str]] = []
+    candidate: Optional[GeneratedVariant] = None
+
+    try:
+        # 1) Construir prompt específico para este set
+        with flight_recorder.stage("prompt", index):
+            system, user = prompt or build_email_prompt(
+                campaign=request.campaign,
+                cluster=request.cluster,
+                feedback=request.feedback,
+                variant_index=index + 1,
+                avoid=avoid,
+            )
+
+        for level, tier in enumerate(tiers):
+            last = level == len(tiers) - 1
+            try:
+                # 2) Llamar al LLM en modo JSON (proveedor preferido = request.engine)
+                with flight_recorder.stage("llm", index):
+                    data = chat_json(
+                        system,
+                        user,
+                        model=tier.model,
+                        engine=tier.engine or request.engine,
+                        schema=variant_json_schema(),
+                    )
+
+                truncated = bool(getattr(data, "truncated", False))
+
+                # 3) Mapear al modelo tipado
+                with flight_recorder.stage("map", index):
+                    variant = _map_json_to_variant(
+                        data,
+                        campaign=request.campaign,
+                        cluster=request.cluster,
+                        index=index,
+                    )
+            except Exception as exc:  # noqa: BLE001
+                if last:
+                    raise
+                flight_recorder.note_error(exc, index)
+                reasons.append([f"error.{type(exc).__name__}"])
+                continue
+
+            # 4) Chequeo local: solo se escala lo que no pasa
+            with flight_recorder.stage("check", index):
+                failed = [] if last else cascade.check_variant(variant, campaign=request.campaign)
+            if truncated and not last:
+                failed.append("json.truncated")
+            if not failed:
+                candidate = variant
+                break
+            reasons.append(failed)
+            logger.info(
+                "IA-Engine: set %d escalado desde %s (%s)",
+                index + 1,
+                tier.label,
+                ", ".join(failed[:5]),
+            )
+
+        if candidate is None:
+            raise RuntimeError("IA-Engine: cascada sin resultado")
+
+        if len(tiers) > 1:
+            cascade.record(request.campaign, len(reasons), reasons)
+        if info is not None:
+            info.update(tier=tiers[len(reasons)].label, escalations=reasons, truncated=truncated)
+        return candidate, False
+
+    except Exception as exc:  # noqa: BLE001
+        # No rompemos todo el batch; dejamos rastro y usamos el respaldo.
+        logger.exception(
+            "IA-Engine: error generando set %d, uso fallback (%s): %s",
+            index + 1,
+            FALLBACK_ENGINE,
+            exc,
+        )
+        flight_recorder.note_error(exc, index)
+        flight_recorder.mark_stub(index)
+        with flight_recorder.stage("fallback", index):
+            return _fallback_variant(request, index), True
+
+
+def _variant_fields(variants: Sequence[GeneratedVariant]) -> Dict[str, List[str]]:
+    """Textos por campo (en el orden de DEDUP_FIELDS) para el análisis de similitud."""
+    return {
+        "subject": [v.subject for v in variants],
+        "preheader": [v.preheader for v in variants],
+        "title": [v.body.title for v in variants],
+        "subtitle": [v.body.subtitle or "" for v in variants],
+        "body": [v.body.content for v in variants],
+    }
+
+
+def _avoid_list(
+    variants: Sequence[GeneratedVariant],
+    index: int,
+    stubs: Set[int],
+) -> List[str]:
+    """Textos de los otros sets (y los propios) que el set regenerado debe evitar."""
+    texts: List[str] = []
+    for j, v in enumerate(variants):
+        if j in stubs:
+            continue
+        texts.extend([v.subject, v.preheader, v.body.title])
+        if j == index and v.body.subtitle:
+            texts.append(v.body.subtitle)
+    return [t for t in dict.fromkeys(texts) if t][:16]
+
+
+def _dedup_sets(
+    request: GenerateRequest,
+    variants: List[GeneratedVariant],
+    stubs: Set[int],
+) -> Dict[str, Any]:
+    """
+    Revisa near-duplicates (entre sets y dentro de cada set) y regenera
+    solo los sets ofensores con un prompt más estricto.
+
+    Modifica `variants`/`stubs` in-place y devuelve el bloque de metadata.
+    """
+    rounds = 0
+    regenerated: List[int] = []
+
+    matrices, offenders = find_near_duplicates(
+        _variant_fields(variants),
+        threshold=DEDUP_THRESHOLD,
+        skip=sorted(stubs),
+    )
+    flagged = dict(offenders)
+
+    while offenders and rounds < DEDUP_MAX_ROUNDS:
+        rounds += 1
+        logger.info(
+            "IA-Engine: near-duplicates en sets %s (ronda %d), regenerando",
+            [i + 1 for i in sorted(offenders)],
+            rounds,
+        )
+        for i in sorted(offenders):
+            avoid = _avoid_list(variants, i, stubs)
+            variant, is_stub = _generate_one(request, i, avoid=avoid)
+            if is_stub:
+                # Mejor un duplicado real que un stub: se conserva el original.
+                continue
+            variants[i] = variant
+            regenerated.append(i + 1)
+
+        matrices, offenders = find_near_duplicates(
+            _variant_fields(variants),
+            threshold=DEDUP_THRESHOLD,
+            skip=sorted(stubs),
+        )
+
+    return {
+        "threshold": DEDUP_THRESHOLD,
+        "rounds": rounds,
+        "flagged": {str(i + 1): reasons for i, reasons in sorted(flagged.items())},
+        "regenerated": regenerated,
+        "remaining": [i + 1 for i in sorted(offenders)],
+        "similarity": {
+            name: matrix.round(2).tolist() for name, matrix in matrices.items()
+        },
+    }
+
+
+def _oversample_sets(
+    request: GenerateRequest,
+    variants: List[GeneratedVariant],
+    total_sets: int,
+) -> Optional[Dict[str, Any]]:
+    """
+    Pide más candidatos que sets faltantes en UNA llamada multi-candidato y
+    agrega a `variants` los mejores según el ranking local (utils/ranking.py).
+
+    Devuelve el bloque de metadata, o None si no aplica. Si la llamada falla
+    o trae menos candidatos, los sets que falten siguen el camino de siempre.
+    """
+    needed = total_sets - len(variants)
+    count = min(max(math.ceil(needed * OVERSAMPLE_FACTOR), needed + 1), OVERSAMPLE_MAX)
+    if needed <= 0 or count <= needed:
+        return None
+
+    avoid = _avoid_list(variants, -1, set()) if variants else None
+    system, user = build_candidates_prompt(request.campaign, request.cluster, request.feedback, count, avoid)
+    candidates: List[GeneratedVariant] = []
+    try:
+        with flight_recorder.stage("oversample"):
+            data = chat_json(
+                system,
+                user,
+                engine=request.engine,
+                schema=candidates_json_schema(),
+                max_tokens=MAX_TOKENS * count,
+            )
+        items = data.get("candidates")
+        if not isinstance(items, list):
+            raise ValueError("respuesta sin lista 'candidates'")
+        if getattr(data, "truncated", False):
+            # El último candidato de un JSON rescatado puede venir cortado.
+            items = items[:-1]
+        for i, item in enumerate(items):
+            try:
+                candidates.append(
+                    _map_json_to_variant(item, campaign=request.campaign, cluster=request.cluster, index=i)
+                )
+            except (ValueError, TypeError, AttributeError):
+                continue
+    except Exception as exc:  # noqa: BLE001
+        logger.warning("IA-Engine: sobre-generación falló, sigo set por set: %s", exc)
+        return {"requested": count, "candidates": 0, "error": type(exc).__name__}
+
+    ranked = rank_candidates(candidates, needed, existing=variants)
+    scores: Dict[str, Any] = {}
+    for r in ranked:
+        variant = candidates[r.index].model_copy(update={"id": len(variants) + 1})
+        variants.append(variant)
+        scores[str(variant.id)] = {"candidate": r.index + 1, "score": r.score, **r.components}
+    return {
+        "requested": count,
+        "candidates": len(candidates),
+        "weights": RANK_WEIGHTS,
+        "scores": scores,
+    }
+
+
+def _lint_sets(
+    request: GenerateRequest,
+    variants: List[GeneratedVariant],
+    stubs: Set[int],
+) -> Dict[str, Any]:
+    """Aplica el linter (con reparación local) a los sets no-stub, in-place."""
+    per_set: Dict[int, List[Violation]] = {}
+    for i, variant in enumerate(variants):
+        if i in stubs:
+            continue
+        fixed, violations = lint_variant(
+            variant,
+            campaign=request.campaign,
+            repair=LINT_REPAIR,
+        )
+        variants[i] = fixed
+        per_set[variant.id] = violations
+    return summarize_violations(per_set)
+
+
+def generate_sets_with_metadata(
+    request: GenerateRequest,
+) -> Tuple[List[GeneratedVariant], Dict[str, Any]]:
+    """
+    Igual que generate_sets, pero además devuelve metadata del proceso
+    (stubs, near-duplicates, etc.) para exponer en GenerateResponse.metadata.
     """
     # Normalizamos campaña/cluster (warnings suaves si algo no cuadra)
     campaign, cluster = soft_validate_campaign_cluster(
@@ -196,6 +540,8 @@ def generate_sets(request: GenerateRequest) -> List[GeneratedVariant]:
     # Número de sets (clamp 1..5)
     total_sets = _clamp_sets(getattr(request, "sets", 1) or 1)
     variants: List[GeneratedVariant] = []
+    stubs: Set[int] = set()
+    metadata: Dict[str, Any] = {}
 
     logger.info(
         "IA-Engine: generando %d sets de contenido (campaign=%s, cluster=%s)",
@@ -204,44 +550,265 @@ def generate_sets(request: GenerateRequest) -> List[GeneratedVariant]:
         cluster,
     )
 
-    for i in range(total_sets):
-        try:
-            # 1) Construir prompt específico para este set
-            system, user = build_email_prompt(
-                campaign=request.campaign,
-                cluster=request.cluster,
-                feedback=request.feedback,
-                variant_index=i + 1,
-            )
-
-            # 2) Llamar a OpenAI en modo JSON
-            data = chat_json(system, user)
-
-            # 3) Mapear al modelo tipado
-            variant = _map_json_to_variant(
-                data,
-                campaign=request.campaign,
-                cluster=request.cluster,
-                index=i,
-            )
-            variants.append(variant)
-
-        except Exception as exc:  # noqa: BLE001
-            # No rompemos todo el batch; dejamos rastro y usamos stub.
-            logger.exception(
-                "IA-Engine: error generando set %d, uso stub: %s",
-                i + 1,
-                exc,
+    # Motor local de plantillas pedido explícitamente: sin llamadas al modelo.
+    if (request.engine or "").strip().lower() == TEMPLATE_ENGINE:
+        variants = [
+            generate_template_variant(campaign, cluster, i) for i in range(total_sets)
+        ]
+        if LINT_ENABLED:
+            metadata["lint"] = _lint_sets(request, variants, set())
+        return variants, metadata
+
+    # Sin feedback: primero intentamos servir sets pre-generados del pool.
+    if variant_pool.POOL_ENABLED and not _has_feedback(request):
+        with flight_recorder.stage("pool"):
+            pooled = variant_pool.take(campaign, cluster, total_sets)
+        variants.extend(
+            v.model_copy(update={"id": i + 1}) for i, v in enumerate(pooled)
+        )
+        metadata["pool"] = {"served": len(pooled)}
+
+    # Con feedback: sets de un feedback casi igual ya generado (caché semántico).
+    feedback = _extract_feedback(request) if semantic_cache.ENABLED else {}
+    if any(feedback.values()):
+        with flight_recorder.stage("semanticCache"):
+            cached = semantic_cache.lookup(
+                campaign, cluster, feedback, total_sets, engine=request.engine, version=get_catalog().version
             )
-            variants.append(_stub_variant(request, i))
+        if cached is not None:
+            variants, similarity = cached
+            metadata["semanticCache"] = {"hit": True, "similarity": round(similarity, 4)}
+            metadata["stubs"] = []
+            return variants, metadata
+        metadata["semanticCache"] = {"hit": False}
+
+    if OVERSAMPLE_FACTOR > 1:
+        oversample = _oversample_sets(request, variants, total_sets)
+        if oversample is not None:
+            metadata["oversample"] = oversample
+
+    served_by: Dict[str, Any] = {}
+    for i in range(len(variants), total_sets):
+        info: Dict[str, Any] = {}
+        variant, is_stub = _generate_one(request, i, info=info)
+        variants.append(variant)
+        if is_stub:
+            stubs.add(i)
+        elif info.get("escalations") is not None:
+            served_by[str(i + 1)] = info
+
+    salvaged = [int(k) for k, v in served_by.items() if v.get("truncated")]
+    if salvaged:
+        metadata["salvaged"] = salvaged
+
+    if cascade.is_enabled(campaign) and served_by:
+        metadata["cascade"] = {
+            "tiers": [t.label for t in cascade.tiers_for(campaign)],
+            "servedBy": {k: v["tier"] for k, v in served_by.items()},
+            "escalated": [int(k) for k, v in served_by.items() if v["escalations"]],
+        }
+
+    if DEDUP_ENABLED and len(variants) - len(stubs) >= 1:
+        with flight_recorder.stage("dedup"):
+            metadata["dedup"] = _dedup_sets(request, variants, stubs)
+
+    if LINT_ENABLED:
+        with flight_recorder.stage("lint"):
+            metadata["lint"] = _lint_sets(request, variants, stubs)
+
+    metadata["stubs"] = [i + 1 for i in sorted(stubs)]
+    if stubs:
+        metadata["fallback"] = FALLBACK_ENGINE
+    elif any(feedback.values()):
+        semantic_cache.store(
+            campaign, cluster, feedback, variants, engine=request.engine, version=get_catalog().version
+        )
 
     logger.info(
         "IA-Engine: generados %d sets (incluyendo stubs si hubo errores).",
         len(variants),
     )
+    return variants, metadata
+
+
+def generate_sets(request: GenerateRequest) -> List[GeneratedVariant]:
+    """
+    Genera N *sets de contenido* para un email
+    (subject, preheader, title, subtitle, body, cta).
+
+    Usa OpenAI como motor principal y cae al stub si algo falla
+    a nivel de cada variante.
+    """
+    variants, _ = generate_sets_with_metadata(request)
     return variants
 
 
+def generate_session_set(
+    request: GenerateRequest,
+    index: int,
+    prompt: Tuple[str, str],
+    *,
+    turn: int = 0,
+) -> Tuple[GeneratedVariant, bool, Dict[str, Any]]:
+    """
+    Un set de un turno de sesión de refinamiento (ver sessions.py): el prompt
+    lo arma la sesión (prefijo fijo + delta). Devuelve (set, es_stub, metadata)
+    con cascada y lint como en /ia/generate.
+
+    Con engine 'template' no hay modelo: se usa el motor de plantillas con
+    `turn` como nonce, para que cada turno proponga otros textos.
+    """
+    info: Dict[str, Any] = {}
+    if (request.engine or "").strip().lower() == TEMPLATE_ENGINE:
+        variant, is_stub = generate_template_variant(request.campaign, request.cluster, index, nonce=turn), False
+    else:
+        variant, is_stub = _generate_one(request, index, info=info, prompt=prompt)
+    meta: Dict[str, Any] = {}
+    if info.get("escalations"):
+        meta["cascade"] = {"servedBy": info["tier"], "escalations": info["escalations"]}
+    if info.get("truncated"):
+        meta["salvaged"] = True
+    if LINT_ENABLED and not is_stub:
+        variant, violations = lint_variant(variant, campaign=request.campaign, repair=LINT_REPAIR)
+        meta["lint"] = summarize_violations({variant.id: violations})
+    return variant, is_stub, meta
+
+
+def generate_pool_variant(campaign: str, cluster: str) -> Optional[GeneratedVariant]:
+    """
+    Genera un set suelto para el pool de pre-generación.
+
+    Devuelve None si el motor cayó al stub (los stubs nunca van al pool).
+    """
+    request = GenerateRequest(campaign=campaign, cluster=cluster, sets=1)
+    variant, is_stub = _generate_one(request, 0)
+    return None if is_stub else variant
+
+
+# Claves alternativas que el modelo a veces usa para cada campo
+_FIELD_ALIASES: Dict[str, Tuple[str, ...]] = {
+    "subject": ("subject",),
+    "preheader": ("preheader",),
+    "title": ("title",),
+    "subtitle": ("subtitle", "bajada", "subheading"),
+    "body": ("body", "content", "bodyContent"),
+    "cta": ("cta",),
+}
+
+
+def _current_fields(variant: GeneratedVariant) -> Dict[str, Optional[str]]:
+    return {
+        "subject": variant.subject,
+        "preheader": variant.preheader,
+        "title": variant.body.title,
+        "subtitle": variant.body.subtitle,
+        "body": variant.body.content,
+        "cta": variant.cta,
+    }
+
+
+def _with_fields(variant: GeneratedVariant, values: Dict[str, Optional[str]]) -> GeneratedVariant:
+    merged = {**_current_fields(variant), **values}
+    return GeneratedVariant(
+        id=variant.id,
+        subject=merged["subject"] or "",
+        preheader=merged["preheader"] or "",
+        body=BodyBlock(
+            title=merged["title"] or "",
+            subtitle=merged["subtitle"] or None,
+            content=merged["body"] or "",
+        ),
+        cta=merged["cta"] or None,
+    )
+
+
+# Sets de plantilla (índices vecinos) que se prueban como donantes al regenerar
+TEMPLATE_DONORS = 8
+
+
+def _template_fields(
+    campaign: str,
+    cluster: str,
+    variant_id: int,
+    fields: Sequence[str],
+    current: Dict[str, Optional[str]],
+) -> Dict[str, Optional[str]]:
+    """
+    Campos pedidos tomados del motor de plantillas, distintos de los actuales.
+
+    El set con el mismo índice suele repetir subject/CTA/beneficios (salen del
+    índice), así que se prueban los índices siguientes y cada campo se toma
+    del primer donante que trae un texto distinto.
+    """
+    nonce = zlib.crc32(repr(sorted(current.items())).encode("utf-8"))
+    values: Dict[str, Optional[str]] = {}
+    for step in range(1, TEMPLATE_DONORS + 1):
+        donor = _current_fields(generate_template_variant(campaign, cluster, variant_id - 1 + step, nonce=nonce))
+        for name in fields:
+            if name not in values and donor[name] and donor[name] != current[name]:
+                values[name] = donor[name]
+        if len(values) == len(fields):
+            break
+    return values
+
+
+def regenerate_fields(
+    request: RegenerateRequest,
+) -> Tuple[Dict[str, Optional[str]], Dict[str, Any]]:
+    """
+    Regenera solo `request.fields` de un set existente.
+
+    Usa un prompt mínimo (el resto de los campos fijo como contexto) y un
+    max_tokens acotado a esos campos. El resultado pasa por el linter junto
+    con los campos fijos. Devuelve (campos que cambiaron, metadata); ante
+    error del modelo usa los mismos campos del motor de plantillas.
+    """
+    campaign, cluster = soft_validate_campaign_cluster(request.campaign, request.cluster)
+    fields = list(dict.fromkeys(request.fields))
+    current = _current_fields(request.variant)
+    budget = field_token_budget(fields)
+    metadata: Dict[str, Any] = {"requested": fields, "maxTokens": budget}
+
+    values: Dict[str, Optional[str]] = {}
+    use_template = (request.engine or "").strip().lower() == TEMPLATE_ENGINE
+    if not use_template:
+        try:
+            system, user = build_field_prompt(
+                campaign, cluster, current, fields, request.instruction
+            )
+            data = chat_json(
+                system,
+                user,
+                max_tokens=budget,
+                engine=request.engine,
+                schema=variant_json_schema(fields),
+            )
+            for name in fields:
+                raw = next((data[k] for k in _FIELD_ALIASES[name] if data.get(k)), None)
+                if raw is not None and str(raw).strip():
+                    values[name] = str(raw).strip()
+            if not values:
+                raise ValueError("Respuesta sin ninguno de los campos pedidos.")
+        except Exception as exc:  # noqa: BLE001
+            logger.exception("IA-Engine: error regenerando %s, uso plantillas: %s", fields, exc)
+            use_template = True
+            metadata["fallback"] = TEMPLATE_ENGINE
+
+    if use_template:
+        missing = [name for name in fields if name not in values]
+        values.update(_template_fields(campaign, cluster, request.variant.id, missing, current))
+
+    variant = _with_fields(request.variant, values)
+    if LINT_ENABLED:
+        variant, violations = lint_variant(variant, campaign=campaign, repair=LINT_REPAIR)
+        metadata["lint"] = summarize_violations({variant.id: violations})
+
+    result = _current_fields(variant)
+    changed = {name: result[name] for name in fields if result[name] != current[name]}
+    metadata["unchanged"] = [name for name in fields if name not in changed]
+    return changed, metadata
+
+
 # Alias más explícito para el resto de la app / futuro refactor
 def generate_email_sets(request: GenerateRequest) -> List[GeneratedVariant]:
     """
@@ -250,4 +817,11 @@ def generate_email_sets(request: GenerateRequest) -> List[GeneratedVariant]:
     return generate_sets(request)
 
 
-__all__ = ["generate_sets", "generate_email_sets"]
+__all__ = [
+    "generate_sets",
+    "generate_sets_with_metadata",
+    "generate_email_sets",
+    "generate_pool_variant",
+    "generate_session_set",
+    "regenerate_fields",
+]
@@ -0,0 +1,361 @@
+# ia-engine/app/services/variant_pool.py
+"""Pool de sets pre-generados por campaña×cluster.
+
+La mayoría de los `/ia/generate` sin feedback piden un grupo chico de
+combinaciones populares de CAMPAIGN_CLUSTERS. Este módulo mantiene, para cada
+combinación configurada, un pool de sets frescos y nunca servidos:
+
+- Profundidad objetivo (`depth`) y TTL (`ttl`, segundos) por combinación;
+  solo las combinaciones configuradas en IA_POOL_CONFIG tienen pool.
+- Con varios workers (WEB_CONCURRENCY), cada uno mantiene su propio pool
+  con `ceil(depth / workers)` sets: el gasto total en background es el de
+  una sola profundidad, no N veces.
+- Un scheduler en background rellena los pools en ventanas off-peak
+  (IA_POOL_REFILL_HOURS) y descarta lo vencido.
+- Un request sin feedback toma sus sets del pool al instante (cada set se
+  sirve una sola vez); lo que falte se genera en vivo.
+- Se reporta profundidad, hit rate y edad de los sets.
+
+Configuración:
+- IA_POOL=1|0               → habilita el pool (default 0: consume tokens en background).
+- IA_POOL_DEPTH=5           → profundidad objetivo de las combinaciones configuradas sin "depth".
+- IA_POOL_TTL=21600         → TTL por defecto (s).
+- IA_POOL_CONFIG='{...}'    → combinaciones con pool, JSON:
+      {"Crédito de consumo - Persona::Viajes solteros": {"depth": 8, "ttl": 3600},
+       "Crédito de consumo - Persona::Auto familiar": {}}
+  La clave "*" aplica a todas las combinaciones no listadas (opt-in explícito
+  para todo el catálogo). Sin config no se pre-genera nada.
+- IA_POOL_REFILL_HOURS="0-7,21-23" → horas locales de relleno (vacío = siempre).
+- IA_POOL_INTERVAL=60       → segundos entre ciclos del scheduler.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from app.models.response import GeneratedVariant
+from app.services.scheduler import BACKGROUND, use_priority
+from app.utils.catalog import get_catalog
+
+logger = logging.getLogger(__name__)
+
+# =========================
+# Configuración
+# =========================
+
+POOL_ENABLED = os.getenv("IA_POOL", "0").strip().lower() in ("1", "true", "yes")
+DEFAULT_DEPTH = int(os.getenv("IA_POOL_DEPTH", "5"))
+DEFAULT_TTL = float(os.getenv("IA_POOL_TTL", "21600"))
+REFILL_INTERVAL = float(os.getenv("IA_POOL_INTERVAL", "60"))
+_RAW_CONFIG = os.getenv("IA_POOL_CONFIG", "").strip()
+_RAW_HOURS = os.getenv("IA_POOL_REFILL_HOURS", "").strip()
+
+Combo = Tuple[str, str]
+
+
+@dataclass(frozen=True)
+class PoolTarget:
+    """Profundidad objetivo y TTL de una combinación campaña×cluster."""
+
+    depth: int
+    ttl: float
+
+
+def _parse_config(raw: str) -> Dict[str, PoolTarget]:
+    if not raw:
+        return {}
+    try:
+        data = json.loads(raw)
+    except json.JSONDecodeError as exc:
+        logger.error("IA-Engine: IA_POOL_CONFIG no es JSON válido: %s", exc)
+        return {}
+
+    out: Dict[str, PoolTarget] = {}
+    for key, cfg in (data or {}).items():
+        if not isinstance(cfg, dict):
+            continue
+        out[key] = PoolTarget(
+            depth=int(cfg.get("depth", DEFAULT_DEPTH)),
+            ttl=float(cfg.get("ttl", DEFAULT_TTL)),
+        )
+    return out
+
+
+def _parse_hours(raw: str) -> Set[int]:
+    """'0-7,21-23' → {0..7, 21, 22, 23}. Vacío = todas las horas."""
+    if not raw:
+        return set(range(24))
+    hours: Set[int] = set()
+    for part in raw.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            lo, hi = (int(x) for x in part.split("-", 1))
+            hours.update(h % 24 for h in range(lo, hi + 1))
+        else:
+            hours.add(int(part) % 24)
+    return hours
+
+
+POOL_CONFIG: Dict[str, PoolTarget] = _parse_config(_RAW_CONFIG)
+REFILL_HOURS: Set[int] = _parse_hours(_RAW_HOURS)
+
+
+def target_for(campaign: str, cluster: str) -> PoolTarget:
+    """Objetivo configurado para la combinación (override > '*'); sin config, depth 0."""
+    return (
+        POOL_CONFIG.get(f"{campaign}::{cluster}")
+        or POOL_CONFIG.get("*")
+        or PoolTarget(depth=0, ttl=DEFAULT_TTL)
+    )
+
+
+def worker_count() -> int:
+    """
+    Workers que comparten el servicio (WEB_CONCURRENCY; 1 si no está). Se lee
+    en cada ciclo y no al importar: el proceso padre del pre-fork lo fija
+    después de cargar la app.
+    """
+    try:
+        return max(int(os.getenv("WEB_CONCURRENCY", "1")), 1)
+    except ValueError:
+        return 1
+
+
+def worker_depth(campaign: str, cluster: str) -> int:
+    """Profundidad que mantiene ESTE worker: la objetivo repartida entre los workers."""
+    depth = target_for(campaign, cluster).depth
+    return math.ceil(depth / worker_count()) if depth > 0 else 0
+
+
+# ============================================================
+#  Estado
+# ============================================================
+
+_lock = threading.Lock()
+_pools: Dict[Combo, Deque[Tuple[float, GeneratedVariant]]] = {}
+_stats: Dict[str, float] = {
+    "requests": 0,
+    "hits": 0,
+    "partial": 0,
+    "misses": 0,
+    "setsServed": 0,
+    "servedAgeTotal": 0.0,
+    "generated": 0,
+    "expired": 0,
+    "refillErrors": 0,
+}
+_thread: Optional[threading.Thread] = None
+_stop = threading.Event()
+
+
+def _evict_expired(now: float) -> None:
+    """Descarta sets vencidos (llamar con _lock tomado)."""
+    for (campaign, cluster), items in _pools.items():
+        ttl = target_for(campaign, cluster).ttl
+        while items and now - items[0][0] > ttl:
+            items.popleft()
+            _stats["expired"] += 1
+
+
+def take(campaign: str, cluster: str, count: int) -> List[GeneratedVariant]:
+    """
+    Saca hasta `count` sets frescos del pool (se sirven una sola vez).
+
+    Devuelve lista vacía si el pool está deshabilitado o no hay stock.
+    """
+    if not POOL_ENABLED or count <= 0:
+        return []
+
+    now = time.time()
+    served: List[GeneratedVariant] = []
+    with _lock:
+        _evict_expired(now)
+        items = _pools.get((campaign, cluster))
+        while items and len(served) < count:
+            created_at, variant = items.popleft()
+            served.append(variant)
+            _stats["servedAgeTotal"] += now - created_at
+
+        _stats["requests"] += 1
+        _stats["setsServed"] += len(served)
+        if len(served) == count:
+            _stats["hits"] += 1
+        elif served:
+            _stats["partial"] += 1
+        else:
+            _stats["misses"] += 1
+
+    return served
+
+
+def put(campaign: str, cluster: str, variant: GeneratedVariant) -> None:
+    """Agrega un set recién generado al pool de la combinación."""
+    with _lock:
+        _pools.setdefault((campaign, cluster), deque()).append((time.time(), variant))
+        _stats["generated"] += 1
+
+
+def _deficits() -> List[Tuple[Combo, int]]:
+    """Combinaciones bajo su profundidad objetivo, de mayor a menor déficit."""
+    out: List[Tuple[Combo, int]] = []
+    with _lock:
+        _evict_expired(time.time())
+        for campaign, clusters in get_catalog().campaign_clusters.items():
+            for cluster in clusters:
+                depth = worker_depth(campaign, cluster)
+                have = len(_pools.get((campaign, cluster), ()))
+                if depth > have:
+                    out.append(((campaign, cluster), depth - have))
+    out.sort(key=lambda item: item[1], reverse=True)
+    return out
+
+
+def in_refill_window(now: Optional[float] = None) -> bool:
+    """True si la hora local actual está dentro de IA_POOL_REFILL_HOURS."""
+    hour = time.localtime(now if now is not None else time.time()).tm_hour
+    return hour in REFILL_HOURS
+
+
+def refill_once(
+    generate: Callable[[str, str], Optional[GeneratedVariant]],
+    *,
+    max_sets: Optional[int] = None,
+) -> int:
+    """
+    Un ciclo de relleno: genera un set por combinación con déficit
+    (round-robin) hasta cubrir los déficits o `max_sets`.
+
+    `generate(campaign, cluster)` devuelve un set o None (stub/error:
+    nunca se guardan stubs en el pool). Devuelve cuántos sets se agregaron.
+    """
+    added = 0
+    while not _stop.is_set():
+        deficits = _deficits()
+        if not deficits:
+            break
+        for (campaign, cluster), _ in deficits:
+            if _stop.is_set() or (max_sets is not None and added >= max_sets):
+                return added
+            try:
+                variant = generate(campaign, cluster)
+            except Exception as exc:  # noqa: BLE001
+                variant = None
+                logger.warning("IA-Engine: relleno de pool falló (%s/%s): %s", campaign, cluster, exc)
+            if variant is None:
+                with _lock:
+                    _stats["refillErrors"] += 1
+                # Si el proveedor está fallando no insistimos en este ciclo.
+                return added
+            put(campaign, cluster, variant)
+            added += 1
+    return added
+
+
+def _loop(generate: Callable[[str, str], Optional[GeneratedVariant]]) -> None:
+    while not _stop.wait(REFILL_INTERVAL):
+        if not in_refill_window():
+            with _lock:
+                _evict_expired(time.time())
+            continue
+        # El relleno cede el paso a los requests en vivo (ver scheduler.py).
+        with use_priority(BACKGROUND, flow="pool"):
+            added = refill_once(generate)
+        if added:
+            logger.info("IA-Engine: pool rellenado con %d sets", added)
+
+
+def start_pool_scheduler(
+    generate: Callable[[str, str], Optional[GeneratedVariant]],
+) -> bool:
+    """Arranca el scheduler de relleno (si IA_POOL=1). Devuelve True si quedó corriendo."""
+    global _thread
+    if not POOL_ENABLED:
+        return False
+    if _thread is not None and _thread.is_alive():
+        return True
+    if not POOL_CONFIG:
+        logger.warning("IA-Engine: IA_POOL=1 sin IA_POOL_CONFIG: no hay combinaciones con pool")
+        return False
+
+    _stop.clear()
+    _thread = threading.Thread(target=_loop, args=(generate,), name="ia-variant-pool", daemon=True)
+    _thread.start()
+    logger.info(
+        "IA-Engine: pool de variantes activo (%d combinaciones configuradas, workers=%d, ttl=%.0fs, horas=%s)",
+        len(POOL_CONFIG),
+        worker_count(),
+        DEFAULT_TTL,
+        _RAW_HOURS or "todas",
+    )
+    return True
+
+
+def stop_pool_scheduler() -> None:
+    """Detiene el scheduler (shutdown de la app)."""
+    global _thread
+    _stop.set()
+    if _thread is not None:
+        _thread.join(timeout=2)
+    _thread = None
+
+
+def pool_stats() -> Dict[str, Any]:
+    """Profundidad por combinación, hit rate y edad de los sets."""
+    now = time.time()
+    with _lock:
+        _evict_expired(now)
+        combos = {}
+        for (campaign, cluster), items in _pools.items():
+            if not items:
+                continue
+            ages = [now - created for created, _ in items]
+            combos[f"{campaign}::{cluster}"] = {
+                "depth": len(items),
+                "target": worker_depth(campaign, cluster),
+                "oldestAgeSec": round(max(ages), 1),
+                "meanAgeSec": round(sum(ages) / len(ages), 1),
+            }
+        stats = dict(_stats)
+
+    requests = stats["requests"] or 0
+    served = stats["setsServed"] or 0
+    return {
+        "enabled": POOL_ENABLED,
+        "refillWindow": in_refill_window(now),
+        "workers": worker_count(),
+        "totalDepth": sum(c["depth"] for c in combos.values()),
+        "hitRate": round(stats["hits"] / requests, 3) if requests else None,
+        "partialRate": round(stats["partial"] / requests, 3) if requests else None,
+        "meanServedAgeSec": round(stats["servedAgeTotal"] / served, 1) if served else None,
+        "requests": int(requests),
+        "setsServed": int(served),
+        "generated": int(stats["generated"]),
+        "expired": int(stats["expired"]),
+        "refillErrors": int(stats["refillErrors"]),
+        "combos": combos,
+    }
+
+
+__all__ = [
+    "PoolTarget",
+    "in_refill_window",
+    "pool_stats",
+    "put",
+    "refill_once",
+    "start_pool_scheduler",
+    "stop_pool_scheduler",
+    "take",
+    "target_for",
+    "worker_count",
+    "worker_depth",
+]
@@ -0,0 +1,112 @@
+# ia-engine/app/services/warmup.py
+"""Warm-up de arranque del IA Engine (cold start en Cloud Run).
+
+En un scale-up, el primer request pagaba: import del SDK, construcción
+del cliente, DNS + TLS contra OpenAI y el primer render de prompts.
+Este módulo hace ese trabajo en background al arrancar y expone el estado
+para el probe `/ready`, que solo pasa cuando el motor quedó caliente.
+
+Configuración:
+- IA_WARMUP=1|0            → habilita el warm-up (si es 0, /ready pasa de inmediato).
+- IA_WARMUP_CONNECT=1|0    → pre-conexión HTTP contra el endpoint del modelo.
+- IA_WARMUP_TIMEOUT=5      → timeout (s) de la pre-conexión.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from app.services.openai_client import warm_up_client
+from app.utils.catalog import get_catalog
+from app.utils.prompts import precompile_prompts
+
+logger = logging.getLogger(__name__)
+
+WARMUP_ENABLED = os.getenv("IA_WARMUP", "1").strip().lower() not in ("0", "false", "no")
+WARMUP_CONNECT = os.getenv("IA_WARMUP_CONNECT", "1").strip().lower() not in ("0", "false", "no")
+WARMUP_TIMEOUT = float(os.getenv("IA_WARMUP_TIMEOUT", "5"))
+
+_ready = threading.Event()
+_state: Dict[str, Any] = {"status": "pending", "steps": {}}
+_thread: Optional[threading.Thread] = None
+
+
+def _step(name: str, fn, *args, **kwargs) -> Any:
+    """Ejecuta un paso del warm-up midiendo su duración; nunca propaga errores."""
+    t0 = time.perf_counter()
+    result: Any = None
+    try:
+        result = fn(*args, **kwargs)
+        ok = True
+    except Exception as exc:  # noqa: BLE001
+        ok = False
+        result = type(exc).__name__
+        logger.warning("IA-Engine: warm-up '%s' falló: %s", name, exc)
+    _state["steps"][name] = {
+        "ok": ok,
+        "ms": round((time.perf_counter() - t0) * 1000, 1),
+        "result": result,
+    }
+    return result
+
+
+def warm_up() -> Dict[str, Any]:
+    """
+    Ejecuta el warm-up completo (síncrono) y marca el motor como listo.
+
+    Pasos: catálogo → prompts precompilados → cliente (+ pre-conexión).
+    Los fallos de un paso se registran pero no impiden quedar listo:
+    un proveedor caído no debe dejar a la instancia fuera de rotación.
+    """
+    t0 = time.perf_counter()
+    _state["status"] = "warming"
+
+    _step("catalog", lambda: get_catalog().version)
+    _step("prompts", precompile_prompts)
+    _step(
+        "client",
+        warm_up_client,
+        connect=WARMUP_CONNECT,
+        timeout=WARMUP_TIMEOUT,
+    )
+
+    _state["status"] = "ready"
+    _state["totalMs"] = round((time.perf_counter() - t0) * 1000, 1)
+    _ready.set()
+    logger.info("IA-Engine: warm-up completo en %.1f ms", _state["totalMs"])
+    return warmup_state()
+
+
+def start_warm_up() -> None:
+    """Lanza el warm-up en un thread de background (idempotente)."""
+    global _thread
+    if not WARMUP_ENABLED:
+        _state["status"] = "disabled"
+        _ready.set()
+        return
+    if _thread is not None or _ready.is_set():
+        return
+
+    _thread = threading.Thread(target=warm_up, name="ia-warmup", daemon=True)
+    _thread.start()
+
+
+def is_ready() -> bool:
+    """True cuando el warm-up terminó (o está deshabilitado)."""
+    return _ready.is_set()
+
+
+def warmup_state() -> Dict[str, Any]:
+    """Copia del estado del warm-up para /ready y diagnósticos."""
+    return {
+        "status": _state["status"],
+        "totalMs": _state.get("totalMs"),
+        "steps": dict(_state["steps"]),
+    }
+
+
+__all__ = ["is_ready", "start_warm_up", "warm_up", "warmup_state"]
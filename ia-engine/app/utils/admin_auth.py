@@ -0,0 +1,38 @@
+# ia-engine/app/utils/admin_auth.py
+"""Autorización mínima para endpoints/acciones administrativas del IA Engine.
+
+Se basa en un token compartido (IA_ADMIN_TOKEN) enviado en el header
+`X-Admin-Token`. Si IA_ADMIN_TOKEN no está configurado, todo lo administrativo
+queda deshabilitado.
+"""
+
+from __future__ import annotations
+
+import hmac
+import os
+from typing import Optional
+
+from fastapi import Header, HTTPException
+
+ADMIN_TOKEN = os.getenv("IA_ADMIN_TOKEN", "").strip()
+ADMIN_HEADER = "X-Admin-Token"
+
+
+def is_admin_token(value: Optional[str]) -> bool:
+    """True si el token entregado coincide con IA_ADMIN_TOKEN."""
+    if not ADMIN_TOKEN or not value:
+        return False
+    return hmac.compare_digest(value.strip(), ADMIN_TOKEN)
+
+
+def require_admin(
+    x_admin_token: Optional[str] = Header(default=None, alias=ADMIN_HEADER),
+) -> None:
+    """Dependency de FastAPI para rutas administrativas."""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin deshabilitado (IA_ADMIN_TOKEN vacío)")
+    if not is_admin_token(x_admin_token):
+        raise HTTPException(status_code=401, detail="Token admin inválido")
+
+
+__all__ = ["ADMIN_HEADER", "is_admin_token", "require_admin"]
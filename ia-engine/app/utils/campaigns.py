@@ -10,10 +10,14 @@ IMPORTANTE:
 - Las keys de CAMPAIGNS_TONE deben coincidir con:
     backend/src/utils/constants.ts::CAMPAIGNS
 - El frontend y el backend deben usar estos nombres canónicos.
+- Este es el catálogo *embebido*: en runtime se lee el snapshot vigente
+  de app.utils.catalog (que puede venir de IA_CATALOG_PATH).
 """
 
 from typing import Dict, List
 
+from app.utils.catalog import get_catalog
+
 # Nombre canónico de campañas + descripción de tono/posicionamiento
 CAMPAIGNS_TONE: Dict[str, str] = {
     "Crédito de consumo - Persona": (
@@ -90,7 +94,7 @@ def normalize_campaign(name: str) -> str:
     if not isinstance(name, str):
         return ""
     cleaned = name.strip()
-    return CAMPAIGN_ALIASES.get(cleaned, cleaned)
+    return get_catalog().campaign_aliases.get(cleaned, cleaned)
 
 
 def describe_campaign(campaign: str) -> str:
@@ -99,7 +103,7 @@ def describe_campaign(campaign: str) -> str:
     Si no se encuentra, se genera una descripción genérica.
     """
     normalized = normalize_campaign(campaign)
-    base = CAMPAIGNS_TONE.get(normalized)
+    base = get_catalog().campaigns.get(normalized)
     if base:
         return base
 
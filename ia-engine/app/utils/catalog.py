@@ -0,0 +1,559 @@
+# ia-engine/app/utils/catalog.py
+"""Catálogo externo recargable en caliente (campañas, clusters y copy).
+
+Responsabilidad:
+- Cargar el catálogo desde un archivo JSON/YAML o un directorio (IA_CATALOG_PATH).
+- Validarlo y compilarlo en un *snapshot* inmutable y versionado. La versión
+  se deriva del contenido (hash): todos los procesos e instancias que sirven
+  el mismo catálogo reportan la misma versión, y una versión desconocida
+  (de otra instancia o ya fuera del historial) recibe el catálogo completo.
+- Reemplazar el snapshot de forma atómica (watcher por polling o endpoint admin)
+  sin afectar requests en curso: cada request toma una referencia al snapshot
+  vigente y la usa hasta terminar.
+- Calcular el delta de `/ia/meta` desde una versión anterior.
+
+Si IA_CATALOG_PATH no está definido, el snapshot se arma desde los catálogos
+embebidos en código (campaigns.py, clusters.py, copy_meta.py).
+
+Formato esperado (todas las secciones son opcionales; las que falten se toman
+del catálogo embebido):
+
+    {
+      "campaigns": {campaña: descripción de tono},
+      "campaignAliases": {alias: campaña canónica},
+      "clusters": {cluster: descripción base},
+      "campaignClusters": {campaña: [clusters]},
+      "campaignClusterContext": {campaña: {cluster: override}},
+      "benefits": {campaña: [..]},
+      "ctas": {campaña: [..]},
+      "subjects": {campaña: [..]},
+      "clusterTone": {cluster: "..."}
+    }
+
+Con un directorio se mezclan todos los *.json / *.yaml / *.yml en orden
+alfabético (a nivel de sección; el último archivo gana).
+"""
+
+from __future__ import annotations
+
+import copy
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Deque, Dict, List, Mapping, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# =========================
+# Configuración
+# =========================
+
+CATALOG_PATH = os.getenv("IA_CATALOG_PATH", "").strip()
+WATCH_INTERVAL = float(os.getenv("IA_CATALOG_WATCH_INTERVAL", "5"))  # segundos; 0 = sin watcher
+HISTORY_SIZE = int(os.getenv("IA_CATALOG_HISTORY", "32"))
+
+# Largo (hex) de la versión derivada del hash de contenido
+VERSION_CHARS = 16
+
+# Secciones del catálogo y su tipo esperado
+SECTIONS: Tuple[str, ...] = (
+    "campaigns",
+    "campaignAliases",
+    "clusters",
+    "campaignClusters",
+    "campaignClusterContext",
+    "benefits",
+    "ctas",
+    "subjects",
+    "clusterTone",
+)
+
+# Claves que expone /ia/meta (se usan para calcular el delta por versión)
+META_KEYS: Tuple[str, ...] = (
+    "campaigns",
+    "clusters",
+    "campaignClusters",
+    "benefits",
+    "ctas",
+    "subjects",
+    "clusterTone",
+)
+
+_SUPPORTED_SUFFIXES = (".json", ".yaml", ".yml")
+
+
+class CatalogError(ValueError):
+    """Catálogo externo inválido (no se aplica; se mantiene el snapshot vigente)."""
+
+
+# ============================================================
+#  Snapshot inmutable
+# ============================================================
+
+def _freeze(value: Any) -> Any:
+    """Convierte dict/list anidados en estructuras de solo lectura."""
+    if isinstance(value, Mapping):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _thaw(value: Any) -> Any:
+    """Inverso de _freeze: estructuras JSON-serializables (dict/list)."""
+    if isinstance(value, Mapping):
+        return {k: _thaw(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(v) for v in value]
+    return value
+
+
+def _fingerprint(value: Any) -> str:
+    raw = json.dumps(_thaw(value), ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    """
+    Vista inmutable y versionada del catálogo.
+
+    Las secciones son MappingProxyType / tuplas: nadie puede mutarlas
+    después de publicado el snapshot.
+    """
+
+    version: str
+    source: str
+    loaded_at: float
+    campaigns: Mapping[str, str]
+    campaign_aliases: Mapping[str, str]
+    clusters: Mapping[str, str]
+    campaign_clusters: Mapping[str, Tuple[str, ...]]
+    campaign_cluster_context: Mapping[str, Mapping[str, str]]
+    benefits: Mapping[str, Tuple[str, ...]]
+    ctas: Mapping[str, Tuple[str, ...]]
+    subjects: Mapping[str, Tuple[str, ...]]
+    cluster_tone: Mapping[str, str]
+    content_hash: str = ""
+    meta_fingerprints: Mapping[str, str] = field(default_factory=dict)
+
+    def meta_section(self, key: str) -> Any:
+        """Sección de /ia/meta en formato JSON plano (dict/list)."""
+        if key == "campaigns":
+            return list(self.campaigns.keys())
+        if key == "clusters":
+            return list(self.clusters.keys())
+        attr = {
+            "campaignClusters": self.campaign_clusters,
+            "benefits": self.benefits,
+            "ctas": self.ctas,
+            "subjects": self.subjects,
+            "clusterTone": self.cluster_tone,
+        }[key]
+        return _thaw(attr)
+
+
+# ============================================================
+#  Carga de fuentes
+# ============================================================
+
+def _builtin_sections() -> Dict[str, Any]:
+    """Catálogo embebido en código (fallback por sección)."""
+    # Import diferido: campaigns/clusters dependen de este módulo.
+    from app.utils.campaigns import CAMPAIGNS_TONE, CAMPAIGN_ALIASES
+    from app.utils.clusters import (
+        CAMPAIGN_CLUSTER_CONTEXT,
+        CAMPAIGN_CLUSTERS,
+        CLUSTERS,
+    )
+    from app.utils.copy_meta import BENEFITS, CLUSTER_TONE, CTAS, SUBJECTS
+
+    return copy.deepcopy(
+        {
+            "campaigns": CAMPAIGNS_TONE,
+            "campaignAliases": CAMPAIGN_ALIASES,
+            "clusters": CLUSTERS,
+            "campaignClusters": CAMPAIGN_CLUSTERS,
+            "campaignClusterContext": CAMPAIGN_CLUSTER_CONTEXT,
+            "benefits": BENEFITS,
+            "ctas": CTAS,
+            "subjects": SUBJECTS,
+            "clusterTone": CLUSTER_TONE,
+        }
+    )
+
+
+def _read_file(path: Path) -> Dict[str, Any]:
+    text = path.read_text(encoding="utf-8")
+    if path.suffix.lower() == ".json":
+        data = json.loads(text)
+    else:
+        try:
+            import yaml  # type: ignore
+        except ImportError as exc:
+            raise CatalogError(
+                f"{path.name}: PyYAML no está instalado; usa JSON o instala pyyaml"
+            ) from exc
+        data = yaml.safe_load(text) or {}
+
+    if not isinstance(data, dict):
+        raise CatalogError(f"{path.name}: el documento raíz debe ser un objeto")
+    return data
+
+
+def _source_files(path: Path) -> List[Path]:
+    if path.is_dir():
+        return sorted(
+            p for p in path.iterdir()
+            if p.is_file() and p.suffix.lower() in _SUPPORTED_SUFFIXES
+        )
+    return [path]
+
+
+def _source_signature(path: Path) -> Tuple[Tuple[str, int, int], ...]:
+    """Firma barata (nombre, mtime, tamaño) para detectar cambios por polling."""
+    sig = []
+    try:
+        for p in _source_files(path):
+            st = p.stat()
+            sig.append((p.name, st.st_mtime_ns, st.st_size))
+    except OSError:
+        return ()
+    return tuple(sig)
+
+
+def load_catalog_source(path: str) -> Dict[str, Any]:
+    """
+    Lee un archivo o directorio de catálogo y devuelve las secciones crudas.
+
+    Raises:
+        CatalogError si la ruta no existe o algún archivo es ilegible.
+    """
+    p = Path(path)
+    if not p.exists():
+        raise CatalogError(f"IA_CATALOG_PATH no existe: {path}")
+
+    merged: Dict[str, Any] = {}
+    for f in _source_files(p):
+        try:
+            data = _read_file(f)
+        except CatalogError:
+            raise
+        except Exception as exc:  # noqa: BLE001
+            raise CatalogError(f"{f.name}: no se pudo leer ({exc})") from exc
+
+        unknown = set(data) - set(SECTIONS)
+        if unknown:
+            raise CatalogError(f"{f.name}: secciones desconocidas {sorted(unknown)}")
+        merged.update(data)
+
+    return merged
+
+
+# ============================================================
+#  Validación
+# ============================================================
+
+def _check_str_map(name: str, value: Any, errors: List[str]) -> None:
+    if not isinstance(value, dict):
+        errors.append(f"{name}: debe ser un objeto")
+        return
+    for k, v in value.items():
+        if not isinstance(v, str) or not v.strip():
+            errors.append(f"{name}[{k!r}]: debe ser un texto no vacío")
+
+
+def _check_list_map(name: str, value: Any, errors: List[str]) -> None:
+    if not isinstance(value, dict):
+        errors.append(f"{name}: debe ser un objeto")
+        return
+    for k, v in value.items():
+        if not isinstance(v, list) or not all(isinstance(i, str) for i in v):
+            errors.append(f"{name}[{k!r}]: debe ser una lista de textos")
+
+
+def validate_catalog(sections: Dict[str, Any]) -> None:
+    """
+    Valida tipos y referencias cruzadas del catálogo completo.
+
+    Raises:
+        CatalogError con el detalle de todos los problemas encontrados.
+    """
+    errors: List[str] = []
+
+    for name in ("campaigns", "campaignAliases", "clusters", "clusterTone"):
+        _check_str_map(name, sections.get(name), errors)
+    for name in ("campaignClusters", "benefits", "ctas", "subjects"):
+        _check_list_map(name, sections.get(name), errors)
+
+    context = sections.get("campaignClusterContext")
+    if not isinstance(context, dict):
+        errors.append("campaignClusterContext: debe ser un objeto")
+    else:
+        for k, v in context.items():
+            _check_str_map(f"campaignClusterContext[{k!r}]", v, errors)
+
+    if errors:
+        raise CatalogError("; ".join(errors))
+
+    campaigns = sections["campaigns"]
+    clusters = sections["clusters"]
+
+    if not campaigns:
+        errors.append("campaigns: el catálogo no puede quedar sin campañas")
+    if not clusters:
+        errors.append("clusters: el catálogo no puede quedar sin clusters")
+
+    for alias, target in sections["campaignAliases"].items():
+        if target not in campaigns:
+            errors.append(f"campaignAliases[{alias!r}] apunta a campaña desconocida {target!r}")
+
+    for campaign, items in sections["campaignClusters"].items():
+        if campaign not in campaigns:
+            errors.append(f"campaignClusters: campaña desconocida {campaign!r}")
+        for c in items:
+            if c not in clusters:
+                errors.append(f"campaignClusters[{campaign!r}]: cluster desconocido {c!r}")
+
+    for campaign, overrides in sections["campaignClusterContext"].items():
+        if campaign not in campaigns:
+            errors.append(f"campaignClusterContext: campaña desconocida {campaign!r}")
+        for c in overrides:
+            if c not in clusters:
+                errors.append(f"campaignClusterContext[{campaign!r}]: cluster desconocido {c!r}")
+
+    for name in ("benefits", "ctas", "subjects"):
+        for campaign in sections[name]:
+            if campaign not in campaigns:
+                errors.append(f"{name}: campaña desconocida {campaign!r}")
+
+    for c in sections["clusterTone"]:
+        if c not in clusters:
+            errors.append(f"clusterTone: cluster desconocido {c!r}")
+
+    if errors:
+        raise CatalogError("; ".join(errors))
+
+
+def compile_snapshot(
+    sections: Dict[str, Any],
+    *,
+    source: str,
+) -> CatalogSnapshot:
+    """Valida y congela las secciones en un CatalogSnapshot (versión = hash del contenido)."""
+    validate_catalog(sections)
+    sections = {name: sections[name] for name in SECTIONS}
+    content_hash = _fingerprint(sections)
+
+    snapshot = CatalogSnapshot(
+        version=content_hash[:VERSION_CHARS],
+        source=source,
+        loaded_at=time.time(),
+        campaigns=_freeze(sections["campaigns"]),
+        campaign_aliases=_freeze(sections["campaignAliases"]),
+        clusters=_freeze(sections["clusters"]),
+        campaign_clusters=_freeze(sections["campaignClusters"]),
+        campaign_cluster_context=_freeze(sections["campaignClusterContext"]),
+        benefits=_freeze(sections["benefits"]),
+        ctas=_freeze(sections["ctas"]),
+        subjects=_freeze(sections["subjects"]),
+        cluster_tone=_freeze(sections["clusterTone"]),
+    )
+    fingerprints = MappingProxyType(
+        {key: _fingerprint(snapshot.meta_section(key)) for key in META_KEYS}
+    )
+    object.__setattr__(snapshot, "content_hash", content_hash)
+    object.__setattr__(snapshot, "meta_fingerprints", fingerprints)
+    return snapshot
+
+
+# ============================================================
+#  Registro global (copy-on-write)
+# ============================================================
+
+_lock = threading.Lock()
+_current: Optional[CatalogSnapshot] = None
+_history: Deque[Tuple[str, Mapping[str, str]]] = deque(maxlen=max(HISTORY_SIZE, 1))
+_watcher: Optional[threading.Thread] = None
+_watcher_stop = threading.Event()
+_last_signature: Tuple[Tuple[str, int, int], ...] = ()
+
+
+def _build(path: str) -> CatalogSnapshot:
+    sections = _builtin_sections()
+    source = "builtin"
+    if path:
+        sections.update(load_catalog_source(path))
+        source = path
+    return compile_snapshot(sections, source=source)
+
+
+def _publish(snapshot: CatalogSnapshot) -> None:
+    global _current
+    # Volver a un contenido anterior reusa su versión: una sola entrada por versión.
+    for entry in [e for e in _history if e[0] == snapshot.version]:
+        _history.remove(entry)
+    _history.append((snapshot.version, snapshot.meta_fingerprints))
+    # Asignación de referencia = swap atómico; los lectores nunca ven un estado mixto.
+    _current = snapshot
+
+
+def get_catalog() -> CatalogSnapshot:
+    """
+    Devuelve el snapshot vigente.
+
+    Quien lo recibe puede usarlo durante todo el request aunque en paralelo
+    se publique una versión nueva.
+    """
+    snapshot = _current
+    if snapshot is not None:
+        return snapshot
+
+    with _lock:
+        if _current is None:
+            try:
+                _publish(_build(CATALOG_PATH))
+            except CatalogError as exc:
+                logger.error(
+                    "IA-Engine: catálogo externo inválido (%s); uso catálogo embebido", exc
+                )
+                _publish(_build(""))
+        return _current  # type: ignore[return-value]
+
+
+def reload_catalog(path: Optional[str] = None) -> CatalogSnapshot:
+    """
+    Recarga el catálogo y publica un snapshot nuevo si el contenido cambió.
+
+    Raises:
+        CatalogError si la fuente es inválida (el snapshot vigente se mantiene).
+    """
+    global _last_signature
+    src = CATALOG_PATH if path is None else path
+
+    with _lock:
+        current = _current
+        candidate = _build(src)
+
+        if current is not None and candidate.content_hash == current.content_hash:
+            logger.info("IA-Engine: catálogo sin cambios (version=%s)", current.version)
+            return current
+
+        if src:
+            _last_signature = _source_signature(Path(src))
+        _publish(candidate)
+
+    logger.info(
+        "IA-Engine: catálogo publicado (version=%s, source=%s)",
+        candidate.version,
+        candidate.source,
+    )
+    return candidate
+
+
+def meta_delta(
+    since: str,
+    snapshot: Optional[CatalogSnapshot] = None,
+) -> Tuple[bool, List[str]]:
+    """
+    Claves de /ia/meta que cambiaron desde la versión `since`.
+
+    Devuelve (full, keys):
+    - full=True si la versión no está en el historial de este proceso (salió
+      del historial, o la publicó otra instancia): el cliente debe recibir el
+      catálogo completo. Como la versión es un hash del contenido, `since`
+      igual a la vigente significa el mismo contenido en cualquier instancia.
+    """
+    snapshot = snapshot or get_catalog()
+    if since == snapshot.version:
+        return False, []
+
+    for version, fingerprints in list(_history):
+        if version == since:
+            changed = [
+                key for key in META_KEYS
+                if fingerprints.get(key) != snapshot.meta_fingerprints.get(key)
+            ]
+            return False, changed
+
+    return True, list(META_KEYS)
+
+
+# ============================================================
+#  Watcher por polling (sin dependencias extra)
+# ============================================================
+
+def _watch_loop(path: str, interval: float) -> None:
+    global _last_signature
+    p = Path(path)
+    while not _watcher_stop.wait(interval):
+        sig = _source_signature(p)
+        if not sig or sig == _last_signature:
+            continue
+        try:
+            reload_catalog(path)
+        except CatalogError as exc:
+            logger.error("IA-Engine: recarga de catálogo rechazada: %s", exc)
+        finally:
+            _last_signature = sig
+
+
+def start_catalog_watcher() -> bool:
+    """
+    Inicia el watcher si IA_CATALOG_PATH está configurado.
+
+    Devuelve True si quedó corriendo.
+    """
+    global _watcher, _last_signature
+    if not CATALOG_PATH or WATCH_INTERVAL <= 0:
+        return False
+    if _watcher is not None and _watcher.is_alive():
+        return True
+
+    get_catalog()
+    _last_signature = _source_signature(Path(CATALOG_PATH))
+    _watcher_stop.clear()
+    _watcher = threading.Thread(
+        target=_watch_loop,
+        args=(CATALOG_PATH, WATCH_INTERVAL),
+        name="ia-catalog-watcher",
+        daemon=True,
+    )
+    _watcher.start()
+    logger.info(
+        "IA-Engine: watcher de catálogo activo (path=%s, interval=%.1fs)",
+        CATALOG_PATH,
+        WATCH_INTERVAL,
+    )
+    return True
+
+
+def stop_catalog_watcher() -> None:
+    """Detiene el watcher (usado en el shutdown de la app)."""
+    global _watcher
+    _watcher_stop.set()
+    if _watcher is not None:
+        _watcher.join(timeout=2)
+    _watcher = None
+
+
+__all__ = [
+    "CatalogError",
+    "CatalogSnapshot",
+    "META_KEYS",
+    "compile_snapshot",
+    "get_catalog",
+    "load_catalog_source",
+    "meta_delta",
+    "reload_catalog",
+    "start_catalog_watcher",
+    "stop_catalog_watcher",
+    "validate_catalog",
+]
@@ -7,11 +7,14 @@ seleccionado en Email Studio.
 IMPORTANTE:
 - Las keys de CLUSTERS deben coincidir con backend/src/utils/constants.ts::CLUSTERS.
 - CAMPAIGN_CLUSTERS debe reflejar backend/src/utils/constants.ts::CAMPAIGN_CLUSTERS.
+- Este es el catálogo *embebido*: en runtime se lee el snapshot vigente
+  de app.utils.catalog (que puede venir de IA_CATALOG_PATH).
 """
 
 from typing import Dict, List, Optional
 
 from app.utils.campaigns import normalize_campaign
+from app.utils.catalog import get_catalog
 
 # Descripción base por cluster (independiente de campaña).
 # Importante: los nombres deben coincidir con backend/src/utils/constants.ts::CLUSTERS
@@ -309,7 +312,7 @@ def clusters_for_campaign(campaign: str) -> list[str]:
     (según la misma lógica que el backend Node).
     """
     normalized = normalize_campaign(campaign)
-    return CAMPAIGN_CLUSTERS.get(normalized, [])
+    return list(get_catalog().campaign_clusters.get(normalized, ()))
 
 
 def describe_cluster(cluster: str, campaign: Optional[str] = None) -> str:
@@ -317,14 +320,15 @@ def describe_cluster(cluster: str, campaign: Optional[str] = None) -> str:
     Devuelve una descripción amigable del cluster.
     Si se entrega campaña, intenta contextualizar el mensaje a ese producto.
     """
-    base = CLUSTERS.get(cluster)
+    catalog = get_catalog()
+    base = catalog.clusters.get(cluster)
     normalized_campaign: Optional[str] = (
         normalize_campaign(campaign) if campaign else None
     )
 
     # 1) Contexto específico campaña+cluster (si existe override)
     if normalized_campaign:
-        override = CAMPAIGN_CLUSTER_CONTEXT.get(
+        override = catalog.campaign_cluster_context.get(
             normalized_campaign, {}
         ).get(cluster)
         if override:
@@ -0,0 +1,167 @@
+# ia-engine/app/utils/json_salvage.py
+"""Rescate de JSON truncado o mal formado devuelto por el modelo.
+
+Cuando la respuesta se corta por max_tokens (body largo) o viene envuelta
+en ```json ... ``` / con texto extra, `json.loads` falla y se perdía el set
+completo (reintento o fallback). Aquí se recupera lo que sí llegó:
+
+- se quitan code fences y texto antes/después del objeto;
+- si el objeto quedó abierto, se cierra el string en curso, se descarta la
+  clave/valor incompleto del final (la clave sin valor queda en `dropped`)
+  y se cierran objetos/listas abiertos; `cut_field` es el campo de primer
+  nivel cuyo valor llegó incompleto;
+- si aun así no parsea, se corta en el último campo completo.
+
+Todo en una pasada lineal sobre el texto (sin regex por carácter).
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+_FENCE = re.compile(r"```(?:json|JSON)?\s*(.*?)(?:```|$)", re.DOTALL)
+_TRAILING_COMMA = re.compile(r",\s*$")
+_DANGLING_KEY = re.compile(r'(?:,|\{)\s*"((?:[^"\\]|\\.)*)"\s*:?\s*$')
+
+
+@dataclass
+class SalvageResult:
+    """Resultado del rescate: datos, si hubo que completar el JSON y qué campo quedó cortado."""
+
+    data: Dict[str, Any]
+    truncated: bool
+    cut_field: Optional[str] = None
+    dropped: List[str] = field(default_factory=list)
+
+
+def _strip_wrappers(text: str) -> str:
+    text = text.strip()
+    fenced = _FENCE.search(text)
+    if fenced and "{" in fenced.group(1):
+        text = fenced.group(1).strip()
+    start = text.find("{")
+    return text[start:] if start >= 0 else text
+
+
+def _scan(text: str) -> Tuple[List[str], bool, List[int], Optional[int], Optional[str]]:
+    """
+    Recorre el texto una vez.
+
+    Returns:
+        (pila de cierres pendientes, quedó dentro de un string,
+         posiciones de fin de cada campo completo de primer nivel,
+         posición donde empezó el último string abierto,
+         última clave de primer nivel)
+    """
+    stack: List[str] = []
+    in_string = False
+    escape = False
+    boundaries: List[int] = []
+    string_start: Optional[int] = None
+    last_string: Optional[str] = None
+    top_key: Optional[str] = None
+
+    for i, ch in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+                if len(stack) == 1:
+                    last_string = text[(string_start or 0) + 1 : i]
+            continue
+        if ch == '"':
+            in_string = True
+            string_start = i
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+        elif ch in "}]":
+            if stack:
+                stack.pop()
+            if not stack:
+                return stack, False, boundaries, string_start, top_key
+        elif ch == ":" and len(stack) == 1:
+            top_key = last_string
+        elif ch == "," and len(stack) == 1:
+            boundaries.append(i)
+    return stack, in_string, boundaries, string_start, top_key
+
+
+def _last_key(text: str) -> Optional[str]:
+    """Clave del último par 'clave: valor' que empieza en el texto."""
+    matches = list(re.finditer(r'"((?:[^"\\]|\\.)*)"\s*:', text))
+    return matches[-1].group(1) if matches else None
+
+
+def salvage_json(text: str) -> Optional[SalvageResult]:
+    """
+    Intenta recuperar un objeto JSON de `text`.
+
+    Devuelve None si no hay nada rescatable (sin '{' o sin ningún campo).
+    """
+    body = _strip_wrappers(text or "")
+    if not body.startswith("{"):
+        return None
+
+    # 1) Objeto completo con basura alrededor: raw_decode basta.
+    try:
+        data, _ = json.JSONDecoder().raw_decode(body)
+        if isinstance(data, dict):
+            return SalvageResult(data=data, truncated=False)
+    except json.JSONDecodeError:
+        pass
+
+    stack, in_string, boundaries, string_start, top_key = _scan(body)
+    if not stack:
+        return None  # cerrado pero inválido por otra razón: no se adivina
+
+    # 2) Completar: cerrar string, limpiar el final y cerrar estructuras.
+    # Corte dentro de un valor anidado: el campo cortado es su clave de primer nivel.
+    nested = len(stack) > 1
+    cut_field: Optional[str] = top_key if nested else None
+    dropped: List[str] = []
+    candidate = body
+    if in_string:
+        before = body[: string_start or 0]
+        if re.search(r":\s*$", before):
+            # Se cortó el VALOR: se conserva lo que llegó de ese campo.
+            if not nested:
+                cut_field = _last_key(before)
+            candidate = body.rstrip("\\") + '"'
+        else:
+            # Se cortó una CLAVE (o un string de una lista): se descarta.
+            candidate = before
+    candidate = candidate.rstrip()
+    dangling = _DANGLING_KEY.search(candidate) if stack[-1] == "}" else None
+    if dangling:
+        # Clave completa sin valor (corte justo después de '"body":'): se descarta y se informa.
+        if not nested:
+            dropped.append(dangling.group(1))
+        candidate = candidate[: dangling.start()] + ("{" if dangling.group(0).startswith("{") else "")
+    candidate = _TRAILING_COMMA.sub("", candidate.rstrip())
+    closed = candidate + "".join(reversed(stack))
+    try:
+        data = json.loads(closed)
+        if isinstance(data, dict) and data:
+            return SalvageResult(data=data, truncated=True, cut_field=cut_field, dropped=dropped)
+    except json.JSONDecodeError:
+        pass
+
+    # 3) Cortar en el último campo completo de primer nivel.
+    for pos in reversed(boundaries):
+        try:
+            data = json.loads(body[:pos] + "}")
+        except json.JSONDecodeError:
+            continue
+        if isinstance(data, dict) and data:
+            dropped = [k for k in (_last_key(body[pos:]),) if k]
+            return SalvageResult(data=data, truncated=True, dropped=dropped)
+    return None
+
+
+__all__ = ["SalvageResult", "salvage_json"]
@@ -0,0 +1,358 @@
+# ia-engine/app/utils/linter.py
+"""Linter local de compliance y largos para sets de contenido, con auto-reparación.
+
+Las reglas de `prompts.py` (LENGTHS_EMAIL, CTA 2–4 palabras sin '!',
+"sin HTML/links", bullets con '- ', palabras gatillantes de spam) son solo
+instrucciones al modelo. Aquí se verifican sobre cada `GeneratedVariant`
+en una sola pasada por campo, con expresiones precompiladas al importar,
+y se corrige localmente todo lo que se puede corregir sin volver a llamar
+al modelo:
+
+- largos excedidos → recorte en límite de palabra / oración;
+- HTML y URLs → se eliminan;
+- signos de exclamación → se quitan (campos cortos) o se colapsan (body);
+- bullets con '•', '*', '–', '1.' → se normalizan a '- ';
+- términos prohibidos → reemplazo conservador cuando existe;
+- CTA fuera de regla → CTA sugerida del catálogo para la campaña.
+
+Lo que no se puede reparar (p. ej. textos demasiado cortos) queda reportado
+como violación no corregida.
+"""
+
+from __future__ import annotations
+
+import html
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from app.models.response import BodyBlock, GeneratedVariant
+from app.utils.catalog import get_catalog
+
+# ============================================================
+#  Reglas (alineadas con prompts.LENGTHS_EMAIL)
+# ============================================================
+
+# (mínimo, máximo) en caracteres
+CHAR_LIMITS: Dict[str, Tuple[int, int]] = {
+    "subject": (38, 60),
+    "preheader": (60, 110),
+    "title": (22, 60),
+    "subtitle": (14, 120),
+}
+
+# (mínimo, máximo) en palabras
+BODY_WORDS: Tuple[int, int] = (160, 500)
+CTA_WORDS: Tuple[int, int] = (2, 4)
+BODY_MIN_BULLETS = 3
+
+# Término prohibido → reemplazo (None = sin reemplazo seguro, solo se reporta)
+BANNED_TERMS: Dict[str, Optional[str]] = {
+    "100% gratis": "sin costo",
+    "gratis": "sin costo",
+    "regalo": "beneficio",
+    "urgente": "pronto",
+    "gana dinero": None,
+    "aprobación garantizada": "evaluación",
+    "aprobado garantizado": "sujeto a evaluación",
+    "sin evaluación": None,
+}
+
+# ============================================================
+#  Expresiones precompiladas
+# ============================================================
+
+_HTML_TAG = re.compile(r"<\s*/?\s*[a-zA-Z][^>]*>")
+_HTML_ENTITY = re.compile(r"&(?:[a-zA-Z]+|#\d+|#x[0-9a-fA-F]+);")
+_URL = re.compile(r"(?:https?://|www\.)\S+", re.IGNORECASE)
+_EXCLAMATION = re.compile(r"[!¡]+")
+_MULTI_EXCLAMATION = re.compile(r"!{2,}")
+# Viñetas y numeración ("1. ", "2) "): el número lleva espacio después, para no
+# tomar montos y tasas al inicio de línea ("3.5% de tasa", "200.000 clientes").
+_BULLET = re.compile(r"^\s*(?:[•●▪◦*–—-]\s*|\d{1,2}[.)]\s+)(?=\S)", re.MULTILINE)
+_WELL_FORMED_BULLET = re.compile(r"^- \S", re.MULTILINE)
+_EMOJI = re.compile(
+    "[\U0001F300-\U0001FAFF\U00002600-\U000027BF\U0001F000-\U0001F2FF️]+"
+)
+_SPACES = re.compile(r"[ \t]{2,}")
+_BLANK_LINES = re.compile(r"\n{3,}")
+_BANNED = re.compile(
+    r"(?<!\w)(" + "|".join(re.escape(t) for t in sorted(BANNED_TERMS, key=len, reverse=True)) + r")(?!\w)",
+    re.IGNORECASE,
+)
+# Puntuación colgante al recortar en límite de palabra (compartida con template_engine)
+TRAILING_PUNCT = re.compile(r"[\s,;:\-–—]+$")
+_SENTENCE_END = re.compile(r"[.?]\s")
+
+
+@dataclass(frozen=True)
+class Violation:
+    """Violación detectada en un campo; `fixed` indica si se reparó localmente."""
+
+    field: str
+    rule: str
+    fixed: bool
+
+
+# ============================================================
+#  Reparaciones
+# ============================================================
+
+def _clean_markup(text: str) -> Tuple[str, bool, bool]:
+    """Quita HTML/entidades y URLs. Devuelve (texto, tenía_html, tenía_url)."""
+    had_html = bool(_HTML_TAG.search(text) or _HTML_ENTITY.search(text))
+    had_url = bool(_URL.search(text))
+    if had_html:
+        text = _HTML_TAG.sub(" ", text)
+        text = html.unescape(text)
+    if had_url:
+        text = _URL.sub("", text)
+    return text, had_html, had_url
+
+
+def _replace_banned(text: str) -> Tuple[str, List[str], bool]:
+    """Reemplaza términos prohibidos. Devuelve (texto, términos, todos_reparados)."""
+    found: List[str] = []
+    all_fixed = True
+
+    def _sub(m: "re.Match[str]") -> str:
+        nonlocal all_fixed
+        term = m.group(1).lower()
+        found.append(term)
+        repl = BANNED_TERMS.get(term)
+        if repl is None:
+            all_fixed = False
+            return m.group(0)
+        return repl
+
+    return _BANNED.sub(_sub, text), found, all_fixed
+
+
+def _tidy(text: str) -> str:
+    text = _SPACES.sub(" ", text)
+    text = _BLANK_LINES.sub("\n\n", text)
+    return "\n".join(line.strip() for line in text.split("\n")).strip()
+
+
+def _trim_chars(text: str, limit: int) -> str:
+    """Recorta a `limit` caracteres en límite de palabra, sin puntuación colgante."""
+    if len(text) <= limit:
+        return text
+    cut = text[: limit + 1]
+    space = cut.rfind(" ")
+    if space >= limit // 2:
+        cut = cut[:space]
+    else:
+        cut = cut[:limit]
+    return TRAILING_PUNCT.sub("", cut)
+
+
+def _trim_words(text: str, limit: int) -> str:
+    """Recorta el body a `limit` palabras, cerrando en la última oración/línea completa."""
+    words = 0
+    out: List[str] = []
+    for line in text.split("\n"):
+        n = len(line.split())
+        if words + n <= limit:
+            out.append(line)
+            words += n
+            continue
+        remaining = " ".join(line.split()[: limit - words])
+        ends = list(_SENTENCE_END.finditer(remaining + " "))
+        if ends:
+            out.append(remaining[: ends[-1].start() + 1])
+        else:
+            out.append(TRAILING_PUNCT.sub("", remaining))
+        break
+    return "\n".join(out).strip()
+
+
+def _catalog_cta(campaign: str) -> Optional[str]:
+    lo, hi = CTA_WORDS
+    for cta in get_catalog().ctas.get(campaign, ()):
+        if lo <= len(cta.split()) <= hi and "!" not in cta:
+            return cta
+    return None
+
+
+# ============================================================
+#  Lint por campo
+# ============================================================
+
+def _lint_short(field: str, text: str, out: List[Violation]) -> str:
+    """subject / preheader / title / subtitle."""
+    text, had_html, had_url = _clean_markup(text)
+    if had_html:
+        out.append(Violation(field, "html", True))
+    if had_url:
+        out.append(Violation(field, "url", True))
+
+    if _EMOJI.search(text):
+        text = _EMOJI.sub("", text)
+        out.append(Violation(field, "emoji", True))
+
+    if _EXCLAMATION.search(text):
+        text = _EXCLAMATION.sub("", text)
+        out.append(Violation(field, "exclamation", True))
+
+    text, banned, banned_fixed = _replace_banned(text)
+    if banned:
+        out.append(Violation(field, "banned_term", banned_fixed))
+
+    text = _tidy(text.replace("\n", " "))
+
+    lo, hi = CHAR_LIMITS[field]
+    if len(text) > hi:
+        text = _trim_chars(text, hi)
+        out.append(Violation(field, "too_long", True))
+    elif len(text) < lo:
+        out.append(Violation(field, "too_short", False))
+    return text
+
+
+def _lint_body(text: str, out: List[Violation]) -> str:
+    text, had_html, had_url = _clean_markup(text)
+    if had_html:
+        out.append(Violation("body", "html", True))
+    if had_url:
+        out.append(Violation("body", "url", True))
+
+    if _EMOJI.search(text):
+        text = _EMOJI.sub("", text)
+        out.append(Violation("body", "emoji", True))
+
+    if _MULTI_EXCLAMATION.search(text):
+        text = _MULTI_EXCLAMATION.sub("!", text)
+        out.append(Violation("body", "exclamation", True))
+
+    text, banned, banned_fixed = _replace_banned(text)
+    if banned:
+        out.append(Violation("body", "banned_term", banned_fixed))
+
+    bullets_before = len(_WELL_FORMED_BULLET.findall(text))
+    text = _BULLET.sub("- ", text)
+    text = _tidy(text)
+    bullets = len(_WELL_FORMED_BULLET.findall(text))
+    if bullets != bullets_before:
+        out.append(Violation("body", "bullet_format", True))
+    if bullets < BODY_MIN_BULLETS:
+        out.append(Violation("body", "bullet_count", False))
+
+    lo, hi = BODY_WORDS
+    words = len(text.split())
+    if words > hi:
+        text = _trim_words(text, hi)
+        out.append(Violation("body", "too_long", True))
+    elif words < lo:
+        out.append(Violation("body", "too_short", False))
+    return text
+
+
+def _lint_cta(cta: Optional[str], campaign: str, out: List[Violation]) -> Optional[str]:
+    text = cta or ""
+    text, had_html, had_url = _clean_markup(text)
+    if had_html or had_url:
+        out.append(Violation("cta", "html" if had_html else "url", True))
+    if _EXCLAMATION.search(text):
+        text = _EXCLAMATION.sub("", text)
+        out.append(Violation("cta", "exclamation", True))
+    text = _tidy(_EMOJI.sub("", text).replace("\n", " "))
+
+    lo, hi = CTA_WORDS
+    n = len(text.split())
+    if lo <= n <= hi:
+        return text
+
+    rule = "missing" if n == 0 else ("too_long" if n > hi else "too_short")
+    fallback = _catalog_cta(campaign)
+    if fallback:
+        out.append(Violation("cta", rule, True))
+        return fallback
+    if n > hi:
+        out.append(Violation("cta", rule, True))
+        return " ".join(text.split()[:hi])
+    out.append(Violation("cta", rule, False))
+    return text or cta
+
+
+# ============================================================
+#  API pública
+# ============================================================
+
+def lint_variant(
+    variant: GeneratedVariant,
+    *,
+    campaign: str,
+    repair: bool = True,
+) -> Tuple[GeneratedVariant, List[Violation]]:
+    """
+    Revisa un set completo en una sola pasada por campo.
+
+    Args:
+        variant: set generado.
+        campaign: campaña canónica (para la CTA de respaldo).
+        repair: si es False solo se reportan violaciones y el set no cambia.
+
+    Returns:
+        (set reparado o el original, violaciones encontradas).
+    """
+    out: List[Violation] = []
+
+    subject = _lint_short("subject", variant.subject, out)
+    preheader = _lint_short("preheader", variant.preheader, out)
+    title = _lint_short("title", variant.body.title, out)
+    subtitle = (
+        _lint_short("subtitle", variant.body.subtitle, out)
+        if variant.body.subtitle
+        else None
+    )
+    content = _lint_body(variant.body.content, out)
+    cta = _lint_cta(variant.cta, campaign, out)
+
+    if not repair:
+        return variant, [Violation(v.field, v.rule, False) for v in out]
+
+    fixed = GeneratedVariant(
+        id=variant.id,
+        subject=subject or variant.subject,
+        preheader=preheader or variant.preheader,
+        body=BodyBlock(
+            title=title or variant.body.title,
+            subtitle=subtitle or None,
+            content=content or variant.body.content,
+        ),
+        cta=cta,
+    )
+    return fixed, out
+
+
+def summarize_violations(per_set: Dict[int, List[Violation]]) -> Dict[str, object]:
+    """Resumen para metadata: conteos por regla y detalle por set."""
+    by_rule: Dict[str, int] = {}
+    fixed = unfixed = 0
+    detail: Dict[str, List[str]] = {}
+
+    for set_id, violations in sorted(per_set.items()):
+        if not violations:
+            continue
+        detail[str(set_id)] = [
+            f"{v.field}.{v.rule}" + ("" if v.fixed else "!") for v in violations
+        ]
+        for v in violations:
+            key = f"{v.field}.{v.rule}"
+            by_rule[key] = by_rule.get(key, 0) + 1
+            if v.fixed:
+                fixed += 1
+            else:
+                unfixed += 1
+
+    return {
+        "violations": fixed + unfixed,
+        "fixed": fixed,
+        "unfixed": unfixed,
+        "byRule": by_rule,
+        "perSet": detail,
+    }
+
+
+__all__ = ["Violation", "lint_variant", "summarize_violations"]
@@ -1,16 +1,15 @@
 # ia-engine/app/utils/meta.py
-from typing import Dict, Any, List
+from typing import Dict, Any, Optional
 
-from app.utils.campaigns import CAMPAIGNS_TONE
-from app.utils.clusters import CLUSTERS as CLUSTERS_DEF, CAMPAIGN_CLUSTERS
-from app.utils.copy_meta import BENEFITS, CTAS, SUBJECTS, CLUSTER_TONE
+from app.utils.catalog import META_KEYS, get_catalog, meta_delta
 
 
-def get_meta() -> Dict[str, Any]:
+def get_meta(since: Optional[str] = None) -> Dict[str, Any]:
     """
     Devuelve el catálogo de campañas, clusters y metadatos de copy
     que usarán backend y frontend.
 
+    - `version`: versión del snapshot de catálogo vigente (hash del contenido).
     - `campaigns`: nombres canónicos de campaña (keys de CAMPAIGNS_TONE).
     - `clusters`: nombres canónicos de cluster (keys de CLUSTERS).
     - `campaignClusters`: mapa campaña → [clusters válidos].
@@ -19,18 +18,28 @@ def get_meta() -> Dict[str, Any]:
     - `subjects`: asuntos de referencia por campaña (keys canónicas).
     - `clusterTone`: lineamientos de tono por cluster (keys = clusters canónicos).
 
+    Si se entrega `since` (versión que ya tiene el cliente), solo se incluyen
+    las claves que cambiaron desde esa versión, con `delta=True`. Si la versión
+    no está en el historial de este proceso (vieja o de otra instancia), se
+    devuelve el catálogo completo (`delta=False`).
+
     La compatibilidad con nombres antiguos se maneja con aliases en:
     - app.utils.campaigns.CAMPAIGN_ALIASES
     """
-    campaigns: List[str] = list(CAMPAIGNS_TONE.keys())
-    clusters: List[str] = list(CLUSTERS_DEF.keys())
-
-    return {
-        "campaigns": campaigns,
-        "clusters": clusters,
-        "campaignClusters": CAMPAIGN_CLUSTERS,
-        "benefits": BENEFITS,
-        "ctas": CTAS,
-        "subjects": SUBJECTS,
-        "clusterTone": CLUSTER_TONE,
-    }
+    snapshot = get_catalog()
+
+    keys = list(META_KEYS)
+    delta = False
+    if since is not None:
+        full, changed = meta_delta(since, snapshot)
+        if not full:
+            keys = changed
+            delta = True
+
+    meta: Dict[str, Any] = {"version": snapshot.version}
+    if delta:
+        meta["delta"] = True
+        meta["since"] = since
+    for key in keys:
+        meta[key] = snapshot.meta_section(key)
+    return meta
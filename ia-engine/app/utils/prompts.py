@@ -8,11 +8,23 @@ con formato JSON.
 from __future__ import annotations
 
 import json
-from typing import Optional, Tuple
+import os
+from functools import lru_cache
+from typing import Dict, Mapping, Optional, Sequence, Tuple
 
 from app.models.request import EmailFeedback
 from app.utils.campaigns import describe_campaign
+from app.utils.catalog import get_catalog
 from app.utils.clusters import describe_cluster
+from app.utils.tokens import clip_to_tokens
+
+# Modo de prompt: "full" (histórico, JSON indentado + ejemplo en el user) o
+# "compact" (contexto minificado, sin instrucciones repetidas, ejemplo y
+# cláusula JSON en el system estático, cacheable por el proveedor).
+PROMPT_MODE = os.getenv("IA_PROMPT_MODE", "full").strip().lower()
+
+# Presupuesto de tokens para descripciones de campaña/cluster (0 = sin recorte)
+DESC_TOKEN_BUDGET = int(os.getenv("IA_PROMPT_DESC_TOKENS", "0"))
 
 # Macros similares a backend/src/services/promptKit.ts
 ES_CL = (
@@ -84,6 +96,15 @@ NEUTRALITY = (
 
 JSON_FIELDS = ["subject", "preheader", "title", "subtitle", "body", "cta"]
 
+STYLE_EXAMPLE = {
+    "subject": "Tu próximo paso financiero, en minutos",
+    "preheader": "Conoce beneficios exclusivos y comisiones preferentes",
+    "title": "Beneficios que se notan desde el primer mes",
+    "subtitle": "Acumula puntos, accede a descuentos y administra todo 100% online",
+    "body": "(texto plano con párrafos y bullets '- ')",
+    "cta": "Conoce más",
+}
+
 
 def _json_only_clause() -> str:
     return (
@@ -93,35 +114,99 @@ def _json_only_clause() -> str:
     )
 
 
+@lru_cache(maxsize=1)
+def _system_prompt() -> str:
+    """System prompt estático (no depende de campaña/cluster): se arma una vez."""
+    return (
+        "Eres copywriter especializado en email marketing bancario y compliance "
+        "para Banco BICE en Chile. "
+        f"{ES_CL} {SAFETY} {DELIVERABILITY} {LENGTHS_EMAIL} "
+        f"{EMAIL_STRUCTURE} {ROLES_EMAIL} {CONTRASTIVE_DEDUP} "
+        f"{TONE_CONSTRAINTS} {CREDIT_NAMING} {NEUTRALITY}"
+    )
+
+
+@lru_cache(maxsize=2)
+def _compact_system_prompt(json_clause: bool = True) -> str:
+    """
+    System del modo compacto: todo lo estático va acá (reglas, gancho en los
+    primeros 50 caracteres, ejemplo de estilo y cláusula JSON) para que el
+    prefijo sea idéntico entre requests y lo cachee el proveedor.
+
+    `json_clause=False` omite la cláusula de un solo set: la usa la llamada
+    multi-candidato, que pide otro formato de respuesta en el user.
+    """
+    system = (
+        f"{_system_prompt()} "
+        "El subject lleva el gancho principal dentro de sus primeros 50 caracteres. "
+        "Ejemplo de estilo (NO lo copies): "
+        f"{json.dumps(STYLE_EXAMPLE, ensure_ascii=False, separators=(',', ':'))}"
+    )
+    return f"{system} {_json_only_clause()}" if json_clause else system
+
+
+def _context_payload(
+    campaign: str, cluster: str, feedback: Optional[EmailFeedback] = None
+) -> Dict[str, object]:
+    """
+    Contexto de campaña/cluster para el user prompt: descripciones recortadas
+    a DESC_TOKEN_BUDGET y, si hay pistas del usuario, `user_feedback` solo con
+    las que vienen informadas.
+    """
+    campaign_desc = describe_campaign(campaign)
+    cluster_desc = describe_cluster(cluster, campaign)
+    if DESC_TOKEN_BUDGET > 0:
+        campaign_desc = clip_to_tokens(campaign_desc, DESC_TOKEN_BUDGET)
+        cluster_desc = clip_to_tokens(cluster_desc, DESC_TOKEN_BUDGET)
+    payload: Dict[str, object] = {
+        "campaign": campaign,
+        "campaign_description": campaign_desc,
+        "cluster": cluster,
+        "cluster_description": cluster_desc,
+    }
+    if feedback and (feedback.subject or feedback.preheader or feedback.bodyContent or feedback.body):
+        payload["user_feedback"] = {
+            k: v
+            for k, v in (
+                ("subject_hint", feedback.subject),
+                ("preheader_hint", feedback.preheader),
+                ("body_hint", feedback.bodyContent or feedback.body),
+            )
+            if v
+        }
+    return payload
+
+
 def build_email_prompt(
     campaign: str,
     cluster: str,
     feedback: Optional[EmailFeedback],
     variant_index: int,
+    avoid: Optional[Sequence[str]] = None,
+    compact: Optional[bool] = None,
 ) -> Tuple[str, str]:
     """
     Construye system + user prompt para generar UN set de contenido de email.
 
+    `avoid` (opcional) lista textos ya usados por otros sets: se agregan como
+    restricción explícita cuando se regenera un set near-duplicate.
+
+    `compact` (default según IA_PROMPT_MODE) arma el modo compacto: mismo
+    contenido informativo con el contexto minificado y lo estático en el system.
+
     La salida esperada del modelo es un JSON con:
     {subject, preheader, title, subtitle, body, cta}
     """
 
-    campaign_desc = describe_campaign(campaign)
-    cluster_desc = describe_cluster(cluster, campaign)
+    if compact is None:
+        compact = PROMPT_MODE == "compact"
+    if compact:
+        return _build_compact_prompt(campaign, cluster, feedback, variant_index, avoid)
 
-    system = (
-        "Eres copywriter especializado en email marketing bancario y compliance "
-        "para Banco BICE en Chile. "
-        f"{ES_CL} {SAFETY} {DELIVERABILITY} {LENGTHS_EMAIL} "
-        f"{EMAIL_STRUCTURE} {ROLES_EMAIL} {CONTRASTIVE_DEDUP} "
-        f"{TONE_CONSTRAINTS} {CREDIT_NAMING} {NEUTRALITY}"
-    )
+    system = _system_prompt()
 
-    payload = {
-        "campaign": campaign,
-        "campaign_description": campaign_desc,
-        "cluster": cluster,
-        "cluster_description": cluster_desc,
+    payload = _context_payload(campaign, cluster)
+    payload.update({
         "variant_index": variant_index,
         "rules": {
             "subject_preheader": (
@@ -142,7 +227,7 @@ def build_email_prompt(
                 "No incluyas disclaimers legales; se agregan aparte en otra capa."
             ),
         },
-    }
+    })
 
     if feedback and (feedback.subject or feedback.preheader or feedback.bodyContent or feedback.body):
         payload["user_feedback"] = {
@@ -155,21 +240,22 @@ def build_email_prompt(
             ),
         }
 
-    example = {
-        "subject": "Tu próximo paso financiero, en minutos",
-        "preheader": "Conoce beneficios exclusivos y comisiones preferentes",
-        "title": "Beneficios que se notan desde el primer mes",
-        "subtitle": "Acumula puntos, accede a descuentos y administra todo 100% online",
-        "body": "(texto plano con párrafos y bullets '- ')",
-        "cta": "Conoce más",
-    }
+    if avoid:
+        payload["avoid_similar_to"] = {
+            "texts": list(avoid),
+            "instruction": (
+                "Estos textos ya se usaron en otros sets. Tu subject, preheader, title y subtitle "
+                "deben ser claramente distintos: otro gancho, otro beneficio principal y otras "
+                "palabras de inicio. No reutilices frases de esta lista."
+            ),
+        }
 
     user_lines = [
         "Escribe UNA variante de email con los campos solicitados (subject, preheader, title, subtitle, body, cta).",
         "Contexto de campaña y cluster (JSON):",
         json.dumps(payload, ensure_ascii=False, indent=2),
         "Ejemplo de estilo (NO lo copies ni lo devuelvas literalmente):",
-        json.dumps(example, ensure_ascii=False, indent=2),
+        json.dumps(STYLE_EXAMPLE, ensure_ascii=False, indent=2),
         (
             "Asegúrate de que title/subtitle NO repitan ni parafraseen subject/preheader. "
             "Si detectas similitud, reescribe title/subtitle con sinónimos o un ángulo nuevo antes de responder."
@@ -183,3 +269,243 @@ def build_email_prompt(
 
     user = "\n- ".join(user_lines)
     return system, user
+
+
+def _build_compact_prompt(
+    campaign: str,
+    cluster: str,
+    feedback: Optional[EmailFeedback],
+    variant_index: int,
+    avoid: Optional[Sequence[str]],
+) -> Tuple[str, str]:
+    """
+    User prompt compacto: solo el contexto variable, en JSON minificado.
+
+    Las reglas de `payload["rules"]` y los recordatorios finales del modo
+    full ya están en el system (LENGTHS_EMAIL, ROLES_EMAIL, EMAIL_STRUCTURE,
+    CONTRASTIVE_DEDUP), así que no se repiten.
+    """
+    payload = _context_payload(campaign, cluster, feedback)
+    payload["variant_index"] = variant_index
+    if avoid:
+        payload["avoid_similar_to"] = list(avoid)
+
+    lines = ["Escribe UNA variante de email para este contexto:"]
+    if "user_feedback" in payload:
+        lines.append("Refina siguiendo user_feedback sin romper las reglas.")
+    if avoid:
+        lines.append(
+            "subject, preheader, title y subtitle deben ser claramente distintos de avoid_similar_to "
+            "(otro gancho, otro beneficio principal, otras palabras de inicio)."
+        )
+    lines.append(json.dumps(payload, ensure_ascii=False, separators=(",", ":")))
+    return _compact_system_prompt(), "\n".join(lines)
+
+
+def build_candidates_prompt(
+    campaign: str,
+    cluster: str,
+    feedback: Optional[EmailFeedback],
+    count: int,
+    avoid: Optional[Sequence[str]] = None,
+) -> Tuple[str, str]:
+    """
+    Prompt de la llamada multi-candidato (sobre-generación): `count` sets
+    distintos entre sí en una sola respuesta {"candidates": [...]}. El
+    contexto es el del modo compacto; el ranking local elige después.
+    """
+    payload = _context_payload(campaign, cluster, feedback)
+    if avoid:
+        payload["avoid_similar_to"] = list(avoid)
+
+    lines = [
+        f"Escribe {count} variantes de email distintas entre sí para este contexto: "
+        "cada una con otro gancho, otro beneficio principal y otras palabras de inicio.",
+    ]
+    if "user_feedback" in payload:
+        lines.append("Todas siguen user_feedback sin romper las reglas.")
+    if avoid:
+        lines.append("Ninguna repite los textos de avoid_similar_to.")
+    lines.append(json.dumps(payload, ensure_ascii=False, separators=(",", ":")))
+    lines.append(
+        'Responde SOLO con un objeto JSON válido {"candidates": [...]} con '
+        f"{count} elementos; cada elemento tiene exactamente estas claves: {', '.join(JSON_FIELDS)}. "
+        "Sin backticks ni texto fuera del JSON."
+    )
+    return _compact_system_prompt(json_clause=False), "\n".join(lines)
+
+
+def build_session_prefix(campaign: str, cluster: str) -> Tuple[str, str]:
+    """
+    System + comienzo del user de una sesión de refinamiento (/ia/sessions).
+
+    Se arma una vez al abrir la sesión y es idéntico en todos los turnos: el
+    contexto de campaña/cluster va primero y cada turno solo agrega su delta
+    al final, así el proveedor puede cachear el prefijo.
+    """
+    context = _context_payload(campaign, cluster)
+    head = "Sesión de refinamiento de un email. Contexto fijo:\n" + json.dumps(
+        context, ensure_ascii=False, separators=(",", ":")
+    )
+    return _compact_system_prompt(), head
+
+
+def build_refine_prompt(
+    prefix: Tuple[str, str],
+    variant_index: int,
+    *,
+    feedback: Mapping[str, str],
+    history: Sequence[Mapping[str, str]] = (),
+    base: Optional[Mapping[str, Optional[str]]] = None,
+    avoid: Optional[Sequence[str]] = None,
+) -> Tuple[str, str]:
+    """
+    Prompt de un set en un turno de sesión: el prefijo fijo + el delta.
+
+    `feedback` son los hints acumulados (subject_hint, preheader_hint,
+    body_hint, instruction), `history` los de turnos anteriores, `base` el set
+    que el usuario eligió refinar y `avoid` textos ya propuestos en la sesión.
+    """
+    system, head = prefix
+    turn: Dict[str, object] = {"variant_index": variant_index}
+    if feedback:
+        turn["user_feedback"] = dict(feedback)
+    if history:
+        turn["previous_feedback"] = [dict(h) for h in history]
+    if base:
+        fields = {k: v for k, v in base.items() if v}
+        if "body" in fields:
+            fields["body"] = _truncate_body(fields["body"])
+        turn["base_variant"] = fields
+    if avoid:
+        turn["avoid_similar_to"] = list(avoid)
+
+    lines = [head, "Escribe UNA variante de email para este turno:"]
+    if base:
+        lines.append("Parte de base_variant y aplícale user_feedback sin romper las reglas.")
+    elif feedback:
+        lines.append("Refina siguiendo user_feedback sin romper las reglas.")
+    if history:
+        lines.append("previous_feedback son pedidos anteriores de la sesión: no los deshagas.")
+    if avoid:
+        lines.append(
+            "subject, preheader y title deben ser distintos de avoid_similar_to "
+            "(ya se propusieron en la sesión)."
+        )
+    lines.append(json.dumps(turn, ensure_ascii=False, separators=(",", ":")))
+    return system, "\n".join(lines)
+
+
+# Reglas por campo para la regeneración parcial (subconjunto de LENGTHS_EMAIL/ROLES_EMAIL)
+FIELD_RULES: Dict[str, str] = {
+    "subject": "subject: 38–60 caracteres; gancho claro para el inbox, idea principal en los primeros 50.",
+    "preheader": "preheader: 60–110 caracteres; complementa al subject sin repetirlo.",
+    "title": "title: 22–60 caracteres; H1 con un ángulo nuevo respecto del subject.",
+    "subtitle": "subtitle: 14–120 caracteres; agrega un beneficio, no repite el preheader.",
+    "body": (
+        "body: 160–500 palabras en TEXTO PLANO; apertura breve, 3 bullets con '- ' "
+        "(4–10 palabras cada uno) y cierre con próxima acción; sin disclaimers."
+    ),
+    "cta": "cta: 2–4 palabras, imperativo suave, sin signos de exclamación.",
+}
+
+# Presupuesto de tokens de salida por campo (la regeneración parcial es chica)
+FIELD_TOKENS: Dict[str, int] = {
+    "subject": 50,
+    "preheader": 80,
+    "title": 50,
+    "subtitle": 80,
+    "body": 750,
+    "cta": 20,
+}
+
+# Largo máximo del body cuando va fijo como contexto
+FIXED_BODY_CHARS = 600
+
+
+def _truncate_body(body: str) -> str:
+    """
+    Body usado como contexto: basta el comienzo (FIXED_BODY_CHARS, cortado
+    en una palabra) y ahorra tokens de entrada.
+    """
+    if len(body) <= FIXED_BODY_CHARS:
+        return body
+    return body[:FIXED_BODY_CHARS].rsplit(" ", 1)[0] + " (...)"
+
+
+def field_token_budget(fields: Sequence[str]) -> int:
+    """max_tokens para regenerar `fields` (claves JSON + margen)."""
+    return sum(FIELD_TOKENS.get(f, 80) for f in dict.fromkeys(fields)) + 20
+
+
+def build_field_prompt(
+    campaign: str,
+    cluster: str,
+    current: Mapping[str, Optional[str]],
+    fields: Sequence[str],
+    instruction: Optional[str] = None,
+) -> Tuple[str, str]:
+    """
+    Prompt mínimo para regenerar solo `fields` de un set existente.
+
+    El resto de los campos va fijo como contexto (para mantener coherencia y
+    no repetirlos); el system prompt lleva solo las reglas de esos campos.
+    La salida esperada es un JSON con exactamente las claves de `fields`.
+    """
+    fields = list(dict.fromkeys(fields))
+
+    system_parts = [
+        "Eres copywriter de email marketing bancario para Banco BICE en Chile.",
+        ES_CL,
+        SAFETY,
+        DELIVERABILITY,
+        NEUTRALITY,
+        "Reglas de los campos a escribir: " + " ".join(FIELD_RULES[f] for f in fields if f in FIELD_RULES),
+    ]
+    if "crédito" in campaign.lower():
+        system_parts.append(CREDIT_NAMING)
+    system = " ".join(system_parts)
+
+    fixed = {k: v for k, v in current.items() if k not in fields and v}
+    if "body" in fixed:
+        fixed["body"] = _truncate_body(fixed["body"])
+
+    payload = {
+        "campaign": campaign,
+        "campaign_description": describe_campaign(campaign),
+        "cluster": cluster,
+        "fixed": fixed,
+        "replace": {k: current.get(k) for k in fields if current.get(k)},
+    }
+    if instruction:
+        payload["instruction"] = instruction.strip()
+
+    user = (
+        f"Reescribe SOLO estos campos del email: {', '.join(fields)}. "
+        "Los campos en 'fixed' no cambian: mantén coherencia con ellos y no los repitas. "
+        "Los textos en 'replace' son la versión actual: escribe una alternativa claramente distinta"
+        + (" siguiendo 'instruction'" if instruction else "")
+        + ".\n"
+        + json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+        + "\nResponde SOLO con un objeto JSON válido con exactamente estas claves: "
+        + ", ".join(fields)
+        + ". Sin backticks ni texto fuera del JSON."
+    )
+    return system, user
+
+
+def precompile_prompts() -> int:
+    """
+    Renderiza una vez el prompt de cada combinación campaña×cluster del catálogo.
+
+    Se usa en el warm-up de arranque: deja calientes el system prompt,
+    las descripciones del catálogo y el encoder JSON. Devuelve cuántos
+    prompts se renderizaron.
+    """
+    catalog = get_catalog()
+    count = 0
+    for campaign, clusters in catalog.campaign_clusters.items():
+        for cluster in clusters:
+            build_email_prompt(campaign, cluster, None, 1)
+            count += 1
+    return count
@@ -0,0 +1,213 @@
+# ia-engine/app/utils/ranking.py
+"""Ranking local de candidatos para la sobre-generación (sin juez LLM).
+
+Con IA_OVERSAMPLE_FACTOR > 1 el motor pide al modelo más candidatos que sets
+(en una sola llamada multi-candidato) y aquí se eligen los mejores. Cada
+componente vale 0..1 y se calcula vectorizado con NumPy sobre todos los
+candidatos a la vez:
+
+- length: ajuste de subject y preheader a los largos del inbox preview
+  (linter.CHAR_LIMITS); fuera del rango cae linealmente;
+- hook: gancho en los primeros 50 caracteres del subject (cifra o [MONTO],
+  trato de tú, beneficio concreto, pregunta);
+- repetition: 1 − la mayor similitud MinHash dentro del set
+  (subject↔title, preheader↔subtitle, subject↔preheader);
+- spam: términos prohibidos del linter, '!', tramos de 2+ palabras en
+  mayúsculas (sin contar marcas y siglas como BICE, CAE o UF) y emojis en
+  subject/preheader/title;
+- diversity: 1 − la mayor similitud con los ya elegidos (selección greedy
+  tipo MMR: cada ronda reevalúa a todos los candidatos restantes).
+
+El puntaje es el promedio ponderado con IA_RANK_WEIGHTS.
+
+Configuración:
+- IA_RANK_WEIGHTS='{"length": 1, "hook": 1, "repetition": 1, "spam": 1.5, "diversity": 1}'
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+from app.models.response import GeneratedVariant
+from app.utils.linter import BANNED_TERMS, CHAR_LIMITS
+from app.utils.similarity import WITHIN_SET_PAIRS, normalize_text, pairwise_similarity, signatures, similarity_matrix
+
+logger = logging.getLogger(__name__)
+
+COMPONENTS = ("length", "hook", "repetition", "spam", "diversity")
+_DEFAULT_WEIGHTS = {"length": 1.0, "hook": 1.0, "repetition": 1.0, "spam": 1.5, "diversity": 1.0}
+
+HOOK_CHARS = 50
+
+# Señal de gancho → peso (sobre el subject normalizado: sin tildes ni mayúsculas)
+_HOOKS = (
+    (re.compile(r"\d|(?<!\w)monto(?!\w)"), 0.35),
+    (re.compile(r"(?<!\w)(?:tu|tus|te|ti)(?!\w)"), 0.25),
+    (
+        re.compile(
+            r"(?<!\w)(?:tasa|cuotas?|beneficios?|exclusiv\w*|preaprobad\w*|ahorr\w*|descuentos?"
+            r"|sin costo|puntos|simula\w*|rapid\w*|online|meses)(?!\w)"
+        ),
+        0.3,
+    ),
+)
+_QUESTION = re.compile(r"\?")
+_QUESTION_WEIGHT = 0.1
+
+_SPAM_TERMS = re.compile(
+    r"(?<!\w)(?:" + "|".join(re.escape(t) for t in sorted(BANNED_TERMS, key=len, reverse=True)) + r")(?!\w)",
+    re.IGNORECASE,
+)
+_EXCLAMATION = re.compile(r"[!¡]")
+# Tramos de palabras en mayúsculas; cuenta como grito si quedan 2+ fuera de ACRONYMS
+_CAPS_RUN = re.compile(r"\b[A-ZÁÉÍÓÚÑ]{2,}(?:[ \t]+[A-ZÁÉÍÓÚÑ]{2,})*\b")
+# Marcas y siglas que se escriben en mayúsculas (no son gritos)
+ACRONYMS = frozenset(
+    {
+        "BICE", "CAE", "UF", "UTM", "DAP", "APV", "RUT", "PYME", "PYMES", "SII",
+        "IVA", "CLP", "USD", "CMF", "SOAP", "ATM", "PIN", "APP", "SMS",
+    }
+)
+_EMOJI = re.compile("[\U0001F300-\U0001FAFF\U00002600-\U000027BF\U0001F000-\U0001F2FF]")
+# Cada hallazgo de spam resta esto al componente
+SPAM_PENALTY = 0.5
+
+
+def _load_weights() -> Dict[str, float]:
+    raw = os.getenv("IA_RANK_WEIGHTS", "").strip()
+    if not raw:
+        return dict(_DEFAULT_WEIGHTS)
+    try:
+        data = json.loads(raw)
+        return {**_DEFAULT_WEIGHTS, **{k: max(float(v), 0.0) for k, v in data.items() if k in COMPONENTS}}
+    except (ValueError, TypeError, AttributeError) as exc:
+        logger.warning("IA-Engine: IA_RANK_WEIGHTS inválido (%s); uso defaults", exc)
+        return dict(_DEFAULT_WEIGHTS)
+
+
+WEIGHTS = _load_weights()
+
+
+@dataclass(frozen=True)
+class RankedCandidate:
+    """Candidato elegido: posición en la lista original, puntaje y componentes."""
+
+    index: int
+    score: float
+    components: Dict[str, float]
+
+
+def _shouting(text: str) -> int:
+    """Tramos de 2+ palabras en mayúsculas sin contar ACRONYMS ("BICE TE REGALA" cuenta, "BICE" o "CAE UF" no)."""
+    return sum(
+        1
+        for run in _CAPS_RUN.findall(text)
+        if sum(1 for word in run.split() if word not in ACRONYMS) >= 2
+    )
+
+
+def _length_fit(lengths: np.ndarray, lo: int, hi: int) -> np.ndarray:
+    """1 dentro de [lo, hi]; fuera cae linealmente (0 a un rango de distancia)."""
+    span = float(hi - lo)
+    distance = np.maximum(lo - lengths, 0) + np.maximum(lengths - hi, 0)
+    return np.clip(1.0 - distance / span, 0.0, 1.0)
+
+
+def _fields(candidates: Sequence[GeneratedVariant]) -> Dict[str, List[str]]:
+    return {
+        "subject": [c.subject for c in candidates],
+        "preheader": [c.preheader for c in candidates],
+        "title": [c.body.title for c in candidates],
+        "subtitle": [c.body.subtitle or "" for c in candidates],
+    }
+
+
+def score_components(candidates: Sequence[GeneratedVariant]) -> Dict[str, np.ndarray]:
+    """Componentes de calidad (sin diversity) de cada candidato: {nombre: (n,)}."""
+    fields = _fields(candidates)
+
+    fits = [
+        _length_fit(np.array([len(t) for t in fields[name]], dtype=float), *CHAR_LIMITS[name])
+        for name in ("subject", "preheader")
+    ]
+    length = np.mean(fits, axis=0)
+
+    heads = [normalize_text(s[:HOOK_CHARS]) for s in fields["subject"]]
+    hook_matrix = np.array(
+        [[bool(pattern.search(h)) for pattern, _ in _HOOKS] for h in heads], dtype=float
+    ).reshape(len(heads), len(_HOOKS))
+    questions = np.array([bool(_QUESTION.search(s[:HOOK_CHARS])) for s in fields["subject"]], dtype=float)
+    hook = np.clip(hook_matrix @ np.array([w for _, w in _HOOKS]) + questions * _QUESTION_WEIGHT, 0.0, 1.0)
+
+    sigs = {name: signatures(texts) for name, texts in fields.items()}
+    within = np.stack([pairwise_similarity(sigs[a], sigs[b]) for a, b in WITHIN_SET_PAIRS])
+    repetition = 1.0 - within.max(axis=0)
+
+    # Un campo por línea: un tramo en mayúsculas no sigue de un campo al otro
+    visible = ["\n".join(t) for t in zip(fields["subject"], fields["preheader"], fields["title"])]
+    hits = np.array(
+        [
+            len(_SPAM_TERMS.findall(t)) + len(_EXCLAMATION.findall(t)) + _shouting(t) + len(_EMOJI.findall(t))
+            for t in visible
+        ],
+        dtype=float,
+    )
+    spam = np.clip(1.0 - SPAM_PENALTY * hits, 0.0, 1.0)
+
+    return {"length": length, "hook": hook, "repetition": repetition, "spam": spam}
+
+
+def rank_candidates(
+    candidates: Sequence[GeneratedVariant],
+    n: int,
+    *,
+    existing: Sequence[GeneratedVariant] = (),
+    weights: Optional[Mapping[str, float]] = None,
+) -> List[RankedCandidate]:
+    """
+    Elige hasta `n` candidatos, en orden. `existing` son sets ya decididos
+    (p. ej. servidos por el pool): cuentan para la diversidad.
+    """
+    if not candidates or n <= 0:
+        return []
+    weights = {**WEIGHTS, **(weights or {})}
+    total = sum(weights[c] for c in COMPONENTS) or 1.0
+
+    components = score_components(candidates)
+    quality = sum(weights[name] * values for name, values in components.items())
+
+    # Similitud del texto visible en el inbox/encabezado entre candidatos (y existentes)
+    texts = [f"{v.subject} {v.preheader} {v.body.title}" for v in (*candidates, *existing)]
+    sim = similarity_matrix(signatures(texts))
+    count = len(candidates)
+    nearest = sim[:count, count:].max(axis=1) if existing else np.zeros(count)
+
+    chosen: List[RankedCandidate] = []
+    available = np.ones(count, dtype=bool)
+    for _ in range(min(n, count)):
+        diversity = 1.0 - nearest
+        scores = np.where(available, (quality + weights["diversity"] * diversity) / total, -np.inf)
+        best = int(np.argmax(scores))
+        available[best] = False
+        nearest = np.maximum(nearest, sim[:count, best])
+        chosen.append(
+            RankedCandidate(
+                index=best,
+                score=round(float(scores[best]), 4),
+                components={
+                    **{name: round(float(values[best]), 3) for name, values in components.items()},
+                    "diversity": round(float(diversity[best]), 3),
+                },
+            )
+        )
+    return chosen
+
+
+__all__ = ["ACRONYMS", "COMPONENTS", "RankedCandidate", "WEIGHTS", "rank_candidates", "score_components"]
@@ -0,0 +1,96 @@
+# ia-engine/app/utils/schema.py
+"""JSON Schema de salida del modelo, derivado de GeneratedVariant.
+
+El modelo responde un objeto plano {subject, preheader, title, subtitle,
+body, cta}; `_map_json_to_variant` lo lleva a GeneratedVariant/BodyBlock.
+Este módulo arma el schema estricto de ese objeto desde las descripciones de
+los modelos pydantic (una sola fuente de verdad) para usarlo con structured
+outputs (OpenAI `json_schema` strict, tool forzado en Anthropic) y para
+validar localmente la salida en modo `json_object`.
+"""
+
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from app.models.response import BodyBlock, GeneratedVariant
+
+SCHEMA_NAME = "email_set"
+
+# Campo plano del JSON → (modelo, campo del modelo)
+FLAT_FIELDS: Dict[str, Tuple[type, str]] = {
+    "subject": (GeneratedVariant, "subject"),
+    "preheader": (GeneratedVariant, "preheader"),
+    "title": (BodyBlock, "title"),
+    "subtitle": (BodyBlock, "subtitle"),
+    "body": (BodyBlock, "content"),
+    "cta": (GeneratedVariant, "cta"),
+}
+
+
+@lru_cache(maxsize=64)
+def _schema(fields: Tuple[str, ...]) -> Dict[str, Any]:
+    properties: Dict[str, Any] = {}
+    for name in fields:
+        model, attr = FLAT_FIELDS[name]
+        info = model.model_fields[attr]
+        properties[name] = {"type": "string", "description": info.description or name}
+    return {
+        "type": "object",
+        "properties": properties,
+        # Strict exige todas las claves en required y sin propiedades extra.
+        "required": list(fields),
+        "additionalProperties": False,
+    }
+
+
+def variant_json_schema(fields: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    """
+    Schema estricto del set (o de un subconjunto de campos, para la
+    regeneración parcial). Se devuelve una copia: el caller puede mutarla.
+    """
+    key = tuple(dict.fromkeys(fields)) if fields else tuple(FLAT_FIELDS)
+    schema = _schema(key)
+    return {**schema, "properties": dict(schema["properties"]), "required": list(schema["required"])}
+
+
+def candidates_json_schema() -> Dict[str, Any]:
+    """
+    Schema de la llamada multi-candidato (sobre-generación):
+    {"candidates": [set, set, ...]} con cada set igual a variant_json_schema().
+    """
+    return {
+        "title": "email_candidates",
+        "type": "object",
+        "properties": {"candidates": {"type": "array", "items": variant_json_schema()}},
+        "required": ["candidates"],
+        "additionalProperties": False,
+    }
+
+
+def schema_violations(data: Mapping[str, Any], schema: Mapping[str, Any]) -> List[str]:
+    """
+    Validación local mínima contra el schema (claves requeridas, tipos string,
+    claves extra). Lista vacía = el objeto cumple.
+    """
+    out: List[str] = []
+    props = schema.get("properties", {})
+    for name in schema.get("required", ()):
+        value = data.get(name)
+        if value is None or (isinstance(value, str) and not value.strip()):
+            out.append(f"{name}.missing")
+        elif props.get(name, {}).get("type") == "string" and not isinstance(value, str):
+            out.append(f"{name}.type")
+    if schema.get("additionalProperties") is False:
+        out.extend(f"{k}.extra" for k in data if k not in props)
+    return out
+
+
+__all__ = [
+    "FLAT_FIELDS",
+    "SCHEMA_NAME",
+    "candidates_json_schema",
+    "schema_violations",
+    "variant_json_schema",
+]
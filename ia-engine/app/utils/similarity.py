@@ -0,0 +1,165 @@
+# ia-engine/app/utils/similarity.py
+"""Detección local de near-duplicates entre sets de contenido (MinHash).
+
+`CONTRASTIVE_DEDUP` le pide al modelo no repetirse, pero nada lo verificaba.
+Aquí se calcula, sin llamar al modelo:
+- Firmas MinHash de shingles de caracteres (texto normalizado).
+- Matrices de similitud N×N por campo entre sets (vectorizado con NumPy).
+- Similitud dentro de cada set (subject↔title, preheader↔subtitle).
+
+La similitud es una estimación de Jaccard sobre shingles: 1.0 = idénticos.
+"""
+
+from __future__ import annotations
+
+import re
+import unicodedata
+import zlib
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+# Parámetros MinHash (fijos para que las firmas sean comparables entre requests)
+SHINGLE_SIZE = 4
+NUM_PERM = 64
+_PRIME = np.int64((1 << 31) - 1)
+_rng = np.random.default_rng(20251101)
+_A = _rng.integers(1, _PRIME, size=NUM_PERM, dtype=np.int64)
+_B = _rng.integers(0, _PRIME, size=NUM_PERM, dtype=np.int64)
+_EMPTY = np.full(NUM_PERM, _PRIME, dtype=np.int64)
+
+_WS = re.compile(r"\s+")
+_NON_WORD = re.compile(r"[^\w\s]")
+
+# Pares que CONTRASTIVE_DEDUP pide diferenciar dentro de un set
+WITHIN_SET_PAIRS: Tuple[Tuple[str, str], ...] = (
+    ("subject", "title"),
+    ("preheader", "subtitle"),
+    ("subject", "preheader"),
+)
+
+
+def normalize_text(text: str) -> str:
+    """Minúsculas, sin tildes ni puntuación, espacios colapsados."""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    text = _NON_WORD.sub(" ", text.lower())
+    return _WS.sub(" ", text).strip()
+
+
+def shingle_hashes(text: str, k: int = SHINGLE_SIZE) -> np.ndarray:
+    """Hashes (crc32) de los shingles de k caracteres del texto normalizado."""
+    norm = normalize_text(text)
+    if not norm:
+        return np.empty(0, dtype=np.int64)
+    if len(norm) <= k:
+        grams = {norm}
+    else:
+        grams = {norm[i:i + k] for i in range(len(norm) - k + 1)}
+    return np.fromiter(
+        (zlib.crc32(g.encode("utf-8")) for g in grams),
+        dtype=np.int64,
+        count=len(grams),
+    )
+
+
+def minhash_signature(text: str) -> np.ndarray:
+    """Firma MinHash (NUM_PERM,) de un texto."""
+    hashes = shingle_hashes(text) % _PRIME
+    if hashes.size == 0:
+        return _EMPTY.copy()
+    # (NUM_PERM, 1) * (1, n) → (NUM_PERM, n); a*x < 2^62, no hay overflow en int64.
+    permuted = (_A[:, None] * hashes[None, :] + _B[:, None]) % _PRIME
+    return permuted.min(axis=1)
+
+
+def signatures(texts: Sequence[str]) -> np.ndarray:
+    """Matriz de firmas (len(texts), NUM_PERM)."""
+    if not texts:
+        return np.empty((0, NUM_PERM), dtype=np.int64)
+    return np.stack([minhash_signature(t) for t in texts])
+
+
+def similarity_matrix(sigs: np.ndarray) -> np.ndarray:
+    """Jaccard estimado N×N a partir de firmas MinHash (diagonal = 1)."""
+    if sigs.shape[0] == 0:
+        return np.zeros((0, 0))
+    sim = (sigs[:, None, :] == sigs[None, :, :]).mean(axis=2)
+    empty = (sigs == _PRIME).all(axis=1)
+    # Textos vacíos no cuentan como duplicados entre sí.
+    sim[empty, :] = 0.0
+    sim[:, empty] = 0.0
+    np.fill_diagonal(sim, 1.0)
+    return sim
+
+
+def pairwise_similarity(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Similitud fila a fila entre dos matrices de firmas del mismo largo."""
+    if a.shape[0] == 0:
+        return np.zeros(0)
+    sim = (a == b).mean(axis=1)
+    empty = (a == _PRIME).all(axis=1) | (b == _PRIME).all(axis=1)
+    sim[empty] = 0.0
+    return sim
+
+
+def find_near_duplicates(
+    fields: Dict[str, List[str]],
+    *,
+    threshold: float,
+    skip: Sequence[int] = (),
+) -> Tuple[Dict[str, np.ndarray], Dict[int, List[str]]]:
+    """
+    Analiza N sets representados como {campo: [texto por set]}.
+
+    Args:
+        fields: textos por campo; todas las listas deben tener el mismo largo.
+        threshold: similitud a partir de la cual se considera near-duplicate.
+        skip: índices de sets que no se evalúan (p. ej. stubs).
+
+    Returns:
+        (matrices, offenders)
+        - matrices: {campo: matriz N×N} + {"<a>~<b>": vector N} dentro de cada set.
+        - offenders: {índice de set: [motivos]}. Entre dos sets parecidos
+          se marca el posterior; el primero se conserva.
+    """
+    sigs = {name: signatures(texts) for name, texts in fields.items()}
+    skipped = set(skip)
+    matrices: Dict[str, np.ndarray] = {}
+    offenders: Dict[int, List[str]] = {}
+
+    for name, s in sigs.items():
+        sim = similarity_matrix(s)
+        matrices[name] = sim
+        n = sim.shape[0]
+        if n < 2:
+            continue
+        # Triangular superior estricta: pares (i < j)
+        ii, jj = np.nonzero(np.triu(sim >= threshold, k=1))
+        for i, j in zip(ii.tolist(), jj.tolist()):
+            if i in skipped or j in skipped:
+                continue
+            offenders.setdefault(j, []).append(f"{name}~set{i + 1}")
+
+    for a, b in WITHIN_SET_PAIRS:
+        if a not in sigs or b not in sigs:
+            continue
+        sim = pairwise_similarity(sigs[a], sigs[b])
+        matrices[f"{a}~{b}"] = sim
+        for i in np.nonzero(sim >= threshold)[0].tolist():
+            if i not in skipped:
+                offenders.setdefault(i, []).append(f"{a}~{b}")
+
+    return matrices, offenders
+
+
+__all__ = [
+    "NUM_PERM",
+    "WITHIN_SET_PAIRS",
+    "find_near_duplicates",
+    "minhash_signature",
+    "normalize_text",
+    "pairwise_similarity",
+    "signatures",
+    "similarity_matrix",
+]
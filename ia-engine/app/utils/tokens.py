@@ -0,0 +1,82 @@
+# ia-engine/app/utils/tokens.py
+"""Conteo local de tokens (sin llamar al proveedor).
+
+Si `tiktoken` está instalado (requirements-extras.txt) se usa el encoding
+del modelo; si no, una aproximación BPE por palabra/puntuación que para
+español queda dentro de ~10% de o200k/cl100k. Sirve para comparar prompts
+entre sí y para presupuestos, no para facturación.
+"""
+
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+from typing import Any, Optional
+
+_WORD = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+# Encoding por defecto si el modelo no es conocido por tiktoken
+_DEFAULT_ENCODING = "o200k_base"
+
+
+@lru_cache(maxsize=8)
+def _encoding(model: Optional[str]) -> Any:
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model) if model else tiktoken.get_encoding(_DEFAULT_ENCODING)
+    except (KeyError, ValueError):
+        return tiktoken.get_encoding(_DEFAULT_ENCODING)
+
+
+def _approx(text: str) -> int:
+    """~1 token por signo y ~1 token cada 4 caracteres de palabra."""
+    total = 0
+    for piece in _WORD.findall(text):
+        total += 1 if len(piece) <= 4 else (len(piece) + 3) // 4
+    return total
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    """Tokens de `text` (exacto con tiktoken, aproximado sin él)."""
+    if not text:
+        return 0
+    enc = _encoding(model)
+    if enc is None:
+        return _approx(text)
+    return len(enc.encode(text))
+
+
+def is_exact() -> bool:
+    """True si el conteo usa tiktoken (no la aproximación)."""
+    return _encoding(None) is not None
+
+
+def clip_to_tokens(text: str, budget: int, model: Optional[str] = None) -> str:
+    """
+    Recorta `text` a ~`budget` tokens cerrando en oración (o palabra).
+
+    budget <= 0 = sin recorte.
+    """
+    if budget <= 0 or count_tokens(text, model) <= budget:
+        return text
+
+    sentences = re.split(r"(?<=[.!?])\s+", text.strip())
+    out = ""
+    for sentence in sentences:
+        candidate = f"{out} {sentence}".strip()
+        if count_tokens(candidate, model) > budget:
+            break
+        out = candidate
+    if out:
+        return out
+
+    words = text.split()
+    while words and count_tokens(" ".join(words), model) > budget:
+        words = words[: max(1, int(len(words) * 0.8))] if len(words) > 1 else []
+    return " ".join(words)
+
+
+__all__ = ["clip_to_tokens", "count_tokens", "is_exact"]
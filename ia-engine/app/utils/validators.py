@@ -10,6 +10,10 @@ IMPORTANTE: mantener alineado con:
 - backend/src/utils/constants.ts (CAMPAIGNS, CLUSTERS, CAMPAIGN_CLUSTERS)
 - app.utils.campaigns.py
 - app.utils.clusters.py
+
+Los helpers consultan el snapshot vigente de app.utils.catalog; las constantes
+de módulo (ALL_CAMPAIGNS, ALL_CLUSTERS, CAMPAIGN_CLUSTERS) reflejan solo el
+catálogo embebido y se mantienen por compatibilidad.
 """
 
 from __future__ import annotations
@@ -17,7 +21,8 @@ from __future__ import annotations
 import logging
 from typing import Dict, List, Tuple
 
-from app.utils.campaigns import CAMPAIGNS_TONE, CAMPAIGN_ALIASES
+from app.utils.campaigns import CAMPAIGNS_TONE
+from app.utils.catalog import get_catalog
 from app.utils.clusters import (
     CLUSTERS as CLUSTERS_DEF,
     CAMPAIGN_CLUSTERS as CAMPAIGN_CLUSTERS_MAP,
@@ -46,26 +51,26 @@ def normalize_campaign_name(name: str) -> str:
     if not isinstance(name, str):
         return ""
     cleaned = name.strip()
-    return CAMPAIGN_ALIASES.get(cleaned, cleaned)
+    return get_catalog().campaign_aliases.get(cleaned, cleaned)
 
 
 def is_known_campaign(name: str) -> bool:
     """True si la campaña (normalizada) existe en el catálogo."""
     normalized = normalize_campaign_name(name)
-    return normalized in ALL_CAMPAIGNS
+    return normalized in get_catalog().campaigns
 
 
 def is_known_cluster(name: str) -> bool:
     """True si el cluster existe en el catálogo canónico."""
     if not isinstance(name, str):
         return False
-    return name in ALL_CLUSTERS
+    return name in get_catalog().clusters
 
 
 def allowed_clusters_for_campaign(campaign: str) -> List[str]:
     """Clusters configurados para una campaña (después de normalizar alias)."""
     normalized = normalize_campaign_name(campaign)
-    return CAMPAIGN_CLUSTERS.get(normalized, [])
+    return list(get_catalog().campaign_clusters.get(normalized, ()))
 
 
 def soft_validate_campaign_cluster(
@@ -84,7 +89,7 @@ def soft_validate_campaign_cluster(
     """
     normalized_campaign = normalize_campaign_name(campaign)
 
-    if normalized_campaign not in ALL_CAMPAIGNS:
+    if not is_known_campaign(normalized_campaign):
         logger.warning(
             "IA-Engine: campaign fuera de catálogo: %r (normalizada=%r)",
             campaign,
@@ -97,7 +102,7 @@ def soft_validate_campaign_cluster(
             cluster,
         )
     else:
-        allowed = CAMPAIGN_CLUSTERS.get(normalized_campaign)
+        allowed = allowed_clusters_for_campaign(normalized_campaign)
         if allowed and cluster not in allowed:
             logger.warning(
                 "IA-Engine: cluster %r no está configurado para campaign %r (allowed=%s)",
@@ -118,7 +123,7 @@ def strict_validate_campaign_cluster(campaign: str, cluster: str) -> Tuple[str,
     """
     normalized_campaign = normalize_campaign_name(campaign)
 
-    if normalized_campaign not in ALL_CAMPAIGNS:
+    if not is_known_campaign(normalized_campaign):
         raise ValueError(
             f"campaign desconocida: {campaign!r} (normalizada={normalized_campaign!r})"
         )
@@ -126,7 +131,7 @@ def strict_validate_campaign_cluster(campaign: str, cluster: str) -> Tuple[str,
     if not is_known_cluster(cluster):
         raise ValueError(f"cluster desconocido: {cluster!r}")
 
-    allowed = CAMPAIGN_CLUSTERS.get(normalized_campaign, [])
+    allowed = allowed_clusters_for_campaign(normalized_campaign)
     if allowed and cluster not in allowed:
         raise ValueError(
             f"cluster {cluster!r} no está configurado para campaign {normalized_campaign!r}. "
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# ia-engine/scripts/bench_cold_start.py
+"""Benchmark de cold start: boot del proceso → primera respuesta.
+
+Para cada corrida levanta `uvicorn app.main:app` en un puerto libre y mide:
+- boot → /health 200 (el proceso acepta tráfico),
+- boot → /ready 200  (warm-up terminado),
+- boot → primera respuesta del endpoint objetivo (por defecto GET /ia/meta;
+  con --generate, POST /ia/generate de 1 set).
+
+Uso (desde ia-engine/):
+    python scripts/bench_cold_start.py --runs 5
+    python scripts/bench_cold_start.py --runs 3 --generate
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+
+GENERATE_PAYLOAD = {
+    "campaign": "Crédito de consumo - Persona",
+    "cluster": "Viajes solteros",
+    "sets": 1,
+}
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _request(url: str, payload: Optional[dict] = None, timeout: float = 60.0) -> int:
+    data = None
+    headers = {}
+    if payload is not None:
+        data = json.dumps(payload).encode("utf-8")
+        headers["Content-Type"] = "application/json"
+    req = urllib.request.Request(url, data=data, headers=headers)
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            resp.read()
+            return resp.status
+    except urllib.error.HTTPError as exc:
+        return exc.code
+
+
+def _wait_for(url: str, deadline: float) -> Optional[float]:
+    while time.perf_counter() < deadline:
+        try:
+            if _request(url, timeout=1.0) == 200:
+                return time.perf_counter()
+        except (urllib.error.URLError, ConnectionError, socket.timeout):
+            pass
+        time.sleep(0.01)
+    return None
+
+
+def one_run(generate: bool, timeout: float) -> Dict[str, float]:
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    env = dict(os.environ, PYTHONPATH=str(ROOT))
+
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT,
+        env=env,
+    )
+    try:
+        deadline = t0 + timeout
+        t_health = _wait_for(f"{base}/health", deadline)
+        if t_health is None:
+            raise RuntimeError("el servidor no respondió /health a tiempo")
+
+        if generate:
+            _request(f"{base}/ia/generate", GENERATE_PAYLOAD, timeout=timeout)
+        else:
+            _request(f"{base}/ia/meta", timeout=timeout)
+        t_first = time.perf_counter()
+
+        t_ready = _wait_for(f"{base}/ready", deadline) or float("nan")
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+    return {
+        "health_ms": (t_health - t0) * 1000,
+        "first_response_ms": (t_first - t0) * 1000,
+        "ready_ms": (t_ready - t0) * 1000,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--generate", action="store_true", help="Primer request = POST /ia/generate")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    results: List[Dict[str, float]] = []
+    for i in range(args.runs):
+        r = one_run(args.generate, args.timeout)
+        results.append(r)
+        print(
+            f"run {i + 1}: health={r['health_ms']:.0f} ms  "
+            f"first={r['first_response_ms']:.0f} ms  ready={r['ready_ms']:.0f} ms"
+        )
+
+    print("\nMediana:")
+    for key in ("health_ms", "first_response_ms", "ready_ms"):
+        values = [r[key] for r in results if r[key] == r[key]]
+        if values:
+            print(f"  {key:18} {statistics.median(values):8.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+# ia-engine/scripts/bench_prompt_versions.py
+"""Benchmark de versiones de prompt: tokens, latencia y costo en todo el catálogo.
+
+Un cambio en las constantes de prompts.py (SAFETY, ROLES_EMAIL,
+CONTRASTIVE_DEDUP, CREDIT_NAMING...) cambia el largo del prompt y de la
+respuesta, y con eso latencia y costo. Este script compara versiones:
+
+- una versión = modo (full | compact) + presupuesto de descripciones +
+  reemplazos de constantes de prompts.py; se registran en un JSON
+  (--versions, ver scripts/prompt_versions.example.json). Sin --versions se
+  comparan las versiones vigentes "full" y "compact";
+- cada versión se renderiza en todas las combinaciones campaña×cluster y se
+  cuentan los tokens de entrada localmente (tiktoken si está instalado);
+- con --live N se hacen N llamadas por versión (las combinaciones en ronda)
+  contra un stand-in local (--standin), un cassette grabado (--cassette DIR)
+  o el backend configurado (IA_PROVIDERS / OPENAI_*; --record DIR lo graba),
+  y se miden tokens de salida (contenido crudo), latencia p50/p95 y errores;
+- el reporte compara cada versión con la primera (línea base): Δ% de tokens
+  y latencia y costo estimado cada 1000 sets con --price-in/--price-out.
+
+Un cassette solo tiene las respuestas de los prompts que se grabaron: una
+versión nueva se graba una vez contra el proveedor (--record) y después se
+compara en replay las veces que haga falta, con la misma configuración de
+proveedor con que se grabó (la clave incluye modelo y schema). Con el
+stand-in la salida no depende del prompt (sirve para latencia y errores, no
+para tokens de salida).
+
+Uso (desde ia-engine/):
+    python scripts/bench_prompt_versions.py
+    python scripts/bench_prompt_versions.py --versions scripts/prompt_versions.example.json
+    python scripts/bench_prompt_versions.py --versions v.json --live 41 --standin
+    python scripts/bench_prompt_versions.py --versions v.json --live 41 --record cassettes/prompts
+    python scripts/bench_prompt_versions.py --versions v.json --live 41 --cassette cassettes/prompts --markdown /tmp/pr.md
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from app.utils import prompts  # noqa: E402
+from app.utils.catalog import get_catalog  # noqa: E402
+from app.utils.tokens import count_tokens, is_exact  # noqa: E402
+
+Combo = Tuple[str, str]
+
+MODES = ("full", "compact")
+
+# Constantes de prompts.py que una versión puede reemplazar (texto; STYLE_EXAMPLE es un objeto)
+OVERRIDABLE = (
+    "ES_CL",
+    "SAFETY",
+    "DELIVERABILITY",
+    "LENGTHS_EMAIL",
+    "EMAIL_STRUCTURE",
+    "ROLES_EMAIL",
+    "CONTRASTIVE_DEDUP",
+    "TONE_CONSTRAINTS",
+    "CREDIT_NAMING",
+    "NEUTRALITY",
+    "STYLE_EXAMPLE",
+)
+
+# Precios por millón de tokens (gpt-4o-mini); se cambian con --price-in/--price-out
+PRICE_IN = 0.15
+PRICE_OUT = 0.60
+
+
+@dataclass
+class PromptVersion:
+    """Versión de prompt: modo, recorte de descripciones y constantes reemplazadas."""
+
+    name: str
+    mode: str = "full"
+    desc_tokens: int = 0
+    overrides: Dict[str, Any] = field(default_factory=dict)
+
+
+def _load_text(value: Any, base: Path) -> Any:
+    """'@ruta' → contenido del archivo (relativo al JSON de versiones)."""
+    if isinstance(value, str) and value.startswith("@"):
+        return (base / value[1:]).read_text(encoding="utf-8").strip()
+    return value
+
+
+def load_versions(path: Optional[str]) -> List[PromptVersion]:
+    """Versiones del archivo (en orden; la primera es la línea base) o las vigentes."""
+    if not path:
+        return [PromptVersion("full", "full"), PromptVersion("compact", "compact")]
+    source = Path(path)
+    data = json.loads(source.read_text(encoding="utf-8"))
+    versions: List[PromptVersion] = []
+    for item in data.get("versions", []):
+        name = str(item["name"])
+        mode = str(item.get("mode", "full"))
+        if mode not in MODES:
+            raise ValueError(f"versión {name!r}: mode inválido {mode!r} (usar {', '.join(MODES)})")
+        overrides = dict(item.get("overrides") or {})
+        unknown = sorted(set(overrides) - set(OVERRIDABLE))
+        if unknown:
+            raise ValueError(f"versión {name!r}: constantes desconocidas {unknown} (usar {', '.join(OVERRIDABLE)})")
+        versions.append(
+            PromptVersion(
+                name=name,
+                mode=mode,
+                desc_tokens=int(item.get("descTokens", 0)),
+                overrides={k: _load_text(v, source.parent) for k, v in overrides.items()},
+            )
+        )
+    if not versions:
+        raise ValueError(f"{path}: sin versiones")
+    if len({v.name for v in versions}) != len(versions):
+        raise ValueError(f"{path}: nombres de versión repetidos")
+    return versions
+
+
+@contextmanager
+def use_version(version: PromptVersion) -> Iterator[None]:
+    """Aplica la versión sobre el módulo prompts y restaura lo vigente al salir."""
+    names = ["DESC_TOKEN_BUDGET", *version.overrides]
+    previous = {name: getattr(prompts, name) for name in names}
+    prompts.DESC_TOKEN_BUDGET = version.desc_tokens
+    for name, value in version.overrides.items():
+        setattr(prompts, name, value)
+    # Los system prompts están cacheados: se rearman con las constantes nuevas.
+    prompts._system_prompt.cache_clear()
+    prompts._compact_system_prompt.cache_clear()
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            setattr(prompts, name, value)
+        prompts._system_prompt.cache_clear()
+        prompts._compact_system_prompt.cache_clear()
+
+
+def _render(version: PromptVersion, campaign: str, cluster: str) -> Tuple[str, str]:
+    return prompts.build_email_prompt(campaign, cluster, None, 1, compact=version.mode == "compact")
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+def token_report(combos: List[Combo], version: PromptVersion, model: str) -> Dict[str, float]:
+    systems, users, totals, render_us = [], [], [], []
+    with use_version(version):
+        for campaign, cluster in combos:
+            t0 = time.perf_counter()
+            system, user = _render(version, campaign, cluster)
+            render_us.append((time.perf_counter() - t0) * 1e6)
+            s, u = count_tokens(system, model), count_tokens(user, model)
+            systems.append(s)
+            users.append(u)
+            totals.append(s + u)
+    return {
+        "system": statistics.mean(systems),
+        "user": statistics.mean(users),
+        "total": statistics.mean(totals),
+        "max": max(totals),
+        "renderUs": statistics.median(render_us),
+        # Un system idéntico entre requests es prefijo cacheable por el proveedor.
+        "staticPrefix": systems[0] if len(set(systems)) == 1 else 0,
+    }
+
+
+def live_report(combos: List[Combo], version: PromptVersion, calls: int, model: Optional[str]) -> Dict[str, float]:
+    """N llamadas reales (o grabadas) con el schema de producción; consumo vía CancelToken."""
+    from app.services.cancellation import CancelToken, cancellable
+    from app.services.cassette import get_cassette
+    from app.services.openai_client import chat_json
+    from app.utils.schema import variant_json_schema
+
+    sample = [combos[i % len(combos)] for i in range(calls)]
+    latencies: List[float] = []
+    outputs: List[int] = []
+    inputs: List[int] = []
+    upstream = errors = 0
+    misses_before = get_cassette().stats()["misses"]
+    with use_version(version):
+        for campaign, cluster in sample:
+            system, user = _render(version, campaign, cluster)
+            # El token anota cada llamada hecha (reintentos incluidos) con su contenido crudo.
+            token = CancelToken("bench_prompt_versions")
+            t0 = time.perf_counter()
+            try:
+                with cancellable(token):
+                    chat_json(system, user, model=model, schema=variant_json_schema())
+                latencies.append((time.perf_counter() - t0) * 1000)
+                outputs.append(token.output_tokens)
+                inputs.append(token.input_tokens)
+            except Exception:  # noqa: BLE001
+                errors += 1
+            upstream += token.calls
+    return {
+        "calls": calls,
+        "upstreamCalls": upstream,
+        "errors": errors,
+        "cassetteMisses": get_cassette().stats()["misses"] - misses_before,
+        "inputTokens": statistics.mean(inputs) if inputs else float("nan"),
+        "outputTokens": statistics.mean(outputs) if outputs else float("nan"),
+        "p50Ms": statistics.median(latencies) if latencies else float("nan"),
+        "p95Ms": _percentile(latencies, 0.95),
+    }
+
+
+def warm_up(combos: List[Combo], version: PromptVersion, model: Optional[str]) -> None:
+    """Una llamada sin medir: conexión, cliente y schema quedan listos antes de la línea base."""
+    from app.services.openai_client import chat_json
+    from app.utils.schema import variant_json_schema
+
+    with use_version(version):
+        system, user = _render(version, *combos[0])
+        try:
+            chat_json(system, user, model=model, schema=variant_json_schema())
+        except Exception:  # noqa: BLE001
+            pass
+
+
+def _cost_per_1k(input_tokens: float, output_tokens: float, price_in: float, price_out: float) -> float:
+    """USD estimados cada 1000 sets (precios por millón de tokens)."""
+    return (input_tokens * price_in + output_tokens * price_out) / 1000
+
+
+def _delta(value: float, base: float) -> str:
+    if not base or value != value or base != base:  # nan
+        return "—"
+    return f"{(value - base) / base * 100:+.1f}%"
+
+
+def build_rows(report: Dict[str, Any], price_in: float, price_out: float) -> List[Dict[str, Any]]:
+    """Una fila por versión con los Δ contra la primera."""
+    rows: List[Dict[str, Any]] = []
+    base: Optional[Dict[str, Any]] = None
+    for name, entry in report["versions"].items():
+        tokens, live = entry["tokens"], entry.get("live")
+        output = live["outputTokens"] if live else float("nan")
+        row = {
+            "version": name,
+            "mode": entry["mode"],
+            "inputTokens": tokens["total"],
+            "maxInput": tokens["max"],
+            "staticPrefix": tokens["staticPrefix"],
+            "outputTokens": output,
+            "p50Ms": live["p50Ms"] if live else float("nan"),
+            "p95Ms": live["p95Ms"] if live else float("nan"),
+            "errors": live["errors"] if live else 0,
+            "misses": live["cassetteMisses"] if live else 0,
+            "costPer1k": _cost_per_1k(tokens["total"], output if live else 0.0, price_in, price_out),
+        }
+        base = base or row
+        row["deltaInput"] = _delta(row["inputTokens"], base["inputTokens"])
+        row["deltaOutput"] = _delta(row["outputTokens"], base["outputTokens"])
+        row["deltaP50"] = _delta(row["p50Ms"], base["p50Ms"])
+        row["deltaCost"] = _delta(row["costPer1k"], base["costPer1k"])
+        rows.append(row)
+    return rows
+
+
+def markdown_table(rows: List[Dict[str, Any]], live: bool) -> str:
+    """Tabla para pegar en la descripción del PR que cambia el prompt."""
+    head = ["versión", "modo", "tokens entrada", "Δ entrada"]
+    if live:
+        head += ["tokens salida", "Δ salida", "p50 ms", "Δ p50", "p95 ms", "errores"]
+    head += ["USD / 1k sets", "Δ costo"]
+    lines = ["| " + " | ".join(head) + " |", "|" + "---|" * len(head)]
+    for r in rows:
+        cells = [r["version"], r["mode"], f"{r['inputTokens']:.0f}", r["deltaInput"]]
+        if live:
+            cells += [
+                f"{r['outputTokens']:.0f}",
+                r["deltaOutput"],
+                f"{r['p50Ms']:.0f}",
+                r["deltaP50"],
+                f"{r['p95Ms']:.0f}",
+                str(r["errors"]),
+            ]
+        cells += [f"{r['costPer1k']:.4f}", r["deltaCost"]]
+        lines.append("| " + " | ".join(cells) + " |")
+    return "\n".join(lines) + "\n"
+
+
+def _setup_backend(args: argparse.Namespace) -> str:
+    """Configura stand-in / cassette para --live. Devuelve una descripción del backend."""
+    if args.standin:
+        from bench_cold_start import _free_port
+        from standin_llm import serve
+        from app.services.providers import ProviderRouter, build_provider, set_router
+
+        port = _free_port()
+        serve(port, latency=0.2, jitter=0.02, error_rate=0.0, input_latency=args.standin_input_latency)
+        set_router(ProviderRouter([build_provider(
+            {"name": "standin", "kind": "openai_compatible", "base_url": f"http://127.0.0.1:{port}/v1"}
+        )]))
+        return "stand-in (salida independiente del prompt)"
+    if args.cassette or args.record:
+        from app.services.cassette import MODE_RECORD, MODE_REPLAY, Cassette, set_cassette
+
+        directory = args.cassette or args.record
+        mode = MODE_REPLAY if args.cassette else MODE_RECORD
+        set_cassette(Cassette(directory, mode=mode, latency_scale=args.latency_scale))
+        return f"cassette {mode} ({directory})"
+    return "backend configurado (IA_PROVIDERS / OPENAI_*)"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--versions", help="JSON con las versiones a comparar (la primera es la línea base)")
+    parser.add_argument("--model", help="modelo para --live (default: el del proveedor) y para contar tokens")
+    parser.add_argument("--live", type=int, default=0, help="llamadas por versión contra el backend")
+    backend = parser.add_mutually_exclusive_group()
+    backend.add_argument("--standin", action="store_true", help="usar un stand-in LLM local para --live")
+    backend.add_argument("--cassette", help="replay de un cassette grabado (directorio) para --live")
+    backend.add_argument("--record", help="grabar las llamadas de --live en este directorio")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="escala de latencia del replay")
+    parser.add_argument(
+        "--standin-input-latency", type=float, default=0.05, help="segundos extra del stand-in por 1000 tokens de prompt"
+    )
+    parser.add_argument("--price-in", type=float, default=PRICE_IN, help="USD por millón de tokens de entrada")
+    parser.add_argument("--price-out", type=float, default=PRICE_OUT, help="USD por millón de tokens de salida")
+    parser.add_argument("--json", help="guardar el reporte en este archivo")
+    parser.add_argument("--markdown", help="guardar la tabla comparativa (Markdown) en este archivo")
+    args = parser.parse_args()
+
+    versions = load_versions(args.versions)
+    catalog = get_catalog()
+    combos = [(c, k) for c, clusters in catalog.campaign_clusters.items() for k in clusters]
+
+    report: Dict[str, Any] = {
+        "combos": len(combos),
+        "exactTokens": is_exact(),
+        "prices": {"input": args.price_in, "output": args.price_out},
+        "versions": {},
+    }
+    for version in versions:
+        report["versions"][version.name] = {
+            "mode": version.mode,
+            "descTokens": version.desc_tokens,
+            "overrides": sorted(version.overrides),
+            "tokens": token_report(combos, version, args.model or os.getenv("OPENAI_MODEL_EMAIL", "gpt-4o-mini")),
+        }
+
+    live = args.live > 0
+    if live:
+        report["backend"] = _setup_backend(args)
+        warm_up(combos, versions[0], args.model)
+        for version in versions:
+            report["versions"][version.name]["live"] = live_report(combos, version, args.live, args.model)
+
+    rows = build_rows(report, args.price_in, args.price_out)
+    report["comparison"] = rows
+
+    print(f"combinaciones: {len(combos)}  conteo: {'tiktoken' if is_exact() else 'aproximado'}  base: {rows[0]['version']}")
+    print(
+        f"{'versión':18} {'modo':8} {'entrada':>8} {'Δ':>7} {'max':>6} {'prefijo':>8} "
+        f"{'render µs':>10} {'USD/1k':>8} {'Δ costo':>8}"
+    )
+    for r, entry in zip(rows, report["versions"].values()):
+        print(
+            f"{r['version']:18} {r['mode']:8} {r['inputTokens']:8.0f} {r['deltaInput']:>7} {r['maxInput']:6.0f} "
+            f"{r['staticPrefix']:8.0f} {entry['tokens']['renderUs']:10.1f} {r['costPer1k']:8.4f} {r['deltaCost']:>8}"
+        )
+    if live:
+        print(f"\n{report['backend']}, {args.live} llamadas por versión")
+        print(
+            f"{'versión':18} {'salida':>7} {'Δ':>7} {'p50 ms':>7} {'Δ':>7} {'p95 ms':>7} "
+            f"{'llamadas':>9} {'errores':>8} {'sin grab.':>9}"
+        )
+        for r, entry in zip(rows, report["versions"].values()):
+            lr = entry["live"]
+            print(
+                f"{r['version']:18} {r['outputTokens']:7.0f} {r['deltaOutput']:>7} {r['p50Ms']:7.0f} {r['deltaP50']:>7} "
+                f"{r['p95Ms']:7.0f} {lr['upstreamCalls']:9d} {lr['errors']:8d} {lr['cassetteMisses']:9d}"
+            )
+    else:
+        print("\n(costo solo de entrada: --live N agrega tokens de salida y latencia)")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    if args.markdown:
+        Path(args.markdown).write_text(markdown_table(rows, live), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# ia-engine/scripts/bench_server.py
+"""Benchmark de throughput: uvicorn de un proceso vs `python -m app.server`.
+
+Para cada modo levanta el servidor en un puerto libre (contra un stand-in
+LLM local, ver standin_llm.py), espera /ready y dispara POST /ia/generate
+con N clientes concurrentes (keep-alive) durante D segundos.
+Reporta req/s, p50/p95/p99 y errores.
+
+Uso (desde ia-engine/):
+    python scripts/bench_server.py                         # engine=template (CPU-bound)
+    python scripts/bench_server.py --engine auto --llm-latency 0.3 --concurrency 64
+    python scripts/bench_server.py --workers 4 --duration 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_cold_start import _free_port, _wait_for  # noqa: E402
+from standin_llm import serve as serve_standin  # noqa: E402
+
+PAYLOAD = {
+    "campaign": "Crédito de consumo - Persona",
+    "cluster": "Viajes solteros",
+    "sets": 3,
+}
+
+
+def _load(port: int, body: bytes, concurrency: int, duration: float) -> Dict[str, float]:
+    latencies: List[float] = []
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def client() -> None:
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        local: List[float] = []
+        failed = 0
+        while time.perf_counter() < stop_at:
+            t0 = time.perf_counter()
+            try:
+                conn.request("POST", "/ia/generate", body, {"Content-Type": "application/json"})
+                resp = conn.getresponse()
+                resp.read()
+                if resp.status != 200:
+                    failed += 1
+                    continue
+                local.append(time.perf_counter() - t0)
+            except (OSError, http.client.HTTPException):
+                # Worker reciclado / conexión cerrada: reconectar.
+                failed += 1
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        conn.close()
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+
+    latencies.sort()
+
+    def pct(p: float) -> float:
+        return latencies[min(int(len(latencies) * p), len(latencies) - 1)] * 1000 if latencies else float("nan")
+
+    return {
+        "requests": len(latencies),
+        "errors": errors[0],
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else float("nan"),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+    }
+
+
+def run_mode(name: str, cmd: List[str], port: int, env: Dict[str, str], args: argparse.Namespace) -> Dict[str, float]:
+    proc = subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        if _wait_for(f"http://127.0.0.1:{port}/ready", time.perf_counter() + 60) is None:
+            raise RuntimeError(f"{name}: el servidor no quedó listo")
+        body = json.dumps(dict(PAYLOAD, engine=args.engine)).encode("utf-8")
+        _load(port, body, min(args.concurrency, 4), 1.0)  # calentamiento
+        return _load(port, body, args.concurrency, args.duration)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--engine", default="template", help="engine del payload (template = sin LLM)")
+    parser.add_argument("--workers", type=int, default=0, help="workers de app.server (0 = automático)")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="latencia del stand-in LLM (s)")
+    args = parser.parse_args()
+
+    llm_port = _free_port()
+    serve_standin(llm_port, latency=args.llm_latency, jitter=args.llm_latency / 5, error_rate=0.0)
+
+    env = dict(
+        os.environ,
+        PYTHONPATH=str(ROOT),
+        IA_PROVIDERS=json.dumps([
+            {"name": "standin", "kind": "openai_compatible", "base_url": f"http://127.0.0.1:{llm_port}/v1"}
+        ]),
+        IA_POOL="0",
+        IA_WARMUP_CONNECT="0",
+        IA_PROVIDER_HEALTH_INTERVAL="0",
+        LOG_LEVEL="WARNING",
+    )
+
+    results: Dict[str, Dict[str, float]] = {}
+
+    port = _free_port()
+    results["uvicorn (1 proceso)"] = run_mode(
+        "uvicorn",
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        port,
+        env,
+        args,
+    )
+
+    port = _free_port()
+    results[f"app.server (workers={args.workers or 'auto'})"] = run_mode(
+        "app.server",
+        [sys.executable, "-m", "app.server", "--host", "127.0.0.1", "--port", str(port), "--workers", str(args.workers)],
+        port,
+        env,
+        args,
+    )
+
+    print(f"\nengine={args.engine} concurrency={args.concurrency} duration={args.duration}s cpus={os.cpu_count()}")
+    print(f"{'modo':34} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errores':>8}")
+    for name, r in results.items():
+        print(
+            f"{name:34} {r['rps']:8.1f} {r['p50_ms']:8.1f} {r['p95_ms']:8.1f} "
+            f"{r['p99_ms']:8.1f} {r['errors']:8d}"
+        )
+
+
+if __name__ == "__main__":
+    main()
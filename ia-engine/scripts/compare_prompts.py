@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# ia-engine/scripts/compare_prompts.py
+"""Reporte: prompt full vs compact en todo el catálogo.
+
+Para cada combinación campaña×cluster renderiza ambos modos y cuenta tokens
+de entrada localmente (tiktoken si está instalado; si no, aproximación).
+Con --desc-tokens agrega un tercer modo: compact + recorte de descripciones.
+Con --live N además llama N veces por modo al backend configurado
+(IA_PROVIDERS / OPENAI_*) o a un stand-in local (--standin) y mide latencia.
+
+Uso (desde ia-engine/):
+    python scripts/compare_prompts.py
+    python scripts/compare_prompts.py --desc-tokens 60 --json /tmp/prompts.json
+    python scripts/compare_prompts.py --live 5 --standin
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from app.utils import prompts  # noqa: E402
+from app.utils.catalog import get_catalog  # noqa: E402
+from app.utils.tokens import count_tokens, is_exact  # noqa: E402
+
+Combo = Tuple[str, str]
+
+
+def _render(mode: str, campaign: str, cluster: str, desc_tokens: int) -> Tuple[str, str]:
+    previous = prompts.DESC_TOKEN_BUDGET
+    prompts.DESC_TOKEN_BUDGET = desc_tokens if mode == "compact+desc" else 0
+    try:
+        return prompts.build_email_prompt(campaign, cluster, None, 1, compact=mode != "full")
+    finally:
+        prompts.DESC_TOKEN_BUDGET = previous
+
+
+def token_report(combos: List[Combo], modes: List[str], desc_tokens: int, model: str) -> Dict[str, Dict[str, float]]:
+    out: Dict[str, Dict[str, float]] = {}
+    for mode in modes:
+        systems, users, totals, render_us = [], [], [], []
+        for campaign, cluster in combos:
+            t0 = time.perf_counter()
+            system, user = _render(mode, campaign, cluster, desc_tokens)
+            render_us.append((time.perf_counter() - t0) * 1e6)
+            s, u = count_tokens(system, model), count_tokens(user, model)
+            systems.append(s)
+            users.append(u)
+            totals.append(s + u)
+        out[mode] = {
+            "system": statistics.mean(systems),
+            "user": statistics.mean(users),
+            "total": statistics.mean(totals),
+            "max": max(totals),
+            "renderUs": statistics.median(render_us),
+            # El system compacto es idéntico entre requests: prefijo cacheable.
+            "staticPrefix": systems[0] if len(set(systems)) == 1 else 0,
+        }
+    return out
+
+
+def latency_report(combos: List[Combo], modes: List[str], desc_tokens: int, calls: int) -> Dict[str, Dict[str, float]]:
+    from app.services.openai_client import chat_json
+
+    out: Dict[str, Dict[str, float]] = {}
+    sample = [combos[i % len(combos)] for i in range(calls)]
+    for mode in modes:
+        latencies: List[float] = []
+        errors = 0
+        for campaign, cluster in sample:
+            system, user = _render(mode, campaign, cluster, desc_tokens)
+            t0 = time.perf_counter()
+            try:
+                chat_json(system, user)
+                latencies.append((time.perf_counter() - t0) * 1000)
+            except Exception:  # noqa: BLE001
+                errors += 1
+        out[mode] = {
+            "p50Ms": statistics.median(latencies) if latencies else float("nan"),
+            "meanMs": statistics.mean(latencies) if latencies else float("nan"),
+            "errors": errors,
+        }
+    return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--desc-tokens", type=int, default=0, help="presupuesto de descripciones (0 = sin modo recortado)")
+    parser.add_argument("--model", default=os.getenv("OPENAI_MODEL_EMAIL", "gpt-4o-mini"))
+    parser.add_argument("--live", type=int, default=0, help="llamadas por modo contra el backend")
+    parser.add_argument("--standin", action="store_true", help="usar un stand-in LLM local para --live")
+    parser.add_argument("--json", help="guardar el reporte en este archivo")
+    args = parser.parse_args()
+
+    catalog = get_catalog()
+    combos = [(c, k) for c, clusters in catalog.campaign_clusters.items() for k in clusters]
+    modes = ["full", "compact"] + (["compact+desc"] if args.desc_tokens > 0 else [])
+
+    report: Dict[str, object] = {
+        "combos": len(combos),
+        "exactTokens": is_exact(),
+        "tokens": token_report(combos, modes, args.desc_tokens, args.model),
+    }
+
+    if args.live > 0:
+        if args.standin:
+            from bench_cold_start import _free_port
+            from standin_llm import serve
+            from app.services.providers import ProviderRouter, build_provider, set_router
+
+            port = _free_port()
+            serve(port, latency=0.2, jitter=0.02, error_rate=0.0)
+            set_router(ProviderRouter([build_provider(
+                {"name": "standin", "kind": "openai_compatible", "base_url": f"http://127.0.0.1:{port}/v1"}
+            )]))
+        report["latency"] = latency_report(combos, modes, args.desc_tokens, args.live)
+
+    tokens = report["tokens"]
+    base = tokens["full"]["total"]
+    print(f"combinaciones: {len(combos)}  conteo: {'tiktoken' if is_exact() else 'aproximado'}")
+    print(f"{'modo':14} {'system':>8} {'user':>8} {'total':>8} {'max':>8} {'Δ total':>8} {'prefijo':>8} {'render µs':>10}")
+    for mode, r in tokens.items():
+        delta = (r["total"] - base) / base * 100
+        print(
+            f"{mode:14} {r['system']:8.0f} {r['user']:8.0f} {r['total']:8.0f} {r['max']:8.0f} "
+            f"{delta:7.1f}% {r['staticPrefix']:8.0f} {r['renderUs']:10.1f}"
+        )
+    if "latency" in report:
+        print(f"\n{'modo':14} {'p50 ms':>8} {'media ms':>9} {'errores':>8}")
+        for mode, r in report["latency"].items():
+            print(f"{mode:14} {r['p50Ms']:8.0f} {r['meanMs']:9.0f} {r['errors']:8d}")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
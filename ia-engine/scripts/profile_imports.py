@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# ia-engine/scripts/profile_imports.py
+"""Modo de profiling de arranque: costo de import por módulo.
+
+Ejecuta `python -X importtime -c "import app.main"` en un proceso limpio
+y resume el tiempo acumulado por módulo (o por paquete raíz con --group).
+
+Uso (desde ia-engine/):
+    python scripts/profile_imports.py
+    python scripts/profile_imports.py --top 40 --group
+    python scripts/profile_imports.py --target app.services.text_engine
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+
+_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+
+
+def run_importtime(target: str) -> List[Tuple[str, int, int, int]]:
+    """Devuelve [(módulo, self_us, cumulative_us, depth)] en orden de import."""
+    env = dict(os.environ, PYTHONPATH=str(ROOT))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    if proc.returncode != 0:
+        sys.stderr.write(proc.stderr)
+        raise SystemExit(proc.returncode)
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            self_us, cum_us, indent, name = m.groups()
+            rows.append((name, int(self_us), int(cum_us), len(indent) // 2))
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--target", default="app.main", help="Módulo a importar (default: app.main)")
+    parser.add_argument("--top", type=int, default=25, help="Cantidad de filas a mostrar")
+    parser.add_argument(
+        "--group",
+        action="store_true",
+        help="Agrupa por paquete raíz (suma de tiempo propio)",
+    )
+    args = parser.parse_args()
+
+    rows = run_importtime(args.target)
+    total_us = max((cum for _, _, cum, depth in rows if depth <= 1), default=0)
+
+    if args.group:
+        grouped: Dict[str, int] = defaultdict(int)
+        for name, self_us, _, _ in rows:
+            grouped[name.split(".", 1)[0]] += self_us
+        items = sorted(grouped.items(), key=lambda kv: kv[1], reverse=True)[: args.top]
+        print(f"{'paquete':40} {'self ms':>10} {'%':>6}")
+        for name, us in items:
+            pct = 100.0 * us / total_us if total_us else 0.0
+            print(f"{name:40} {us / 1000:10.1f} {pct:6.1f}")
+    else:
+        items = sorted(rows, key=lambda r: r[2], reverse=True)[: args.top]
+        print(f"{'módulo':55} {'self ms':>10} {'cum ms':>10}")
+        for name, self_us, cum_us, _ in items:
+            print(f"{name:55} {self_us / 1000:10.1f} {cum_us / 1000:10.1f}")
+
+    print(f"\nTotal import {args.target}: {total_us / 1000:.1f} ms ({len(rows)} módulos)")
+
+
+if __name__ == "__main__":
+    main()
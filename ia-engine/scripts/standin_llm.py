@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+# ia-engine/scripts/standin_llm.py
+"""Servidor LLM stand-in local (OpenAI-compatible + Anthropic Messages).
+
+Responde sets de email válidos (armados con el motor de plantillas) con
+latencia y tasa de error configurables, para probar ruteo, failover,
+health checks y benchmarks sin llamar a ningún proveedor real.
+
+Endpoints:
+- POST /v1/chat/completions   (OpenAI / OpenAI-compatible)
+- POST /v1/messages           (Anthropic; respeta el prefill "{")
+- GET  /v1/models[/<id>]      (health checks)
+
+Con --capacity N simula un rate limit: headers x-ratelimit-*-requests,
+latencia que crece con la carga y 429 sobre N requests simultáneos.
+Con --input-latency S cada 1000 tokens de prompt (≈ 4 chars/token) suman S
+segundos, para que un prompt más largo también se note en la latencia.
+
+Uso (desde ia-engine/):
+    python scripts/standin_llm.py --port 9001 --latency 0.4 --error-rate 0.1
+
+    IA_PROVIDERS='[
+      {"name": "rapido", "kind": "openai_compatible", "base_url": "http://127.0.0.1:9001/v1"},
+      {"name": "claude", "kind": "anthropic", "base_url": "http://127.0.0.1:9002", "api_key": "x"}
+    ]' uvicorn app.main:app
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+DEFAULT_CAMPAIGN = "Crédito de consumo - Persona"
+DEFAULT_CLUSTER = "Viajes solteros"
+
+_counter = itertools.count()
+
+
+def _fake_set(user: str) -> Dict[str, Any]:
+    """Set plausible para el campaign/cluster del prompt (o uno por defecto)."""
+    from app.services.template_engine import generate_template_variant
+
+    campaign, cluster = DEFAULT_CAMPAIGN, DEFAULT_CLUSTER
+    try:
+        payload, _ = json.JSONDecoder().raw_decode(user[user.index("{"):])
+        campaign = str(payload.get("campaign") or campaign)
+        cluster = str(payload.get("cluster") or cluster)
+    except (ValueError, AttributeError):
+        pass
+
+    n = next(_counter)
+    try:
+        v = generate_template_variant(campaign, cluster, n % 5, nonce=n)
+    except Exception:  # noqa: BLE001
+        v = generate_template_variant(DEFAULT_CAMPAIGN, DEFAULT_CLUSTER, n % 5, nonce=n)
+    return {
+        "subject": v.subject,
+        "preheader": v.preheader,
+        "title": v.body.title,
+        "subtitle": v.body.subtitle,
+        "body": v.body.content,
+        "cta": v.cta,
+    }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "standin-llm/1.0"
+    protocol_version = "HTTP/1.1"
+
+    # Seteados por serve()
+    latency: float = 0.3
+    jitter: float = 0.1
+    error_rate: float = 0.0
+    error_status: int = 503
+    reject_schema: bool = False
+    capacity: int = 0
+    input_latency: float = 0.0
+    lock = threading.Lock()
+    stats: Dict[str, int] = {"requests": 0, "errors": 0, "rateLimited": 0, "inFlight": 0}
+    rate_headers: Optional[Dict[str, str]] = None
+
+    def log_message(self, fmt: str, *args: Any) -> None:  # silencio
+        pass
+
+    def _send(self, status: int, body: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+        raw = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        for key, value in {**(self.rate_headers or {}), **(headers or {})}.items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def _read_json(self) -> Dict[str, Any]:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _simulate(self, in_flight: int = 0, prompt_tokens: int = 0) -> bool:
+        """Duerme la latencia simulada; False si este request debe fallar."""
+        latency = random.gauss(self.latency, self.jitter) + self.input_latency * prompt_tokens / 1000
+        if self.capacity:
+            # Pasada la mitad de la capacidad, la latencia crece con la carga.
+            latency *= 1 + max(0, in_flight - self.capacity / 2) / self.capacity
+        time.sleep(max(0.0, latency))
+        with self.lock:
+            self.stats["requests"] += 1
+            failed = random.random() < self.error_rate
+            if failed:
+                self.stats["errors"] += 1
+        return not failed
+
+    def do_GET(self) -> None:  # noqa: N802
+        if self.path.startswith("/v1/models") or self.path.startswith("/models"):
+            model = self.path.rsplit("/", 1)[-1]
+            self._send(200, {"id": model, "object": "model", "data": []})
+        elif self.path == "/stats":
+            self._send(200, dict(self.stats))
+        else:
+            self._send(404, {"error": {"message": "not found"}})
+
+    def do_POST(self) -> None:  # noqa: N802
+        body = self._read_json()
+        with self.lock:
+            self.stats["inFlight"] += 1
+            in_flight = self.stats["inFlight"]
+        try:
+            if self.capacity:
+                # Headers estilo OpenAI; sobre la capacidad se responde 429.
+                self.rate_headers = {
+                    "x-ratelimit-limit-requests": str(self.capacity),
+                    "x-ratelimit-remaining-requests": str(max(self.capacity - in_flight, 0)),
+                }
+                if in_flight > self.capacity:
+                    with self.lock:
+                        self.stats["rateLimited"] += 1
+                    self._send(429, {"error": {"message": "stand-in: rate limit"}}, {"retry-after": "1"})
+                    return
+            self._complete(body, in_flight)
+        finally:
+            with self.lock:
+                self.stats["inFlight"] -= 1
+
+    def _complete(self, body: Dict[str, Any], in_flight: int) -> None:
+        wants_schema = (body.get("response_format") or {}).get("type") == "json_schema" or "tools" in body
+        if wants_schema and self.reject_schema:
+            self._send(400, {"error": {"message": "stand-in: response_format json_schema no soportado"}})
+            return
+        messages = body.get("messages", [])
+        user = next((m.get("content", "") for m in messages if m.get("role") == "user"), "")
+        prompt_chars = len(body.get("system", "")) + sum(len(str(m.get("content", ""))) for m in messages)
+        usage_in = max(1, prompt_chars // 4)
+        if not self._simulate(in_flight, usage_in):
+            self._send(self.error_status, {"error": {"message": "stand-in: error simulado"}})
+            return
+
+        content = json.dumps(_fake_set(str(user)), ensure_ascii=False)
+        usage_out = max(1, len(content) // 4)
+
+        if self.path.endswith("/chat/completions"):
+            self._send(200, {
+                "id": f"chatcmpl-standin-{self.stats['requests']}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "standin"),
+                "choices": [{
+                    "index": 0,
+                    "finish_reason": "stop",
+                    "message": {"role": "assistant", "content": content},
+                }],
+                "usage": {
+                    "prompt_tokens": usage_in,
+                    "completion_tokens": usage_out,
+                    "total_tokens": usage_in + usage_out,
+                },
+            })
+        elif self.path.endswith("/messages"):
+            # Con prefill "{" el modelo continúa después de la llave.
+            prefilled = messages and messages[-1].get("role") == "assistant"
+            text = content[1:] if prefilled and content.startswith("{") else content
+            if "tools" in body:
+                tool = body["tools"][0]
+                blocks = [{"type": "tool_use", "id": "toolu_standin", "name": tool["name"], "input": json.loads(content)}]
+            else:
+                blocks = [{"type": "text", "text": text}]
+            self._send(200, {
+                "id": f"msg_standin_{self.stats['requests']}",
+                "type": "message",
+                "role": "assistant",
+                "model": body.get("model", "standin"),
+                "content": blocks,
+                "stop_reason": "end_turn",
+                "usage": {"input_tokens": usage_in, "output_tokens": usage_out},
+            })
+        else:
+            self._send(404, {"error": {"message": "not found"}})
+
+
+def serve(
+    port: int,
+    *,
+    latency: float,
+    jitter: float,
+    error_rate: float,
+    error_status: int = 503,
+    reject_schema: bool = False,
+    capacity: int = 0,
+    input_latency: float = 0.0,
+) -> ThreadingHTTPServer:
+    """Levanta el stand-in en un thread daemon y devuelve el server (para scripts/benchmarks)."""
+    handler = type(
+        "StandinHandler",
+        (_Handler,),
+        {
+            "latency": latency,
+            "jitter": jitter,
+            "error_rate": error_rate,
+            "error_status": error_status,
+            "reject_schema": reject_schema,
+            "capacity": capacity,
+            "input_latency": input_latency,
+            "lock": threading.Lock(),
+            "stats": {"requests": 0, "errors": 0, "rateLimited": 0, "inFlight": 0},
+        },
+    )
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, name=f"standin-{port}", daemon=True).start()
+    return server
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=9001)
+    parser.add_argument("--latency", type=float, default=0.3, help="latencia media (s)")
+    parser.add_argument("--jitter", type=float, default=0.1, help="desvío estándar de la latencia (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fracción de requests que fallan")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--reject-schema", action="store_true", help="responder 400 a structured outputs")
+    parser.add_argument("--capacity", type=int, default=0, help="requests simultáneos antes de responder 429 (0 = sin límite)")
+    parser.add_argument("--input-latency", type=float, default=0.0, help="segundos extra por cada 1000 tokens de prompt")
+    args = parser.parse_args()
+
+    server = serve(
+        args.port,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        reject_schema=args.reject_schema,
+        capacity=args.capacity,
+        input_latency=args.input_latency,
+    )
+    print(f"stand-in LLM en http://127.0.0.1:{args.port} (latency={args.latency}s, errors={args.error_rate:.0%})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,9 @@
+# ia-engine/tests/conftest.py
+"""Fixtures compartidas: los tests corren desde ia-engine/ (imports `app.*`)."""
+
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
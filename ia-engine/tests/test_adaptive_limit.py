@@ -0,0 +1,64 @@
+# ia-engine/tests/test_adaptive_limit.py
+"""Límite AIMD sobre los cupos del scheduler (app/services/adaptive_limit.py)."""
+
+import pytest
+
+from app.services import adaptive_limit
+from app.services.adaptive_limit import AimdLimit, call_class
+from app.services.providers import ProviderError
+from app.services.scheduler import UpstreamScheduler
+
+
+@pytest.fixture(autouse=True)
+def _no_cooldown(monkeypatch):
+    monkeypatch.setattr(adaptive_limit, "COOLDOWN", 0.0)
+
+
+def _limiter(initial=8.0):
+    return AimdLimit(UpstreamScheduler(1), initial=initial, min_limit=1.0, max_limit=64.0)
+
+
+def test_call_class_buckets_by_max_tokens():
+    assert call_class(None) == 0
+    assert call_class(70) == 128
+    assert call_class(900) == 1024
+    assert call_class(1024) == 1024
+    assert call_class(900 * 4) == 4096
+
+
+def test_short_calls_do_not_set_baseline_for_long_ones():
+    limiter = _limiter()
+    # Una regeneración corta y después sets completos estables: no hay señal de sobrecarga.
+    limiter.on_success(0.3, max_tokens=70)
+    for _ in range(30):
+        limiter.on_success(2.0, max_tokens=900)
+    assert limiter.stats()["cuts"] == {}
+    assert limiter.limit == 8.0
+
+
+def test_latency_rise_within_a_class_cuts_the_limit():
+    limiter = _limiter()
+    for _ in range(20):
+        limiter.on_success(1.0, max_tokens=900)
+    for _ in range(10):
+        limiter.on_success(3.0, max_tokens=900)
+    assert limiter.stats()["cuts"].get("latency", 0) >= 1
+    assert limiter.limit < 8.0
+
+
+def test_overload_error_halves_the_limit():
+    limiter = _limiter()
+    limiter.on_error(ProviderError("rate limit", status_code=429))
+    assert limiter.limit == 4.0
+    assert limiter.stats()["cuts"] == {"http429": 1}
+
+
+def test_baseline_is_a_low_percentile_not_the_minimum():
+    limiter = _limiter()
+    # Una respuesta suelta muy rápida (p. ej. corta o cacheada) entre sets estables.
+    limiter.on_success(0.2, max_tokens=900)
+    for _ in range(30):
+        limiter.on_success(2.0, max_tokens=900)
+    assert limiter.stats()["latency"]["1024"]["baselineMs"] == 2000.0
+    assert limiter.stats()["cuts"] == {}
+    assert limiter.limit == 8.0
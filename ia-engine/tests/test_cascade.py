@@ -0,0 +1,99 @@
+# ia-engine/tests/test_cascade.py
+"""Cascada de modelos (services/cascade.py) contra dos stand-ins: tiers con proveedor inferido y ruteo por modelo."""
+
+import pytest
+
+from app.models.request import GenerateRequest
+from app.services import cascade, text_engine
+from app.services.cascade import Tier, _parse_config, _parse_tier
+from app.services.openai_client import chat_json
+from app.services.providers import KIND_ANTHROPIC, KIND_OPENAI_COMPATIBLE, ProviderRouter, build_provider, set_router
+from scripts.standin_llm import serve
+
+SYSTEM = "Responde un set de email en JSON."
+USER = '{"campaign":"Crédito de consumo - Persona","cluster":"Viajes solteros"}'
+
+
+@pytest.fixture
+def gateway_down():
+    return False
+
+
+@pytest.fixture
+def router(gateway_down):
+    gateway = serve(0, latency=0.0, jitter=0.0, error_rate=1.0 if gateway_down else 0.0)
+    claude = serve(0, latency=0.0, jitter=0.0, error_rate=0.0)
+    router = ProviderRouter(
+        [
+            build_provider(
+                {
+                    "name": "gateway",
+                    "kind": KIND_OPENAI_COMPATIBLE,
+                    "model": "gpt-4o-mini",
+                    "base_url": f"http://127.0.0.1:{gateway.server_address[1]}/v1",
+                }
+            ),
+            build_provider(
+                {
+                    "name": "claude",
+                    "kind": KIND_ANTHROPIC,
+                    "model": "claude-3-5-haiku-latest",
+                    "api_key": "x",
+                    "base_url": f"http://127.0.0.1:{claude.server_address[1]}",
+                }
+            ),
+        ]
+    )
+    set_router(router)
+    yield router
+    set_router(None)
+    for server in (gateway, claude):
+        server.shutdown()
+        server.server_close()
+
+
+def _calls(router):
+    return {ep.name: ep.stats.calls for ep in router.endpoints}
+
+
+def test_plain_string_tiers_infer_the_provider():
+    assert _parse_tier("gpt-4o") == Tier(model="gpt-4o", engine="openai")
+    assert _parse_tier("claude-3-5-sonnet-latest") == Tier(model="claude-3-5-sonnet-latest", engine="anthropic")
+    assert _parse_tier({"model": "llama-3.1-70b", "engine": "gateway"}) == Tier(model="llama-3.1-70b", engine="gateway")
+    # Modelo desconocido sin engine: no se adivina el proveedor.
+    assert _parse_tier("llama-3.1-70b") is None
+
+
+def test_pick_only_considers_endpoints_that_serve_the_model(router):
+    for preference in ("auto", "anthropic", "claude", None):
+        assert router.pick(preference, model="gpt-4o").name == "gateway"
+    for preference in ("auto", "openai", "gateway"):
+        assert router.pick(preference, model="claude-3-5-sonnet-latest").name == "claude"
+    # Sin modelo explícito se respeta la preferencia.
+    assert router.pick("claude").name == "claude"
+
+
+@pytest.mark.parametrize("gateway_down", [True])
+def test_failover_never_sends_an_openai_model_to_anthropic(router):
+    with pytest.raises(RuntimeError):
+        chat_json(SYSTEM, USER, model="gpt-4o", engine="auto")
+    calls = _calls(router)
+    assert calls["claude"] == 0
+    assert calls["gateway"] >= 1
+
+
+@pytest.mark.parametrize("gateway_down", [True])
+def test_cascade_escalates_to_the_anthropic_tier(router, monkeypatch):
+    monkeypatch.setattr(cascade, "CASCADE_CONFIG", _parse_config('["gpt-4o-mini", "claude-3-5-sonnet-latest"]'))
+    request = GenerateRequest(campaign="Crédito de consumo - Persona", cluster="Viajes solteros", sets=1)
+    info: dict = {}
+
+    variant, is_stub = text_engine._generate_one(request, 0, info=info)
+
+    assert not is_stub and variant.subject
+    assert info["tier"] == "claude-3-5-sonnet-latest"
+    assert info["escalations"] and info["escalations"][0][0].startswith("error.")
+    calls = _calls(router)
+    # El tier "gpt-4o-mini" nunca salió hacia Anthropic, ni siquiera al fallar el gateway.
+    assert calls["claude"] == 1
+    assert calls["gateway"] >= 1
@@ -0,0 +1,90 @@
+# ia-engine/tests/test_cassette.py
+"""Cassettes (services/cassette.py): record → replay, errores y grabación desde varios procesos."""
+
+import gzip
+import json
+import multiprocessing
+
+import pytest
+
+from app.services.cassette import MODE_RECORD, MODE_REPLAY, Cassette, CassetteMiss, request_key
+from app.services.providers import Provider, ProviderError
+
+CALL = {"model": None, "temperature": 0.7, "top_p": 1.0, "max_tokens": 800, "timeout": 5.0}
+
+
+class FakeProvider(Provider):
+    """Responde JSON con un contador; los prompts que empiezan con "falla" levantan 503."""
+
+    kind = "openai_compatible"
+
+    def __init__(self) -> None:
+        super().__init__("fake", "standin")
+        self.calls = 0
+
+    def complete_json(self, system, user, *, model, temperature, top_p, max_tokens, timeout, schema=None):
+        self.calls += 1
+        if user.startswith("falla"):
+            raise ProviderError("upstream caído", status_code=503)
+        return json.dumps({"subject": f"{user} #{self.calls}"})
+
+    def health_check(self, timeout: float = 5.0) -> None:
+        return None
+
+
+def _interactions(directory, user: str):
+    key = request_key(FakeProvider(), "system", user, **CALL)
+    with gzip.open(directory / f"{key}.json.gz", "rt", encoding="utf-8") as fh:
+        return json.load(fh)["interactions"]
+
+
+def test_record_then_replay_round_trip_with_errors(tmp_path):
+    provider = FakeProvider()
+    recorder = Cassette(tmp_path, MODE_RECORD)
+    first = recorder.complete_json(provider, "system", "hola", **CALL)
+    second = recorder.complete_json(provider, "system", "hola", **CALL)
+    with pytest.raises(ProviderError):
+        recorder.complete_json(provider, "system", "falla", **CALL)
+    assert recorder.stats()["recorded"] == 3
+
+    offline = FakeProvider()
+    player = Cassette(tmp_path, MODE_REPLAY, latency_scale=0)
+    # Varias grabaciones de la misma clave se rotan en orden.
+    assert player.complete_json(offline, "system", "hola", **CALL) == first
+    assert player.complete_json(offline, "system", "hola", **CALL) == second
+    assert player.complete_json(offline, "system", "hola", **CALL) == first
+    with pytest.raises(ProviderError) as exc:
+        player.complete_json(offline, "system", "falla", **CALL)
+    assert exc.value.status_code == 503
+    assert "upstream caído" in str(exc.value)
+    with pytest.raises(CassetteMiss):
+        player.complete_json(offline, "system", "no grabado", **CALL)
+    assert offline.calls == 0
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_recorders_merge_with_what_is_on_disk(tmp_path):
+    # Dos instancias = dos workers, cada una con su caché en memoria.
+    a, b = Cassette(tmp_path, MODE_RECORD), Cassette(tmp_path, MODE_RECORD)
+    a.complete_json(FakeProvider(), "system", "hola", **CALL)
+    b.complete_json(FakeProvider(), "system", "hola", **CALL)
+    a.complete_json(FakeProvider(), "system", "hola", **CALL)
+    assert len(_interactions(tmp_path, "hola")) == 3
+
+
+def _record_many(directory: str, n: int) -> None:
+    cassette, provider = Cassette(directory, MODE_RECORD), FakeProvider()
+    for _ in range(n):
+        cassette.complete_json(provider, "system", "hola", **CALL)
+
+
+def test_concurrent_processes_do_not_lose_recordings(tmp_path):
+    ctx = multiprocessing.get_context("fork")
+    workers = [ctx.Process(target=_record_many, args=(str(tmp_path), 15)) for _ in range(3)]
+    for p in workers:
+        p.start()
+    for p in workers:
+        p.join(30)
+        assert p.exitcode == 0
+    assert len(_interactions(tmp_path, "hola")) == 45
+    assert not list(tmp_path.glob("*.tmp"))
@@ -0,0 +1,83 @@
+# ia-engine/tests/test_catalog_delta.py
+"""Delta de /ia/meta por versión de catálogo (app/utils/catalog.meta_delta)."""
+
+import json
+from collections import deque
+
+import pytest
+
+from app.utils import catalog
+from app.utils.catalog import get_catalog, meta_delta, reload_catalog
+
+CAMPAIGN = "Crédito de consumo - Persona"
+
+
+@pytest.fixture(autouse=True)
+def _isolated_registry(monkeypatch):
+    """Cada test parte del catálogo embebido con historial propio."""
+    monkeypatch.setattr(catalog, "_current", None)
+    monkeypatch.setattr(catalog, "_history", deque(maxlen=32))
+    monkeypatch.setattr(catalog, "CATALOG_PATH", "")
+    yield
+
+
+def _write(tmp_path, name, sections):
+    path = tmp_path / name
+    path.write_text(json.dumps(sections, ensure_ascii=False), encoding="utf-8")
+    return str(path)
+
+
+def _with_ctas(tmp_path, name, ctas):
+    return _write(tmp_path, name, {"ctas": {CAMPAIGN: ctas}})
+
+
+def test_version_is_content_hash_and_stable_across_processes():
+    first = get_catalog()
+    # Otro proceso (o instancia) con el mismo contenido arma la misma versión.
+    rebuilt = catalog._build("")
+    assert rebuilt.version == first.version
+    assert first.content_hash.startswith(first.version)
+
+
+def test_same_version_gives_empty_delta():
+    snapshot = get_catalog()
+    assert meta_delta(snapshot.version, snapshot) == (False, [])
+
+
+def test_delta_after_reload_lists_only_changed_keys(tmp_path):
+    base = get_catalog()
+    updated = reload_catalog(_with_ctas(tmp_path, "v2.json", ["Ver mi oferta", "Simular mi crédito"]))
+    assert updated.version != base.version
+    assert meta_delta(base.version, updated) == (False, ["ctas"])
+
+
+def test_unchanged_reload_keeps_version(tmp_path):
+    base = get_catalog()
+    same = reload_catalog(_write(tmp_path, "same.json", {}))
+    assert same is base
+
+
+def test_unknown_version_gets_full_payload(tmp_path):
+    reload_catalog(_with_ctas(tmp_path, "v2.json", ["Ver mi oferta"]))
+    # Versión de otra instancia (o el contador viejo): nunca un delta vacío.
+    full, keys = meta_delta("1")
+    assert full is True
+    assert keys == list(catalog.META_KEYS)
+
+
+def test_delta_after_history_eviction_is_full(tmp_path, monkeypatch):
+    monkeypatch.setattr(catalog, "_history", deque(maxlen=2))
+    base = get_catalog()
+    reload_catalog(_with_ctas(tmp_path, "v2.json", ["Ver mi oferta"]))
+    reload_catalog(_with_ctas(tmp_path, "v3.json", ["Simular mi crédito"]))
+    # base salió del historial (maxlen=2): catálogo completo.
+    assert meta_delta(base.version) == (True, list(catalog.META_KEYS))
+
+
+def test_returning_to_previous_content_reuses_version(tmp_path):
+    base = get_catalog()
+    v2 = reload_catalog(_with_ctas(tmp_path, "v2.json", ["Ver mi oferta"]))
+    back = reload_catalog("")
+    assert back.version == base.version
+    assert meta_delta(v2.version, back) == (False, ["ctas"])
+    assert [version for version, _ in catalog._history].count(base.version) == 1
@@ -0,0 +1,194 @@
+# ia-engine/tests/test_idempotency.py
+"""Idempotency-Key (services/idempotency.py): store en memoria y SQLite compartido entre procesos."""
+
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.models.response import GenerateResponse
+from app.routers import generate as generate_router
+from app.services import idempotency
+from app.services.idempotency import (
+    STATUS_JOINED,
+    STATUS_NEW,
+    STATUS_REPLAYED,
+    IdempotencyConflict,
+    IdempotencyTimeout,
+    run_idempotent,
+)
+
+PAYLOAD = {"campaign": "Crédito de consumo - Persona", "cluster": "Viajes solteros", "sets": 1}
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, monkeypatch, tmp_path):
+    monkeypatch.setattr(idempotency, "_entries", OrderedDict())
+    if request.param == "sqlite":
+        monkeypatch.setenv("IA_IDEMPOTENCY_DB", str(tmp_path / "idempotency.sqlite3"))
+    else:
+        monkeypatch.delenv("IA_IDEMPOTENCY_DB", raising=False)
+    return request.param
+
+
+def test_second_call_is_replayed(store):
+    calls = []
+    assert run_idempotent("k", "fp", lambda: calls.append(1) or {"n": 1}) == ({"n": 1}, STATUS_NEW)
+    assert run_idempotent("k", "fp", lambda: calls.append(1) or {"n": 2}) == ({"n": 1}, STATUS_REPLAYED)
+    assert calls == [1]
+
+
+def test_duplicate_attaches_to_the_request_in_flight(store):
+    started, release = threading.Event(), threading.Event()
+    results = {}
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return {"subject": "original"}
+
+    owner = threading.Thread(target=lambda: results.setdefault("owner", run_idempotent("k", "fp", slow)))
+    owner.start()
+    assert started.wait(5)
+    joiner = threading.Thread(
+        target=lambda: results.setdefault("joiner", run_idempotent("k", "fp", lambda: pytest.fail("no debe generar")))
+    )
+    joiner.start()
+    time.sleep(0.2)
+    assert joiner.is_alive(), "el duplicado espera al original"
+    release.set()
+    owner.join(5)
+    joiner.join(5)
+
+    assert results["owner"] == ({"subject": "original"}, STATUS_NEW)
+    assert results["joiner"] == ({"subject": "original"}, STATUS_JOINED)
+
+
+def test_failed_original_frees_the_key(store):
+    with pytest.raises(ZeroDivisionError):
+        run_idempotent("k", "fp", lambda: 1 / 0)
+    assert run_idempotent("k", "fp", lambda: {"ok": True}) == ({"ok": True}, STATUS_NEW)
+
+
+def test_conflict_and_timeout(store, monkeypatch):
+    run_idempotent("k", "fp", lambda: {"n": 1})
+    with pytest.raises(IdempotencyConflict):
+        run_idempotent("k", "otro", lambda: {"n": 2})
+
+    monkeypatch.setattr(idempotency, "WAIT_TIMEOUT", 0.2)
+    release = threading.Event()
+    owner = threading.Thread(target=run_idempotent, args=("lenta", "fp", lambda: release.wait(5) and {}))
+    owner.start()
+    time.sleep(0.1)
+    with pytest.raises(IdempotencyTimeout):
+        run_idempotent("lenta", "fp", lambda: {})
+    release.set()
+    owner.join(5)
+
+
+def _child_owner(path: str, started, release) -> None:
+    os.environ["IA_IDEMPOTENCY_DB"] = path
+
+    def slow():
+        started.set()
+        release.wait(10)
+        return {"pid": os.getpid()}
+
+    run_idempotent("k", "fp", slow)
+
+
+def test_shared_store_joins_a_request_in_another_process(monkeypatch, tmp_path):
+    path = str(tmp_path / "idempotency.sqlite3")
+    monkeypatch.setenv("IA_IDEMPOTENCY_DB", path)
+    ctx = multiprocessing.get_context("fork")
+    started, release = ctx.Event(), ctx.Event()
+    child = ctx.Process(target=_child_owner, args=(path, started, release))
+    child.start()
+    try:
+        assert started.wait(10)
+        threading.Timer(0.2, release.set).start()
+        result, status = run_idempotent("k", "fp", lambda: pytest.fail("no debe generar"))
+    finally:
+        release.set()
+        child.join(10)
+    assert status == STATUS_JOINED
+    assert result == {"pid": child.pid}
+
+
+def test_shared_store_takes_over_a_key_whose_owner_died(monkeypatch, tmp_path):
+    path = str(tmp_path / "idempotency.sqlite3")
+    monkeypatch.setenv("IA_IDEMPOTENCY_DB", path)
+    ctx = multiprocessing.get_context("fork")
+    dead = ctx.Process(target=lambda: None)
+    dead.start()
+    dead.join()
+
+    idempotency._connect(path).close()
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.execute(
+            "INSERT INTO idempotency (key, fingerprint, created, owner_pid) VALUES (?, ?, ?, ?)",
+            ("k", "fp", time.time(), dead.pid),
+        )
+    conn.close()
+    assert run_idempotent("k", "fp", lambda: {"ok": True}) == ({"ok": True}, STATUS_NEW)
+
+
+# ---------- a través del router ----------
+
+
+@pytest.fixture
+def client(store, monkeypatch):
+    release = threading.Event()
+    release.set()
+    calls = []
+
+    def fake_generate(payload, profile=False):
+        calls.append(payload.campaign)
+        release.wait(5)
+        return GenerateResponse(engine=payload.engine, variants=[], metadata={"call": len(calls)})
+
+    monkeypatch.setattr(generate_router, "_generate", fake_generate)
+    app = FastAPI()
+    app.include_router(generate_router.router, prefix="/ia")
+    with TestClient(app) as client:
+        client.release, client.calls = release, calls
+        yield client
+
+
+def test_router_replays_with_header(client):
+    headers = {"Idempotency-Key": "abc"}
+    first = client.post("/ia/generate", json=PAYLOAD, headers=headers)
+    second = client.post("/ia/generate", json=PAYLOAD, headers=headers)
+    assert first.status_code == second.status_code == 200
+    assert second.json() == first.json()
+    assert second.headers.get("Idempotent-Replayed") == "true"
+    assert len(client.calls) == 1
+
+
+def test_router_conflict_is_422(client):
+    headers = {"Idempotency-Key": "abc"}
+    assert client.post("/ia/generate", json=PAYLOAD, headers=headers).status_code == 200
+    other = client.post("/ia/generate", json={**PAYLOAD, "sets": 2}, headers=headers)
+    assert other.status_code == 422
+
+
+def test_router_timeout_is_409(client, monkeypatch):
+    monkeypatch.setattr(idempotency, "WAIT_TIMEOUT", 0.3)
+    client.release.clear()
+    headers = {"Idempotency-Key": "abc"}
+    first = {}
+    owner = threading.Thread(target=lambda: first.update(r=client.post("/ia/generate", json=PAYLOAD, headers=headers)))
+    owner.start()
+    while not client.calls:
+        time.sleep(0.01)
+    assert client.post("/ia/generate", json=PAYLOAD, headers=headers).status_code == 409
+    client.release.set()
+    owner.join(5)
+    assert first["r"].status_code == 200
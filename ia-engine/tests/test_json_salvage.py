@@ -0,0 +1,70 @@
+# ia-engine/tests/test_json_salvage.py
+"""Rescate de JSON truncado o mal formado (app/utils/json_salvage.py)."""
+
+import pytest
+
+from app.utils.json_salvage import salvage_json
+
+
+def test_complete_object_with_fences_and_extra_text():
+    result = salvage_json('Aquí va:\n```json\n{"subject": "Hola", "cta": "Ver"}\n```\nSaludos')
+    assert result.data == {"subject": "Hola", "cta": "Ver"}
+    assert result.truncated is False
+
+
+@pytest.mark.parametrize("text", ["", "sin json", "[1, 2]", '{"a": tru}'])
+def test_nothing_to_salvage(text):
+    assert salvage_json(text) is None
+
+
+def test_cut_inside_string_value_keeps_partial_value():
+    result = salvage_json('{"subject": "Hola", "body": "Texto largo que se co')
+    assert result.data == {"subject": "Hola", "body": "Texto largo que se co"}
+    assert result.truncated is True
+    assert result.cut_field == "body"
+    assert result.dropped == []
+
+
+def test_cut_after_escape_sequence():
+    result = salvage_json('{"subject": "dice \\"hola')
+    assert result.data == {"subject": 'dice "hola'}
+    assert result.cut_field == "subject"
+
+
+def test_cut_inside_key_drops_partial_key():
+    result = salvage_json('{"subject": "Hola", "preh')
+    assert result.data == {"subject": "Hola"}
+    assert result.cut_field is None
+
+
+@pytest.mark.parametrize("tail", ['"body":', '"body": ', '"body"'])
+def test_cut_right_after_key_reports_dropped_key(tail):
+    result = salvage_json('{"subject": "Hola", ' + tail)
+    assert result.data == {"subject": "Hola"}
+    assert result.cut_field is None
+    assert result.dropped == ["body"]
+
+
+def test_trailing_comma():
+    result = salvage_json('{"subject": "Hola",')
+    assert result.data == {"subject": "Hola"}
+    assert result.dropped == []
+
+
+def test_cut_inside_nested_value_reports_top_level_field():
+    result = salvage_json('{"subject": "Hola", "body": {"title": "T", "content": "abc')
+    assert result.data == {"subject": "Hola", "body": {"title": "T", "content": "abc"}}
+    assert result.cut_field == "body"
+
+
+def test_cut_after_nested_key_keeps_rest_of_object():
+    result = salvage_json('{"subject": "Hola", "body": {"title": "T", "content":')
+    assert result.data == {"subject": "Hola", "body": {"title": "T"}}
+    assert result.cut_field == "body"
+    assert result.dropped == []
+
+
+def test_cut_inside_list_keeps_complete_items():
+    result = salvage_json('{"subject": "Hola", "tags": ["x", "y"')
+    assert result.data == {"subject": "Hola", "tags": ["x", "y"]}
+    assert result.cut_field == "tags"
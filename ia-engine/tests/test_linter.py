@@ -0,0 +1,68 @@
+# ia-engine/tests/test_linter.py
+"""Linter local de sets (utils/linter.py): viñetas, números y reparaciones."""
+
+from typing import List
+
+import pytest
+
+from app.models.response import BodyBlock, GeneratedVariant
+from app.utils.linter import Violation, _lint_body, lint_variant
+
+
+def _body(text: str) -> str:
+    return _lint_body(text, [])
+
+
+@pytest.mark.parametrize(
+    "line",
+    [
+        "3.5% de tasa referencial para ti.",
+        "200.000 clientes ya confían en BICE.",
+        "1.500.000 pesos de monto referencial.",
+        "12,9% CAE referencial.",
+        "24 cuotas fijas para tu proyecto.",
+    ],
+)
+def test_amounts_and_rates_at_line_start_are_kept(line):
+    text = f"Apertura del correo.\n{line}\nCierre."
+    assert _body(text) == text
+
+
+def test_numbered_markers_become_dash_bullets():
+    text = "Beneficios:\n1. Tasa preferente\n2) Cuotas fijas\n10. Todo online"
+    assert _body(text) == "Beneficios:\n- Tasa preferente\n- Cuotas fijas\n- Todo online"
+
+
+def test_symbol_bullets_become_dash_bullets():
+    text = "Beneficios:\n• Tasa preferente\n* Cuotas fijas\n–Todo online"
+    assert _body(text) == "Beneficios:\n- Tasa preferente\n- Cuotas fijas\n- Todo online"
+
+
+def test_bullet_with_leading_amount_keeps_the_amount():
+    text = "Beneficios:\n1. 3.5% de tasa referencial\n2. 200.000 clientes confían en BICE"
+    assert _body(text) == "Beneficios:\n- 3.5% de tasa referencial\n- 200.000 clientes confían en BICE"
+
+
+def test_bullet_format_violation_only_when_rewritten():
+    out: List[Violation] = []
+    _lint_body("3.5% de tasa.\n- uno dos tres\n- cuatro cinco\n- seis siete", out)
+    assert "bullet_format" not in {v.rule for v in out}
+
+    out = []
+    _lint_body("Beneficios:\n1. uno dos tres\n- cuatro cinco\n- seis siete", out)
+    assert Violation("body", "bullet_format", True) in out
+
+
+def test_lint_variant_repairs_banned_terms_and_exclamations():
+    variant = GeneratedVariant(
+        id=1,
+        subject="Tu crédito gratis!! con tasa preferente hoy",
+        preheader="Conoce beneficios exclusivos y comisiones preferentes en tu crédito",
+        body=BodyBlock(title="Beneficios que se notan", subtitle=None, content="3.5% de tasa referencial."),
+        cta="Conoce más",
+    )
+    fixed, out = lint_variant(variant, campaign="Crédito de consumo - Persona")
+    assert "gratis" not in fixed.subject.lower()
+    assert "!" not in fixed.subject
+    assert fixed.body.content.startswith("3.5% de tasa")
+    assert any(v.rule == "banned_term" and v.fixed for v in out)
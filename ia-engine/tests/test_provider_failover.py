@@ -0,0 +1,81 @@
+# ia-engine/tests/test_provider_failover.py
+"""Failover y circuit breaker de ProviderRouter contra stand-ins locales (scripts/standin_llm.py)."""
+
+import time
+
+import pytest
+
+from app.services import providers
+from app.services.openai_client import chat_json
+from app.services.providers import KIND_OPENAI_COMPATIBLE, ProviderRouter, build_provider, set_router
+from scripts.standin_llm import serve
+
+SYSTEM = "Responde un set de email en JSON."
+USER = '{"campaign":"Crédito de consumo - Persona","cluster":"Viajes solteros"}'
+
+
+@pytest.fixture
+def standins():
+    down = serve(0, latency=0.0, jitter=0.0, error_rate=1.0, error_status=503)
+    up = serve(0, latency=0.0, jitter=0.0, error_rate=0.0)
+    yield down, up
+    for server in (down, up):
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def router(standins):
+    down, up = standins
+    router = ProviderRouter(
+        [
+            build_provider(
+                {"name": name, "kind": KIND_OPENAI_COMPATIBLE, "model": "standin", "base_url": f"http://127.0.0.1:{s.server_address[1]}/v1"}
+            )
+            for name, s in (("caido", down), ("sano", up))
+        ]
+    )
+    set_router(router)
+    yield router
+    set_router(None)
+
+
+def _requests(server) -> int:
+    return server.RequestHandlerClass.stats["requests"]
+
+
+def test_failover_to_the_other_endpoint(standins, router):
+    down, up = standins
+    data = chat_json(SYSTEM, USER, engine="caido")
+    assert data["subject"]
+    assert (_requests(down), _requests(up)) == (1, 1)
+    caido, sano = router.endpoints
+    assert (caido.stats.failures, sano.stats.failures) == (1, 0)
+
+
+def test_circuit_opens_and_skips_the_failing_endpoint(standins, router):
+    down, _ = standins
+    for _ in range(providers.FAILURES_TO_OPEN):
+        chat_json(SYSTEM, USER, engine="caido")
+    caido = router.endpoints[0]
+    assert not caido.available(time.monotonic())
+    assert _requests(down) == providers.FAILURES_TO_OPEN
+
+    # Con el circuito abierto, el preferido se saltea sin llamarlo.
+    chat_json(SYSTEM, USER, engine="caido")
+    assert _requests(down) == providers.FAILURES_TO_OPEN
+
+
+def test_circuit_half_opens_after_cooldown(standins, router, monkeypatch):
+    down, _ = standins
+    monkeypatch.setattr(providers, "COOLDOWN", 0.0)
+    for _ in range(providers.FAILURES_TO_OPEN + 1):
+        chat_json(SYSTEM, USER, engine="caido")
+    # Cooldown 0: cada llamada vuelve a probar el endpoint (half-open) y hace failover.
+    assert _requests(down) == providers.FAILURES_TO_OPEN + 1
+
+
+def test_all_endpoints_down_raises(standins, router):
+    router.endpoints.pop()  # solo queda "caido"
+    with pytest.raises(RuntimeError):
+        chat_json(SYSTEM, USER)
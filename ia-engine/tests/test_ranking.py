@@ -0,0 +1,98 @@
+# ia-engine/tests/test_ranking.py
+"""Ranking local de candidatos (utils/ranking.py): largos, gancho, spam y selección MMR."""
+
+import numpy as np
+import pytest
+
+from app.models.response import GeneratedVariant
+from app.utils.linter import CHAR_LIMITS
+from app.utils.ranking import _length_fit, _shouting, rank_candidates, score_components
+
+PREHEADER = "Conoce las condiciones de tu crédito y simula el monto que necesitas en minutos"
+OTHER_PREHEADER = "Revisa coberturas, asistencia en ruta y el deducible que mejor se ajusta a tu auto"
+
+
+def _variant(subject: str, preheader: str = PREHEADER, title: str = "Un título claro y breve") -> GeneratedVariant:
+    return GeneratedVariant(
+        id=1,
+        subject=subject,
+        preheader=preheader,
+        body={"title": title, "subtitle": None, "content": "Contenido"},
+        cta="Conoce más",
+    )
+
+
+def test_length_fit_is_one_inside_and_falls_linearly_outside():
+    lo, hi = CHAR_LIMITS["subject"]
+    span = hi - lo
+    fit = _length_fit(np.array([lo, hi, (lo + hi) / 2, hi + span / 2, lo - span, 0], dtype=float), lo, hi)
+    assert fit.tolist() == pytest.approx([1.0, 1.0, 1.0, 0.5, 0.0, 0.0])
+
+
+def test_length_component_prefers_inbox_preview_lengths():
+    fits = _variant("Tu crédito de consumo con tasa preferente hoy")
+    short = _variant("Hola")
+    length = score_components([fits, short])["length"]
+    assert length[0] > length[1]
+
+
+@pytest.mark.parametrize(
+    "subject, expected",
+    [
+        ("Hola, este es nuestro mensaje de la semana", 0.0),
+        ("Tu crédito con 3 cuotas menos", 0.35 + 0.25 + 0.3),
+        ("¿Planificas un viaje este verano?", 0.1),
+        ("Beneficios para este verano", 0.3),
+    ],
+)
+def test_hook_detection(subject, expected):
+    assert score_components([_variant(subject)])["hook"][0] == pytest.approx(expected)
+
+
+def test_hook_only_looks_at_the_first_characters():
+    late = "Un mensaje largo sin nada especial al comienzo del asunto con 3 cuotas"
+    assert score_components([_variant(late)])["hook"][0] == pytest.approx(0.0)
+
+
+@pytest.mark.parametrize(
+    "text, hits",
+    [
+        ("Tu crédito BICE con CAE referencial", 0),
+        ("Ahorra en UF con BICE", 0),
+        ("CAE UF", 0),
+        ("BICE TE REGALA beneficios", 1),
+        ("AHORRA YA con tu crédito", 1),
+        ("ÚLTIMOS DÍAS y OFERTA ESPECIAL", 2),
+    ],
+)
+def test_shouting_ignores_brands_and_acronyms(text, hits):
+    assert _shouting(text) == hits
+
+
+def test_brand_name_is_not_penalised_as_spam():
+    spam = score_components(
+        [_variant("Tu crédito BICE con tasa preferente"), _variant("Tu crédito BICE CON TASA preferente")]
+    )["spam"]
+    assert spam[0] == pytest.approx(1.0)
+    assert spam[1] < 1.0
+
+
+def test_mmr_picks_the_distinct_candidate_second():
+    best = _variant("Tu crédito de consumo con tasa preferente")
+    twin = _variant("Tu crédito de consumo con tasa preferente")
+    distinct = _variant("Protege tu auto con asistencia en ruta", OTHER_PREHEADER, "Seguro para cada viaje")
+    candidates = [best, twin, distinct]
+
+    # Solo por calidad, el gemelo (mejor gancho) iría segundo; la diversidad lo cambia.
+    assert [c.index for c in rank_candidates(candidates, 2, weights={"diversity": 0.0})] == [0, 1]
+    chosen = rank_candidates(candidates, 2)
+    assert [c.index for c in chosen] == [0, 2]
+    assert chosen[0].components["diversity"] == pytest.approx(1.0)
+    assert chosen[1].components["diversity"] > 0.5
+
+
+def test_existing_sets_count_for_diversity():
+    same = _variant("Tu crédito de consumo con tasa preferente")
+    distinct = _variant("Protege tu auto con asistencia en ruta", OTHER_PREHEADER, "Seguro para cada viaje")
+    chosen = rank_candidates([same, distinct], 1, existing=[same], weights={"diversity": 5.0})
+    assert chosen[0].index == 1
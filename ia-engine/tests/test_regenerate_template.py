@@ -0,0 +1,33 @@
+# ia-engine/tests/test_regenerate_template.py
+"""Regeneración por campo con el motor de plantillas (text_engine.regenerate_fields)."""
+
+import pytest
+
+from app.models.request import RegenerateRequest
+from app.services.template_engine import generate_template_variant
+from app.services.text_engine import regenerate_fields
+from app.utils.catalog import get_catalog
+
+FIELDS = ["subject", "preheader", "title", "subtitle", "body", "cta"]
+
+
+def _sets():
+    catalog = get_catalog()
+    combos = [(c, k) for c, clusters in catalog.campaign_clusters.items() for k in clusters][:12]
+    return [(c, k, generate_template_variant(c, k, i)) for c, k in combos for i in range(3)]
+
+
+@pytest.mark.parametrize("field", FIELDS)
+def test_template_regeneration_changes_each_field(field):
+    for campaign, cluster, variant in _sets():
+        request = RegenerateRequest(engine="template", campaign=campaign, cluster=cluster, variant=variant, fields=[field])
+        changed, meta = regenerate_fields(request)
+        assert field in changed, (campaign, cluster, variant.id)
+        assert meta["unchanged"] == []
+
+
+def test_nonce_rotates_subject_and_cta():
+    for campaign, cluster, first in _sets():
+        other = generate_template_variant(campaign, cluster, first.id - 1, nonce=1)
+        assert first.subject != other.subject, (campaign, cluster, first.id)
+        assert first.cta != other.cta, (campaign, cluster, first.id)
@@ -0,0 +1,122 @@
+# ia-engine/tests/test_scheduler.py
+"""Clases de prioridad y WFQ por flujo (app/services/scheduler.py)."""
+
+import threading
+import time
+
+import pytest
+
+from app.services.cancellation import RequestCancelled
+from app.services.scheduler import BACKGROUND, BATCH, INTERACTIVE, SchedulerTimeout, UpstreamScheduler
+
+WEIGHTS = {INTERACTIVE: 8.0, BATCH: 2.0, BACKGROUND: 1.0}
+
+
+def _queued(scheduler):
+    return sum(c["queued"] for c in scheduler.stats()["classes"].values())
+
+
+def _dispatch_order(scheduler, requests):
+    """
+    Encola `requests` [(etiqueta, clase, flujo)] en ese orden con el único
+    cupo tomado y lo libera: devuelve el orden en que se otorgaron.
+    """
+    held = scheduler.acquire(INTERACTIVE, "holder")
+    order = []
+    threads = []
+    for label, priority, flow in requests:
+        def work(label=label, priority=priority, flow=flow):
+            ticket = scheduler.acquire(priority, flow)
+            order.append(label)
+            scheduler.release(ticket)
+
+        expected = _queued(scheduler) + 1
+        thread = threading.Thread(target=work)
+        thread.start()
+        threads.append(thread)
+        deadline = time.monotonic() + 2
+        while _queued(scheduler) < expected:
+            assert time.monotonic() < deadline, "el ticket no llegó a la cola"
+            time.sleep(0.001)
+    scheduler.release(held)
+    for thread in threads:
+        thread.join(5)
+    return order
+
+
+def _scheduler(**kwargs):
+    return UpstreamScheduler(1, class_weights=WEIGHTS, flow_weights=kwargs.pop("flow_weights", {}), **kwargs)
+
+
+def test_disabled_scheduler_does_not_queue():
+    scheduler = UpstreamScheduler(0)
+    assert scheduler.acquire(BACKGROUND, "x") is None
+    scheduler.release(None)
+
+
+def test_wfq_small_flow_is_not_stuck_behind_large_one():
+    requests = [(f"big{i}", INTERACTIVE, "big") for i in range(6)] + [("small", INTERACTIVE, "small")]
+    order = _dispatch_order(_scheduler(), requests)
+    assert order.index("small") == 1
+    # Dentro de un flujo se respeta el orden de llegada.
+    assert [o for o in order if o.startswith("big")] == [f"big{i}" for i in range(6)]
+
+
+def test_wfq_flow_weights():
+    requests = [("a", INTERACTIVE, "a")] * 6 + [("b", INTERACTIVE, "b")] * 6
+    order = _dispatch_order(_scheduler(flow_weights={"a": 2.0}), requests)
+    assert order[:6].count("a") == 4
+
+
+def test_stride_between_batch_and_background():
+    requests = [("bg", BACKGROUND, "x")] * 6 + [("batch", BATCH, "x")] * 6
+    order = _dispatch_order(_scheduler(), requests)
+    assert order[:6].count("batch") == 4
+    assert order[:6].count("bg") == 2
+
+
+def test_stride_batch_is_not_starved_by_interactive():
+    requests = [("i", INTERACTIVE, "x")] * 10 + [("batch", BATCH, "x")] * 2
+    order = _dispatch_order(_scheduler(), requests)
+    assert "batch" in order[:6]
+
+
+def test_background_waits_while_interactive_is_queued():
+    requests = [("bg", BACKGROUND, "x")] * 3 + [("i", INTERACTIVE, "x")] * 3
+    order = _dispatch_order(_scheduler(), requests)
+    # Background encolado antes no pasa delante de los interactivos, pero se atiende después.
+    assert order == ["i", "i", "i", "bg", "bg", "bg"]
+
+
+def test_returning_class_does_not_keep_accumulated_credit():
+    scheduler = _scheduler()
+    _dispatch_order(scheduler, [("batch", BATCH, "x")] * 8)
+    requests = [("batch", BATCH, "x")] * 4 + [("bg", BACKGROUND, "x")] * 4
+    order = _dispatch_order(scheduler, requests)
+    # Background no acumuló "crédito" mientras no tenía cola: no se adelanta en bloque.
+    assert order[:3].count("bg") <= 1
+
+
+def test_timeout_when_no_slot():
+    scheduler = _scheduler(max_wait=0.05)
+    held = scheduler.acquire(INTERACTIVE, "holder")
+    with pytest.raises(SchedulerTimeout):
+        scheduler.acquire(BATCH, "x")
+    scheduler.release(held)
+    stats = scheduler.stats()["classes"][BATCH]
+    assert stats["timeouts"] == 1
+    assert stats["queued"] == 0
+
+
+def test_cancelled_wait_leaves_the_queue():
+    scheduler = _scheduler(max_wait=5)
+    held = scheduler.acquire(INTERACTIVE, "holder")
+    cancel = threading.Event()
+    threading.Timer(0.05, cancel.set).start()
+    with pytest.raises(RequestCancelled):
+        scheduler.acquire(BATCH, "x", cancel=cancel)
+    scheduler.release(held)
+    stats = scheduler.stats()
+    assert stats["classes"][BATCH]["cancelled"] == 1
+    assert stats["classes"][BATCH]["queued"] == 0
+    assert stats["active"] == 0
@@ -0,0 +1,111 @@
+# ia-engine/tests/test_semantic_cache.py
+"""Caché semántico de feedback (services/semantic_cache.py): umbral, TTL, clave y topes."""
+
+from collections import OrderedDict
+
+import pytest
+
+from app.models.response import GeneratedVariant
+from app.services import semantic_cache
+from app.services.semantic_cache import lookup, store
+
+CAMPAIGN = "Crédito de consumo - Persona"
+CLUSTER = "Viajes solteros"
+KEY = {"engine": "openai", "version": "v1"}
+FEEDBACK = {"subject": "Destacar la tasa preferente para viajes de verano"}
+
+
+@pytest.fixture(autouse=True)
+def cache(monkeypatch):
+    monkeypatch.setattr(semantic_cache, "_index", OrderedDict())
+    monkeypatch.setattr(semantic_cache, "THRESHOLD", 0.95)
+    monkeypatch.setattr(semantic_cache, "TTL", 3600.0)
+
+
+def _sets(tag: str, n: int = 2):
+    return [
+        GeneratedVariant(
+            id=i + 1,
+            subject=f"{tag} {i}",
+            preheader="Preheader",
+            body={"title": "Título", "subtitle": None, "content": "Contenido"},
+            cta="Conoce más",
+        )
+        for i in range(n)
+    ]
+
+
+def _subjects(hit):
+    return [v.subject for v in hit[0]] if hit else None
+
+
+def test_near_identical_feedback_hits_above_threshold():
+    store(CAMPAIGN, CLUSTER, FEEDBACK, _sets("a"), **KEY)
+    hit = lookup(CAMPAIGN, CLUSTER, {"subject": "  destacar la TASA preferente para viajes de verano"}, 2, **KEY)
+    assert _subjects(hit) == ["a 0", "a 1"]
+    assert hit[1] >= 0.95
+
+
+def test_changed_content_word_misses():
+    store(CAMPAIGN, CLUSTER, FEEDBACK, _sets("a"), **KEY)
+    other = {"subject": "Destacar la tasa preferente para viajes de invierno"}
+    assert lookup(CAMPAIGN, CLUSTER, other, 2, **KEY) is None
+
+
+def test_threshold_is_configurable(monkeypatch):
+    store(CAMPAIGN, CLUSTER, FEEDBACK, _sets("a"), **KEY)
+    other = {"subject": "Destacar la tasa preferente para viajes de invierno"}
+    monkeypatch.setattr(semantic_cache, "THRESHOLD", 0.8)
+    assert _subjects(lookup(CAMPAIGN, CLUSTER, other, 2, **KEY)) == ["a 0", "a 1"]
+
+
+def test_needs_at_least_the_requested_sets():
+    store(CAMPAIGN, CLUSTER, FEEDBACK, _sets("a", 2), **KEY)
+    assert lookup(CAMPAIGN, CLUSTER, FEEDBACK, 3, **KEY) is None
+    assert [v.id for v in lookup(CAMPAIGN, CLUSTER, FEEDBACK, 1, **KEY)[0]] == [1]
+
+
+def test_expired_entries_are_not_served(monkeypatch):
+    store(CAMPAIGN, CLUSTER, FEEDBACK, _sets("a"), **KEY)
+    monkeypatch.setattr(semantic_cache, "TTL", 0.0)
+    assert lookup(CAMPAIGN, CLUSTER, FEEDBACK, 2, **KEY) is None
+
+
+def test_engine_and_catalog_version_are_part_of_the_key():
+    store(CAMPAIGN, CLUSTER, FEEDBACK, _sets("openai"), **KEY)
+    assert lookup(CAMPAIGN, CLUSTER, FEEDBACK, 2, engine="template", version="v1") is None
+    assert lookup(CAMPAIGN, CLUSTER, FEEDBACK, 2, engine="openai", version="v2") is None
+
+
+def test_new_catalog_version_drops_old_entries():
+    store(CAMPAIGN, CLUSTER, FEEDBACK, _sets("viejo"), **KEY)
+    store(CAMPAIGN, CLUSTER, FEEDBACK, _sets("nuevo"), engine="openai", version="v2")
+    assert list(semantic_cache._index) == [("openai", "v2", CAMPAIGN, CLUSTER)]
+    assert lookup(CAMPAIGN, CLUSTER, FEEDBACK, 2, **KEY) is None
+
+
+def test_per_combo_bound_replaces_the_least_used(monkeypatch):
+    monkeypatch.setattr(semantic_cache, "PER_COMBO", 2)
+    first = {"subject": "Hablar de cuotas fijas y plazo"}
+    second = {"preheader": "Mencionar el seguro de desgravamen"}
+    third = {"title": "Enfatizar la simulación online"}
+    store(CAMPAIGN, CLUSTER, first, _sets("uno"), **KEY)
+    store(CAMPAIGN, CLUSTER, second, _sets("dos"), **KEY)
+    assert lookup(CAMPAIGN, CLUSTER, first, 2, **KEY) is not None  # "uno" pasa a ser el más usado
+
+    store(CAMPAIGN, CLUSTER, third, _sets("tres"), **KEY)
+    assert semantic_cache._index[("openai", "v1", CAMPAIGN, CLUSTER)].size == 2
+    assert lookup(CAMPAIGN, CLUSTER, second, 2, **KEY) is None
+    assert _subjects(lookup(CAMPAIGN, CLUSTER, first, 2, **KEY)) == ["uno 0", "uno 1"]
+    assert _subjects(lookup(CAMPAIGN, CLUSTER, third, 2, **KEY)) == ["tres 0", "tres 1"]
+
+
+def test_max_combos_bound_drops_the_least_recent(monkeypatch):
+    monkeypatch.setattr(semantic_cache, "MAX_COMBOS", 2)
+    for cluster in ("A", "B"):
+        store(CAMPAIGN, cluster, FEEDBACK, _sets(cluster), **KEY)
+    assert lookup(CAMPAIGN, "A", FEEDBACK, 2, **KEY) is not None  # "A" pasa a ser la más reciente
+
+    store(CAMPAIGN, "C", FEEDBACK, _sets("C"), **KEY)
+    assert [k[3] for k in semantic_cache._index] == ["A", "C"]
+    assert lookup(CAMPAIGN, "B", FEEDBACK, 2, **KEY) is None
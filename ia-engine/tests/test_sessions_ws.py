@@ -0,0 +1,133 @@
+"""Protocolo de /ia/sessions: frames inválidos y cancelación del turno."""
+
+import threading
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.models.response import GeneratedVariant
+from app.routers import sessions as sessions_router
+from app.services import cancellation
+from app.services.sessions import SessionStore, set_session_store
+from app.utils.catalog import get_catalog
+
+
+@pytest.fixture
+def store():
+    store = SessionStore()
+    set_session_store(store)
+    yield store
+    set_session_store(None)
+
+
+@pytest.fixture
+def client(store):
+    app = FastAPI()
+    app.include_router(sessions_router.router, prefix="/ia")
+    with TestClient(app) as client:
+        yield client
+
+
+def _open(ws) -> dict:
+    catalog = get_catalog()
+    campaign = next(iter(catalog.campaign_clusters))
+    ws.send_json({"type": "open", "campaign": campaign, "cluster": catalog.campaign_clusters[campaign][0], "engine": "template"})
+    reply = ws.receive_json()
+    assert reply["type"] == "session"
+    return reply
+
+
+def test_binary_frame_replies_error_and_keeps_socket(client):
+    with client.websocket_connect("/ia/sessions") as ws:
+        ws.send_bytes(b'{"type": "open"}')
+        assert ws.receive_json()["type"] == "error"
+        ws.send_text("{no es json")
+        assert ws.receive_json()["type"] == "error"
+        ws.send_text("[1, 2]")
+        assert ws.receive_json()["type"] == "error"
+        _open(ws)
+
+
+def test_template_turn_streams_variants_then_done(client):
+    with client.websocket_connect("/ia/sessions") as ws:
+        _open(ws)
+        ws.send_json({"type": "refine", "sets": 2})
+        kinds = [ws.receive_json()["type"] for _ in range(3)]
+        assert kinds == ["variant", "variant", "done"]
+
+
+def test_disconnect_mid_turn_cancels_pending_calls(client, store, monkeypatch):
+    started = threading.Event()
+    stopped = threading.Event()
+
+    def slow_set(request, index, prompt, *, turn=0):
+        # Como chat_json: revisa el token antes de cada intento.
+        started.set()
+        try:
+            while True:
+                cancellation.check_cancelled()
+                time.sleep(0.01)
+        finally:
+            stopped.set()
+
+    monkeypatch.setattr(sessions_router, "generate_session_set", slow_set)
+    before = cancellation.cancellation_stats()["cancelledRequests"]
+    with client.websocket_connect("/ia/sessions") as ws:
+        session_id = _open(ws)["session"]
+        ws.send_json({"type": "refine", "sets": 3})
+        assert started.wait(5)
+    assert stopped.wait(5)
+
+    deadline = time.monotonic() + 5
+    while store.get(session_id).busy and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not store.get(session_id).busy
+    assert cancellation.cancellation_stats()["cancelledRequests"] == before + 1
+
+
+def test_disconnect_after_a_set_finishes_ends_the_turn_cleanly(client, store, monkeypatch):
+    # El set termina igual (no revisa el token) después de que llegó el disconnect:
+    # el turno no debe volver a leer el socket ni pedir el set siguiente.
+    calls = []
+    started = threading.Event()
+
+    def deaf_set(request, index, prompt, *, turn=0):
+        calls.append(index)
+        started.set()
+        cancellation.current_token().event.wait(5)
+        variant = GeneratedVariant(
+            id=index + 1,
+            subject="Asunto",
+            preheader="Preheader",
+            body={"title": "Título", "subtitle": None, "content": "Contenido"},
+            cta="Conoce más",
+        )
+        return variant, False, {}
+
+    errors = []
+    run_turn = sessions_router._run_turn
+
+    async def spy(*args, **kwargs):
+        try:
+            await run_turn(*args, **kwargs)
+        except BaseException as exc:
+            errors.append(exc)
+            raise
+
+    monkeypatch.setattr(sessions_router, "generate_session_set", deaf_set)
+    monkeypatch.setattr(sessions_router, "_run_turn", spy)
+    with client.websocket_connect("/ia/sessions") as ws:
+        session_id = _open(ws)["session"]
+        ws.send_json({"type": "refine", "sets": 3})
+        assert started.wait(5)
+
+    deadline = time.monotonic() + 5
+    while store.get(session_id).busy and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not store.get(session_id).busy
+    assert calls == [0]
+    assert errors == []
+    # El set que alcanzó a terminar queda en la sesión.
+    assert store.get(session_id).describe()["variants"] == [1]
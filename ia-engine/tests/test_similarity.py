@@ -0,0 +1,124 @@
+# ia-engine/tests/test_similarity.py
+"""Near-duplicates con MinHash (utils/similarity.py) y dedup de sets (text_engine._dedup_sets)."""
+
+from typing import List
+
+import numpy as np
+import pytest
+
+from app.models.request import GenerateRequest
+from app.models.response import GeneratedVariant
+from app.services import text_engine
+from app.utils.similarity import find_near_duplicates, minhash_signature, normalize_text, similarity_matrix
+
+SUBJECTS = [
+    "Tu crédito de consumo con tasa preferente",
+    "Financia tu próximo viaje en cuotas fijas",
+    "Seguro de auto con asistencia en ruta",
+]
+
+
+def _fields(subjects: List[str]) -> dict:
+    return {"subject": list(subjects), "title": [f"Título {i}: {s[::-1]}" for i, s in enumerate(subjects)]}
+
+
+def test_normalize_text_drops_case_accents_and_punctuation():
+    assert normalize_text("  ¡Crédito   CONSUMO, ya! ") == "credito consumo ya"
+
+
+def test_identical_sets_flag_the_later_one():
+    _, offenders = find_near_duplicates({"subject": [SUBJECTS[0], SUBJECTS[0]]}, threshold=0.6)
+    assert offenders == {1: ["subject~set1"]}
+
+
+def test_near_duplicate_differs_only_in_punctuation_and_accents():
+    near = "¡Tu credito de consumo, con tasa preferente!"
+    matrices, offenders = find_near_duplicates({"subject": [SUBJECTS[0], near]}, threshold=0.6)
+    assert matrices["subject"][0, 1] == pytest.approx(1.0)
+    assert 1 in offenders
+
+
+def test_unrelated_sets_are_not_flagged():
+    matrices, offenders = find_near_duplicates(_fields(SUBJECTS), threshold=0.6)
+    assert offenders == {}
+    assert matrices["subject"][~np.eye(3, dtype=bool)].max() < 0.6
+
+
+def test_empty_fields_never_count_as_duplicates():
+    sig = minhash_signature("")
+    sim = similarity_matrix(np.stack([sig, sig]))
+    assert sim[0, 1] == 0.0
+    _, offenders = find_near_duplicates({"subject": ["", ""], "title": ["", ""]}, threshold=0.6)
+    assert offenders == {}
+
+
+def test_within_set_pair_is_flagged():
+    fields = {"subject": [SUBJECTS[0]], "title": [SUBJECTS[0]]}
+    _, offenders = find_near_duplicates(fields, threshold=0.6)
+    assert offenders == {0: ["subject~title"]}
+
+
+def test_skip_excludes_stubs_from_pairs():
+    subjects = [SUBJECTS[0], SUBJECTS[0], SUBJECTS[0]]
+    _, offenders = find_near_duplicates({"subject": subjects}, threshold=0.6, skip=[0])
+    # El par (0, 1) no cuenta por el stub; (1, 2) sí.
+    assert offenders == {2: ["subject~set2"]}
+    _, offenders = find_near_duplicates({"subject": [SUBJECTS[0]], "title": [SUBJECTS[0]]}, threshold=0.6, skip=[0])
+    assert offenders == {}
+
+
+OTHER = [
+    ("Beneficios exclusivos desde hoy", "Metas claras", "Apertura breve sobre metas personales."),
+    ("Cuotas que se ajustan a tu mes", "Planifica sin apuro", "Texto sobre planificar vacaciones."),
+    ("Asistencia las 24 horas del día", "Protección total", "Detalle de coberturas del seguro."),
+]
+
+
+def _variant(i: int, subject: str) -> GeneratedVariant:
+    preheader, title, content = OTHER[i]
+    return GeneratedVariant(
+        id=i + 1,
+        subject=subject,
+        preheader=preheader,
+        body={"title": title, "subtitle": None, "content": content},
+        cta="Conoce más",
+    )
+
+
+def test_dedup_sets_regenerates_only_offenders(monkeypatch):
+    calls: List[int] = []
+
+    def fake_generate(request, index, *, avoid=None, info=None, prompt=None):
+        calls.append(index)
+        assert avoid, "el set regenerado recibe los textos a evitar"
+        return _variant(index, SUBJECTS[2]), False
+
+    monkeypatch.setattr(text_engine, "_generate_one", fake_generate)
+    variants = [_variant(0, SUBJECTS[0]), _variant(1, SUBJECTS[0]), _variant(2, SUBJECTS[1])]
+    request = GenerateRequest(campaign="Crédito de consumo - Persona", cluster="Viajes solteros", sets=3)
+    meta = text_engine._dedup_sets(request, variants, set())
+
+    assert calls == [1]
+    assert meta["flagged"] == {"2": ["subject~set1"]}
+    assert meta["regenerated"] == [2]
+    assert meta["remaining"] == []
+    assert variants[1].subject == SUBJECTS[2]
+
+
+def test_dedup_sets_keeps_original_when_regeneration_is_a_stub(monkeypatch):
+    monkeypatch.setattr(text_engine, "_generate_one", lambda request, index, **_: (_variant(index, "stub"), True))
+    variants = [_variant(0, SUBJECTS[0]), _variant(1, SUBJECTS[0])]
+    request = GenerateRequest(campaign="Crédito de consumo - Persona", cluster="Viajes solteros", sets=2)
+    meta = text_engine._dedup_sets(request, variants, set())
+
+    assert meta["regenerated"] == []
+    assert meta["remaining"] == [2]
+    assert variants[1].subject == SUBJECTS[0]
+
+
+def test_dedup_sets_ignores_stub_sets(monkeypatch):
+    monkeypatch.setattr(text_engine, "_generate_one", lambda *a, **k: pytest.fail("no debe regenerar"))
+    variants = [_variant(0, SUBJECTS[0]), _variant(1, SUBJECTS[0])]
+    request = GenerateRequest(campaign="Crédito de consumo - Persona", cluster="Viajes solteros", sets=2)
+    meta = text_engine._dedup_sets(request, variants, {0})
+    assert meta["flagged"] == {}
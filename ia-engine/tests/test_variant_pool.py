@@ -0,0 +1,72 @@
+# ia-engine/tests/test_variant_pool.py
+"""Pool de sets pre-generados (services/variant_pool.py): combinaciones y profundidad por worker."""
+
+import pytest
+
+from app.models.response import GeneratedVariant
+from app.services import variant_pool
+from app.services.variant_pool import PoolTarget
+from app.utils.catalog import get_catalog
+
+CAMPAIGN = "Crédito de consumo - Persona"
+CLUSTER = "Viajes solteros"
+
+
+@pytest.fixture(autouse=True)
+def pool(monkeypatch):
+    monkeypatch.setattr(variant_pool, "POOL_ENABLED", True)
+    monkeypatch.setattr(variant_pool, "POOL_CONFIG", {})
+    monkeypatch.setattr(variant_pool, "_pools", {})
+    monkeypatch.delenv("WEB_CONCURRENCY", raising=False)
+    variant_pool._stop.clear()
+
+
+def _generate(campaign, cluster):
+    return GeneratedVariant(
+        id=1,
+        subject=f"{campaign} {cluster}",
+        preheader="preheader",
+        body={"title": "t", "subtitle": None, "content": "c"},
+        cta="Conoce más",
+    )
+
+
+def test_unconfigured_combos_have_no_pool():
+    assert variant_pool.target_for(CAMPAIGN, CLUSTER).depth == 0
+    assert variant_pool.refill_once(_generate) == 0
+
+
+def test_default_depth_applies_only_to_configured_combos(monkeypatch):
+    monkeypatch.setattr(
+        variant_pool, "POOL_CONFIG", {f"{CAMPAIGN}::{CLUSTER}": PoolTarget(depth=variant_pool.DEFAULT_DEPTH, ttl=60)}
+    )
+    added = variant_pool.refill_once(_generate)
+    assert added == variant_pool.DEFAULT_DEPTH
+    assert set(variant_pool._pools) == {(CAMPAIGN, CLUSTER)}
+
+
+def test_star_opts_in_the_whole_catalog(monkeypatch):
+    monkeypatch.setattr(variant_pool, "POOL_CONFIG", {"*": PoolTarget(depth=1, ttl=60)})
+    combos = sum(len(clusters) for clusters in get_catalog().campaign_clusters.values())
+    assert variant_pool.refill_once(_generate) == combos
+
+
+@pytest.mark.parametrize("workers, expected", [("1", 5), ("2", 3), ("4", 2), ("8", 1), ("x", 5)])
+def test_depth_is_split_across_workers(monkeypatch, workers, expected):
+    monkeypatch.setattr(variant_pool, "POOL_CONFIG", {f"{CAMPAIGN}::{CLUSTER}": PoolTarget(depth=5, ttl=60)})
+    monkeypatch.setenv("WEB_CONCURRENCY", workers)
+    assert variant_pool.worker_depth(CAMPAIGN, CLUSTER) == expected
+    assert variant_pool.refill_once(_generate) == expected
+
+
+def test_take_serves_each_set_once(monkeypatch):
+    monkeypatch.setattr(variant_pool, "POOL_CONFIG", {f"{CAMPAIGN}::{CLUSTER}": PoolTarget(depth=3, ttl=60)})
+    variant_pool.refill_once(_generate)
+    first = variant_pool.take(CAMPAIGN, CLUSTER, 2)
+    second = variant_pool.take(CAMPAIGN, CLUSTER, 2)
+    assert (len(first), len(second)) == (2, 1)
+    assert len({id(v) for v in first + second}) == 3
+
+
+def test_scheduler_does_not_start_without_config():
+    assert variant_pool.start_pool_scheduler(_generate) is False